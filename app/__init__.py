@@ -45,6 +45,9 @@ def create_app(config_name=None):
         from app.models import User
         return User.query.get(int(user_id))
     
+    # Session hooks keeping skill links, application status counts and jobseeker dashboards in step
+    from app.services import application_pipeline, jobseeker_dashboard, skill_links  # noqa: F401
+
     # Register new module blueprints - but skip the old admin one
     from app.modules.jobseeker.routes import jobseeker
     from app.modules.consultancy.routes import consultancy
@@ -76,6 +79,13 @@ def create_app(config_name=None):
     except ImportError as e:
         print(f"Warning: Could not register auth routes: {e}")
     
+    # Register taxonomy lookup API (typeahead for job and profile forms)
+    try:
+        from app.routes.reference_routes import reference_bp
+        app.register_blueprint(reference_bp)
+    except ImportError as e:
+        print(f"Warning: Could not register reference routes: {e}")
+    
     # Register legacy blueprints for backwards compatibility
     try:
         from app.modules.users.routes import users_bp
@@ -288,18 +298,13 @@ def create_app(config_name=None):
     def inject_csrf_token():
         def csrf_token():
             try:
-                # Try database-based CSRF token first
-                from app.auth.auth_models import CSRFToken
+                # Signed or database-backed token, depending on CSRF_TOKEN_MODE
+                from app.services.auth_service import SecurityService
                 user_id = None
                 if hasattr(current_user, 'is_authenticated') and current_user.is_authenticated:
                     user_id = getattr(current_user, 'id', None)
                 
-                return CSRFToken.generate_token(
-                    user_id=user_id,
-                    session_id=session.get('session_id'),
-                    ip_address=request.remote_addr if request else None,
-                    user_agent=request.headers.get('User-Agent') if request else None
-                )
+                return SecurityService.generate_csrf_token(user_id)
             except Exception as e:
                 # Fallback: return a simple session-based token if database operations fail
                 import secrets
@@ -4,7 +4,6 @@ Authentication Models for JWT, ACL, and Subscription Management
 
 from app import db
 from datetime import datetime, timedelta
-from werkzeug.security import generate_password_hash, check_password_hash
 from flask_login import UserMixin
 import jwt
 import uuid
@@ -96,11 +95,13 @@ class AuthUser(UserMixin, db.Model):
     
     def set_password(self, password):
         """Set password hash"""
-        self.password_hash = generate_password_hash(password)
+        from app.services.password_hasher import password_hasher
+        self.password_hash = password_hasher.hash(password)
     
     def check_password(self, password):
         """Check password"""
-        return check_password_hash(self.password_hash, password)
+        from app.services.password_hasher import password_hasher
+        return password_hasher.verify(self.password_hash, password)
     
     def is_account_locked(self):
         """Check if account is locked"""
@@ -134,37 +135,22 @@ class AuthUser(UserMixin, db.Model):
         db.session.commit()
     
     def update_last_activity(self):
-        """Update user's last activity timestamp"""
-        self.updated_at = datetime.utcnow()
-        try:
-            db.session.commit()
-        except Exception:
-            # If commit fails, rollback to prevent session issues
-            db.session.rollback()
+        """Record user's last activity; written back in batches by the activity tracker"""
+        from app.services.activity_tracker import activity_tracker
+        activity_tracker.record(self.id)
+    
+    def get_principal(self):
+        """Get resolved roles and permissions (cached per request)"""
+        from app.services.principal_service import get_principal
+        return get_principal(self)
     
     def has_role(self, role_name):
         """Check if user has specific role"""
-        return self.user_roles.join(Role).filter(Role.name == role_name).first() is not None
+        return self.get_principal().has_role(role_name)
     
     def has_permission(self, permission_name):
         """Check if user has specific permission (via role or direct assignment)"""
-        # Check direct permissions first
-        direct_perm = self.user_permissions.join(Permission).filter(
-            Permission.name == permission_name,
-            UserPermission.granted == True
-        ).first()
-        
-        if direct_perm:
-            return True
-        
-        # Check role-based permissions
-        role_perm = db.session.query(Permission).join(RolePermission).join(Role).join(UserRole, Role.id == UserRole.role_id).filter(
-            UserRole.user_id == self.id,
-            UserRole.is_active == True,
-            Permission.name == permission_name
-        ).first()
-        
-        return role_perm is not None
+        return self.get_principal().has_permission(permission_name)
     
     def get_roles(self):
         """Get all user roles"""
@@ -206,8 +192,6 @@ class AuthUser(UserMixin, db.Model):
             'user_id': self.id,
             'username': self.username,
             'email': self.email,
-            'roles': [role.name for role in self.get_roles()],
-            'permissions': [perm.name for perm in self.get_permissions()],
             'type': token_type,
             'exp': datetime.utcnow() + expires_delta,
             'iat': datetime.utcnow(),
@@ -220,9 +204,22 @@ class AuthUser(UserMixin, db.Model):
         try:
             from flask import current_app
             secret_key = current_app.config['SECRET_KEY']
+            compact_claims = current_app.config.get('JWT_COMPACT_CLAIMS', True)
         except RuntimeError:
             # Fallback if no request context (during initialization)
             secret_key = 'dev-secret-key-change-in-production-2024'  # This should match config
+            compact_claims = False
+        
+        if compact_claims:
+            # Role ids plus a fingerprint of the effective permission set
+            from app.services.principal_service import register_permission_set
+            principal = self.get_principal()
+            payload['role_ids'] = sorted(principal.role_ids)
+            payload['perm_fp'] = register_permission_set(principal.permissions)
+            payload['rbac_v'] = principal.rbac_version
+        else:
+            payload['roles'] = [role.name for role in self.get_roles()]
+            payload['permissions'] = [perm.name for perm in self.get_permissions()]
         
         return jwt.encode(payload, secret_key, algorithm='HS256')
     
@@ -546,6 +543,14 @@ class JWTBlacklist(db.Model):
     blacklisted_at = db.Column(db.DateTime, default=datetime.utcnow)
     reason = db.Column(db.String(255))
 
+class RateLimitState(db.Model):
+    """Shared rate limiter state, one row per throttled identifier"""
+    __tablename__ = 'rate_limit_state'
+    
+    key = db.Column(db.String(255), primary_key=True)
+    state_json = db.Column(db.JSON)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
 class CSRFToken(db.Model):
     """CSRF token model"""
     __tablename__ = 'csrf_tokens'
@@ -609,6 +614,13 @@ class CSRFToken(db.Model):
 class SecurityLog(db.Model):
     """Security audit log"""
     __tablename__ = 'security_logs'
+    __table_args__ = (
+        # Keyset browsing seeks on (created_at, id) behind each filter the log views offer
+        db.Index('idx_security_logs_created_id', 'created_at', 'id'),
+        db.Index('idx_security_logs_type_created_id', 'event_type', 'created_at', 'id'),
+        db.Index('idx_security_logs_severity_created_id', 'severity', 'created_at', 'id'),
+        db.Index('idx_security_logs_user_created_id', 'user_id', 'created_at', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('auth_users.id'))
@@ -622,17 +634,108 @@ class SecurityLog(db.Model):
     
     @staticmethod
     def log_security_event(event_type, user_id=None, ip_address=None, user_agent=None, details=None, severity='medium'):
-        """Log security event"""
-        log_entry = SecurityLog(
+        """Log security event; queued for a batched insert unless severity is critical"""
+        from app.services.security_log_writer import security_log_writer
+        return security_log_writer.log(
+            event_type,
             user_id=user_id,
-            event_type=event_type,
             ip_address=ip_address,
             user_agent=user_agent,
-            details_json=details,
+            details=details,
             severity=severity
         )
+
+class SecurityLogArchive(db.Model):
+    """Manifest of security log days exported to compressed archive files"""
+    __tablename__ = 'security_log_archives'
+    __table_args__ = (
+        db.UniqueConstraint('bucket_date', 'part', name='uq_security_log_archives_bucket_part'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    bucket_date = db.Column(db.Date, nullable=False, index=True)
+    part = db.Column(db.Integer, nullable=False, default=1)  # later parts hold rows that arrived after an export
+    path = db.Column(db.String(500), nullable=False)  # relative to SECURITY_LOG_ARCHIVE_DIR
+    row_count = db.Column(db.Integer, nullable=False, default=0)
+    min_id = db.Column(db.Integer)
+    max_id = db.Column(db.Integer)
+    min_created_at = db.Column(db.DateTime)  # time span of the part's rows, so pages skip parts that cannot hold theirs
+    max_created_at = db.Column(db.DateTime)
+    sha256 = db.Column(db.String(64))
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow)
+    purged_at = db.Column(db.DateTime)  # set once the rows are deleted from security_logs
+
+class DashboardCounter(db.Model):
+    """Pre-aggregated dashboard statistics, one row per metric, day and dimension"""
+    __tablename__ = 'dashboard_counters'
+    
+    metric = db.Column(db.String(50), primary_key=True)
+    bucket_date = db.Column(db.Date, primary_key=True)  # GAUGE_DATE for current totals
+    dimension = db.Column(db.String(100), primary_key=True, default='total')
+    value = db.Column(db.BigInteger, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class PermissionSet(db.Model):
+    """Distinct effective permission sets, referenced from JWTs by fingerprint"""
+    __tablename__ = 'permission_sets'
+    
+    fingerprint = db.Column(db.String(16), primary_key=True)
+    permissions_json = db.Column(db.JSON, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    @staticmethod
+    def register(fingerprint, permissions):
+        """Store a permission set outside the caller's transaction; no-op if known"""
+        from sqlalchemy import insert
+        from sqlalchemy.exc import IntegrityError
         
-        db.session.add(log_entry)
-        db.session.commit()
+        table = PermissionSet.__table__
+        try:
+            with db.engine.begin() as connection:
+                exists = connection.execute(
+                    table.select().where(table.c.fingerprint == fingerprint)
+                ).first()
+                if exists is None:
+                    connection.execute(insert(table).values(
+                        fingerprint=fingerprint,
+                        permissions_json=sorted(permissions),
+                        created_at=datetime.utcnow()
+                    ))
+        except IntegrityError:
+            pass  # Registered concurrently by another worker
+
+class CacheVersion(db.Model):
+    """Monotonic version counters used to invalidate per-process caches"""
+    __tablename__ = 'cache_versions'
+    
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.BigInteger, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    @staticmethod
+    def get_version(name):
+        """Read the current version of a cache (0 if never bumped)"""
+        version = db.session.query(CacheVersion.version).filter_by(name=name).scalar()
+        return version or 0
+    
+    @staticmethod
+    def bump(name):
+        """Increment a version counter as part of the current transaction"""
+        CacheVersion.bump_on(db.session.connection(), name)
+    
+    @staticmethod
+    def bump_on(connection, name):
+        """Increment a version counter on a connection; usable from session flush hooks"""
+        from sqlalchemy import insert, update
+        from sqlalchemy.exc import IntegrityError
         
-        return log_entry
+        table = CacheVersion.__table__
+        increment = update(table).where(table.c.name == name) \
+            .values(version=table.c.version + 1, updated_at=datetime.utcnow())
+        if connection.execute(increment).rowcount:
+            return
+        try:
+            with connection.begin_nested():
+                connection.execute(insert(table).values(name=name, version=1, updated_at=datetime.utcnow()))
+        except IntegrityError:
+            connection.execute(increment)  # Another transaction created the counter first
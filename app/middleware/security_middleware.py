@@ -11,6 +11,7 @@ from app.services.auth_service import (
     JWTAuthService, SecurityService, AuthorizationService
 )
 from app.auth.auth_models import SecurityLog, SecurityEventType
+from app.services.rate_limiter import rate_limiter
 import json
 
 def get_safe_request_info():
@@ -70,8 +71,10 @@ class SecurityMiddleware:
         # Check for JWT token and authenticate user
         self._authenticate_request()
         
-        # Basic rate limiting check
-        self._check_rate_limiting()
+        # Rate limiting check
+        response = self._check_rate_limiting()
+        if response is not None:
+            return response
         
         # Log suspicious activity
         self._check_suspicious_activity()
@@ -81,6 +84,11 @@ class SecurityMiddleware:
         # Add security headers
         response = self._add_security_headers(response)
         
+        # Report the caller's rate limit state
+        rate_limit = getattr(g, 'rate_limit', None)
+        if rate_limit is not None:
+            response.headers.extend(rate_limiter.headers(rate_limit))
+        
         # Log request details
         if hasattr(g, 'start_time'):
             duration = time.time() - g.start_time
@@ -162,14 +170,37 @@ class SecurityMiddleware:
         g.current_user = None
     
     def _check_rate_limiting(self):
-        """Basic rate limiting check"""
-        # Simple IP-based rate limiting
+        """Throttle by plan limit for users and by IP for anonymous traffic"""
+        g.rate_limit = None
+        if not rate_limiter.enabled or request.endpoint in ['static', 'health']:
+            return None
+        
         request_info = get_safe_request_info()
-        ip_address = request_info['ip_address'] or 'unknown'
+        result = rate_limiter.check_request(g.current_user, request_info['ip_address'])
+        g.rate_limit = result
+        
+        if result.allowed:
+            return None
+        
+        SecurityLog.log_security_event(
+            SecurityEventType.RATE_LIMIT_EXCEEDED,
+            user_id=getattr(g.current_user, 'id', None),
+            ip_address=request_info['ip_address'],
+            user_agent=request_info['user_agent'],
+            details={
+                'endpoint': request_info['endpoint'],
+                'limit': result.limit,
+                'retry_after': round(result.retry_after, 2)
+            },
+            severity='medium'
+        )
         
-        if not SecurityService.check_rate_limit(f"ip:{ip_address}", limit=100, window=300):
-            # Rate limit exceeded
-            return jsonify({'error': 'Rate limit exceeded'}), 429
+        response = jsonify({
+            'error': 'Rate limit exceeded',
+            'message': 'Too many requests. Please try again later.'
+        })
+        response.status_code = 429
+        return response
     
     def _check_suspicious_activity(self):
         """Check for suspicious activity patterns"""
@@ -305,7 +336,7 @@ class AuthMiddleware:
                 user_agent=request_info['user_agent'],
                 details={
                     'required_role': required_role,
-                    'user_roles': [role.name for role in g.current_user.roles],
+                    'user_roles': sorted(g.current_user.get_principal().roles),
                     'endpoint': request.endpoint
                 },
                 severity='medium'
@@ -389,6 +420,49 @@ def create_middleware_stack(app):
     # Initialize security middleware
     security_middleware = SecurityMiddleware(app)
     
+    # Initialize write-behind last-activity tracking
+    from app.services.activity_tracker import activity_tracker
+    activity_tracker.init_app(app)
+    
+    # Initialize batched security logging
+    from app.services.security_log_writer import security_log_writer
+    security_log_writer.init_app(app)
+    
+    # Initialize request throttling
+    rate_limiter.init_app(app)
+    
+    # Initialize in-memory JWT revocation checks
+    from app.services.revocation_index import revocation_index
+    revocation_index.init_app(app)
+    
+    # Initialize verified JWT caching
+    from app.services.token_cache import verified_token_cache
+    verified_token_cache.init_app(app)
+    
+    # Initialize offloaded password hashing
+    from app.services.password_hasher import password_hasher
+    password_hasher.init_app(app)
+    
+    # Initialize dashboard statistics rollups
+    from app.services.dashboard_rollups import dashboard_rollups
+    dashboard_rollups.init_app(app)
+    
+    # Initialize cached subscription sidebar totals
+    from app.services.subscription_summary import subscription_summary
+    subscription_summary.init_app(app)
+    
+    # Initialize cached security log browser totals
+    from app.services.keyset_pagination import security_log_counts
+    security_log_counts.init_app(app)
+    
+    # Initialize security log filter facets
+    from app.services.log_facets import log_facets
+    log_facets.init_app(app)
+    
+    # Initialize security log archiving and retention
+    from app.services.log_retention import log_retention
+    log_retention.init_app(app)
+    
     # Register middleware functions
     # Note: CSRF token injection is handled in app/__init__.py
     # @app.context_processor  
@@ -1,6 +1,5 @@
 from app import db
 from datetime import datetime
-from werkzeug.security import generate_password_hash, check_password_hash
 from enum import Enum
 
 class UserType(Enum):
@@ -33,11 +32,13 @@ class User(db.Model):
     
     def set_password(self, password):
         """Set password hash"""
-        self.password_hash = generate_password_hash(password)
+        from app.services.password_hasher import password_hasher
+        self.password_hash = password_hasher.hash(password)
     
     def check_password(self, password):
         """Check password"""
-        return check_password_hash(self.password_hash, password)
+        from app.services.password_hasher import password_hasher
+        return password_hasher.verify(self.password_hash, password)
     
     def to_dict(self):
         """Convert user to dictionary"""
@@ -89,6 +90,14 @@ class JobSeekerProfile(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    # The candidate index polls updated_at for other workers' edits
+    __table_args__ = (db.Index('idx_jobseeker_profiles_updated_at', 'updated_at'),)
+    
+    # Skills resolved against the taxonomy, kept in step with the skills text
+    skill_links = db.relationship('JobSeekerSkill', cascade='all, delete-orphan', lazy=True)
+    linked_skills = db.relationship('Skill', secondary='jobseeker_skills', viewonly=True,
+                                    order_by='Skill.display_name', lazy=True)
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -127,6 +136,11 @@ class ConsultancyProfile(db.Model):
     # Relationship with jobs
     jobs = db.relationship('Job', backref='consultancy', lazy=True)
     
+    # Specializations resolved against the skill taxonomy
+    skill_links = db.relationship('ConsultancySkill', cascade='all, delete-orphan', lazy=True)
+    linked_skills = db.relationship('Skill', secondary='consultancy_skills', viewonly=True,
+                                    order_by='Skill.display_name', lazy=True)
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -168,6 +182,17 @@ class Job(db.Model):
     # Relationship with applications
     applications = db.relationship('JobApplication', backref='job', lazy=True)
     
+    # Required skills resolved against the taxonomy
+    skill_links = db.relationship('JobSkill', cascade='all, delete-orphan', lazy=True)
+    linked_skills = db.relationship('Skill', secondary='job_skills', viewonly=True,
+                                    order_by='Skill.display_name', lazy=True)
+    
+    # City-radius search matches location against the labels of nearby cities; the
+    # search index polls updated_at and, while warming up, pages newest first
+    __table_args__ = (db.Index('idx_jobs_location', 'location'),
+                      db.Index('idx_jobs_updated_at', 'updated_at'),
+                      db.Index('idx_jobs_created', 'created_at', 'id'))
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -192,16 +217,24 @@ class JobApplication(db.Model):
     __tablename__ = 'job_applications'
     
     id = db.Column(db.Integer, primary_key=True)
-    job_id = db.Column(db.Integer, db.ForeignKey('jobs.id'), nullable=False)
+    # active_history: the status counts need the old job and status even when set on an expired object
+    job_id = db.column_property(db.Column(db.Integer, db.ForeignKey('jobs.id'), nullable=False),
+                                active_history=True)
     jobseeker_id = db.Column(db.Integer, db.ForeignKey('jobseeker_profiles.id'), nullable=False)
     cover_letter = db.Column(db.Text, nullable=True)
-    status = db.Column(db.String(50), default='applied')  # applied, reviewed, interviewed, rejected, hired
+    status = db.column_property(db.Column(db.String(50), default='applied'),  # see application_pipeline.STATUSES
+                                active_history=True)
     applied_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relationships
     jobseeker = db.relationship('JobSeekerProfile', backref='applications')
     
+    # A job's applications by status, for listings and bulk transitions; a jobseeker's, newest first
+    __table_args__ = (db.Index('idx_job_applications_job_status', 'job_id', 'status', 'applied_at', 'id'),
+                      db.Index('idx_job_applications_job_applied', 'job_id', 'applied_at', 'id'),
+                      db.Index('idx_job_applications_jobseeker', 'jobseeker_id', 'applied_at'))
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -213,6 +246,59 @@ class JobApplication(db.Model):
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
 
+class ApplicationStatusCount(db.Model):
+    """Applications per status of a job (scope 'job') or of all a consultancy's jobs (scope 'consultancy')"""
+    __tablename__ = 'application_status_counts'
+    
+    scope = db.Column(db.String(20), primary_key=True)
+    scope_id = db.Column(db.Integer, primary_key=True)
+    status = db.Column(db.String(50), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+class JobSeekerDashboard(db.Model):
+    """Read model of a jobseeker's dashboard, rewritten on profile and application writes (see jobseeker_dashboard)"""
+    __tablename__ = 'jobseeker_dashboards'
+    
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    profile_id = db.Column(db.Integer, nullable=True)
+    first_name = db.Column(db.String(50), nullable=True)
+    last_name = db.Column(db.String(50), nullable=True)
+    profile_completeness = db.Column(db.Integer, default=0)  # percent
+    profile_summary = db.Column(db.Text, nullable=True)  # JSON: job title, location, skill names
+    application_counts = db.Column(db.Text, nullable=True)  # JSON: status -> applications
+    recent_applications = db.Column(db.Text, nullable=True)  # JSON list, newest first
+    recently_viewed = db.Column(db.Text, nullable=True)  # JSON list, newest first
+    jobs_viewed = db.Column(db.Integer, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class Recommendation(db.Model):
+    """Precomputed top matches: profiles for a job (kind 'job') or jobs for a profile (kind 'profile')"""
+    __tablename__ = 'recommendations'
+    
+    kind = db.Column(db.String(10), primary_key=True)
+    subject_id = db.Column(db.Integer, primary_key=True)
+    rank = db.Column(db.Integer, primary_key=True)  # 1 is the best match
+    target_id = db.Column(db.Integer, nullable=False)
+    score = db.Column(db.Float, nullable=False)
+    computed_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    # Incremental runs look up the lists holding an edited job or profile
+    __table_args__ = (db.Index('idx_recommendations_target', 'kind', 'target_id'),)
+
+class RecommendationRun(db.Model):
+    """One run of the recommendation pipeline; the last finished run is the next run's watermark"""
+    __tablename__ = 'recommendation_runs'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    started_at = db.Column(db.DateTime, nullable=False)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    full = db.Column(db.Boolean, default=False)
+    reference_version = db.Column(db.BigInteger, default=0)  # skill taxonomy version the lists were scored with
+    top_k = db.Column(db.Integer, nullable=False)
+    jobs_scored = db.Column(db.Integer, default=0)
+    profiles_scored = db.Column(db.Integer, default=0)
+    lists_written = db.Column(db.Integer, default=0)
+
 class AuditLog(db.Model):
     """Audit log for admin/superadmin actions"""
     __tablename__ = 'audit_logs'
@@ -430,6 +516,37 @@ class Skill(db.Model):
             'sort_order': self.sort_order
         }
 
+# Skill association tables: the skill columns above resolved to Skill ids (see
+# app/services/skill_links.py). Keyed (owner, skill); the (skill, owner) index
+# answers "rows with skill X" without touching the owner table.
+class JobSeekerSkill(db.Model):
+    """A skill of a jobseeker profile"""
+    __tablename__ = 'jobseeker_skills'
+    
+    profile_id = db.Column(db.Integer, db.ForeignKey('jobseeker_profiles.id', ondelete='CASCADE'), primary_key=True)
+    skill_id = db.Column(db.Integer, db.ForeignKey('skills.id', ondelete='CASCADE'), primary_key=True)
+    
+    __table_args__ = (db.Index('idx_jobseeker_skills_skill', 'skill_id', 'profile_id'),)
+
+class JobSkill(db.Model):
+    """A skill required by a job"""
+    __tablename__ = 'job_skills'
+    
+    job_id = db.Column(db.Integer, db.ForeignKey('jobs.id', ondelete='CASCADE'), primary_key=True)
+    skill_id = db.Column(db.Integer, db.ForeignKey('skills.id', ondelete='CASCADE'), primary_key=True)
+    
+    __table_args__ = (db.Index('idx_job_skills_skill', 'skill_id', 'job_id'),)
+
+class ConsultancySkill(db.Model):
+    """A specialization of a consultancy"""
+    __tablename__ = 'consultancy_skills'
+    
+    consultancy_id = db.Column(db.Integer, db.ForeignKey('consultancy_profiles.id', ondelete='CASCADE'),
+                               primary_key=True)
+    skill_id = db.Column(db.Integer, db.ForeignKey('skills.id', ondelete='CASCADE'), primary_key=True)
+    
+    __table_args__ = (db.Index('idx_consultancy_skills_skill', 'skill_id', 'consultancy_id'),)
+
 # Experience Levels Model
 class Experience(db.Model):
     """Experience levels for job positions"""
@@ -12,6 +12,7 @@ from app.auth.auth_models import (
     AuthUser, Role, UserRole, UserSubscription, SubscriptionPlan, 
     SecurityLog, SecurityEventType, SubscriptionStatus
 )
+from app.services.principal_service import resolve_permission_set
 from app import db
 from datetime import datetime
 import re
@@ -932,11 +933,14 @@ def verify_token():
         user, message = JWTAuthService.verify_token(token)
         
         if user:
+            principal = user.get_principal()
             return jsonify({
                 'valid': True,
                 'user_id': user.id,
                 'username': user.username,
-                'roles': [role.name for role in user.get_roles()]
+                'roles': sorted(principal.roles),
+                # Clients compare this with their token's perm_fp to detect stale grants
+                'permissions_fingerprint': principal.fingerprint
             }), 200
         else:
             return jsonify({
@@ -950,6 +954,27 @@ def verify_token():
             'message': 'Error verifying token'
         }), 500
 
+@auth_bp.route('/permission-sets/<fingerprint>', methods=['GET'])
+@jwt_required
+def get_permission_set(fingerprint):
+    """Expand a token's permission fingerprint into permission names"""
+    permissions = resolve_permission_set(fingerprint)
+    
+    if permissions is None:
+        return jsonify({
+            'success': False,
+            'message': 'Unknown permission set'
+        }), 404
+    
+    response = jsonify({
+        'success': True,
+        'fingerprint': fingerprint,
+        'permissions': sorted(permissions)
+    })
+    # A fingerprint always names the same set, so clients may cache it
+    response.headers['Cache-Control'] = 'private, max-age=86400, immutable'
+    return response, 200
+
 # Health check endpoint
 @auth_bp.route('/health')
 def health_check():
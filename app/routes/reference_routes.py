@@ -0,0 +1,52 @@
+"""
+Reference Routes - Taxonomy lookups for job and profile forms
+Available to every signed-in user, served from in-memory indexes
+"""
+
+from flask import Blueprint, request, jsonify
+from app.middleware.security_middleware import AuthMiddleware
+from app.services.geo_index import get_geo_index, MAX_RADIUS_KM
+from app.services.reference_data import get_reference_data
+from app.services.typeahead import get_typeahead, MAX_LIMIT
+
+# Create blueprint
+reference_bp = Blueprint('reference', __name__, url_prefix='/api/reference')
+
+@reference_bp.before_request
+def require_login():
+    """Require an authenticated user for all routes in this blueprint"""
+    result = AuthMiddleware.require_auth()
+    if result:
+        return result
+
+@reference_bp.route('/typeahead/<kind>')
+def typeahead(kind):
+    """Autocomplete skills or cities by word prefix"""
+    query = request.args.get('q', '').strip()
+    limit = min(request.args.get('limit', 10, type=int), MAX_LIMIT)
+    
+    try:
+        results = get_typeahead().search(kind, query, limit)
+    except KeyError:
+        return jsonify({'error': f'Unknown typeahead: {kind}'}), 404
+    
+    response = jsonify({'query': query, 'results': results})
+    response.headers['Cache-Control'] = 'private, max-age=60'
+    return response
+
+@reference_bp.route('/cities/<int:city_id>/nearby')
+def nearby_cities(city_id):
+    """Cities within a radius (km) of a city, nearest first"""
+    radius = min(request.args.get('radius', 50, type=float), MAX_RADIUS_KM)
+    geo_index = get_geo_index()
+    
+    matches = geo_index.near_city(city_id, radius)
+    if not matches:
+        return jsonify({'error': 'City not found'}), 404
+    
+    cities = get_reference_data().tables['cities']
+    results = [{'id': match_id, 'name': cities[match_id].name, 'distance_km': round(distance, 1)}
+               for match_id, distance in matches]
+    response = jsonify({'city_id': city_id, 'radius_km': radius, 'results': results})
+    response.headers['Cache-Control'] = 'private, max-age=60'
+    return response
@@ -6,6 +6,7 @@ Dynamic menu generation based on database permissions
 from flask import Blueprint, render_template, request, redirect, url_for, flash, session, g
 from app.middleware.security_middleware import AuthMiddleware
 from app.auth.auth_models import AuthUser, Role, Permission  # Using AuthUser for admins
+from app.services.dashboard_rollups import dashboard_rollups
 from app import db
 
 # Create blueprint
@@ -217,11 +218,12 @@ def dashboard():
         
         # Get dashboard statistics based on permissions
         stats = {}
+        rollups = dashboard_rollups.read()
         
         # Only show stats the admin has permission to see
         if admin_user.has_permission('user.read'):
-            stats['total_users'] = AuthUser.query.count()
-            stats['active_users'] = AuthUser.query.filter_by(is_active=True).count()
+            stats['total_users'] = rollups.gauge('users')
+            stats['active_users'] = rollups.gauge('users', 'active')
         else:
             stats['total_users'] = 0
             stats['active_users'] = 0
@@ -234,14 +236,14 @@ def dashboard():
             stats['active_jobs'] = 0
         
         if admin_user.has_permission('subscription.read'):
-            stats['total_subscriptions'] = 0  # Would fetch from subscriptions
-            stats['active_subscriptions'] = 0
+            stats['total_subscriptions'] = rollups.gauge('subscriptions')
+            stats['active_subscriptions'] = rollups.gauge('subscriptions', 'active')
         else:
             stats['total_subscriptions'] = 0
             stats['active_subscriptions'] = 0
         
         if admin_user.has_permission('security.read'):
-            stats['security_events_today'] = 0  # Would fetch from security logs
+            stats['security_events_today'] = rollups.daily('security_events')
         else:
             stats['security_events_today'] = 0
         
@@ -2,10 +2,17 @@
 Consultancy Routes - Role-based functionality for recruitment companies
 Handles user table (not auth_users)
 """
-from flask import Blueprint, render_template, request, redirect, url_for, flash, session, g
+from flask import Blueprint, render_template, request, redirect, url_for, flash, session, g, current_app
 from app.middleware.security_middleware import AuthMiddleware
-from app.models import User, UserSession  # Using User model for consultancies
+from app.models import ConsultancyProfile, Job, JobApplication, JobSeekerProfile, User, UserSession  # Using User model for consultancies
+from app.services.application_pipeline import (APPLIED, CONSULTANCY_SCOPE, HIRED, INTERVIEWED, JOB_SCOPE, REJECTED,
+                                               REVIEWED, STATUSES, TRANSITIONS, status_counts, transition)
+from app.services.candidate_index import get_candidate_search, parse_experience_range, parse_skills
+from app.services.geo_index import get_geo_index
+from app.services.keyset_pagination import paginate_keyset
+from app.services.recommendations import JOB, recommended
 from app import db
+from sqlalchemy.orm import selectinload
 
 # Create blueprint
 consultancy_routes_bp = Blueprint('consultancy_routes', __name__, url_prefix='/consultancy')
@@ -134,19 +141,50 @@ def applications():
         user_id = session.get('user_id')
         
         # Get filter parameters
-        job_id = request.args.get('job_id')
+        job_id = request.args.get('job_id', type=int)
         status = request.args.get('status', 'all')
+        cursor = request.args.get('cursor')
+        
+        consultancy = ConsultancyProfile.query.filter_by(user_id=user_id).first()
+        jobs = Job.query.filter_by(consultancy_id=consultancy.id) \
+            .order_by(Job.created_at.desc(), Job.id.desc()).all() if consultancy else []
+        job_ids = [job.id for job in jobs]
+        if job_id not in job_ids:
+            job_id = None
+        
+        # Counts come from the status counters, not from grouping the applications
+        job_counts = status_counts(JOB_SCOPE, job_ids)
+        if job_id:
+            counts = job_counts[job_id]
+        elif consultancy:
+            counts = status_counts(CONSULTANCY_SCOPE, [consultancy.id])[consultancy.id]
+        else:
+            counts = dict.fromkeys((*STATUSES, 'total'), 0)
+        
+        # Newest first, served by the (job_id, applied_at, id) index, or (job_id, status, applied_at, id)
+        # with a status
+        query = JobApplication.query.options(
+            selectinload(JobApplication.job), selectinload(JobApplication.jobseeker).selectinload(JobSeekerProfile.user)
+        ).filter(JobApplication.job_id == job_id if job_id else JobApplication.job_id.in_(job_ids))
+        if status in STATUSES:
+            query = query.filter(JobApplication.status == status)
+        try:
+            page = paginate_keyset(query, JobApplication.applied_at, JobApplication.id, cursor, per_page=50)
+        except ValueError:
+            page = paginate_keyset(query, JobApplication.applied_at, JobApplication.id, per_page=50)
         
         applications_data = {
-            'applications': [],  # Would fetch applications for company's jobs
-            'jobs': [],  # Would fetch company's jobs for filtering
+            'applications': page,
+            'jobs': jobs,
+            'job_counts': job_counts,  # job id -> applications per status
+            'transitions': TRANSITIONS,
             'stats': {
-                'total': 0,
-                'new': 0,
-                'reviewed': 0,
-                'interviewed': 0,
-                'hired': 0,
-                'rejected': 0
+                'total': counts['total'],
+                'new': counts[APPLIED],
+                'reviewed': counts[REVIEWED],
+                'interviewed': counts[INTERVIEWED],
+                'hired': counts[HIRED],
+                'rejected': counts[REJECTED]
             },
             'filters': {
                 'job_id': job_id,
@@ -160,32 +198,109 @@ def applications():
         flash(f'Error loading applications: {str(e)}', 'error')
         return render_template('consultancy/applications.html', applications=[], stats={})
 
+@consultancy_routes_bp.route('/applications/status', methods=['POST'])
+def update_application_status():
+    """Move the selected applications (or all of a job's applications in one status) to a new status"""
+    user_id = session.get('user_id')
+    job_id = request.form.get('job_id', type=int)
+    from_status = request.form.get('from_status')
+    try:
+        consultancy = ConsultancyProfile.query.filter_by(user_id=user_id).first()
+        if not consultancy:
+            flash('Consultancy profile not found', 'error')
+            return redirect('/consultancy/applications')
+        
+        application_ids = [int(value) for value in request.form.getlist('application_ids') if value.isdigit()]
+        if not application_ids and not job_id:
+            flash('Select the applications to update', 'warning')
+        elif not application_ids and from_status not in STATUSES:
+            flash('Choose the status to move the job\'s applications from', 'warning')
+        else:
+            moved = transition(request.form.get('status'), application_ids=application_ids or None, job_id=job_id,
+                               from_statuses=[from_status] if from_status else None, consultancy_id=consultancy.id)
+            db.session.commit()
+            flash(f'{moved} application{"s" if moved != 1 else ""} moved to {request.form.get("status")}', 'success')
+        
+    except ValueError as e:
+        db.session.rollback()
+        flash(str(e), 'error')
+    except Exception as e:
+        db.session.rollback()
+        flash(f'Error updating applications: {str(e)}', 'error')
+    
+    return redirect(url_for('.applications', job_id=job_id, status=from_status or 'all'))
+
 @consultancy_routes_bp.route('/candidates')
 def candidates():
     """Browse and search candidates"""
     try:
         user_id = session.get('user_id')
         
-        # Get search parameters
+        # Get search parameters (skills as a comma-separated list, experience as '3', '3+' or '3-5')
         search_query = request.args.get('q', '')
         skills = request.args.get('skills', '')
+        skill_match = request.args.get('skill_match', 'any')
         experience = request.args.get('experience', '')
         location = request.args.get('location', '')
+        city_id = request.args.get('city_id', type=int)
+        radius = request.args.get('radius', current_app.config.get('JOB_SEARCH_DEFAULT_RADIUS_KM', 50), type=float)
+        cursor = request.args.get('cursor')
+        
+        skill_list = parse_skills(skills)
+        experience_min, experience_max = parse_experience_range(experience)
+        locations, _ = get_geo_index().location_filter(location, city_id, radius)
+        
+        candidate_search = get_candidate_search()
+        filters = dict(skills=skill_list, match_all=skill_match == 'all', query=search_query,
+                       experience_min=experience_min, experience_max=experience_max, locations=locations, per_page=20)
+        try:
+            candidates_page = candidate_search.search(cursor=cursor, **filters)
+        except ValueError:
+            candidates_page = candidate_search.search(**filters)
+        
+        # Render from the rows; ids whose profiles are gone are dropped from the index
+        rows = {profile.id: profile for profile in
+                JobSeekerProfile.query.options(selectinload(JobSeekerProfile.linked_skills),
+                                               selectinload(JobSeekerProfile.user))
+                .filter(JobSeekerProfile.id.in_(candidates_page.items))} \
+            if candidates_page.items else {}
+        missing = [profile_id for profile_id in candidates_page.items if profile_id not in rows]
+        if missing:
+            candidate_search.forget(missing)
+        candidates_page.items = [rows[profile_id] for profile_id in candidates_page.items if profile_id in rows]
+        
+        # ?job_id= shows the precomputed best candidates for one of this consultancy's jobs
+        job_id = request.args.get('job_id', type=int)
+        recommended_candidates = []
+        consultancy = ConsultancyProfile.query.filter_by(user_id=user_id).first() if job_id else None
+        if consultancy and Job.query.filter_by(id=job_id, consultancy_id=consultancy.id).first():
+            scores = dict(recommended(JOB, job_id))
+            profiles = JobSeekerProfile.query.options(selectinload(JobSeekerProfile.linked_skills)) \
+                .filter(JobSeekerProfile.id.in_(scores)).all() if scores else []
+            recommended_candidates = sorted(profiles, key=lambda profile: (-scores[profile.id], profile.id))
         
         candidates_data = {
-            'candidates': [],  # Would fetch from jobseeker profiles
-            'total_count': 0,
+            'candidates': candidates_page,
+            'total_count': candidates_page.total,
+            'search_warming': candidate_search.warming,  # empty until the index is built
+            'unknown_skills': candidate_search.resolve(skill_list)[1],
+            'recommended_candidates': recommended_candidates,
             'filters': {
                 'skills': [],  # Would fetch from database
-                'experience_levels': [],
+                'experience_levels': ['0-2', '3-5', '6-10', '10+'],
                 'locations': []
             },
             'search_params': {
                 'query': search_query,
                 'skills': skills,
+                'skill_match': skill_match,
                 'experience': experience,
-                'location': location
-            }
+                'location': location,
+                'city_id': city_id,
+                'radius': radius,
+                'job_id': job_id
+            },
+            'page_args': {key: value for key, value in request.args.items() if key != 'cursor' and value}
         }
         
         return render_template('consultancy/candidates.html', **candidates_data)
@@ -2,10 +2,20 @@
 Jobseeker Routes - Role-based functionality for job seekers
 Handles user table (not auth_users)
 """
-from flask import Blueprint, render_template, request, redirect, url_for, flash, session, g
+from datetime import datetime
+from flask import Blueprint, render_template, request, redirect, url_for, flash, session, g, current_app
 from app.middleware.security_middleware import AuthMiddleware
-from app.models import User, UserSession  # Using User model for jobseekers
+from app.models import Job, JobApplication, User, UserSession  # Using User model for jobseekers
+from app.services.geo_index import get_geo_index
+from app.services.application_pipeline import INTERVIEWED, REJECTED
+from app.services.candidate_index import parse_skills
+from app.services.job_search import get_job_search
+from app.services.jobseeker_dashboard import get_dashboard, record_job_view
+from app.services.keyset_pagination import paginate_keyset
+from app.services.recommendations import PROFILE, open_jobs, recommended
+from app.services.skill_links import resolve
 from app import db
+from sqlalchemy.orm import joinedload, selectinload
 
 # Create blueprint
 jobseeker_routes_bp = Blueprint('jobseeker_routes', __name__, url_prefix='/jobseeker')
@@ -25,26 +35,39 @@ def require_jobseeker_auth():
 def dashboard():
     """Jobseeker dashboard with job search focus"""
     try:
-        # Get current user from session
-        user_id = session.get('user_id')
-        user = User.query.get(user_id) if user_id else None
+        # One keyed read of the user's dashboard row
+        summary = get_dashboard(session.get('user_id'))
         
-        if not user:
+        if not summary:
             flash('Session expired. Please login again.', 'warning')
             return redirect('/jobseeker/login')
         
+        # Precomputed by the recommendation pipeline; jobs closed or expired since its
+        # last run are skipped, so the stored list is read whole and the best 5 open ones shown
+        recommended_ids = [job_id for job_id, _ in recommended(PROFILE, summary.profile_id)] \
+            if summary.profile_id else []
+        recommended_jobs = {job.id: job for job in Job.query.filter(Job.id.in_(recommended_ids),
+                                                                    open_jobs(datetime.utcnow()))} \
+            if recommended_ids else {}
+        
         # Dashboard statistics for job seeker
         dashboard_data = {
-            'user': user,
+            'summary': summary,
+            'profile': summary.profile,
             'stats': {
-                'applications_submitted': 0,  # Would fetch from database
-                'jobs_viewed': 0,
+                'applications_submitted': summary.total_applications,
+                'jobs_viewed': summary.jobs_viewed,
                 'profile_views': 0,
-                'interviews_scheduled': 0
+                'interviews_scheduled': summary.counts[INTERVIEWED]
             },
-            'recent_jobs': [],  # Would fetch recent job postings
-            'recent_applications': [],  # Would fetch user's applications
-            'recommended_jobs': []  # Would fetch AI-recommended jobs
+            'total_applications': summary.total_applications,
+            'pending_applications': summary.pending_applications,
+            'accepted_applications': summary.accepted_applications,
+            'profile_completeness': summary.profile_completeness,
+            'recent_jobs': summary.recently_viewed,
+            'recent_applications': summary.recent_applications,
+            'recommended_jobs': [recommended_jobs[job_id] for job_id in recommended_ids
+                                 if job_id in recommended_jobs][:5]
         }
         
         return render_template('jobseeker/dashboard.html', **dashboard_data)
@@ -60,16 +83,51 @@ def jobs():
     try:
         user_id = session.get('user_id')
         
-        # Get search parameters
-        search_query = request.args.get('q', '')
+        # Get search parameters (the search form posts 'search' and 'job_type')
+        search_query = request.args.get('q') or request.args.get('search', '')
         location = request.args.get('location', '')
         category = request.args.get('category', '')
-        job_type = request.args.get('type', '')
+        job_type = request.args.get('type') or request.args.get('job_type', '')
+        salary_min = request.args.get('salary_min', type=float)
+        salary_max = request.args.get('salary_max', type=float)
+        skills = request.args.get('skills', '')
+        skill_match = request.args.get('skill_match', 'any')
+        city_id = request.args.get('city_id', type=int)
+        radius = request.args.get('radius', current_app.config.get('JOB_SEARCH_DEFAULT_RADIUS_KM', 50), type=float)
+        cursor = request.args.get('cursor')
+        
+        # Skills (comma-separated) narrow the search to the jobs requiring any (or all) of
+        # them, filtered inside the index from its per-skill postings
+        skill_ids, unknown_skills = resolve(parse_skills(skills))
+        
+        # "Jobs within N km of X": the city (typeahead id or typed name) becomes the
+        # labels of the cities inside the radius, matched against the job location
+        locations, distances = get_geo_index().location_filter(location, city_id, radius)
+        
+        job_search = get_job_search()
+        filters = dict(query=search_query, locations=locations, category=category, job_type=job_type,
+                       salary_min=salary_min, salary_max=salary_max, skills=skill_ids if skills.strip() else None,
+                       match_all=skill_match == 'all', per_page=20)
+        try:
+            jobs_page = job_search.search(cursor=cursor, **filters)
+        except ValueError:
+            jobs_page = job_search.search(**filters)
+        
+        # Render from the rows; ids whose rows are gone are dropped from the index
+        rows = {job.id: job for job in Job.query.options(selectinload(Job.linked_skills))
+                .filter(Job.id.in_(jobs_page.items))} if jobs_page.items else {}
+        missing = [job_id for job_id in jobs_page.items if job_id not in rows]
+        if missing:
+            job_search.forget(missing)
+        jobs_page.items = [rows[job_id] for job_id in jobs_page.items if job_id in rows]
         
-        # Mock job data (would come from database in real app)
         jobs_data = {
-            'jobs': [],  # Would fetch from jobs table
-            'total_count': 0,
+            'jobs': jobs_page,
+            'total_count': jobs_page.total,
+            'total_jobs': len(job_search),
+            'search_warming': job_search.warming,  # served from the database until the index is built
+            'distances': distances,  # lower-cased job location -> km from the searched city
+            'unknown_skills': unknown_skills,
             'filters': {
                 'categories': [],  # Would fetch from database
                 'locations': [],
@@ -79,8 +137,15 @@ def jobs():
                 'query': search_query,
                 'location': location,
                 'category': category,
-                'type': job_type
-            }
+                'type': job_type,
+                'salary_min': salary_min,
+                'salary_max': salary_max,
+                'skills': skills,
+                'skill_match': skill_match,
+                'city_id': city_id,
+                'radius': radius
+            },
+            'page_args': {key: value for key, value in request.args.items() if key != 'cursor' and value}
         }
         
         return render_template('jobseeker/jobs.html', **jobs_data)
@@ -93,15 +158,26 @@ def jobs():
 def applications():
     """View job applications history"""
     try:
-        user_id = session.get('user_id')
+        summary = get_dashboard(session.get('user_id'))
+        cursor = request.args.get('cursor')
+        
+        # Newest first from the jobseeker's index; the stats come with the dashboard row
+        page = []
+        if summary and summary.profile_id:
+            query = JobApplication.query.options(joinedload(JobApplication.job)) \
+                .filter(JobApplication.jobseeker_id == summary.profile_id)
+            try:
+                page = paginate_keyset(query, JobApplication.applied_at, JobApplication.id, cursor, per_page=20)
+            except ValueError:
+                page = paginate_keyset(query, JobApplication.applied_at, JobApplication.id, per_page=20)
         
         applications_data = {
-            'applications': [],  # Would fetch user's applications
+            'applications': page,
             'stats': {
-                'total': 0,
-                'pending': 0,
-                'accepted': 0,
-                'rejected': 0
+                'total': summary.total_applications if summary else 0,
+                'pending': summary.pending_applications if summary else 0,
+                'accepted': summary.accepted_applications if summary else 0,
+                'rejected': summary.counts[REJECTED] if summary else 0
             }
         }
         
@@ -111,6 +187,25 @@ def applications():
         flash(f'Error loading applications: {str(e)}', 'error')
         return render_template('jobseeker/applications.html', applications=[], stats={})
 
+@jobseeker_routes_bp.route('/jobs/<int:job_id>')
+def job_detail(job_id):
+    """Job details; the view goes to the top of the user's recently viewed jobs"""
+    try:
+        job = Job.query.get(job_id)
+        if not job or not job.is_active:
+            flash('Job not found', 'error')
+            return redirect('/jobseeker/jobs')
+        
+        # Counted only once the page has rendered
+        page = render_template('jobseeker/job_detail.html', job=job)
+        record_job_view(session.get('user_id'), job)
+        db.session.commit()
+        return page
+        
+    except Exception as e:
+        flash(f'Error loading job: {str(e)}', 'error')
+        return redirect('/jobseeker/jobs')
+
 @jobseeker_routes_bp.route('/resume')
 def resume():
     """Resume builder and management"""
@@ -139,16 +234,16 @@ def resume():
 def profile():
     """User profile management"""
     try:
-        user_id = session.get('user_id')
-        user = User.query.get(user_id)
+        summary = get_dashboard(session.get('user_id'))
         
-        if not user:
+        if not summary:
             flash('User not found', 'error')
             return redirect('/jobseeker/dashboard')
         
         profile_data = {
-            'user': user,
-            'profile_completeness': 75,  # Would calculate based on filled fields
+            'summary': summary,
+            'profile': summary.profile,
+            'profile_completeness': summary.profile_completeness,
             'verification_status': 'pending'
         }
         
@@ -3,7 +3,10 @@ SuperAdmin Routes - ACL and Subscription Management
 Minimalist admin interface with comprehensive controls
 """
 
-from flask import Blueprint, request, jsonify, render_template, flash, redirect, url_for, g
+from flask import (
+    Blueprint, request, jsonify, render_template, flash, redirect, url_for, g,
+    current_app, Response, stream_with_context
+)
 from app.services.auth_service import (
     JWTAuthService, SecurityService, AuthorizationService,
     jwt_required, require_role, require_permission, csrf_protect
@@ -13,10 +16,20 @@ from app.auth.auth_models import (
     AuthUser, Role, Permission, SubscriptionPlan, UserSubscription, SubscriptionFeature,
     SecurityLog, SecurityEventType, SubscriptionStatus, UserRole, JobPortal, UserPortalAccess
 )
+from app.services.rbac_snapshot import bump_rbac_version
+from app.services.reference_data import bump_reference_version, get_reference_data
+from app.services.dashboard_rollups import dashboard_rollups
+from app.services.subscription_summary import subscription_summary
+from app.services.export_service import UserExportStream, decode_cursor
+from app.services.keyset_pagination import paginate_keyset, security_log_counts
+from app.services.log_retention import log_retention
+from app.services.log_facets import log_facets
+from app.services.skill_links import get_skill_relinker
 from app.models import (
     IndustryType, Skill, Experience, JobRole, CompanyType, JobType, Country, State, City
 )
 from app import db
+from sqlalchemy.orm import contains_eager
 from datetime import datetime, timedelta
 import json
 
@@ -37,18 +50,15 @@ def require_superadmin():
 def dashboard():
     """SuperAdmin dashboard with key metrics"""
     try:
-        # Get key statistics
+        # Get key statistics from the rollup table
+        rollups = dashboard_rollups.read()
         stats = {
-            'total_users': AuthUser.query.count(),
-            'active_users': AuthUser.query.filter_by(is_active=True).count(),
-            'total_subscriptions': UserSubscription.query.count(),
-            'active_subscriptions': UserSubscription.query.filter_by(
-                status=SubscriptionStatus.ACTIVE.value
-            ).count(),
-            'security_events_today': SecurityLog.query.filter(
-                SecurityLog.created_at >= datetime.utcnow().date()
-            ).count(),
-            'high_severity_events': SecurityLog.query.filter_by(severity='high').count()
+            'total_users': rollups.gauge('users'),
+            'active_users': rollups.gauge('users', 'active'),
+            'total_subscriptions': rollups.gauge('subscriptions'),
+            'active_subscriptions': rollups.gauge('subscriptions', 'active'),
+            'security_events_today': rollups.daily('security_events'),
+            'high_severity_events': rollups.gauge('security_events', 'severity:high')
         }
         
         # Recent security events
@@ -57,10 +67,7 @@ def dashboard():
         ).limit(10).all()
         
         # Subscription breakdown
-        subscription_stats = db.session.query(
-            SubscriptionPlan.name,
-            db.func.count(UserSubscription.id).label('count')
-        ).join(UserSubscription).group_by(SubscriptionPlan.name).all()
+        subscription_stats = rollups.breakdown('subscriptions', 'plan:')
         
         return render_template('superadmin/dashboard.html', 
                              stats=stats, 
@@ -373,6 +380,7 @@ def create_role():
                     role.permissions.append(permission)
             
             db.session.add(role)
+            bump_rbac_version()
             db.session.commit()
             
             SecurityLog.log_security_event(
@@ -472,6 +480,7 @@ def edit_role(role_id):
                 if permission:
                     role.permissions.append(permission)
             
+            bump_rbac_version()
             db.session.commit()
             
             SecurityLog.log_security_event(
@@ -517,6 +526,7 @@ def delete_role(role_id):
         
         # Delete the role
         db.session.delete(role)
+        bump_rbac_version()
         db.session.commit()
         
         SecurityLog.log_security_event(
@@ -583,6 +593,7 @@ def add_permission():
             )
             
             db.session.add(permission)
+            bump_rbac_version()
             db.session.commit()
             
             SecurityLog.log_security_event(
@@ -630,6 +641,7 @@ def edit_permission(permission_id):
             if description:
                 permission.description = description
             
+            bump_rbac_version()
             db.session.commit()
             
             SecurityLog.log_security_event(
@@ -673,6 +685,7 @@ def delete_permission(permission_id):
         
         # Delete the permission
         db.session.delete(permission)
+        bump_rbac_version()
         db.session.commit()
         
         SecurityLog.log_security_event(
@@ -721,6 +734,7 @@ def create_permission():
             )
             
             db.session.add(permission)
+            bump_rbac_version()
             db.session.commit()
             
             SecurityLog.log_security_event(
@@ -845,8 +859,8 @@ def manage_subscription(subscription_id):
 @superadmin_bp.route('/security')
 def security_logs():
     """View security logs and events"""
-    page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 50, type=int)
+    cursor = request.args.get('cursor', '')
+    per_page = min(request.args.get('per_page', 50, type=int), 200)
     event_type = request.args.get('event_type', '')
     severity = request.args.get('severity', '')
     date_from = request.args.get('date_from', '')
@@ -861,6 +875,7 @@ def security_logs():
     if severity:
         query = query.filter(SecurityLog.severity == severity)
     
+    date_from_obj = date_to_obj = None
     if date_from:
         try:
             date_from_obj = datetime.strptime(date_from, '%Y-%m-%d')
@@ -875,30 +890,58 @@ def security_logs():
         except ValueError:
             pass
     
-    logs = query.order_by(SecurityLog.created_at.desc()).paginate(
-        page=page, per_page=per_page, error_out=False
+    # Aged days live in archive files; a page reads only the archive parts
+    # that can hold its rows, and none while the hot table fills it
+    archive_from = date_from_obj.date() if date_from_obj else None
+    archive_to = (date_to_obj - timedelta(days=1)).date() if date_to_obj else None
+    archived = lambda bound, newest_first, limit, threshold: log_retention.archived_page(
+        limit, bound, newest_first, threshold, date_from=archive_from, date_to=archive_to,
+        event_type=event_type, severity=severity
     )
     
-    # Get unique event types and severities for filters
-    event_types = db.session.query(SecurityLog.event_type.distinct()).all()
-    severities = db.session.query(SecurityLog.severity.distinct()).all()
-    
-    # Extract string values from enums
-    event_type_values = [et[0].value if hasattr(et[0], 'value') else et[0] for et in event_types]
-    severity_values = [s[0] for s in severities]
+    # Seek to the requested page; cost is the same at any depth
+    try:
+        logs = paginate_keyset(query, SecurityLog.created_at, SecurityLog.id, cursor=cursor, per_page=per_page,
+                               extra_rows=archived)
+    except ValueError:
+        flash('Invalid page link, showing the newest entries', 'warning')
+        logs = paginate_keyset(query, SecurityLog.created_at, SecurityLog.id, per_page=per_page,
+                               extra_rows=archived)
+    count_key = ('security_logs', event_type, severity, date_from, date_to)
+    logs.total, logs.total_capped = security_log_counts.count(count_key, query, SecurityLog.id)
+    # The manifest holds each part's row count; filtered totals read parts up to the count cap
+    if event_type or severity:
+        archived_total, archived_capped = security_log_counts.count_rows(
+            count_key + ('archived',),
+            log_retention.iter_archived(archive_from, archive_to, event_type=event_type, severity=severity)
+        )
+    else:
+        archived_total, archived_capped = log_retention.archived_count(archive_from, archive_to), False
+    total = logs.total + archived_total
+    logs.total = min(total, security_log_counts.cap)
+    logs.total_capped = logs.total_capped or archived_capped or total > security_log_counts.cap
+    
+    # Filter choices come from the enums and their counts from the rollups,
+    # so the dropdowns never scan security_logs
+    options = log_facets.options()
+    facet_counts = log_facets.counts(
+        date_from_obj.date() if date_from_obj else None,
+        (date_to_obj - timedelta(days=1)).date() if date_to_obj else None
+    )
     
     # Calculate today's start for filtering today's events
-    from datetime import datetime, timedelta
     today_start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
     
     # Calculate today's events count
     today_events_count = len([log for log in logs.items if log.created_at and log.created_at >= today_start])
 
     return render_template('superadmin/security_logs.html',
-                         logs=logs, event_types=event_type_values,
-                         severities=severity_values,
+                         logs=logs, event_types=options['event_type'],
+                         severities=options['severity'],
+                         facet_counts=facet_counts,
                          today_start=today_start,
                          today_events_count=today_events_count,
+                         retention_days=log_retention.retention_days,
                          filters={
                              'event_type': event_type,
                              'severity': severity,
@@ -1162,12 +1205,17 @@ def user_activity_log(user_id):
     """View user activity log"""
     user = AuthUser.query.get_or_404(user_id)
     
-    page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 50, type=int)
+    cursor = request.args.get('cursor', '')
+    per_page = min(request.args.get('per_page', 50, type=int), 200)
     
-    activity_logs = SecurityLog.query.filter_by(user_id=user_id).order_by(
-        SecurityLog.created_at.desc()
-    ).paginate(page=page, per_page=per_page, error_out=False)
+    query = SecurityLog.query.filter_by(user_id=user_id)
+    try:
+        activity_logs = paginate_keyset(query, SecurityLog.created_at, SecurityLog.id, cursor=cursor, per_page=per_page)
+    except ValueError:
+        activity_logs = paginate_keyset(query, SecurityLog.created_at, SecurityLog.id, per_page=per_page)
+    activity_logs.total, activity_logs.total_capped = security_log_counts.count(
+        ('user_activity', user_id), query, SecurityLog.id
+    )
     
     return render_template('superadmin/user_activity.html', 
                          user=user, activity_logs=activity_logs)
@@ -1227,21 +1275,16 @@ def update_user(user_id):
 def security_stats():
     """Get security statistics for dashboard"""
     try:
-        today = datetime.utcnow().date()
-        last_week = today - timedelta(days=7)
+        rollups = dashboard_rollups.read()
+        last_week = rollups.today - timedelta(days=7)
         
         stats = {
-            'events_today': SecurityLog.query.filter(
-                SecurityLog.created_at >= today
-            ).count(),
-            'events_this_week': SecurityLog.query.filter(
-                SecurityLog.created_at >= last_week
-            ).count(),
-            'high_severity_events': SecurityLog.query.filter_by(severity='high').count(),
-            'failed_logins_today': SecurityLog.query.filter(
-                SecurityLog.event_type == SecurityEventType.LOGIN_FAILED.value,
-                SecurityLog.created_at >= today
-            ).count()
+            'events_today': rollups.daily('security_events'),
+            'events_this_week': rollups.daily('security_events', since=last_week),
+            'high_severity_events': rollups.gauge('security_events', 'severity:high'),
+            'failed_logins_today': rollups.daily(
+                'security_events', f'event_type:{SecurityEventType.LOGIN_FAILED.value}'
+            )
         }
         
         return jsonify(stats)
@@ -1249,64 +1292,111 @@ def security_stats():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-# Export/Import functionality
-@superadmin_bp.route('/export/users')
-def export_users():
-    """Export users data as JSON"""
+@superadmin_bp.route('/api/dashboard-rollups/check')
+def check_dashboard_rollups():
+    """Compare the dashboard rollups with the base tables"""
     try:
-        users = AuthUser.query.all()
-        
-        export_data = []
-        for user in users:
-            user_data = {
-                'id': user.id,
-                'username': user.username,
-                'email': user.email,
-                'first_name': user.first_name,
-                'last_name': user.last_name,
-                'is_active': user.is_active,
-                'created_at': user.created_at.isoformat() if user.created_at else None,
-                'roles': [role.name for role in user.roles],
-                'subscription': {
-                    'plan': user.get_active_subscription().plan.name if user.get_active_subscription() else None,
-                    'status': user.get_active_subscription().status if user.get_active_subscription() else None
-                }
-            }
-            export_data.append(user_data)
+        days = request.args.get('days', 7, type=int)
+        mismatches = dashboard_rollups.check_consistency(days=days)
+        return jsonify({
+            'consistent': not mismatches,
+            'days_checked': days,
+            'mismatches': mismatches
+        })
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@superadmin_bp.route('/api/dashboard-rollups/check', methods=['POST'])
+@csrf_protect
+def repair_dashboard_rollups():
+    """Rewrite dashboard rollups that drifted from the base tables"""
+    try:
+        days = request.form.get('days', 7, type=int)
+        mismatches = dashboard_rollups.check_consistency(days=days, repair=True)
+        if mismatches:
+            log_facets.clear()  # Repaired day buckets may already be cached as final
         
         SecurityLog.log_security_event(
-            SecurityEventType.DATA_EXPORT,
+            SecurityEventType.SYSTEM_MAINTENANCE,
             user_id=g.current_user.id,
             ip_address=request.remote_addr,
             user_agent=request.headers.get('User-Agent'),
-            details={'export_type': 'users', 'record_count': len(export_data)},
-            severity='medium'
+            details={
+                'action': 'repair_rollups',
+                'days': days,
+                'mismatches': len(mismatches)
+            },
+            severity='low'
         )
         
         return jsonify({
-            'success': True,
-            'data': export_data,
-            'exported_at': datetime.utcnow().isoformat(),
-            'exported_by': g.current_user.username
+            'repaired': len(mismatches),
+            'days_checked': days,
+            'mismatches': mismatches
         })
     
     except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
+        return jsonify({'error': str(e)}), 500
+
+# Export/Import functionality
+@superadmin_bp.route('/export/users')
+def export_users():
+    """Stream users as NDJSON (default) or CSV; resume with ?cursor=<last record's cursor>"""
+    export_format = request.args.get('format', 'ndjson')
+    cursor = request.args.get('cursor', '')
+    if export_format not in ('ndjson', 'csv'):
+        return jsonify({'success': False, 'error': 'format must be ndjson or csv'}), 400
+    
+    try:
+        after_id = decode_cursor(cursor)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
+    stream = UserExportStream(after_id=after_id, batch_size=current_app.config.get('EXPORT_BATCH_SIZE', 500))
+    user_id = g.current_user.id
+    ip_address = request.remote_addr
+    user_agent = request.headers.get('User-Agent')
+    
+    def generate():
+        completed = False
+        try:
+            if export_format == 'csv':
+                yield from stream.csv(header=not cursor)
+            else:
+                yield from stream.ndjson()
+            completed = True
+        finally:
+            SecurityLog.log_security_event(
+                SecurityEventType.DATA_EXPORT,
+                user_id=user_id,
+                ip_address=ip_address,
+                user_agent=user_agent,
+                details={
+                    'export_type': 'users',
+                    'format': export_format,
+                    'resumed': bool(cursor),
+                    'record_count': stream.exported,
+                    'completed': completed
+                },
+                severity='medium'
+            )
+    
+    mimetype = 'text/csv' if export_format == 'csv' else 'application/x-ndjson'
+    filename = f"users_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.{export_format}"
+    return Response(stream_with_context(generate()), mimetype=mimetype, headers={
+        'Content-Disposition': f'attachment; filename={filename}',
+        'X-Exported-By': g.current_user.username
+    })
 
 # System maintenance
 @superadmin_bp.route('/maintenance/cleanup-logs', methods=['POST'])
 @csrf_protect
 def cleanup_old_logs():
-    """Clean up old security logs"""
+    """Queue archiving and purging of security logs older than the retention window"""
     try:
-        days = request.form.get('days', 90, type=int)
-        cutoff_date = datetime.utcnow() - timedelta(days=days)
-        
-        deleted_count = SecurityLog.query.filter(
-            SecurityLog.created_at < cutoff_date
-        ).delete()
-        
-        db.session.commit()
+        days = request.form.get('days', current_app.config.get('SECURITY_LOG_RETENTION_DAYS', 90), type=int)
+        log_retention.request_run(retention_days=days)
         
         SecurityLog.log_security_event(
             SecurityEventType.SYSTEM_MAINTENANCE,
@@ -1316,12 +1406,13 @@ def cleanup_old_logs():
             details={
                 'action': 'cleanup_logs',
                 'days': days,
-                'deleted_count': deleted_count
+                'queued': True
             },
             severity='low'
         )
         
-        flash(f'Cleaned up {deleted_count} old log entries', 'success')
+        flash(f'Archiving log entries older than {days} days in the background; '
+              f'archived days leave the live table as each one completes', 'success')
         return redirect(url_for('superadmin.security_logs'))
     
     except Exception as e:
@@ -1488,7 +1579,14 @@ def subscription_plans():
         per_page = request.args.get('per_page', 25, type=int)
         plan_type = request.args.get('plan_type', '')
         
-        query = SubscriptionPlan.query
+        # Plans with their subscriber counts in one grouped query
+        total_users = db.func.count(UserSubscription.id)
+        active_users = db.func.coalesce(db.func.sum(db.case(
+            (UserSubscription.status == SubscriptionStatus.ACTIVE.value, 1), else_=0
+        )), 0)
+        query = db.session.query(SubscriptionPlan, total_users, active_users).outerjoin(
+            UserSubscription, UserSubscription.plan_id == SubscriptionPlan.id
+        ).group_by(SubscriptionPlan.id)
         
         # Apply plan type filter
         if plan_type:
@@ -1498,34 +1596,17 @@ def subscription_plans():
             page=page, per_page=per_page, error_out=False
         )
         
-        # Get usage statistics for each plan
+        # Split usage statistics from the plan rows
         plan_usage = {}
-        for plan in plans.items:
-            usage_count = UserSubscription.query.filter_by(plan_id=plan.id).count()
-            active_count = UserSubscription.query.filter_by(
-                plan_id=plan.id, 
-                status=SubscriptionStatus.ACTIVE.value
-            ).count()
+        for plan, usage_count, active_count in plans.items:
             plan_usage[plan.id] = {
                 'total_users': usage_count,
-                'active_users': active_count
+                'active_users': int(active_count)
             }
+        plans.items = [row[0] for row in plans.items]
         
         # Get sidebar stats
-        sidebar_stats = {
-            'total_plans': SubscriptionPlan.query.count(),
-            'active_plans': SubscriptionPlan.query.filter_by(is_active=True).count(),
-            'jobseeker_count': SubscriptionPlan.query.filter_by(plan_type='jobseeker').count(),
-            'consultancy_count': SubscriptionPlan.query.filter_by(plan_type='consultancy').count(),
-            'total_subscribers': UserSubscription.query.count(),
-            'active_subscribers': UserSubscription.query.filter_by(status=SubscriptionStatus.ACTIVE.value).count(),
-            'portal_count': JobPortal.query.filter_by(is_active=True).count(),
-            'monthly_revenue': db.session.query(
-                db.func.sum(SubscriptionPlan.price_monthly)
-            ).join(UserSubscription).filter(
-                UserSubscription.status == SubscriptionStatus.ACTIVE.value
-            ).scalar() or 0
-        }
+        sidebar_stats = subscription_summary.get()
         
         return render_template('superadmin/subscription_plans.html', 
                              plans=plans, 
@@ -1847,28 +1928,9 @@ def duplicate_subscription_plan(id):
 def subscription_dashboard():
     """Subscription management dashboard with overview and analytics"""
     try:
-        # Basic statistics
-        total_plans = SubscriptionPlan.query.count()
-        active_plans = SubscriptionPlan.query.filter_by(is_active=True).count()
-        jobseeker_count = SubscriptionPlan.query.filter_by(plan_type='jobseeker').count()
-        consultancy_count = SubscriptionPlan.query.filter_by(plan_type='consultancy').count()
-        
-        # User subscription statistics
-        total_subscribers = UserSubscription.query.count()
-        active_subscribers = UserSubscription.query.filter_by(status=SubscriptionStatus.ACTIVE.value).count()
-        
-        # Feature statistics
-        total_features = SubscriptionFeature.query.count()
-        
-        # Revenue calculation (active subscriptions)
-        monthly_revenue = db.session.query(
-            db.func.sum(SubscriptionPlan.price_monthly)
-        ).join(UserSubscription, SubscriptionPlan.id == UserSubscription.plan_id).filter(
-            UserSubscription.status == SubscriptionStatus.ACTIVE.value
-        ).scalar() or 0
-        
-        # Portal count
-        portal_count = JobPortal.query.filter_by(is_active=True).count()
+        # Plan, subscriber, revenue, feature and portal totals (shared with the plan listing)
+        sidebar_data = subscription_summary.get()
+        sidebar_data['monthly_revenue'] = f"{sidebar_data['monthly_revenue']:.2f}"
         
         # Recent activity
         recent_plans = SubscriptionPlan.query.order_by(SubscriptionPlan.created_at.desc()).limit(5).all()
@@ -1885,19 +1947,6 @@ def subscription_dashboard():
             SubscriptionPlan.id, SubscriptionPlan.display_name, SubscriptionPlan.plan_type
         ).order_by(db.desc('user_count')).all()
         
-        # Sidebar data
-        sidebar_data = {
-            'total_plans': total_plans,
-            'active_plans': active_plans,
-            'jobseeker_count': jobseeker_count,
-            'consultancy_count': consultancy_count,
-            'total_subscribers': total_subscribers,
-            'active_subscribers': active_subscribers,
-            'total_features': total_features,
-            'monthly_revenue': f"{monthly_revenue:.2f}",
-            'portal_count': portal_count
-        }
-        
         return render_template('superadmin/subscription_dashboard.html',
                              sidebar_data=sidebar_data,
                              recent_plans=recent_plans,
@@ -1913,6 +1962,17 @@ def subscription_dashboard():
 # JOB DATA MANAGEMENT ROUTES
 # ===========================
 
+# Reference Data API
+@superadmin_bp.route('/api/reference-data')
+def reference_data_api():
+    """All taxonomy tables as JSON; revalidated by ETag so browsers reuse their copy"""
+    reference = get_reference_data()
+    response = Response(reference.json, mimetype='application/json')
+    response.set_etag(reference.etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response.make_conditional(request)
+
+
 # Industry Types Management
 @superadmin_bp.route('/industry-types')
 def industry_types():
@@ -1944,6 +2004,7 @@ def create_industry_type():
                 sort_order=int(request.form.get('sort_order', 0))
             )
             db.session.add(industry)
+            bump_reference_version()
             db.session.commit()
             flash('Industry type created successfully', 'success')
             return redirect(url_for('superadmin.industry_types'))
@@ -1967,6 +2028,7 @@ def edit_industry_type(id):
             industry.sort_order = int(request.form.get('sort_order', 0))
             industry.is_active = 'is_active' in request.form
             
+            bump_reference_version()
             db.session.commit()
             flash('Industry type updated successfully', 'success')
             return redirect(url_for('superadmin.industry_types'))
@@ -1983,6 +2045,7 @@ def delete_industry_type(id):
         industry = IndustryType.query.get_or_404(id)
         name = industry.display_name
         db.session.delete(industry)
+        bump_reference_version()
         db.session.commit()
         return jsonify({'success': True, 'message': f'Industry type "{name}" deleted successfully'})
     except Exception as e:
@@ -2008,8 +2071,7 @@ def skills():
         page=page, per_page=per_page, error_out=False
     )
     
-    categories = db.session.query(Skill.category).distinct().all()
-    categories = [cat[0] for cat in categories if cat[0]]
+    categories = get_reference_data().categories('skills')
     
     return render_template('superadmin/skills.html', skills=skills, search=search, 
                          category=category, categories=categories)
@@ -2028,14 +2090,16 @@ def create_skill():
                 sort_order=int(request.form.get('sort_order', 0))
             )
             db.session.add(skill)
+            bump_reference_version()
             db.session.commit()
+            get_skill_relinker().request()  # what stored skill names resolve to may have changed
             flash('Skill created successfully', 'success')
             return redirect(url_for('superadmin.skills'))
         except Exception as e:
             db.session.rollback()
             flash(f'Error creating skill: {str(e)}', 'error')
     
-    industries = IndustryType.query.filter_by(is_active=True).order_by(IndustryType.display_name).all()
+    industries = sorted(get_reference_data().all('industry_types'), key=lambda industry: industry.display_name)
     return render_template('superadmin/skill_form.html', skill=None, industries=industries)
 
 @superadmin_bp.route('/skills/<int:id>/edit', methods=['GET', 'POST'])
@@ -2053,14 +2117,16 @@ def edit_skill(id):
             skill.sort_order = int(request.form.get('sort_order', 0))
             skill.is_active = 'is_active' in request.form
             
+            bump_reference_version()
             db.session.commit()
+            get_skill_relinker().request()
             flash('Skill updated successfully', 'success')
             return redirect(url_for('superadmin.skills'))
         except Exception as e:
             db.session.rollback()
             flash(f'Error updating skill: {str(e)}', 'error')
     
-    industries = IndustryType.query.filter_by(is_active=True).order_by(IndustryType.display_name).all()
+    industries = sorted(get_reference_data().all('industry_types'), key=lambda industry: industry.display_name)
     return render_template('superadmin/skill_form.html', skill=skill, industries=industries)
 
 @superadmin_bp.route('/skills/<int:id>/delete', methods=['POST'])
@@ -2070,7 +2136,9 @@ def delete_skill(id):
         skill = Skill.query.get_or_404(id)
         name = skill.display_name
         db.session.delete(skill)
+        bump_reference_version()
         db.session.commit()
+        get_skill_relinker().request()
         return jsonify({'success': True, 'message': f'Skill "{name}" deleted successfully'})
     except Exception as e:
         db.session.rollback()
@@ -2108,6 +2176,7 @@ def create_experience_level():
                 sort_order=int(request.form.get('sort_order', 0))
             )
             db.session.add(experience)
+            bump_reference_version()
             db.session.commit()
             flash('Experience level created successfully', 'success')
             return redirect(url_for('superadmin.experience_levels'))
@@ -2132,6 +2201,7 @@ def edit_experience_level(id):
             experience.sort_order = int(request.form.get('sort_order', 0))
             experience.is_active = 'is_active' in request.form
             
+            bump_reference_version()
             db.session.commit()
             flash('Experience level updated successfully', 'success')
             return redirect(url_for('superadmin.experience_levels'))
@@ -2148,6 +2218,7 @@ def delete_experience_level(id):
         experience = Experience.query.get_or_404(id)
         name = experience.display_name
         db.session.delete(experience)
+        bump_reference_version()
         db.session.commit()
         return jsonify({'success': True, 'message': f'Experience level "{name}" deleted successfully'})
     except Exception as e:
@@ -2173,8 +2244,7 @@ def job_roles():
         page=page, per_page=per_page, error_out=False
     )
     
-    categories = db.session.query(JobRole.category).distinct().all()
-    categories = [cat[0] for cat in categories if cat[0]]
+    categories = get_reference_data().categories('job_roles')
     
     return render_template('superadmin/job_roles.html', job_roles=job_roles, search=search,
                          category=category, categories=categories)
@@ -2193,6 +2263,7 @@ def create_job_role():
                 sort_order=int(request.form.get('sort_order', 0))
             )
             db.session.add(job_role)
+            bump_reference_version()
             db.session.commit()
             flash('Job role created successfully', 'success')
             return redirect(url_for('superadmin.job_roles'))
@@ -2200,7 +2271,7 @@ def create_job_role():
             db.session.rollback()
             flash(f'Error creating job role: {str(e)}', 'error')
     
-    industries = IndustryType.query.filter_by(is_active=True).order_by(IndustryType.display_name).all()
+    industries = sorted(get_reference_data().all('industry_types'), key=lambda industry: industry.display_name)
     return render_template('superadmin/job_role_form.html', job_role=None, industries=industries)
 
 @superadmin_bp.route('/job-roles/<int:id>/edit', methods=['GET', 'POST'])
@@ -2218,6 +2289,7 @@ def edit_job_role(id):
             job_role.sort_order = int(request.form.get('sort_order', 0))
             job_role.is_active = 'is_active' in request.form
             
+            bump_reference_version()
             db.session.commit()
             flash('Job role updated successfully', 'success')
             return redirect(url_for('superadmin.job_roles'))
@@ -2225,7 +2297,7 @@ def edit_job_role(id):
             db.session.rollback()
             flash(f'Error updating job role: {str(e)}', 'error')
     
-    industries = IndustryType.query.filter_by(is_active=True).order_by(IndustryType.display_name).all()
+    industries = sorted(get_reference_data().all('industry_types'), key=lambda industry: industry.display_name)
     return render_template('superadmin/job_role_form.html', job_role=job_role, industries=industries)
 
 @superadmin_bp.route('/job-roles/<int:id>/delete', methods=['POST'])
@@ -2235,6 +2307,7 @@ def delete_job_role(id):
         job_role = JobRole.query.get_or_404(id)
         name = job_role.display_name
         db.session.delete(job_role)
+        bump_reference_version()
         db.session.commit()
         return jsonify({'success': True, 'message': f'Job role "{name}" deleted successfully'})
     except Exception as e:
@@ -2245,7 +2318,7 @@ def delete_job_role(id):
 @superadmin_bp.route('/company-types')
 def company_types():
     """List all company types"""
-    company_types = CompanyType.query.order_by(CompanyType.sort_order, CompanyType.display_name).all()
+    company_types = get_reference_data().all('company_types', active_only=False)
     return render_template('superadmin/company_types.html', company_types=company_types)
 
 @superadmin_bp.route('/company-types/create', methods=['GET', 'POST'])
@@ -2262,6 +2335,7 @@ def create_company_type():
                 sort_order=int(request.form.get('sort_order', 0))
             )
             db.session.add(company_type)
+            bump_reference_version()
             db.session.commit()
             flash('Company type created successfully', 'success')
             return redirect(url_for('superadmin.company_types'))
@@ -2286,6 +2360,7 @@ def edit_company_type(id):
             company_type.sort_order = int(request.form.get('sort_order', 0))
             company_type.is_active = 'is_active' in request.form
             
+            bump_reference_version()
             db.session.commit()
             flash('Company type updated successfully', 'success')
             return redirect(url_for('superadmin.company_types'))
@@ -2302,6 +2377,7 @@ def delete_company_type(id):
         company_type = CompanyType.query.get_or_404(id)
         name = company_type.display_name
         db.session.delete(company_type)
+        bump_reference_version()
         db.session.commit()
         return jsonify({'success': True, 'message': f'Company type "{name}" deleted successfully'})
     except Exception as e:
@@ -2312,7 +2388,7 @@ def delete_company_type(id):
 @superadmin_bp.route('/job-types')
 def job_types():
     """List all job types"""
-    job_types = JobType.query.order_by(JobType.sort_order, JobType.display_name).all()
+    job_types = get_reference_data().all('job_types', active_only=False)
     return render_template('superadmin/job_types.html', job_types=job_types)
 
 @superadmin_bp.route('/job-types/create', methods=['GET', 'POST'])
@@ -2328,6 +2404,7 @@ def create_job_type():
                 sort_order=int(request.form.get('sort_order', 0))
             )
             db.session.add(job_type)
+            bump_reference_version()
             db.session.commit()
             flash('Job type created successfully', 'success')
             return redirect(url_for('superadmin.job_types'))
@@ -2351,6 +2428,7 @@ def edit_job_type(id):
             job_type.sort_order = int(request.form.get('sort_order', 0))
             job_type.is_active = 'is_active' in request.form
             
+            bump_reference_version()
             db.session.commit()
             flash('Job type updated successfully', 'success')
             return redirect(url_for('superadmin.job_types'))
@@ -2367,6 +2445,7 @@ def delete_job_type(id):
         job_type = JobType.query.get_or_404(id)
         name = job_type.display_name
         db.session.delete(job_type)
+        bump_reference_version()
         db.session.commit()
         return jsonify({'success': True, 'message': f'Job type "{name}" deleted successfully'})
     except Exception as e:
@@ -2407,6 +2486,7 @@ def create_country():
                 sort_order=int(request.form.get('sort_order', 0))
             )
             db.session.add(country)
+            bump_reference_version()
             db.session.commit()
             flash('Country created successfully', 'success')
             return redirect(url_for('superadmin.countries'))
@@ -2433,6 +2513,7 @@ def edit_country(id):
             country.sort_order = int(request.form.get('sort_order', 0))
             country.is_active = 'is_active' in request.form
             
+            bump_reference_version()
             db.session.commit()
             flash('Country updated successfully', 'success')
             return redirect(url_for('superadmin.countries'))
@@ -2449,6 +2530,7 @@ def delete_country(id):
         country = Country.query.get_or_404(id)
         name = country.name
         db.session.delete(country)
+        bump_reference_version()
         db.session.commit()
         return jsonify({'success': True, 'message': f'Country "{name}" deleted successfully'})
     except Exception as e:
@@ -2464,7 +2546,7 @@ def states():
     search = request.args.get('search', '')
     country_id = request.args.get('country_id', type=int)
     
-    query = State.query.join(Country)
+    query = State.query.join(Country).options(contains_eager(State.country))
     if search:
         query = query.filter(State.name.ilike(f'%{search}%'))
     if country_id:
@@ -2474,7 +2556,7 @@ def states():
         page=page, per_page=per_page, error_out=False
     )
     
-    countries = Country.query.filter_by(is_active=True).order_by(Country.name).all()
+    countries = sorted(get_reference_data().all('countries'), key=lambda country: country.name)
     
     return render_template('superadmin/states.html', states=states, search=search,
                          country_id=country_id, countries=countries)
@@ -2492,6 +2574,7 @@ def create_state():
                 sort_order=int(request.form.get('sort_order', 0))
             )
             db.session.add(state)
+            bump_reference_version()
             db.session.commit()
             flash('State created successfully', 'success')
             return redirect(url_for('superadmin.states'))
@@ -2499,7 +2582,7 @@ def create_state():
             db.session.rollback()
             flash(f'Error creating state: {str(e)}', 'error')
     
-    countries = Country.query.filter_by(is_active=True).order_by(Country.name).all()
+    countries = sorted(get_reference_data().all('countries'), key=lambda country: country.name)
     return render_template('superadmin/state_form.html', state=None, countries=countries)
 
 @superadmin_bp.route('/states/<int:id>/edit', methods=['GET', 'POST'])
@@ -2516,6 +2599,7 @@ def edit_state(id):
             state.sort_order = int(request.form.get('sort_order', 0))
             state.is_active = 'is_active' in request.form
             
+            bump_reference_version()
             db.session.commit()
             flash('State updated successfully', 'success')
             return redirect(url_for('superadmin.states'))
@@ -2523,7 +2607,7 @@ def edit_state(id):
             db.session.rollback()
             flash(f'Error updating state: {str(e)}', 'error')
     
-    countries = Country.query.filter_by(is_active=True).order_by(Country.name).all()
+    countries = sorted(get_reference_data().all('countries'), key=lambda country: country.name)
     return render_template('superadmin/state_form.html', state=state, countries=countries)
 
 @superadmin_bp.route('/states/<int:id>/delete', methods=['POST'])
@@ -2533,6 +2617,7 @@ def delete_state(id):
         state = State.query.get_or_404(id)
         name = state.name
         db.session.delete(state)
+        bump_reference_version()
         db.session.commit()
         return jsonify({'success': True, 'message': f'State "{name}" deleted successfully'})
     except Exception as e:
@@ -2546,11 +2631,17 @@ def cities():
     page = request.args.get('page', 1, type=int)
     per_page = 25
     search = request.args.get('search', '')
+    country_id = request.args.get('country_id', type=int)
     state_id = request.args.get('state_id', type=int)
     
-    query = City.query.join(State).join(Country)
+    # Rows show their state and country; load them from the joins already in the query
+    query = City.query.join(State).join(Country).options(
+        contains_eager(City.state).contains_eager(State.country)
+    )
     if search:
         query = query.filter(City.name.ilike(f'%{search}%'))
+    if country_id:
+        query = query.filter(State.country_id == country_id)
     if state_id:
         query = query.filter(City.state_id == state_id)
     
@@ -2558,10 +2649,15 @@ def cities():
         page=page, per_page=per_page, error_out=False
     )
     
-    states = State.query.join(Country).filter_by(is_active=True).order_by(Country.name, State.name).all()
+    reference = get_reference_data()
+    countries = sorted(reference.all('countries'), key=lambda country: country.name)
+    states = reference.states_by_country()
+    if country_id:
+        states = [state for state in states if state.country_id == country_id]
     
     return render_template('superadmin/cities.html', cities=cities, search=search,
-                         state_id=state_id, states=states)
+                         country_id=country_id, state_id=state_id,
+                         countries=countries, states=states)
 
 @superadmin_bp.route('/cities/create', methods=['GET', 'POST'])
 def create_city():
@@ -2579,6 +2675,7 @@ def create_city():
                 sort_order=int(request.form.get('sort_order', 0))
             )
             db.session.add(city)
+            bump_reference_version()
             db.session.commit()
             flash('City created successfully', 'success')
             return redirect(url_for('superadmin.cities'))
@@ -2586,7 +2683,7 @@ def create_city():
             db.session.rollback()
             flash(f'Error creating city: {str(e)}', 'error')
     
-    states = State.query.join(Country).filter_by(is_active=True).order_by(Country.name, State.name).all()
+    states = get_reference_data().states_by_country()
     return render_template('superadmin/city_form.html', city=None, states=states)
 
 @superadmin_bp.route('/cities/<int:id>/edit', methods=['GET', 'POST'])
@@ -2606,6 +2703,7 @@ def edit_city(id):
             city.sort_order = int(request.form.get('sort_order', 0))
             city.is_active = 'is_active' in request.form
             
+            bump_reference_version()
             db.session.commit()
             flash('City updated successfully', 'success')
             return redirect(url_for('superadmin.cities'))
@@ -2613,7 +2711,7 @@ def edit_city(id):
             db.session.rollback()
             flash(f'Error updating city: {str(e)}', 'error')
     
-    states = State.query.join(Country).filter_by(is_active=True).order_by(Country.name, State.name).all()
+    states = get_reference_data().states_by_country()
     return render_template('superadmin/city_form.html', city=city, states=states)
 
 @superadmin_bp.route('/cities/<int:id>/delete', methods=['POST'])
@@ -2623,6 +2721,7 @@ def delete_city(id):
         city = City.query.get_or_404(id)
         name = city.name
         db.session.delete(city)
+        bump_reference_version()
         db.session.commit()
         return jsonify({'success': True, 'message': f'City "{name}" deleted successfully'})
     except Exception as e:
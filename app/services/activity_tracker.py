@@ -0,0 +1,170 @@
+"""
+Activity Tracker Service
+
+Write-behind tracking of user last-activity timestamps. Authenticated requests
+only record the timestamp in memory; repeated hits from the same user are
+coalesced and the pending set is written back in batched
+UPDATE ... SET updated_at = CASE id ... statements, either on a timer or once
+the queue reaches a size threshold. A final flush runs at interpreter shutdown.
+"""
+
+import atexit
+import threading
+import time
+from datetime import datetime
+
+from flask import Flask
+from sqlalchemy import case, update
+
+from app import db
+from app.auth.auth_models import AuthUser
+
+class ActivityTracker:
+    """Buffers last-seen timestamps and flushes them in batches"""
+
+    def __init__(self, app: Flask = None):
+        self.app = app
+        self.flush_interval = 10  # seconds, 0 disables the background flusher
+        self.flush_threshold = 500  # pending users that trigger an inline flush
+        self.batch_size = 500  # ids per UPDATE statement
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._atexit_registered = False
+        self._metrics = {
+            'recorded': 0,
+            'coalesced': 0,
+            'flushes': 0,
+            'failed_flushes': 0,
+            'rows_flushed': 0,
+            'last_flush_ms': 0.0,
+            'max_flush_ms': 0.0,
+            'total_flush_ms': 0.0,
+            'max_queue_depth': 0
+        }
+
+        if app:
+            self.init_app(app)
+
+    def init_app(self, app: Flask):
+        """Initialize the activity tracker with Flask app"""
+        self.app = app
+        self.flush_interval = app.config.get('ACTIVITY_FLUSH_INTERVAL', self.flush_interval)
+        self.flush_threshold = app.config.get('ACTIVITY_FLUSH_THRESHOLD', self.flush_threshold)
+        app.extensions['activity_tracker'] = self
+
+        if not self._atexit_registered:
+            atexit.register(self.shutdown)
+            self._atexit_registered = True
+
+        # Start background flush thread
+        if self.flush_interval > 0 and not self._thread:
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._background_flusher, daemon=True)
+            self._thread.start()
+
+    def record(self, user_id, timestamp=None):
+        """Record activity for a user; only the latest timestamp is kept"""
+        if user_id is None:
+            return
+
+        timestamp = timestamp or datetime.utcnow()
+        with self._lock:
+            previous = self._pending.get(user_id)
+            if previous is None:
+                self._pending[user_id] = timestamp
+            else:
+                self._metrics['coalesced'] += 1
+                if timestamp > previous:
+                    self._pending[user_id] = timestamp
+
+            self._metrics['recorded'] += 1
+            depth = len(self._pending)
+            self._metrics['max_queue_depth'] = max(self._metrics['max_queue_depth'], depth)
+
+        if depth >= self.flush_threshold:
+            self.flush()
+
+    def flush(self):
+        """Write all pending timestamps to the database, returning the rows written"""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+
+            if not batch:
+                return 0
+
+            started = time.perf_counter()
+            try:
+                self._write(batch)
+            except Exception as e:
+                self._requeue(batch)
+                with self._lock:
+                    self._metrics['failed_flushes'] += 1
+                print(f"🚨 Activity Tracker Error: {e}")
+                return 0
+
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            with self._lock:
+                self._metrics['flushes'] += 1
+                self._metrics['rows_flushed'] += len(batch)
+                self._metrics['last_flush_ms'] = elapsed_ms
+                self._metrics['total_flush_ms'] += elapsed_ms
+                self._metrics['max_flush_ms'] = max(self._metrics['max_flush_ms'], elapsed_ms)
+            return len(batch)
+
+    def get_metrics(self):
+        """Get flush latency and queue depth metrics"""
+        with self._lock:
+            metrics = dict(self._metrics)
+            metrics['queue_depth'] = len(self._pending)
+
+        total_ms = metrics.pop('total_flush_ms')
+        metrics['avg_flush_ms'] = total_ms / metrics['flushes'] if metrics['flushes'] else 0.0
+        return metrics
+
+    def shutdown(self):
+        """Stop the background flusher and write out anything still pending"""
+        self._stop_event.set()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=self.flush_interval or None)
+        self._thread = None
+
+        if self.app is not None:
+            with self.app.app_context():
+                self.flush()
+
+    def _background_flusher(self):
+        """Background thread that flushes pending activity on a timer"""
+        while not self._stop_event.wait(self.flush_interval):
+            try:
+                with self.app.app_context():
+                    self.flush()
+            except Exception as e:
+                print(f"🚨 Activity Tracker Error: {e}")
+
+    def _write(self, batch):
+        """Apply a batch with one UPDATE ... CASE statement per chunk of users"""
+        table = AuthUser.__table__
+        user_ids = list(batch)
+        with db.engine.begin() as connection:
+            for start in range(0, len(user_ids), self.batch_size):
+                chunk = {user_id: batch[user_id] for user_id in user_ids[start:start + self.batch_size]}
+                connection.execute(
+                    update(table)
+                    .where(table.c.id.in_(list(chunk)))
+                    .values(updated_at=case(chunk, value=table.c.id))
+                )
+
+    def _requeue(self, batch):
+        """Put a failed batch back without overwriting newer timestamps"""
+        with self._lock:
+            for user_id, timestamp in batch.items():
+                current = self._pending.get(user_id)
+                if current is None or timestamp > current:
+                    self._pending[user_id] = timestamp
+
+# Global activity tracker instance
+activity_tracker = ActivityTracker()
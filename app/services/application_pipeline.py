@@ -0,0 +1,229 @@
+"""
+Application Pipeline Service
+
+Moves job applications through the hiring stages and keeps per-status
+counts, so recruiter pages never group the applications table:
+
+    applied -> reviewed -> interviewed -> hired
+         \\          \\            \\
+          `----------`------------`--> rejected -> reviewed (reconsidered)
+
+application_status_counts holds the applications per status of each job
+(scope 'job') and of all the jobs of each consultancy (scope 'consultancy').
+The counts change in the same transaction as the applications:
+
+- session hooks check the status of new and edited JobApplication rows
+  against STATUSES and TRANSITIONS, and add the moves of a flush to the
+  counts, and
+- transition() moves many applications with one UPDATE and adjusts the
+  counts once per (job, status) pair.
+
+Counts are updated in key order so concurrent transactions lock them in the
+same order. check_consistency compares them with job_applications and can
+rebuild them, e.g. once after creating the table.
+"""
+
+from collections import Counter
+from datetime import datetime
+
+from sqlalchemy import delete, event, func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, attributes
+
+from app import db
+from app.models import ApplicationStatusCount, Job, JobApplication
+
+APPLIED = 'applied'
+REVIEWED = 'reviewed'
+INTERVIEWED = 'interviewed'
+HIRED = 'hired'
+REJECTED = 'rejected'
+STATUSES = (APPLIED, REVIEWED, INTERVIEWED, HIRED, REJECTED)
+
+# Status -> the statuses an application in it can move to
+TRANSITIONS = {
+    APPLIED: (REVIEWED, INTERVIEWED, REJECTED),
+    REVIEWED: (INTERVIEWED, HIRED, REJECTED),
+    INTERVIEWED: (HIRED, REJECTED),
+    HIRED: (),
+    REJECTED: (REVIEWED,),
+}
+
+JOB_SCOPE = 'job'
+CONSULTANCY_SCOPE = 'consultancy'
+
+# session.info key: jobseeker profile ids whose applications transition() moved, for read models
+MOVED_JOBSEEKERS = 'application_pipeline_moved_jobseekers'
+
+def check_transition(old_status, new_status):
+    """Raise ValueError unless an application may move from old_status (None if new) to new_status"""
+    if new_status not in STATUSES:
+        raise ValueError(f'Unknown application status: {new_status!r}')
+    if old_status is not None and old_status != new_status and new_status not in TRANSITIONS.get(old_status, ()):
+        raise ValueError(f'An application cannot move from {old_status} to {new_status}')
+
+def sources(new_status):
+    """Statuses an application can move to new_status from"""
+    return [status for status in STATUSES if new_status in TRANSITIONS[status]]
+
+def transition(new_status, application_ids=None, job_id=None, from_statuses=None, consultancy_id=None):
+    """Move applications to new_status with one UPDATE, in the caller's transaction; returns how many moved
+
+    Moves the applications matching every filter given: application_ids, a
+    job, current statuses (default every status that can move to new_status)
+    and the consultancy owning the job. Applications that cannot make the
+    move are left as they are. Loaded JobApplication objects that moved are
+    expired so they reload their status.
+    """
+    check_transition(None, new_status)
+    allowed = sources(new_status)
+    statuses = [status for status in from_statuses if status in allowed] if from_statuses else allowed
+    if not statuses or application_ids is not None and not application_ids:
+        return 0
+    table = JobApplication.__table__
+    condition = table.c.status.in_(statuses)
+    if application_ids is not None:
+        condition &= table.c.id.in_(application_ids)
+    if job_id is not None:
+        condition &= table.c.job_id == job_id
+    if consultancy_id is not None:
+        condition &= table.c.job_id.in_(select(Job.id).where(Job.consultancy_id == consultancy_id))
+
+    # Lock the rows first: the counts must move with exactly the rows the UPDATE changes
+    rows = db.session.execute(select(table.c.id, table.c.job_id, table.c.jobseeker_id, table.c.status)
+                              .where(condition).with_for_update()).all()
+    if not rows:
+        return 0
+    moved_ids = [row.id for row in rows]
+    db.session.execute(update(table).where(table.c.id.in_(moved_ids))
+                       .values(status=new_status, updated_at=datetime.utcnow()))
+
+    moves = Counter()
+    for row in rows:
+        moves[(row.job_id, row.status)] -= 1
+        moves[(row.job_id, new_status)] += 1
+    _apply_moves(db.session.connection(), moves)
+    db.session.info.setdefault(MOVED_JOBSEEKERS, set()).update(row.jobseeker_id for row in rows)
+
+    moved = set(moved_ids)
+    for instance in list(db.session.identity_map.values()):
+        if isinstance(instance, JobApplication) and instance.id in moved:
+            db.session.expire(instance, ['status', 'updated_at'])
+    return len(rows)
+
+def status_counts(scope, scope_ids):
+    """{scope id: {status: count for every status, 'total': count}} of jobs or consultancies, in one query"""
+    counts = {scope_id: dict.fromkeys(STATUSES, 0) for scope_id in scope_ids}
+    if counts:
+        table = ApplicationStatusCount.__table__
+        for scope_id, status, count in db.session.execute(
+            select(table.c.scope_id, table.c.status, table.c.count)
+            .where(table.c.scope == scope, table.c.scope_id.in_(list(counts)))
+        ):
+            counts[scope_id][status] = count
+    for values in counts.values():
+        values['total'] = sum(values[status] for status in STATUSES)
+    return counts
+
+def check_consistency(repair=False):
+    """Compare the stored counts with job_applications, optionally rebuilding them; returns the mismatches"""
+    applications = JobApplication.__table__
+    expected = Counter()
+    for job_id, consultancy_id, status, count in db.session.execute(
+        select(applications.c.job_id, Job.consultancy_id, applications.c.status, func.count())
+        .join(Job, Job.id == applications.c.job_id)
+        .group_by(applications.c.job_id, Job.consultancy_id, applications.c.status)
+    ):
+        expected[(JOB_SCOPE, job_id, status)] += count
+        expected[(CONSULTANCY_SCOPE, consultancy_id, status)] += count
+
+    table = ApplicationStatusCount.__table__
+    actual = {(row.scope, row.scope_id, row.status): row.count for row in db.session.execute(
+        select(table.c.scope, table.c.scope_id, table.c.status, table.c.count))}
+
+    mismatches = [
+        {'scope': key[0], 'scope_id': key[1], 'status': key[2],
+         'expected': expected.get(key, 0), 'actual': actual.get(key, 0)}
+        for key in sorted(set(expected) | set(actual))
+        if expected.get(key, 0) != actual.get(key, 0)
+    ]
+    if mismatches and repair:
+        db.session.execute(delete(table))
+        if expected:
+            db.session.execute(insert(table), [
+                {'scope': scope, 'scope_id': scope_id, 'status': status, 'count': count}
+                for (scope, scope_id, status), count in expected.items()
+            ])
+        db.session.commit()
+    return mismatches
+
+def _apply_moves(connection, moves):
+    """Add {(job id, status): delta} to the job counts and to those of the jobs' consultancies"""
+    moves = {key: delta for key, delta in moves.items() if delta}
+    if not moves:
+        return
+    job_ids = {job_id for job_id, _ in moves}
+    consultancy_of = dict(connection.execute(select(Job.id, Job.consultancy_id).where(Job.id.in_(job_ids))).all())
+    deltas = Counter()
+    for (job_id, status), delta in moves.items():
+        deltas[(JOB_SCOPE, job_id, status)] += delta
+        if job_id in consultancy_of:
+            deltas[(CONSULTANCY_SCOPE, consultancy_of[job_id], status)] += delta
+
+    table = ApplicationStatusCount.__table__
+    for (scope, scope_id, status), delta in sorted(deltas.items()):
+        if not delta:
+            continue
+        key = (table.c.scope == scope) & (table.c.scope_id == scope_id) & (table.c.status == status)
+        increment = update(table).where(key).values(count=table.c.count + delta)
+        if connection.execute(increment).rowcount:
+            continue
+        try:
+            with connection.begin_nested():
+                connection.execute(insert(table).values(scope=scope, scope_id=scope_id, status=status, count=delta))
+        except IntegrityError:
+            connection.execute(increment)  # another transaction created the count first
+
+def _committed(instance, key):
+    """Value of an attribute before the flush"""
+    history = attributes.get_history(instance, key)
+    values = history.deleted or history.unchanged
+    return values[0] if values else getattr(instance, key)
+
+@event.listens_for(Session, 'before_flush')
+def _check_status_changes(session, flush_context, instances):
+    """Reject unknown statuses and moves the pipeline does not allow"""
+    for instance in (*session.new, *session.dirty):
+        if not isinstance(instance, JobApplication):
+            continue
+        if instance in session.new:
+            if instance.status is not None:
+                check_transition(None, instance.status)
+        elif attributes.get_history(instance, 'status').has_changes():
+            check_transition(_committed(instance, 'status'), instance.status)
+
+@event.listens_for(Session, 'after_flush')
+def _count_status_changes(session, flush_context):
+    """Add the applications this flush created, moved or deleted to the status counts"""
+    moves = Counter()
+    for instance in session.new:
+        if isinstance(instance, JobApplication):
+            moves[(instance.job_id, instance.status or APPLIED)] += 1
+    for instance in session.dirty:
+        if isinstance(instance, JobApplication):
+            old = (_committed(instance, 'job_id'), _committed(instance, 'status'))
+            new = (instance.job_id, instance.status)
+            if old != new:
+                moves[old] -= 1
+                moves[new] += 1
+    for instance in session.deleted:
+        if isinstance(instance, JobApplication):
+            moves[(_committed(instance, 'job_id'), _committed(instance, 'status'))] -= 1
+    if moves:
+        _apply_moves(session.connection(), moves)
+
+@event.listens_for(Session, 'after_commit')
+@event.listens_for(Session, 'after_rollback')
+def _discard_moved_jobseekers(session):
+    # Read models pick the moves up before the commit
+    session.info.pop(MOVED_JOBSEEKERS, None)
@@ -13,6 +13,10 @@ from app.auth.auth_models import (
     AuthUser, JWTBlacklist, CSRFToken, SecurityLog, 
     SecurityEventType, SubscriptionStatus
 )
+from app.services.csrf_service import generate_signed_token, validate_signed_token
+from app.services.password_hasher import password_hasher, PasswordHasherBusy
+from app.services.revocation_index import revocation_index
+from app.services.token_cache import verified_token_cache
 from app import db
 import re
 
@@ -76,6 +80,10 @@ class JWTAuthService:
                 )
                 return None, 'Invalid credentials'
             
+            # Upgrade hashes stored below the current cost while the plaintext is at hand
+            if password_hasher.needs_rehash(user.password_hash):
+                user.set_password(password)
+            
             # Successful authentication
             user.reset_login_attempts()
             SecurityLog.log_security_event(
@@ -89,6 +97,15 @@ class JWTAuthService:
             
             return user, 'Authentication successful'
             
+        except PasswordHasherBusy:
+            SecurityLog.log_security_event(
+                SecurityEventType.RATE_LIMIT_EXCEEDED,
+                ip_address=ip_address,
+                user_agent=user_agent,
+                details={'reason': 'password_hash_queue_full'},
+                severity='medium'
+            )
+            return None, 'Too many login attempts, please try again shortly'
         except Exception as e:
             try:
                 current_app.logger.error(f"Authentication error: {str(e)}")
@@ -123,6 +140,15 @@ class JWTAuthService:
     def verify_token(token):
         """Verify JWT token"""
         try:
+            cached = verified_token_cache.get(token)
+            if cached is not None:
+                payload, user = cached
+                if payload.get('jti') and revocation_index.is_revoked(payload['jti']):
+                    verified_token_cache.invalidate_jti(payload['jti'])
+                    return None, 'Token is blacklisted'
+                return user, 'Token is valid'
+            
+            cache_version = verified_token_cache.version()  # Taken before the user row is read
             payload = jwt.decode(
                 token, 
                 current_app.config['SECRET_KEY'], 
@@ -133,7 +159,7 @@ class JWTAuthService:
             
             # Check if token is blacklisted
             jti = payload.get('jti')
-            if jti and JWTBlacklist.query.filter_by(token_jti=jti).first():
+            if jti and revocation_index.is_revoked(jti):
                 return None, 'Token is blacklisted'
             
             # Get user
@@ -143,6 +169,7 @@ class JWTAuthService:
             if not user or not user.is_active:
                 return None, 'User not found or inactive'
             
+            verified_token_cache.put(token, payload, user, cache_version)
             return user, 'Token is valid'
             
         except jwt.ExpiredSignatureError:
@@ -175,7 +202,7 @@ class JWTAuthService:
                     refresh_token, 
                     current_app.config['SECRET_KEY'], 
                     algorithms=['HS256'],
-                    options={"verify_exp": False}
+                    options={"verify_exp": False, "verify_aud": False}
                 )
                 
                 if payload.get('jti'):
@@ -215,6 +242,10 @@ class JWTAuthService:
             db.session.add(blacklist_entry)
             db.session.commit()
             
+            # Visible to this worker immediately, to the others on their next poll
+            revocation_index.add(jti, expires_at)
+            verified_token_cache.invalidate_jti(jti)
+            
             return True
             
         except Exception as e:
@@ -233,7 +264,7 @@ class JWTAuthService:
                 token, 
                 current_app.config['SECRET_KEY'], 
                 algorithms=['HS256'],
-                options={"verify_exp": False}
+                options={"verify_exp": False, "verify_aud": False}
             )
             
             user_id = user_id or payload.get('user_id')
@@ -312,7 +343,12 @@ class SecurityService:
         
         session_id = session.get('session_id') if session else None
         
-        if CSRFToken.validate_token(token, user_id, session_id):
+        if current_app.config.get('CSRF_TOKEN_MODE', 'signed') == 'database':
+            valid = CSRFToken.validate_token(token, user_id, session_id)
+        else:
+            valid = validate_signed_token(token, user_id, session_id)
+        
+        if valid:
             return True
         
         SecurityLog.log_security_event(
@@ -330,6 +366,10 @@ class SecurityService:
     def generate_csrf_token(user_id=None):
         """Generate CSRF token"""
         session_id = session.get('session_id') if session else None
+        
+        if current_app.config.get('CSRF_TOKEN_MODE', 'signed') != 'database':
+            return generate_signed_token(user_id, session_id)
+        
         ip_address = request.remote_addr if request else None
         user_agent = request.headers.get('User-Agent') if request else None
         
@@ -337,19 +377,13 @@ class SecurityService:
     
     @staticmethod
     def check_rate_limit(identifier, limit=60, window=3600):
-        """Simple rate limiting check"""
-        # This is a basic implementation - in production, use Redis
-        # For now, we'll just log excessive requests
-        
-        # In a real implementation, you would check request count per identifier per time window
-        # Here we'll just demonstrate the concept
+        """Count a request against an identifier's rate limit"""
+        from app.services.rate_limiter import rate_limiter
         
         try:
-            # Placeholder for rate limiting logic
-            # You would typically use Redis or similar for this
-            current_requests = 1  # This would be the actual count
+            result = rate_limiter.hit(identifier, limit, window)
             
-            if current_requests > limit:
+            if not result.allowed:
                 SecurityLog.log_security_event(
                     SecurityEventType.RATE_LIMIT_EXCEEDED,
                     ip_address=request.remote_addr if request else None,
@@ -358,7 +392,7 @@ class SecurityService:
                         'identifier': identifier,
                         'limit': limit,
                         'window': window,
-                        'requests': current_requests
+                        'retry_after': round(result.retry_after, 2)
                     },
                     severity='medium'
                 )
@@ -0,0 +1,321 @@
+"""
+Candidate Index Service
+
+Matches jobseeker profiles for the consultancy candidate search.
+JobSeekerProfile.skills is free text (a JSON list), so each profile's skills
+are resolved once, when it is indexed, against the Skill taxonomy of the
+reference data snapshot (by name or display name, accent- and
+case-insensitive) into integer skill ids. Skills outside the taxonomy are
+ignored.
+
+Per candidate the index keeps its sorted skill ids in one flat int32 array
+with offsets (CSR), next to experience and location columns, and per skill
+the slots of the candidates that have it. A search adds up the postings of
+the requested skills with bincount, so its cost follows the number of
+candidates sharing a skill rather than the number of profiles, and scores
+them in one vectorized pass:
+
+    score = weighted coverage + EXPERIENCE_WEIGHT * min(experience, EXPERIENCE_CAP) / EXPERIENCE_CAP
+
+where weighted coverage is the share of the requested skills a candidate
+has, each skill weighted by its rarity (idf). Job title words, experience
+range and location (including city radius) filter the matches as masks,
+and results page with (score, id) cursors.
+
+Edited profiles are tombstoned and re-added; dead slots are compacted away
+once they make up a quarter of the index. A change to the skill taxonomy
+rebuilds the index, since it can change how profiles resolve.
+"""
+
+import array
+import json
+import math
+import re
+import threading
+
+import numpy as np
+from flask import current_app
+
+from app.models import JobSeekerProfile
+from app.services.index_sync import SyncedIndex
+from app.services.keyset_pagination import KeysetPage, paginate_ranked
+from app.services.reference_data import get_reference_data
+from app.services.typeahead import normalize
+
+EXPERIENCE_WEIGHT = 0.1  # share of the score experience can add on top of skill coverage
+EXPERIENCE_CAP = 20  # years beyond which experience no longer adds to the score
+LOCATION_FIELDS = ('current_location', 'preferred_location')
+
+def parse_skills(value):
+    """Skill names from a skills column: a JSON list of names (or {'name': ...}) or comma-separated text"""
+    if not value:
+        return []
+    try:
+        skills = json.loads(value)
+    except (TypeError, ValueError):
+        skills = value
+    if isinstance(skills, str):
+        skills = skills.split(',')
+    if not isinstance(skills, list):
+        return []
+    names = []
+    for skill in skills:
+        if isinstance(skill, dict):
+            skill = skill.get('name') or skill.get('skill')
+        if isinstance(skill, str) and skill.strip():
+            names.append(skill.strip())
+    return names
+
+def parse_experience_range(value):
+    """(min, max) years from '3', '3+' or '3-5'; (None, None) if empty or unreadable"""
+    match = re.fullmatch(r'\s*(\d+)\s*(?:(\+)|-\s*(\d+))?\s*', value or '')
+    if not match:
+        return None, None
+    low, _, high = match.groups()
+    return int(low), int(high) if high else None
+
+def skill_names(snapshot):
+    """{normalized skill name or display name: skill id} of the active skills"""
+    names = {}
+    for skill in snapshot.all('skills'):
+        names.setdefault(normalize(skill.name.replace('_', ' ')), skill.id)
+        names.setdefault(normalize(skill.display_name), skill.id)
+    return names
+
+def resolve_skills(skill_ids, names):
+    """(skill ids in order of first mention, names outside the taxonomy) of skill names"""
+    ids, unknown = [], []
+    for name in names:
+        skill_id = skill_ids.get(normalize(name))
+        if skill_id is None:
+            unknown.append(name)
+        elif skill_id not in ids:
+            ids.append(skill_id)
+    return ids, unknown
+
+class CandidateIndex:
+    """Skill postings and filter columns over jobseeker profiles"""
+
+    def __init__(self, skill_ids):
+        self.skill_ids = skill_ids  # normalized skill name -> skill id
+        self._slot_of = {}  # profile id -> slot of its current version
+        self._size = 0  # slots in use, live or tombstoned
+        self._codes = {}  # casefolded location -> code
+        self._columns = {
+            'id': np.zeros(0, np.int64),
+            'live': np.zeros(0, bool),
+            'experience': np.zeros(0, np.float32),
+            **{field: np.zeros(0, np.int32) for field in LOCATION_FIELDS},
+        }
+        # Skill ids of slot s at [skill_offsets[s], skill_offsets[s + 1]) of skill_values
+        self._skill_offsets = array.array('q', [0])
+        self._skill_values = array.array('i')
+        self._postings = {}  # skill id -> slots having it
+        self._title_postings = {}  # job title word -> slots having it
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._slot_of)
+
+    def resolve(self, names):
+        """(skill ids, names outside the taxonomy) for skill names"""
+        return resolve_skills(self.skill_ids, names)
+
+    def skills_of(self, profile_id):
+        """Resolved skill ids of a profile, sorted"""
+        with self._lock:
+            slot = self._slot_of.get(profile_id)
+            if slot is None:
+                return []
+            return self._skill_values[self._skill_offsets[slot]:self._skill_offsets[slot + 1]].tolist()
+
+    def upsert(self, rows):
+        """Index profiles given as mappings of JobSeekerProfile columns, replacing earlier versions"""
+        with self._lock:
+            for row in rows:
+                self._remove(row['id'])
+                self._add(row)
+            self.merge()
+
+    def remove(self, profile_ids):
+        """Drop profiles from the results"""
+        with self._lock:
+            for profile_id in profile_ids:
+                self._remove(profile_id)
+
+    def _remove(self, profile_id):
+        slot = self._slot_of.pop(profile_id, None)
+        if slot is not None:
+            self._columns['live'][slot] = False
+
+    def _add(self, row):
+        if self._size == len(self._columns['id']):
+            capacity = max(1024, 2 * self._size)
+            for name, column in self._columns.items():
+                grown = np.zeros(capacity, column.dtype)
+                grown[:self._size] = column[:self._size]
+                self._columns[name] = grown
+        slot = self._size
+        self._size += 1
+
+        skill_ids = sorted(self.resolve(parse_skills(row.get('skills')))[0])
+        self._skill_values.extend(skill_ids)
+        self._skill_offsets.append(len(self._skill_values))
+        for skill_id in skill_ids:
+            self._postings.setdefault(skill_id, array.array('i')).append(slot)
+        for word in set(normalize(row.get('job_title')).split(' ')):
+            if word:
+                self._title_postings.setdefault(word, array.array('i')).append(slot)
+
+        columns = self._columns
+        columns['id'][slot] = row['id']
+        columns['live'][slot] = True
+        columns['experience'][slot] = row.get('experience_years') or 0
+        for field in LOCATION_FIELDS:
+            columns[field][slot] = self._code(row.get(field), create=True)
+        self._slot_of[row['id']] = slot
+
+    def _code(self, value, create=False):
+        """Code of a location, -1 for none or (unless create) one never indexed"""
+        key = (value or '').strip().casefold()
+        if not key:
+            return -1
+        if create:
+            return self._codes.setdefault(key, len(self._codes))
+        return self._codes.get(key, -1)
+
+    def merge(self):
+        """Compact the slots if tombstoned profiles make up a quarter of the index"""
+        with self._lock:
+            if self._size - len(self._slot_of) <= self._size // 4:
+                return
+            live = self._columns['live'][:self._size]
+            live_slots = np.flatnonzero(live)
+            renumber = np.full(self._size, -1, np.int32)
+            renumber[live_slots] = np.arange(len(live_slots), dtype=np.int32)
+
+            offsets = np.array(self._skill_offsets, dtype=np.int64)
+            lengths = np.diff(offsets)
+            values = np.array(self._skill_values, dtype=np.int32)[np.repeat(live, lengths)]
+            self._skill_values = array.array('i', values.tobytes())
+            self._skill_offsets = array.array('q', np.concatenate(([0], np.cumsum(lengths[live]))).tobytes())
+            for postings in (self._postings, self._title_postings):
+                for key, slots in list(postings.items()):
+                    slots = renumber[np.array(slots, dtype=np.int32)]
+                    postings[key] = array.array('i', slots[slots >= 0].tobytes())
+
+            for column in self._columns.values():
+                column[:len(live_slots)] = column[live_slots]
+            self._columns['live'][len(live_slots):] = False
+            self._size = len(live_slots)
+            self._slot_of = dict(zip(self._columns['id'][:self._size].tolist(), range(self._size)))
+
+    def search(self, skills=(), match_all=False, query=None, experience_min=None, experience_max=None,
+               locations=None, cursor=None, per_page=20):
+        """One page of matching profile ids; raises ValueError for a bad cursor
+
+        skills are names (resolved against the taxonomy, unknown ones ignored);
+        candidates need at least one of them, or all with match_all. locations maps location labels to
+        match against current or preferred location, as in job search.
+        """
+        with self._lock:
+            columns, size = self._columns, self._size
+            skill_ids = self.resolve(skills)[0]
+            if skills and not skill_ids:
+                return KeysetPage([], per_page, total=0)
+            if skill_ids:
+                live_count = len(self._slot_of) + 1
+                slot_parts, weight_parts = [], []
+                for skill_id in skill_ids:
+                    slots = np.array(self._postings.get(skill_id, ()), dtype=np.int32)
+                    slot_parts.append(slots)
+                    weight_parts.append(np.full(len(slots), math.log(1 + live_count / (len(slots) + 1))))
+                weights = np.bincount(np.concatenate(slot_parts), weights=np.concatenate(weight_parts),
+                                      minlength=size)
+                if match_all:
+                    counts = np.bincount(np.concatenate(slot_parts), minlength=size)
+                    candidates = np.flatnonzero(counts == len(skill_ids))
+                else:
+                    candidates = np.flatnonzero(weights)
+                total_weight = sum(math.log(1 + live_count / (len(slots) + 1)) for slots in slot_parts)
+                coverage = weights[candidates] / total_weight
+            else:
+                candidates, coverage = np.arange(size), np.zeros(size)
+
+            mask = columns['live'][candidates]
+            for word in set(normalize(query).split(' ')) if query else ():
+                if word:
+                    mask &= np.isin(candidates, np.array(self._title_postings.get(word, ()), dtype=np.int32))
+            experience = columns['experience'][candidates]
+            if experience_min is not None:
+                mask &= experience >= experience_min
+            if experience_max is not None:
+                mask &= experience <= experience_max
+            if locations is not None:
+                codes = np.array([self._code(label) for label in locations], dtype=np.int32)
+                codes = codes[codes >= 0]
+                mask &= np.isin(columns['current_location'][candidates], codes) | \
+                    np.isin(columns['preferred_location'][candidates], codes)
+
+            candidates, coverage, experience = candidates[mask], coverage[mask], experience[mask]
+            keys = coverage + EXPERIENCE_WEIGHT * np.minimum(experience, EXPERIENCE_CAP) / EXPERIENCE_CAP
+            return paginate_ranked(keys.astype(np.float64), columns['id'][candidates], cursor, per_page)
+
+# Profile columns the index reads
+_INDEXED = JobSeekerProfile.__table__.c
+_COLUMNS = (_INDEXED.id, _INDEXED.skills, _INDEXED.experience_years, _INDEXED.current_location,
+            _INDEXED.preferred_location, _INDEXED.job_title, _INDEXED.updated_at)
+
+class CandidateSearch(SyncedIndex):
+    """A worker's candidate index, kept in step with jobseeker_profiles and the skill taxonomy"""
+
+    model = JobSeekerProfile
+    columns = _COLUMNS
+    extension = 'candidate_search'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._snapshot = None
+        self._skill_ids = None
+
+    def create_index(self):
+        return CandidateIndex(self._skill_ids)
+
+    def search(self, **filters):
+        """One page of matching profile ids, see CandidateIndex.search; empty until the index is built"""
+        self._follow_taxonomy()
+        index = self.sync()
+        if index is None:
+            return KeysetPage([], filters.get('per_page', 20), total=0)
+        return index.search(**filters)
+
+    def skills_of(self, profile_id):
+        """Resolved skill ids of an indexed profile"""
+        index = self.index
+        return index.skills_of(profile_id) if index is not None else []
+
+    def resolve(self, names):
+        """(skill ids, names outside the taxonomy) for skill names, against the taxonomy last followed"""
+        return resolve_skills(self._skill_ids or {}, names)
+
+    def _follow_taxonomy(self):
+        snapshot = get_reference_data()
+        if snapshot is self._snapshot:
+            return
+        skill_ids = skill_names(snapshot)
+        if skill_ids != self._skill_ids:
+            self._skill_ids = skill_ids
+            self.rebuild()
+        self._snapshot = snapshot
+
+def get_candidate_search(app=None):
+    """Get the candidate index of an application, creating it on first use"""
+    app = app or current_app._get_current_object()
+    search = app.extensions.get('candidate_search')
+    if search is None:
+        search = app.extensions['candidate_search'] = CandidateSearch(
+            sync_interval=app.config.get('CANDIDATE_SEARCH_SYNC_INTERVAL', 5.0),
+            background=app.config.get('CANDIDATE_SEARCH_BACKGROUND_BUILD', True),
+            warm_up_timeout=app.config.get('CANDIDATE_SEARCH_WARM_UP_TIMEOUT', 0.0)
+        )
+    return search
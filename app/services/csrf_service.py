@@ -0,0 +1,106 @@
+"""
+CSRF Token Service
+
+Stateless CSRF tokens signed with HMAC-SHA256. A token carries its issue time,
+a random nonce and the user it was issued to; the signature additionally covers
+the session id, so a token only validates for the session and user it was
+issued for and only within SECURITY_CSRF_TIME_LIMIT seconds. Issuing and
+validating need no database round-trip.
+
+When CSRF_SINGLE_USE is enabled, spent nonces are remembered in a bounded
+in-process replay cache until their token would have expired anyway.
+"""
+
+import base64
+import hashlib
+import hmac
+import secrets
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app
+
+TOKEN_VERSION = 'v1'
+
+class ReplayCache:
+    """Bounded set of spent nonces, each kept until its token expires"""
+
+    def __init__(self, max_entries=10000, clock=time.time):
+        self.max_entries = max_entries
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def check_and_add(self, nonce, expires_at):
+        """Return False if the nonce was already spent, otherwise remember it"""
+        with self._lock:
+            self._evict(self.clock())
+            if nonce in self._entries:
+                return False
+
+            self._entries[nonce] = expires_at
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return True
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _evict(self, now):
+        # Expiry is roughly ordered by spend time; stop at the first live entry
+        # and let max_entries bound anything left behind it
+        while self._entries:
+            nonce, expires_at = next(iter(self._entries.items()))
+            if expires_at > now:
+                break
+            self._entries.popitem(last=False)
+
+# Global replay cache instance
+csrf_replay_cache = ReplayCache()
+
+def _b64encode(raw):
+    return base64.urlsafe_b64encode(raw).rstrip(b'=').decode('ascii')
+
+def _signing_key():
+    secret = current_app.config['SECRET_KEY']
+    if isinstance(secret, str):
+        secret = secret.encode('utf-8')
+    return hmac.new(secret, b'csrf-token', hashlib.sha256).digest()
+
+def _signature(issued_at, nonce, user_id, session_id):
+    message = f'{TOKEN_VERSION}|{issued_at}|{nonce}|{user_id or ""}|{session_id or ""}'
+    digest = hmac.new(_signing_key(), message.encode('utf-8'), hashlib.sha256).digest()
+    return _b64encode(digest)
+
+def generate_signed_token(user_id=None, session_id=None):
+    """Issue a signed CSRF token bound to a user and session"""
+    issued_at = int(time.time())
+    nonce = secrets.token_urlsafe(12)
+    signature = _signature(issued_at, nonce, user_id, session_id)
+    return f'{issued_at}.{nonce}.{user_id or ""}.{signature}'
+
+def validate_signed_token(token, user_id=None, session_id=None):
+    """Validate a signed CSRF token without touching the database"""
+    try:
+        issued_at, nonce, token_user_id, signature = token.split('.')
+        issued_at = int(issued_at)
+        token_user_id = int(token_user_id) if token_user_id else None
+    except (AttributeError, ValueError):
+        return False
+
+    expected = _signature(issued_at, nonce, token_user_id, session_id)
+    if not hmac.compare_digest(expected, signature):
+        return False
+
+    expires_at = issued_at + current_app.config.get('SECURITY_CSRF_TIME_LIMIT', 3600)
+    if expires_at < time.time():
+        return False
+
+    if user_id and token_user_id != user_id:
+        return False
+
+    if current_app.config.get('CSRF_SINGLE_USE', False):
+        return csrf_replay_cache.check_and_add(nonce, expires_at)
+
+    return True
@@ -0,0 +1,294 @@
+"""
+Dashboard Rollups Service
+
+Keeps the admin dashboards off the base tables. A periodic aggregator writes
+pre-computed counts into dashboard_counters:
+
+- security_events per day, in 'total', 'severity:<level>' and
+  'event_type:<type>' buckets; only the open days (today and yesterday) are
+  recomputed on each run, closed days are kept as they are
+- current totals (users, subscriptions, subscriptions per plan and all-time
+  security events) on the GAUGE_DATE row set
+
+Dashboards read every counter they need with one query and never refresh
+on the request path while the background aggregator runs: a read that finds
+the counters older than DASHBOARD_ROLLUP_MAX_STALENESS seconds (or missing)
+serves what it loaded and wakes the aggregator. Only a process without the
+aggregator (DASHBOARD_ROLLUP_INTERVAL = 0) refreshes inline. A refresh that
+loses a deadlock or lock wait to a concurrent one is rolled back, and the
+read serves the counters it already loaded.
+check_consistency compares the stored rollups with the base tables and can
+repair any drift.
+"""
+
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+from flask import Flask
+from sqlalchemy import case, delete, func, insert, or_, select
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+from app import db
+from app.auth.auth_models import (
+    AuthUser, DashboardCounter, SecurityLog, SubscriptionPlan, UserSubscription, SubscriptionStatus
+)
+
+# bucket_date used for totals that are not tied to a day
+GAUGE_DATE = date(1970, 1, 1)
+
+SECURITY_EVENTS = 'security_events'
+REFRESHED_AT = ('rollup', GAUGE_DATE, 'refreshed_at')
+
+def _as_date(value):
+    # func.date() returns a string on SQLite and a date on MySQL
+    return date.fromisoformat(value) if isinstance(value, str) else value
+
+def _dimension_value(value):
+    return getattr(value, 'value', value)
+
+class DashboardStats:
+    """Read-only view over one load of the dashboard counters"""
+
+    def __init__(self, counters, today):
+        self.counters = counters
+        self.today = today
+
+    def gauge(self, metric, dimension='total'):
+        """Current total for a metric"""
+        return self.counters.get((metric, GAUGE_DATE, dimension), 0)
+
+    def daily(self, metric, dimension='total', since=None):
+        """Sum of the day buckets from `since` (default today) through today"""
+        since = since or self.today
+        return sum(
+            value for (name, day, dim), value in self.counters.items()
+            if name == metric and dim == dimension and day != GAUGE_DATE and day >= since
+        )
+
+    def breakdown(self, metric, prefix):
+        """(label, total) pairs for the current totals whose dimension starts with `prefix`"""
+        return sorted(
+            (dim[len(prefix):], value) for (name, day, dim), value in self.counters.items()
+            if name == metric and day == GAUGE_DATE and dim.startswith(prefix)
+        )
+
+    @property
+    def refreshed_at(self):
+        return self.counters.get(REFRESHED_AT, 0)
+
+class DashboardRollups:
+    """Maintains and reads the dashboard_counters table"""
+
+    def __init__(self, app: Flask = None):
+        self.app = app
+        self.interval = 60  # seconds between aggregator runs, 0 disables the background thread
+        self.max_staleness = 120  # seconds before a read asks for a refresh
+        self.open_days = 2  # day buckets recomputed on each run
+        self.lookback_days = 7  # day buckets loaded for dashboard reads
+        self._refresh_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._wake_event = threading.Event()  # set by reads that found the counters stale
+        self._full_requested = False  # set by reads that found no counters at all
+        self._thread = None
+
+        if app:
+            self.init_app(app)
+
+    def init_app(self, app: Flask):
+        """Initialize the dashboard rollups with Flask app"""
+        self.app = app
+        self.interval = app.config.get('DASHBOARD_ROLLUP_INTERVAL', self.interval)
+        self.max_staleness = app.config.get('DASHBOARD_ROLLUP_MAX_STALENESS', self.max_staleness)
+        app.extensions['dashboard_rollups'] = self
+
+        # Start background aggregator thread
+        if self.interval > 0 and not self._thread:
+            self._thread = threading.Thread(target=self._background_aggregator, daemon=True)
+            self._thread.start()
+
+    def read(self):
+        """Load the dashboard counters; stale counters are served and refreshed in the background"""
+        today = datetime.utcnow().date()
+        stats = DashboardStats(self._load(today), today)
+        if stats.refreshed_at and time.time() - stats.refreshed_at <= self.max_staleness:
+            return stats
+
+        if self.interval > 0 and self._thread is not None:
+            self._full_requested = self._full_requested or not stats.refreshed_at
+            self._wake_event.set()
+            return stats
+
+        try:
+            self.refresh(full=not stats.refreshed_at)
+        except OperationalError as e:
+            # Deadlock or lock timeout against a concurrent refresh; its transaction is already rolled back
+            print(f"⚠️ Dashboard Rollups: refresh failed, serving the previous counters: {e}")
+            return stats
+        return DashboardStats(self._load(today), today)
+
+    def refresh(self, full=False, since=None):
+        """Recompute the open day buckets (every day if full) and the current totals"""
+        if since is None and not full:
+            since = datetime.utcnow().date() - timedelta(days=self.open_days - 1)
+
+        table = DashboardCounter.__table__
+        with self._refresh_lock:
+            try:
+                with db.engine.begin() as connection:
+                    daily = self._compute_daily(connection, since)
+                    stale = table.c.metric == SECURITY_EVENTS
+                    stale &= table.c.bucket_date > GAUGE_DATE
+                    if since is not None:
+                        stale &= table.c.bucket_date >= since
+                    connection.execute(delete(table).where(stale))
+                    self._insert(connection, daily)
+
+                    gauges = self._compute_gauges(connection, daily, since)
+                    gauges[REFRESHED_AT] = int(time.time())
+                    connection.execute(delete(table).where(table.c.bucket_date == GAUGE_DATE))
+                    self._insert(connection, gauges)
+            except IntegrityError:
+                pass  # Another worker refreshed the same buckets concurrently
+
+    def check_consistency(self, days=7, repair=False):
+        """Compare the last `days` day buckets and current totals with the base tables"""
+        today = datetime.utcnow().date()
+        since = today - timedelta(days=days - 1)
+
+        with db.engine.connect() as connection:
+            expected = self._compute_daily(connection, since)
+            expected.update(self._compute_gauges(connection, expected, since))
+
+            table = DashboardCounter.__table__
+            rows = connection.execute(
+                select(table.c.metric, table.c.bucket_date, table.c.dimension, table.c.value).where(
+                    or_(table.c.bucket_date == GAUGE_DATE,
+                        (table.c.metric == SECURITY_EVENTS) & (table.c.bucket_date >= since))
+                )
+            ).all()
+        actual = {(row.metric, _as_date(row.bucket_date), row.dimension): row.value for row in rows}
+        actual.pop(REFRESHED_AT, None)
+
+        mismatches = [
+            {
+                'metric': key[0],
+                'bucket_date': None if key[1] == GAUGE_DATE else key[1].isoformat(),
+                'dimension': key[2],
+                'expected': expected.get(key, 0),
+                'actual': actual.get(key, 0)
+            }
+            for key in sorted(set(expected) | set(actual))
+            if expected.get(key, 0) != actual.get(key, 0)
+        ]
+
+        if mismatches and repair:
+            self.refresh(since=since)
+        return mismatches
+
+    def _load(self, today):
+        """Fetch the current totals and recent day buckets in one query"""
+        table = DashboardCounter.__table__
+        rows = db.session.execute(
+            select(table.c.metric, table.c.bucket_date, table.c.dimension, table.c.value).where(
+                or_(table.c.bucket_date == GAUGE_DATE,
+                    table.c.bucket_date >= today - timedelta(days=self.lookback_days))
+            )
+        ).all()
+        return {(row.metric, _as_date(row.bucket_date), row.dimension): row.value for row in rows}
+
+    @staticmethod
+    def _compute_daily(connection, since):
+        """Security event counts per day, severity and event type from security_logs"""
+        day = func.date(SecurityLog.created_at)
+        query = select(day, SecurityLog.severity, SecurityLog.event_type, func.count(SecurityLog.id))
+        if since is not None:
+            query = query.where(SecurityLog.created_at >= datetime.combine(since, datetime.min.time()))
+        query = query.group_by(day, SecurityLog.severity, SecurityLog.event_type)
+
+        counters = {}
+        for bucket_day, severity, event_type, count in connection.execute(query):
+            bucket_day = _as_date(bucket_day)
+            dimensions = ['total']
+            if severity:
+                dimensions.append(f'severity:{_dimension_value(severity)}')
+            if event_type:
+                dimensions.append(f'event_type:{_dimension_value(event_type)}')
+            for dimension in dimensions:
+                key = (SECURITY_EVENTS, bucket_day, dimension)
+                counters[key] = counters.get(key, 0) + count
+        return counters
+
+    @staticmethod
+    def _compute_gauges(connection, daily, since):
+        """Current totals from the base tables; all-time security events are the
+        stored day buckets before `since` plus the freshly computed `daily` ones"""
+        counters = {}
+
+        total, active = connection.execute(select(
+            func.count(AuthUser.id),
+            func.coalesce(func.sum(case((AuthUser.is_active == True, 1), else_=0)), 0)
+        )).one()
+        counters[('users', GAUGE_DATE, 'total')] = total
+        counters[('users', GAUGE_DATE, 'active')] = active
+
+        total, active = connection.execute(select(
+            func.count(UserSubscription.id),
+            func.coalesce(func.sum(case(
+                (UserSubscription.status == SubscriptionStatus.ACTIVE.value, 1), else_=0
+            )), 0)
+        )).one()
+        counters[('subscriptions', GAUGE_DATE, 'total')] = total
+        counters[('subscriptions', GAUGE_DATE, 'active')] = active
+
+        for name, count in connection.execute(
+            select(SubscriptionPlan.name, func.count(UserSubscription.id))
+            .join(UserSubscription, UserSubscription.plan_id == SubscriptionPlan.id)
+            .group_by(SubscriptionPlan.name)
+        ):
+            counters[('subscriptions', GAUGE_DATE, f'plan:{name}')] = count
+
+        totals = {}
+        if since is not None:
+            table = DashboardCounter.__table__
+            for dimension, value in connection.execute(
+                select(table.c.dimension, func.sum(table.c.value))
+                .where(table.c.metric == SECURITY_EVENTS,
+                       table.c.bucket_date > GAUGE_DATE,
+                       table.c.bucket_date < since)
+                .group_by(table.c.dimension)
+            ):
+                totals[dimension] = int(value)
+        for (metric, bucket_date, dimension), value in daily.items():
+            totals[dimension] = totals.get(dimension, 0) + value
+
+        for dimension, value in totals.items():
+            counters[(SECURITY_EVENTS, GAUGE_DATE, dimension)] = value
+        return counters
+
+    @staticmethod
+    def _insert(connection, counters):
+        if not counters:
+            return
+        now = datetime.utcnow()
+        connection.execute(insert(DashboardCounter.__table__), [
+            {'metric': metric, 'bucket_date': bucket_date, 'dimension': dimension,
+             'value': int(value), 'updated_at': now}
+            for (metric, bucket_date, dimension), value in counters.items()
+        ])
+
+    def _background_aggregator(self):
+        """Background thread that refreshes the rollups on a timer, or early when a read asks"""
+        while not self._stop_event.is_set():
+            self._wake_event.wait(self.interval or None)
+            self._wake_event.clear()
+            full, self._full_requested = self._full_requested, False
+            try:
+                with self.app.app_context():
+                    self.refresh(full=full)
+            except Exception as e:
+                self._full_requested = self._full_requested or full
+                print(f"🚨 Dashboard Rollups Error: {e}")
+
+# Global dashboard rollups instance
+dashboard_rollups = DashboardRollups()
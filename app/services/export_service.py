@@ -0,0 +1,148 @@
+"""
+Streaming Export Service
+
+Exports users as NDJSON or CSV without holding the table in memory. Users are
+read in keyset batches ordered by id; roles and active subscriptions for each
+batch are fetched with one query each. Every batch is read on its own engine
+connection, returned to the pool before the batch is sent, so a long export
+never holds a transaction open and leaves the request's session alone.
+
+Every record carries a cursor. An interrupted download resumes by passing the
+cursor of the last record received.
+"""
+
+import base64
+import csv
+import io
+import json
+
+from sqlalchemy import select
+
+from app import db
+from app.auth.auth_models import AuthUser, Role, SubscriptionPlan, SubscriptionStatus, UserRole, UserSubscription
+
+EXPORT_FIELDS = [
+    'id', 'username', 'email', 'first_name', 'last_name', 'is_active', 'created_at',
+    'roles', 'subscription_plan', 'subscription_status', 'cursor'
+]
+
+def encode_cursor(last_id):
+    """Opaque cursor that resumes an export after the given user id"""
+    raw = json.dumps({'after': last_id}, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).rstrip(b'=').decode('ascii')
+
+def decode_cursor(cursor):
+    """User id an export cursor resumes after; raises ValueError if it is malformed"""
+    if not cursor:
+        return 0
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        after = json.loads(raw)['after']
+    except (TypeError, KeyError, ValueError) as e:
+        raise ValueError('Invalid export cursor') from e
+    if not isinstance(after, int) or after < 0:
+        raise ValueError('Invalid export cursor')
+    return after
+
+class UserExportStream:
+    """Keyset-paged user export producing NDJSON or CSV chunks"""
+
+    def __init__(self, after_id=0, batch_size=500):
+        self.after_id = after_id
+        self.batch_size = batch_size
+        self.exported = 0
+
+    def records(self):
+        """Yield one dict per user, in id order, starting after after_id"""
+        after_id = self.after_id
+        while True:
+            with db.engine.connect() as connection:
+                users = connection.execute(
+                    select(
+                        AuthUser.id, AuthUser.username, AuthUser.email, AuthUser.first_name,
+                        AuthUser.last_name, AuthUser.is_active, AuthUser.created_at
+                    ).where(AuthUser.id > after_id).order_by(AuthUser.id).limit(self.batch_size)
+                ).all()
+                if not users:
+                    return
+
+                user_ids = [user.id for user in users]
+                roles = self._roles_for(connection, user_ids)
+                plans = self._active_plans_for(connection, user_ids)
+
+            for user in users:
+                plan = plans.get(user.id)
+                self.exported += 1
+                yield {
+                    'id': user.id,
+                    'username': user.username,
+                    'email': user.email,
+                    'first_name': user.first_name,
+                    'last_name': user.last_name,
+                    'is_active': user.is_active,
+                    'created_at': user.created_at.isoformat() if user.created_at else None,
+                    'roles': roles.get(user.id, []),
+                    'subscription_plan': plan,
+                    'subscription_status': SubscriptionStatus.ACTIVE.value if plan else None,
+                    'cursor': encode_cursor(user.id)
+                }
+
+            after_id = user_ids[-1]
+            if len(users) < self.batch_size:
+                return
+
+    def ndjson(self):
+        """Yield one chunk of newline-delimited JSON per batch"""
+        lines = []
+        for record in self.records():
+            lines.append(json.dumps(record, separators=(',', ':')))
+            if len(lines) >= self.batch_size:
+                yield '\n'.join(lines) + '\n'
+                lines = []
+        if lines:
+            yield '\n'.join(lines) + '\n'
+
+    def csv(self, header=True):
+        """Yield CSV chunks, roles joined with ';'"""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        if header:
+            writer.writerow(EXPORT_FIELDS)
+
+        for record in self.records():
+            record['roles'] = ';'.join(record['roles'])
+            writer.writerow([record[field] for field in EXPORT_FIELDS])
+            if self.exported % self.batch_size == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+
+        if buffer.tell():
+            yield buffer.getvalue()
+
+    @staticmethod
+    def _roles_for(connection, user_ids):
+        roles = {}
+        for user_id, name in connection.execute(
+            select(UserRole.user_id, Role.name)
+            .join(Role, Role.id == UserRole.role_id)
+            .where(UserRole.user_id.in_(user_ids), UserRole.is_active == True)
+            .order_by(UserRole.user_id, Role.name)
+        ):
+            roles.setdefault(user_id, []).append(name)
+        return roles
+
+    @staticmethod
+    def _active_plans_for(connection, user_ids):
+        plans = {}
+        for user_id, name in connection.execute(
+            select(UserSubscription.user_id, SubscriptionPlan.name)
+            .join(SubscriptionPlan, SubscriptionPlan.id == UserSubscription.plan_id)
+            .where(
+                UserSubscription.user_id.in_(user_ids),
+                UserSubscription.status == SubscriptionStatus.ACTIVE.value
+            )
+            .order_by(UserSubscription.user_id, UserSubscription.id)
+        ):
+            plans.setdefault(user_id, name)
+        return plans
@@ -0,0 +1,216 @@
+"""
+Geo Index Service
+
+Answers "cities within N km of X" from the latitude/longitude stored on
+City, without touching the database. The active cities of the reference
+data snapshot are bucketed into a grid of CELL_DEGREES x CELL_DEGREES cells
+held in NumPy arrays sorted by cell number. A radius query turns its
+bounding box into one contiguous run of cells per grid row, finds each run
+with searchsorted, and ranks the candidates with a vectorized haversine.
+
+Jobs only carry a free-text location, so a radius query is joined to jobs
+through the location labels a city is written as ("Austin", "Austin, TX",
+"Austin, Texas", ...). A bare city name is only used when every city of
+that name lies inside the radius.
+
+The index is rebuilt whenever the reference data snapshot changes; a full
+rebuild over every city is a few sorts on flat arrays.
+"""
+
+import math
+import threading
+
+import numpy as np
+from flask import current_app
+
+from app.services.reference_data import get_reference_data
+
+EARTH_RADIUS_KM = 6371.0088
+CELL_DEGREES = 0.5  # grid cell size; a 50 km query touches a handful of cells
+MAX_RADIUS_KM = 500  # largest radius a search may ask for
+
+def haversine_km(lat, lon, lats, lons):
+    """Great-circle distances in km from one point to arrays of points, all in degrees"""
+    lat, lon = math.radians(lat), math.radians(lon)
+    lats, lons = np.radians(lats), np.radians(lons)
+    a = np.sin((lats - lat) / 2) ** 2 + math.cos(lat) * np.cos(lats) * np.sin((lons - lon) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+def _suffixes(state):
+    """What follows a city name in the ways a job location may name a city of
+    `state`, most specific first; the bare name comes last"""
+    country = state.country if state else None
+    suffixes = []
+    if state is not None:
+        if country is not None:
+            suffixes.append(f', {state.name}, {country.name}')
+            if state.code and country.code_alpha2:
+                suffixes.append(f', {state.code}, {country.code_alpha2}')
+        suffixes.append(f', {state.name}')
+        if state.code:
+            suffixes.append(f', {state.code}')
+    suffixes.append('')
+    return suffixes
+
+class GeoGrid:
+    """Immutable grid over a fixed set of points"""
+
+    def __init__(self, ids, lats, lons, cell_degrees=CELL_DEGREES):
+        self.cell_degrees = cell_degrees
+        self.columns = int(math.ceil(360 / cell_degrees))
+        cells = self._rows(lats) * self.columns + self._columns(lons)
+        order = np.argsort(cells, kind='stable')
+        self.cells = cells[order]
+        self.ids = np.asarray(ids, dtype=np.int64)[order]
+        self.lats = np.asarray(lats, dtype=np.float64)[order]
+        self.lons = np.asarray(lons, dtype=np.float64)[order]
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _rows(self, lats):
+        rows = np.floor((np.asarray(lats, dtype=np.float64) + 90) / self.cell_degrees).astype(np.int64)
+        return np.clip(rows, 0, int(math.ceil(180 / self.cell_degrees)) - 1)
+
+    def _columns(self, lons):
+        return np.floor((np.asarray(lons, dtype=np.float64) + 180) / self.cell_degrees).astype(np.int64) % self.columns
+
+    def within(self, lat, lon, radius_km):
+        """(ids, distances in km) of the points inside the radius, nearest first"""
+        candidates = self._candidates(lat, lon, radius_km)
+        if not len(candidates):
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        distances = haversine_km(lat, lon, self.lats[candidates], self.lons[candidates])
+        inside = distances <= radius_km
+        candidates, distances = candidates[inside], distances[inside]
+        order = np.lexsort((self.ids[candidates], distances))
+        return self.ids[candidates][order], distances[order]
+
+    def _candidates(self, lat, lon, radius_km):
+        """Positions of the points in the cells the query circle overlaps"""
+        angle = radius_km / EARTH_RADIUS_KM
+        delta_lat = math.degrees(angle)
+        first_row, last_row = self._rows([lat - delta_lat, lat + delta_lat])
+        if abs(lat) + delta_lat >= 90 or angle >= math.pi / 2:
+            column_ranges = [(0, self.columns - 1)]
+        else:
+            # Widest longitude span of the circle, reached where it is tangent to a meridian
+            delta_lon = math.degrees(math.asin(min(math.sin(angle) / math.cos(math.radians(lat)), 1.0)))
+            first = int(math.floor((lon - delta_lon + 180) / self.cell_degrees))
+            last = int(math.floor((lon + delta_lon + 180) / self.cell_degrees))
+            if last - first + 1 >= self.columns:
+                column_ranges = [(0, self.columns - 1)]
+            elif first < 0:  # wraps across the antimeridian
+                column_ranges = [(0, last), (first % self.columns, self.columns - 1)]
+            elif last >= self.columns:
+                column_ranges = [(first, self.columns - 1), (0, last % self.columns)]
+            else:
+                column_ranges = [(first, last)]
+
+        rows = np.arange(first_row, last_row + 1, dtype=np.int64) * self.columns
+        low = np.concatenate([rows + first for first, _ in column_ranges])
+        high = np.concatenate([rows + last for _, last in column_ranges])
+        starts = np.searchsorted(self.cells, low, side='left')
+        ends = np.searchsorted(self.cells, high, side='right')
+        runs = [np.arange(start, end) for start, end in zip(starts, ends) if end > start]
+        return np.concatenate(runs) if runs else np.empty(0, dtype=np.int64)
+
+class GeoIndex:
+    """Grid over the active cities of the reference data snapshot"""
+
+    def __init__(self):
+        self._snapshot = None
+        # (GeoGrid, {city id: record}, {casefolded label: [city ids]}), replaced as a whole
+        self._state = (GeoGrid([], [], []), {}, {})
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        """Rebuild the grid if the reference data changed"""
+        snapshot = get_reference_data()
+        if snapshot is self._snapshot:
+            return
+        with self._lock:
+            if snapshot is self._snapshot:
+                return
+            # Read the record fields directly: this runs for every city on each change
+            cities = {city_id: city for city_id, city in snapshot.tables['cities'].items()
+                      if city._fields['is_active']}
+            located = [city._fields for city in cities.values() if city._fields['latitude'] is not None
+                       and city._fields['longitude'] is not None]
+            grid = GeoGrid([fields['id'] for fields in located], [fields['latitude'] for fields in located],
+                           [fields['longitude'] for fields in located])
+            suffixes = {state_id: [suffix.casefold() for suffix in _suffixes(state)]
+                        for state_id, state in snapshot.tables['states'].items()}
+            suffixes[None] = ['']
+            labels = {}
+            for city_id, city in cities.items():
+                name = city._fields['name'].casefold()
+                for suffix in suffixes.get(city._fields['state_id'], suffixes[None]):
+                    labels.setdefault(name + suffix, []).append(city_id)
+            self._state = (grid, cities, labels)
+            self._snapshot = snapshot
+
+    def within(self, lat, lon, radius_km):
+        """[(city id, distance in km)] of the active cities inside the radius, nearest first"""
+        self.refresh()
+        ids, distances = self._state[0].within(lat, lon, min(radius_km, MAX_RADIUS_KM))
+        return list(zip(ids.tolist(), distances.tolist()))
+
+    def near_city(self, city_id, radius_km):
+        """Cities within the radius of a city, nearest first; just the city if it has no
+        coordinates, [] if it is unknown or inactive"""
+        self.refresh()
+        city = self._state[1].get(city_id)
+        if city is None:
+            return []
+        if city.latitude is None or city.longitude is None:
+            return [(city.id, 0.0)]
+        return self.within(city.latitude, city.longitude, radius_km)
+
+    def resolve(self, text):
+        """Id of the city a free-text location names, the most populous one if several do, or None"""
+        self.refresh()
+        _, cities, labels = self._state
+        ids = labels.get(', '.join(' '.join(part.split()) for part in (text or '').split(',')).casefold())
+        if not ids:
+            return None
+        return max(ids, key=lambda city_id: (cities[city_id].population or 0, -city_id))
+
+    def location_labels(self, matches):
+        """{job location label: (city id, distance in km)} for the cities of a radius query"""
+        _, cities, labels = self._state
+        inside = {city_id for city_id, _ in matches}
+        result = {}
+        for city_id, distance in matches:
+            city = cities[city_id]
+            for suffix in _suffixes(city.state):
+                if not suffix and not inside.issuperset(labels[city.name.casefold()]):
+                    continue  # the bare name also names a city outside the radius
+                result.setdefault(city.name + suffix, (city_id, distance))
+        return result
+
+    def location_filter(self, location=None, city_id=None, radius_km=50):
+        """(locations, distances) for a search form's location fields
+
+        A city (picked by id, or typed and resolved by name) becomes the labels
+        of the cities within the radius, mapped to their distance in km; text
+        that names no city is matched as typed. distances is keyed by the
+        lower-cased label for display. locations is None without a location.
+        """
+        if not city_id and location:
+            city_id = self.resolve(location)
+        if city_id:
+            locations = {label: distance for label, (_, distance)
+                         in self.location_labels(self.near_city(city_id, radius_km)).items()}
+            return locations, {label.lower(): distance for label, distance in locations.items()}
+        if location:
+            return {location: None}, {}
+        return None, {}
+
+def get_geo_index(app=None):
+    """Get the city geo index of an application, creating it on first use"""
+    app = app or current_app._get_current_object()
+    index = app.extensions.get('geo_index')
+    if index is None:
+        index = app.extensions['geo_index'] = GeoIndex()
+    return index
@@ -0,0 +1,215 @@
+"""
+Index Sync Service
+
+Keeps a worker's in-memory index over a table in step with the database.
+The first search starts a background thread that builds the index by
+streaming the table in batches and swaps it in when done. Searches wait up
+to warm_up_timeout for that first build; after that they see no index
+(warming is true) and the subclass serves them another way, e.g. from a
+bounded database query. Once built, each sync applies
+
+- the rows this worker committed, queued by session hooks so an author sees
+  their own edit on the very next search, and
+- the rows other workers changed, found by polling updated_at at most once
+  per sync interval. Each poll re-reads an overlap window to catch
+  transactions that committed after a later poll started, and skips rows
+  whose updated_at did not move.
+
+Rows that are gone are dropped from the index. A rebuild builds a new index
+the same way while searches keep using the current one, and swaps it in
+when done. Subclasses name the model,
+the columns to read and their app.extensions key, and create the index,
+which must offer upsert(rows), remove(ids) and merge().
+"""
+
+import threading
+import time
+from datetime import datetime, timedelta
+
+from flask import current_app, has_app_context
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from app import db
+
+SYNC_OVERLAP = timedelta(seconds=60)  # re-read window for edits committed after a later poll started
+BUILD_BATCH_SIZE = 5000
+
+_TRACKED = {}  # model -> app.extensions key of the index over its table
+
+class SyncedIndex:
+    """A worker's index over one table, built in the background on first use and kept in step with it"""
+
+    model = None
+    columns = ()  # table columns handed to the index; must include id and updated_at
+    extension = None
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if cls.model is not None:
+            _TRACKED[cls.model] = cls.extension
+
+    def __init__(self, sync_interval=5.0, clock=time.monotonic, background=True, warm_up_timeout=0.0):
+        self.sync_interval = sync_interval
+        self.clock = clock
+        self.background = background  # False builds on the calling thread (tests, scripts)
+        self.warm_up_timeout = warm_up_timeout  # seconds a search waits for the first build
+        self.index = None
+        self._built = threading.Event()  # set once the first build is swapped in
+        self._stamps = {}  # row id -> updated_at of the indexed version
+        self._pending = set()  # ids committed by this worker since the last sync
+        self._applied_during_build = set()  # pending ids applied to the old index while a build runs
+        self._watermark = None
+        self._next_sync = 0.0
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        self._builder = None  # thread running builds, if any
+        self._build_requested = False
+
+    def create_index(self):
+        raise NotImplementedError
+
+    def __len__(self):
+        index = self.index
+        return len(index) if index is not None else 0
+
+    @property
+    def warming(self):
+        """Whether the first build is still running"""
+        return self.index is None
+
+    def sync(self):
+        """Apply edits made since the last sync and return the index, or None
+        while its first build is still running after warm_up_timeout"""
+        if self.index is None:
+            self._request_build()
+            if self.index is None and self.warm_up_timeout > 0:
+                self._built.wait(self.warm_up_timeout)
+            return self.index
+        now = self.clock()
+        if not self._pending and now < self._next_sync:
+            return self.index
+        with self._lock:
+            if self._pending or self.clock() >= self._next_sync:
+                self._catch_up()
+                self._next_sync = now + self.sync_interval
+            return self.index
+
+    def rebuild(self):
+        """Build the index again from the table; searches keep the current one until it is swapped in"""
+        self._request_build()
+
+    def mark_changed(self, row_ids):
+        """Queue rows this worker committed for the next sync"""
+        with self._lock:
+            self._pending.update(row_ids)
+
+    def forget(self, row_ids):
+        """Drop rows that are gone"""
+        index = self.index
+        if index is not None:
+            index.remove(row_ids)
+            for row_id in row_ids:
+                self._stamps.pop(row_id, None)
+
+    def _request_build(self):
+        """Build the index unless a build is already under way"""
+        with self._build_lock:
+            self._build_requested = True
+            if self._builder is not None:
+                return
+            if self.background:
+                self._builder = threading.Thread(target=self._run_builds, args=(current_app._get_current_object(),),
+                                                 daemon=True)
+            else:
+                self._builder = threading.current_thread()
+        if self.background:
+            self._builder.start()
+        else:
+            self._run_builds()
+
+    def _run_builds(self, app=None):
+        """Build until no further build was requested meanwhile"""
+        while True:
+            with self._build_lock:
+                if not self._build_requested:
+                    self._builder = None
+                    return
+                self._build_requested = False
+            try:
+                if app is None:
+                    self._build()
+                else:
+                    with app.app_context():
+                        try:
+                            self._build()
+                        finally:
+                            db.session.remove()
+            except Exception as e:
+                with self._build_lock:
+                    self._builder = None
+                if app is None:
+                    raise
+                app.logger.error('Building the %s index failed: %s', self.extension, e)
+                return
+
+    def _build(self):
+        """Stream the table into a new index, without holding the sync lock, and swap it in"""
+        started = datetime.utcnow()
+        index, stamps = self.create_index(), {}
+        result = db.session.execute(select(*self.columns).execution_options(yield_per=BUILD_BATCH_SIZE))
+        for rows in result.mappings().partitions():
+            index.upsert(rows)
+            stamps.update((row['id'], row['updated_at']) for row in rows)
+        index.merge()
+        # Rows committed during the build are re-read by a later catch-up:
+        # they are pending or inside the overlap window of the watermark
+        with self._lock:
+            self.index, self._stamps, self._watermark = index, stamps, started
+            self._pending.update(self._applied_during_build)
+            self._applied_during_build = set()
+            self._next_sync = self.clock() + self.sync_interval
+        self._built.set()
+
+    def _catch_up(self):
+        started = datetime.utcnow()
+        table = self.model.__table__
+        pending, self._pending = self._pending, set()
+        if self._builder is not None:
+            self._applied_during_build.update(pending)  # the new index may predate them
+        condition = table.c.updated_at >= self._watermark - SYNC_OVERLAP
+        if pending:
+            condition = condition | table.c.id.in_(pending)
+        changed = []
+        for row in db.session.execute(select(*self.columns).where(condition)).mappings():
+            row_id = row['id']
+            # Rows re-read inside the overlap window are skipped unless they changed
+            if row_id in pending or row_id not in self._stamps or self._stamps[row_id] != row['updated_at']:
+                changed.append(row)
+            pending.discard(row_id)
+        self.index.upsert(changed)
+        self._stamps.update((row['id'], row['updated_at']) for row in changed)
+        self.forget(pending)  # committed by this worker but no longer in the table
+        self._watermark = started
+
+@event.listens_for(Session, 'after_flush')
+def _track_changes(session, flush_context):
+    """Remember the rows of indexed tables this transaction wrote"""
+    for instance in (*session.new, *session.dirty, *session.deleted):
+        extension = _TRACKED.get(type(instance))
+        if extension is not None and instance.id is not None:
+            session.info.setdefault('synced_index_changes', {}).setdefault(extension, set()).add(instance.id)
+
+@event.listens_for(Session, 'after_commit')
+def _queue_committed_changes(session):
+    """Have this worker's indexes pick up its own edits on the next search"""
+    changes = session.info.pop('synced_index_changes', None)
+    if changes and has_app_context():
+        for extension, row_ids in changes.items():
+            index = current_app.extensions.get(extension)
+            if index is not None:
+                index.mark_changed(row_ids)
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_changes(session):
+    session.info.pop('synced_index_changes', None)
@@ -0,0 +1,449 @@
+"""
+Job Search Service
+
+Full-text search over job postings, held in memory per worker. Title,
+skills, requirements and description are tokenized with the typeahead
+normalizer (accent- and case-insensitive) into an inverted index, and every
+term of the query must match. Matches are ranked with BM25, each field
+counting FIELD_WEIGHTS times.
+
+The index is split in two segments. The main segment keeps postings as flat
+NumPy arrays grouped by term (CSR layout); jobs created or edited since the
+last merge go to a small delta segment, and the slot of a replaced version
+is tombstoned. Once the delta grows past a quarter of the main segment the
+two are merged and dead slots are compacted away, so bulk loads stay close
+to linear.
+
+Filters (active and not expired, location, category, job type, salary range)
+are per-slot columns turned into boolean masks and intersected with the
+matches. For the skills filter each normalized skill name in a job's
+skills_required keeps the slots of its jobs, and the requested skill ids are
+mapped to their names in the Skill taxonomy (by name or display name, as the
+job_skills links are, see skill_links) at search time; any or all of some
+skills is a bincount over their postings. A change to the taxonomy only swaps
+that mapping, so the index is not rebuilt. Results are ordered by score, or
+distance for city-radius browsing, or recency, with job id as the
+tie-breaker, and paged with opaque cursors on that (key, id) pair.
+
+The index is built in a background thread on the first search, which waits
+up to JOB_SEARCH_WARM_UP_TIMEOUT for it and is otherwise served newest-first
+from a bounded database query (see JobSearch.search). Each worker applies its
+own commits on the next search and picks up other workers' edits by polling
+jobs.updated_at at most once per JOB_SEARCH_SYNC_INTERVAL (see index_sync).
+"""
+
+import array
+import json
+import math
+import threading
+from datetime import datetime
+
+import numpy as np
+from flask import current_app
+from sqlalchemy import func, or_
+
+from app import db
+from app.models import Job
+from app.services.candidate_index import parse_skills, skill_names
+from app.services.index_sync import SyncedIndex
+from app.services.keyset_pagination import KeysetPage, paginate_keyset, paginate_ranked
+from app.services.skill_links import linked_to
+from app.services.reference_data import get_reference_data
+from app.services.typeahead import normalize
+
+# Indexed fields and how much a token in each counts towards its term frequency
+FIELD_WEIGHTS = (('title', 3.0), ('skills_required', 2.0), ('requirements', 1.0), ('description', 1.0))
+BM25_K1 = 1.2
+BM25_B = 0.75
+MERGE_THRESHOLD = 50000  # delta postings that always allow a merge, however small the main segment
+FILTER_FIELDS = ('location', 'category', 'job_type')
+
+STOPWORDS = frozenset((
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'in', 'is', 'it', 'of', 'on', 'or',
+    'our', 'that', 'the', 'this', 'to', 'we', 'will', 'with', 'you', 'your',
+))
+
+EPOCH = datetime(1970, 1, 1)
+
+def tokenize(text):
+    """Indexed terms of a text: normalized words without stopwords or trailing dots"""
+    tokens = []
+    for word in normalize(text).split(' '):
+        word = word.rstrip('.')
+        if word and word not in STOPWORDS:
+            tokens.append(word)
+    return tokens
+
+def _skills_text(value):
+    # skills_required holds a JSON list, but older rows may carry plain text
+    try:
+        skills = json.loads(value) if value else None
+    except (TypeError, ValueError):
+        return value
+    if isinstance(skills, list):
+        return ' '.join(str(skill) for skill in skills)
+    return value if isinstance(value, str) else None
+
+def _timestamp(value):
+    return (value - EPOCH).total_seconds() if value is not None else math.inf
+
+def _number(value):
+    return float(value) if value is not None else math.nan
+
+class JobSearchIndex:
+    """Inverted index and filter columns over job postings"""
+
+    def __init__(self, merge_threshold=MERGE_THRESHOLD, skill_ids=None):
+        self.merge_threshold = merge_threshold
+        # Normalized skill name -> Skill.id, see candidate_index.skill_names
+        self.skill_ids = skill_ids if skill_ids is not None else {}
+        self._names_of = None  # Skill.id -> its normalized names, derived from skill_ids on first use
+        self.terms = {}  # token -> term id
+        self._name_slots = {}  # normalized skill name -> slots of the jobs requiring it, live or tombstoned
+        self._slot_of = {}  # job id -> slot of its current version
+        self._codes = {field: {} for field in FILTER_FIELDS}  # casefolded value -> code
+        self._size = 0  # slots in use, live or tombstoned
+        self._total_length = 0.0  # weighted token count of the live slots
+        # Per-slot columns, grown by doubling
+        self._columns = {
+            'id': np.zeros(0, np.int64),
+            'live': np.zeros(0, bool),
+            'active': np.zeros(0, bool),
+            'expires': np.zeros(0, np.float64),
+            'salary_min': np.zeros(0, np.float64),
+            'salary_max': np.zeros(0, np.float64),
+            'length': np.zeros(0, np.float32),
+            **{field: np.zeros(0, np.int32) for field in FILTER_FIELDS},
+        }
+        # Main segment: the postings of term t are at [offsets[t], offsets[t + 1])
+        self._offsets = np.zeros(1, np.int64)
+        self._slots = np.zeros(0, np.int32)
+        self._tfs = np.zeros(0, np.float32)
+        # Delta segment: (term ids, slots, term frequencies) in arrival order, and
+        # the same sorted by term, rebuilt by the first search after a write
+        self._delta = (array.array('i'), array.array('i'), array.array('f'))
+        self._delta_sorted = None
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._slot_of)
+
+    def set_skill_ids(self, skill_ids):
+        """Follow a new skill taxonomy; the postings are kept by name, so nothing is re-indexed"""
+        with self._lock:
+            self.skill_ids = skill_ids if skill_ids is not None else {}
+            self._names_of = None
+
+    def upsert(self, rows):
+        """Index jobs given as mappings of Job columns, replacing earlier versions"""
+        with self._lock:
+            for row in rows:
+                self._remove(row['id'])
+                self._add(row)
+            if len(self._delta[0]) > max(self.merge_threshold, len(self._slots) // 4):
+                self.merge()
+
+    def remove(self, job_ids):
+        """Drop jobs from the results"""
+        with self._lock:
+            for job_id in job_ids:
+                self._remove(job_id)
+
+    def _remove(self, job_id):
+        slot = self._slot_of.pop(job_id, None)
+        if slot is not None:
+            self._columns['live'][slot] = False
+            self._total_length -= float(self._columns['length'][slot])
+
+    def _add(self, row):
+        if self._size == len(self._columns['id']):
+            capacity = max(1024, 2 * self._size)
+            for name, column in self._columns.items():
+                grown = np.zeros(capacity, column.dtype)
+                grown[:self._size] = column[:self._size]
+                self._columns[name] = grown
+        slot = self._size
+        self._size += 1
+
+        frequencies = {}
+        for field, weight in FIELD_WEIGHTS:
+            text = row.get(field)
+            for token in tokenize(_skills_text(text) if field == 'skills_required' else text):
+                frequencies[token] = frequencies.get(token, 0.0) + weight
+        term_ids, slots, tfs = self._delta
+        for token, frequency in frequencies.items():
+            term_id = self.terms.get(token)
+            if term_id is None:
+                term_id = self.terms[token] = len(self.terms)
+            term_ids.append(term_id)
+            slots.append(slot)
+            tfs.append(frequency)
+        self._delta_sorted = None
+
+        length = sum(frequencies.values())
+        columns = self._columns
+        columns['id'][slot] = row['id']
+        columns['live'][slot] = True
+        columns['active'][slot] = row.get('is_active') is not False
+        columns['expires'][slot] = _timestamp(row.get('expires_at'))
+        columns['salary_min'][slot] = _number(row.get('salary_min'))
+        columns['salary_max'][slot] = _number(row.get('salary_max'))
+        columns['length'][slot] = length
+        for field in FILTER_FIELDS:
+            columns[field][slot] = self._code(field, row.get(field), create=True)
+        for name in {normalize(name) for name in parse_skills(row.get('skills_required'))}:
+            self._name_slots.setdefault(name, array.array('i')).append(slot)
+        self._total_length += length
+        self._slot_of[row['id']] = slot
+
+    def _code(self, field, value, create=False):
+        """Code of a filter value, -1 for none or (unless create) one never indexed"""
+        key = (value or '').strip().casefold()
+        if not key:
+            return -1
+        codes = self._codes[field]
+        if create:
+            return codes.setdefault(key, len(codes))
+        return codes.get(key, -1)
+
+    def merge(self):
+        """Fold the delta into the main segment, dropping postings of replaced and removed jobs"""
+        with self._lock:
+            delta_terms, delta_slots, delta_tfs = self._delta
+            main_terms = np.repeat(np.arange(len(self._offsets) - 1, dtype=np.int32), np.diff(self._offsets))
+            terms = np.concatenate((main_terms, np.asarray(delta_terms, dtype=np.int32)))
+            slots = np.concatenate((self._slots, np.asarray(delta_slots, dtype=np.int32)))
+            tfs = np.concatenate((self._tfs, np.asarray(delta_tfs, dtype=np.float32)))
+
+            live = self._columns['live']
+            keep = live[slots]
+            terms, slots, tfs = terms[keep], slots[keep], tfs[keep]
+            if self._size - len(self._slot_of) > self._size // 4:
+                # Compact: renumber the live slots densely
+                live_slots = np.flatnonzero(live[:self._size])
+                renumber = np.full(self._size, -1, np.int32)
+                renumber[live_slots] = np.arange(len(live_slots), dtype=np.int32)
+                slots = renumber[slots]
+                for name, name_slots in list(self._name_slots.items()):
+                    kept = renumber[np.frombuffer(name_slots, dtype=np.int32)]
+                    kept = kept[kept >= 0]
+                    if len(kept):
+                        self._name_slots[name] = array.array('i', kept.tobytes())
+                    else:
+                        del self._name_slots[name]
+                for column in self._columns.values():
+                    column[:len(live_slots)] = column[live_slots]
+                live[len(live_slots):] = False
+                self._size = len(live_slots)
+                self._slot_of = dict(zip(self._columns['id'][:self._size].tolist(), range(self._size)))
+
+            order = np.argsort(terms, kind='stable')
+            self._slots, self._tfs = slots[order], tfs[order]
+            counts = np.bincount(terms, minlength=len(self.terms))
+            self._offsets = np.concatenate(([0], np.cumsum(counts))).astype(np.int64)
+            self._delta = (array.array('i'), array.array('i'), array.array('f'))
+            self._delta_sorted = None
+
+    def _postings(self, term_id):
+        """(slots, term frequencies) of a term over both segments"""
+        parts = []
+        if term_id < len(self._offsets) - 1:
+            start, end = self._offsets[term_id], self._offsets[term_id + 1]
+            parts.append((self._slots[start:end], self._tfs[start:end]))
+        if len(self._delta[0]):
+            if self._delta_sorted is None:
+                terms = np.asarray(self._delta[0], dtype=np.int32)
+                order = np.argsort(terms, kind='stable')
+                self._delta_sorted = (terms[order], np.asarray(self._delta[1], dtype=np.int32)[order],
+                                      np.asarray(self._delta[2], dtype=np.float32)[order])
+            terms, slots, tfs = self._delta_sorted
+            start, end = np.searchsorted(terms, [term_id, term_id + 1])
+            parts.append((slots[start:end], tfs[start:end]))
+        if len(parts) == 1:
+            return parts[0]
+        return (np.concatenate([slots for slots, _ in parts]) if parts else np.zeros(0, np.int32),
+                np.concatenate([tfs for _, tfs in parts]) if parts else np.zeros(0, np.float32))
+
+    def search(self, query=None, locations=None, category=None, job_type=None, salary_min=None,
+               salary_max=None, skills=None, match_all=False, job_ids=None, cursor=None, per_page=20, now=None):
+        """One page of matching job ids; raises ValueError for a bad cursor
+
+        locations maps the location labels to match to their distance in km (or
+        None); without a query, results with distances are ranked nearest first.
+        skills, if given, are skill ids a job must require at least one of (all
+        of them with match_all). job_ids, if given, limits the results to those
+        jobs.
+        """
+        with self._lock:
+            columns, size = self._columns, self._size
+            tokens = list(dict.fromkeys(tokenize(query))) if query else []
+            if tokens:
+                term_ids = [self.terms.get(token) for token in tokens]
+                if None in term_ids:
+                    return KeysetPage([], per_page, total=0)
+                candidates, keys = self._score(term_ids)
+            else:
+                candidates, keys = np.arange(size), None
+
+            now = _timestamp(now or datetime.utcnow())
+            mask = columns['live'][candidates] & columns['active'][candidates] & (columns['expires'][candidates] > now)
+            for field, value in (('category', category), ('job_type', job_type)):
+                if value:
+                    mask &= columns[field][candidates] == self._code(field, value)
+            if locations is not None:
+                codes = np.array([self._code('location', label) for label in locations], dtype=np.int32)
+                mask &= np.isin(columns['location'][candidates], codes[codes >= 0])
+            if salary_min is not None or salary_max is not None:
+                lows, highs = columns['salary_min'][candidates], columns['salary_max'][candidates]
+                lows, highs = np.where(np.isnan(lows), highs, lows), np.where(np.isnan(highs), lows, highs)
+                if salary_min is not None:
+                    mask &= highs >= salary_min
+                if salary_max is not None:
+                    mask &= lows <= salary_max
+            if skills is not None:
+                wanted = list(dict.fromkeys(skills))
+                postings = [postings for postings in map(self._skill_postings, wanted) if len(postings)]
+                if not postings:
+                    return KeysetPage([], per_page, total=0)
+                hits = np.bincount(np.concatenate(postings), minlength=size)
+                mask &= hits[candidates] >= (len(wanted) if match_all else 1)
+            if job_ids is not None:
+                mask &= np.isin(columns['id'][candidates], np.asarray(job_ids, dtype=np.int64))
+            candidates = candidates[mask]
+
+            ids = columns['id'][candidates]
+            if keys is not None:
+                keys = keys[mask]
+            elif locations and any(distance is not None for distance in locations.values()):
+                by_code = np.full(len(self._codes['location']) + 1, np.inf)  # code -1 reads the last entry
+                for label, distance in locations.items():
+                    code = self._code('location', label)
+                    if code >= 0 and distance is not None:
+                        by_code[code] = min(by_code[code], distance)
+                keys = -by_code[columns['location'][candidates]]
+            else:
+                keys = ids.astype(np.float64)
+            return paginate_ranked(keys, ids, cursor, per_page)
+
+    def _skill_postings(self, skill_id):
+        """Slots of the jobs requiring a skill under any of its names, each once"""
+        if self._names_of is None:
+            self._names_of = {}
+            for name, named_id in self.skill_ids.items():
+                self._names_of.setdefault(named_id, []).append(name)
+        parts = [np.frombuffer(self._name_slots[name], dtype=np.int32)
+                 for name in self._names_of.get(skill_id, ()) if name in self._name_slots]
+        if len(parts) == 1:
+            return parts[0]
+        return np.unique(np.concatenate(parts)) if parts else np.zeros(0, np.int32)
+
+    def _score(self, term_ids):
+        """(slots matching every term, their BM25 scores)"""
+        live_count = max(len(self._slot_of), 1)
+        average_length = self._total_length / live_count or 1.0
+        lengths = self._columns['length']
+        slot_parts, score_parts = [], []
+        for term_id in term_ids:
+            slots, tfs = self._postings(term_id)
+            frequency = min(len(slots), live_count)
+            idf = math.log(1 + (live_count - frequency + 0.5) / (frequency + 0.5))
+            norms = BM25_K1 * (1 - BM25_B + BM25_B * lengths[slots] / average_length)
+            slot_parts.append(slots)
+            score_parts.append(idf * tfs * (BM25_K1 + 1) / (tfs + norms))
+        slots = np.concatenate(slot_parts)
+        if len(term_ids) == 1:
+            return slots.astype(np.int64), score_parts[0].astype(np.float64)
+        matched = np.bincount(slots, minlength=self._size)
+        scores = np.bincount(slots, weights=np.concatenate(score_parts), minlength=self._size)
+        candidates = np.flatnonzero(matched == len(term_ids))
+        return candidates, scores[candidates]
+
+# Job columns the index reads
+_INDEXED = Job.__table__.c
+_COLUMNS = (_INDEXED.id, _INDEXED.title, _INDEXED.description, _INDEXED.requirements, _INDEXED.skills_required,
+            _INDEXED.location, _INDEXED.category, _INDEXED.job_type, _INDEXED.salary_min, _INDEXED.salary_max,
+            _INDEXED.is_active, _INDEXED.expires_at, _INDEXED.updated_at)
+
+class JobSearch(SyncedIndex):
+    """A worker's job index, built in the background on first use and kept in step with the jobs table"""
+
+    model = Job
+    columns = _COLUMNS
+    extension = 'job_search'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._snapshot = None
+        self._skill_ids = None
+
+    def create_index(self):
+        return JobSearchIndex(skill_ids=self._skill_ids)
+
+    def search(self, **filters):
+        """One page of matching job ids, see JobSearchIndex.search; from the
+        database while the index is warming up"""
+        self._follow_taxonomy()
+        index = self.sync()
+        if index is None:
+            return self._search_database(**filters)
+        if index.skill_ids is not self._skill_ids:
+            index.set_skill_ids(self._skill_ids)  # built before the taxonomy last changed
+        return index.search(**filters)
+
+    def _search_database(self, query=None, locations=None, category=None, job_type=None, salary_min=None,
+                         salary_max=None, skills=None, match_all=False, job_ids=None, cursor=None, per_page=20,
+                         now=None):
+        """Newest-first page of matching job ids read straight from the jobs table
+
+        Serves searches until the first build is done. Each page reads at most
+        per_page + 1 rows and is not counted (total is None); query words must
+        appear in one of the indexed fields, unranked, and skills go through
+        the job_skills links. Raises ValueError for a bad cursor, including an
+        index cursor.
+        """
+        if skills is not None and not skills:
+            return KeysetPage([], per_page, total=0)
+        now = now or datetime.utcnow()
+        conditions = [Job.is_active.isnot(False), or_(Job.expires_at.is_(None), Job.expires_at > now)]
+        for word in tokenize(query) if query else ():
+            pattern = f'%{word}%'
+            conditions.append(or_(*(getattr(Job, field).ilike(pattern) for field, _ in FIELD_WEIGHTS)))
+        for column, value in ((Job.category, category), (Job.job_type, job_type)):
+            if value and value.strip():
+                conditions.append(func.lower(func.trim(column)) == value.strip().casefold())
+        if locations is not None:
+            conditions.append(func.lower(func.trim(Job.location)).in_(
+                [label.strip().casefold() for label in locations]
+            ))
+        if salary_min is not None:
+            conditions.append(func.coalesce(Job.salary_max, Job.salary_min) >= salary_min)
+        if salary_max is not None:
+            conditions.append(func.coalesce(Job.salary_min, Job.salary_max) <= salary_max)
+        if skills is not None:
+            conditions.append(Job.id.in_(linked_to(Job, list(dict.fromkeys(skills)), match_all)))
+        if job_ids is not None:
+            conditions.append(Job.id.in_(job_ids))
+
+        rows = db.session.query(Job.id, Job.created_at).filter(*conditions)
+        page = paginate_keyset(rows, Job.created_at, Job.id, cursor, per_page)
+        page.items = [row.id for row in page.items]
+        return page
+
+    def _follow_taxonomy(self):
+        snapshot = get_reference_data()
+        if snapshot is self._snapshot:
+            return
+        self._skill_ids = skill_names(snapshot)
+        self._snapshot = snapshot
+
+def get_job_search(app=None):
+    """Get the job search index of an application, creating it on first use"""
+    app = app or current_app._get_current_object()
+    search = app.extensions.get('job_search')
+    if search is None:
+        search = app.extensions['job_search'] = JobSearch(
+            sync_interval=app.config.get('JOB_SEARCH_SYNC_INTERVAL', 5.0),
+            background=app.config.get('JOB_SEARCH_BACKGROUND_BUILD', True),
+            warm_up_timeout=app.config.get('JOB_SEARCH_WARM_UP_TIMEOUT', 0.0)
+        )
+    return search
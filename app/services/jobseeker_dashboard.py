@@ -0,0 +1,266 @@
+"""
+Jobseeker Dashboard Service
+
+Serves the jobseeker dashboard, applications and profile pages from one row
+of jobseeker_dashboards per user, read by primary key, instead of joining
+users, jobseeker_profiles, job_applications and jobs on every render. A row
+holds the user's name, profile summary and completeness score, application
+counts by status, the latest applications and the recently viewed jobs.
+
+Rows are rewritten from the base tables for the users a transaction touched,
+just before it commits:
+
+- session hooks collect the users whose user row, profile or applications
+  were written, and
+- application_pipeline.transition() reports the jobseekers of the
+  applications it moved in bulk.
+
+refresh() reads those users' rows in a few set-based queries, whatever the
+number of users, so bulk transitions stay cheap. Job views are recorded on
+the row directly. Job titles and companies are copied into the row as they
+are when it is rewritten. A missing row (a user older than the table) is
+built on first read, in a transaction of its own.
+"""
+
+import json
+from datetime import datetime
+
+from sqlalchemy import delete, event, func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app import db
+from app.models import ConsultancyProfile, Job, JobApplication, JobSeekerDashboard, JobSeekerProfile, User, UserType
+from app.services.application_pipeline import APPLIED, HIRED, INTERVIEWED, MOVED_JOBSEEKERS, REVIEWED, STATUSES
+from app.services.candidate_index import parse_skills
+
+RECENT_LIMIT = 5  # applications and viewed jobs kept per user
+REFRESH_BATCH_SIZE = 500
+
+# Field -> share of the profile completeness score; they add up to 100
+USER_WEIGHTS = {'first_name': 5, 'last_name': 5, 'phone': 5}
+PROFILE_WEIGHTS = {
+    'skills': 20, 'resume_url': 15, 'job_title': 10, 'experience_years': 5, 'current_location': 10,
+    'preferred_location': 5, 'expected_salary': 5, 'education': 10, 'certifications': 5,
+}
+
+PENDING = (APPLIED, REVIEWED, INTERVIEWED)
+
+_USERS = 'jobseeker_dashboard_users'  # session.info keys of the rows to rewrite
+_PROFILES = 'jobseeker_dashboard_profiles'
+
+def _filled(value):
+    """Whether a field counts as filled in; JSON columns need a non-empty list or object"""
+    if isinstance(value, str):
+        try:
+            return bool(json.loads(value))
+        except ValueError:
+            return bool(value.strip())
+    return value is not None  # numbers, including 0 years of experience
+
+def completeness(user, profile):
+    """Profile completeness in percent, from a users row and a jobseeker_profiles row (or None)"""
+    score = sum(weight for field, weight in USER_WEIGHTS.items() if _filled(user[field]))
+    if profile is not None:
+        score += sum(weight for field, weight in PROFILE_WEIGHTS.items() if _filled(profile[field]))
+    return score
+
+def _skill_names(value):
+    """Skill names of a profile as the jobseeker typed them, including names outside the taxonomy"""
+    names = {}
+    for name in parse_skills(value):
+        names.setdefault(name.casefold(), name)
+    return list(names.values())
+
+def _datetime(value):
+    return datetime.fromisoformat(value) if value else None
+
+class DashboardSummary:
+    """Decoded view over one jobseeker_dashboards row"""
+
+    def __init__(self, row):
+        self.row = row
+        self.user_id = row.user_id
+        self.profile_id = row.profile_id
+        self.first_name = row.first_name
+        self.last_name = row.last_name
+        self.profile_completeness = row.profile_completeness or 0
+        self.profile = json.loads(row.profile_summary) if row.profile_summary else None
+        counts = json.loads(row.application_counts or '{}')
+        self.counts = {status: counts.get(status, 0) for status in STATUSES}
+        self.recent_applications = [dict(entry, applied_at=_datetime(entry['applied_at']))
+                                    for entry in json.loads(row.recent_applications or '[]')]
+        self.recently_viewed = [dict(entry, viewed_at=_datetime(entry['viewed_at']))
+                                for entry in json.loads(row.recently_viewed or '[]')]
+        self.jobs_viewed = row.jobs_viewed or 0
+
+    @property
+    def total_applications(self):
+        return sum(self.counts.values())
+
+    @property
+    def pending_applications(self):
+        return sum(self.counts[status] for status in PENDING)
+
+    @property
+    def accepted_applications(self):
+        return self.counts[HIRED]
+
+def get_dashboard(user_id):
+    """The DashboardSummary of a user, building the row on first read; None if there is no such user
+
+    A missing row is built and committed on a session of its own, so reads
+    never commit the request's session, and read back there: the request's
+    transaction may not see a row committed after it started.
+    """
+    row = db.session.get(JobSeekerDashboard, user_id)
+    if row is None:
+        with Session(db.engine, expire_on_commit=False) as build_session:
+            with build_session.begin():
+                refresh(build_session, user_ids=[user_id])
+            row = build_session.get(JobSeekerDashboard, user_id)
+    return DashboardSummary(row) if row is not None else None
+
+def record_job_view(user_id, job):
+    """Put a job at the top of a user's recently viewed jobs, in the caller's transaction"""
+    row = db.session.get(JobSeekerDashboard, user_id, with_for_update=True)
+    if row is None:
+        refresh(db.session, user_ids=[user_id])
+        row = db.session.get(JobSeekerDashboard, user_id, with_for_update=True)
+        if row is None:
+            return
+    viewed = [entry for entry in json.loads(row.recently_viewed or '[]') if entry['job_id'] != job.id]
+    company = job.consultancy.company_name if job.consultancy else None
+    viewed.insert(0, {'job_id': job.id, 'title': job.title, 'company': company, 'location': job.location,
+                      'viewed_at': datetime.utcnow().isoformat()})
+    row.recently_viewed = json.dumps(viewed[:RECENT_LIMIT])
+    row.jobs_viewed = (row.jobs_viewed or 0) + 1
+
+def refresh(session, user_ids=(), profile_ids=()):
+    """Rewrite the dashboard rows of users (given directly or by jobseeker profile) from the base tables"""
+    user_ids = set(user_ids)
+    profile_ids = set(profile_ids)
+    if profile_ids:
+        user_ids.update(session.scalars(
+            select(JobSeekerProfile.user_id).where(JobSeekerProfile.id.in_(profile_ids))
+        ))
+    user_ids = sorted(user_id for user_id in user_ids if user_id is not None)
+    for start in range(0, len(user_ids), REFRESH_BATCH_SIZE):
+        _refresh_batch(session, user_ids[start:start + REFRESH_BATCH_SIZE])
+
+def _refresh_batch(session, user_ids):
+    users = {row['id']: row for row in session.execute(
+        select(User.id, User.first_name, User.last_name, User.phone)
+        .where(User.id.in_(user_ids), User.user_type == UserType.JOBSEEKER)
+    ).mappings()}
+    profiles = {row['user_id']: row for row in session.execute(
+        select(*JobSeekerProfile.__table__.c).where(JobSeekerProfile.user_id.in_(list(users)))
+    ).mappings()} if users else {}
+    user_of = {profile['id']: user_id for user_id, profile in profiles.items()}
+
+    counts, recent = {}, {}
+    if user_of:
+        for profile_id, status, count in session.execute(
+            select(JobApplication.jobseeker_id, JobApplication.status, func.count())
+            .where(JobApplication.jobseeker_id.in_(list(user_of)))
+            .group_by(JobApplication.jobseeker_id, JobApplication.status)
+        ):
+            counts.setdefault(profile_id, {})[status] = count
+
+        # The latest applications of every profile in one query
+        newest = func.row_number().over(partition_by=JobApplication.jobseeker_id,
+                                        order_by=(JobApplication.applied_at.desc(), JobApplication.id.desc()))
+        latest = select(JobApplication.id, JobApplication.job_id, JobApplication.jobseeker_id,
+                        JobApplication.status, JobApplication.applied_at, newest.label('position')) \
+            .where(JobApplication.jobseeker_id.in_(list(user_of))).subquery()
+        for row in session.execute(
+            select(latest, Job.title, Job.location, ConsultancyProfile.company_name)
+            .join(Job, Job.id == latest.c.job_id)
+            .outerjoin(ConsultancyProfile, ConsultancyProfile.id == Job.consultancy_id)
+            .where(latest.c.position <= RECENT_LIMIT)
+            .order_by(latest.c.jobseeker_id, latest.c.position)
+        ).mappings():
+            recent.setdefault(row['jobseeker_id'], []).append({
+                'id': row['id'], 'job_id': row['job_id'], 'title': row['title'], 'company': row['company_name'],
+                'location': row['location'], 'status': row['status'],
+                'applied_at': row['applied_at'].isoformat() if row['applied_at'] else None,
+            })
+
+    table = JobSeekerDashboard.__table__
+    gone = [user_id for user_id in user_ids if user_id not in users]
+    if gone:
+        session.execute(delete(table).where(table.c.user_id.in_(gone)))
+
+    now = datetime.utcnow()
+    for user_id, user in users.items():
+        profile = profiles.get(user_id)
+        profile_id = profile['id'] if profile is not None else None
+        values = {
+            'profile_id': profile_id,
+            'first_name': user['first_name'],
+            'last_name': user['last_name'],
+            'profile_completeness': completeness(user, profile),
+            'profile_summary': json.dumps({
+                'job_title': profile['job_title'],
+                'location': profile['current_location'],
+                'experience_years': profile['experience_years'],
+                'skills': _skill_names(profile['skills']),
+            }) if profile is not None else None,
+            'application_counts': json.dumps(counts.get(profile_id, {})),
+            'recent_applications': json.dumps(recent.get(profile_id, [])),
+            'updated_at': now,
+        }
+        # Keeps recently_viewed and jobs_viewed, which only record_job_view writes
+        if session.execute(update(table).where(table.c.user_id == user_id).values(**values)).rowcount:
+            continue
+        try:
+            with session.begin_nested():
+                session.execute(insert(table).values(user_id=user_id, recently_viewed='[]', jobs_viewed=0, **values))
+        except IntegrityError:
+            session.execute(update(table).where(table.c.user_id == user_id).values(**values))
+
+def rebuild(batch_size=REFRESH_BATCH_SIZE, progress=None):
+    """Rewrite the rows of every jobseeker, batch_size users per transaction; returns the users refreshed"""
+    refreshed, last_id = 0, 0
+    while True:
+        user_ids = db.session.scalars(
+            select(User.id).where(User.id > last_id, User.user_type == UserType.JOBSEEKER)
+            .order_by(User.id).limit(batch_size)
+        ).all()
+        if not user_ids:
+            return refreshed
+        _refresh_batch(db.session, user_ids)
+        db.session.commit()
+        refreshed += len(user_ids)
+        last_id = user_ids[-1]
+        if progress:
+            progress(last_id, refreshed)
+
+@event.listens_for(Session, 'after_flush')
+def _track_dashboard_changes(session, flush_context):
+    """Remember the users whose dashboard rows this transaction changed"""
+    users = session.info.setdefault(_USERS, set())
+    profiles = session.info.setdefault(_PROFILES, set())
+    for instance in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(instance, User):
+            if instance.user_type in (None, UserType.JOBSEEKER):
+                users.add(instance.id)
+        elif isinstance(instance, JobSeekerProfile):
+            users.add(instance.user_id)
+        elif isinstance(instance, JobApplication):
+            profiles.add(instance.jobseeker_id)
+
+@event.listens_for(Session, 'before_commit')
+def _refresh_changed_dashboards(session):
+    """Rewrite the dashboard rows of the users this transaction touched, before it commits"""
+    session.flush()  # commit flushes after this hook; the changes are tracked on flush
+    if not any(session.info.get(key) for key in (_USERS, _PROFILES, MOVED_JOBSEEKERS)):
+        return
+    users = session.info.pop(_USERS, set())
+    profiles = session.info.pop(_PROFILES, set()) | session.info.pop(MOVED_JOBSEEKERS, set())
+    refresh(session, user_ids=users, profile_ids=profiles)
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_dashboard_changes(session):
+    session.info.pop(_USERS, None)
+    session.info.pop(_PROFILES, None)
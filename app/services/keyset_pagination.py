@@ -0,0 +1,248 @@
+"""
+Keyset Pagination Service
+
+Seek pagination for newest-first listings ordered by (created_at, id). A page
+is fetched with a range condition on the last key seen, so the database reads
+per_page + 1 rows whatever the depth, where OFFSET would read and discard
+every earlier row. Pages link to each other with opaque cursors. Rows kept
+outside the query, such as archived logs, can be merged into the same listing.
+Results ranked in memory (search scores, distances) page the same way on
+(key, id) with paginate_ranked.
+
+Totals come from CountCache: each count is capped at a maximum and cached
+per filter combination for a short TTL, so browsing does not re-count the
+table on every page view.
+"""
+
+import base64
+import heapq
+import itertools
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+import numpy as np
+from flask import Flask
+from sqlalchemy import and_, or_, select, func
+
+NEXT = 'n'  # older rows, after the key in newest-first order
+PREV = 'p'  # newer rows, before the key
+
+def encode_cursor(created_at, row_id, direction):
+    """Opaque cursor pointing just past a row in the given direction"""
+    raw = json.dumps([created_at.isoformat(), row_id, direction], separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).rstrip(b'=').decode('ascii')
+
+def decode_cursor(cursor):
+    """Decode a cursor into (created_at, id, direction); raises ValueError if malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        created_at, row_id, direction = json.loads(raw)
+        created_at = datetime.fromisoformat(created_at)
+    except (TypeError, ValueError) as e:
+        raise ValueError('Invalid page cursor') from e
+    if not isinstance(row_id, int) or direction not in (NEXT, PREV):
+        raise ValueError('Invalid page cursor')
+    return created_at, row_id, direction
+
+def encode_rank_cursor(key, row_id, direction):
+    """Opaque cursor pointing just past a ranked in-memory result"""
+    raw = json.dumps([key, row_id, direction], separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).rstrip(b'=').decode('ascii')
+
+def decode_rank_cursor(cursor):
+    """Decode a ranked cursor into (key, id, direction); raises ValueError if malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        key, row_id, direction = json.loads(raw)
+    except (TypeError, ValueError) as e:
+        raise ValueError('Invalid page cursor') from e
+    if isinstance(key, bool) or not isinstance(key, (int, float)) or not isinstance(row_id, int) \
+            or direction not in (NEXT, PREV):
+        raise ValueError('Invalid page cursor')
+    return float(key), row_id, direction
+
+class KeysetPage:
+    """One page of a keyset listing, exposing the cursors of its neighbours"""
+
+    def __init__(self, items, per_page, next_cursor=None, prev_cursor=None, total=None, total_capped=False):
+        self.items = items
+        self.per_page = per_page
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        self.total = total
+        self.total_capped = total_capped
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self):
+        return self.prev_cursor is not None
+
+def _after_cursor(key, cursor_key, direction):
+    return key < cursor_key if direction == NEXT else key > cursor_key
+
+def paginate_keyset(query, created_column, id_column, cursor=None, per_page=50, extra_rows=None):
+    """Fetch one newest-first page of a query; raises ValueError for a bad cursor
+
+    extra_rows is an optional callable merging further objects with the same
+    created_at and id attributes (e.g. archived rows) into the listing. It is
+    called as extra_rows(bound, newest_first, limit, threshold) and returns at
+    most limit rows past bound, the cursor's (created_at, id) key or None on
+    the first page; threshold is the key of the worst database row when those
+    already fill the page, so rows beyond it need not be read.
+    """
+    direction = NEXT
+    if cursor:
+        created_at, row_id, direction = decode_cursor(cursor)
+        if direction == NEXT:
+            query = query.filter(or_(
+                created_column < created_at,
+                and_(created_column == created_at, id_column < row_id)
+            ))
+        else:
+            query = query.filter(or_(
+                created_column > created_at,
+                and_(created_column == created_at, id_column > row_id)
+            ))
+
+    if direction == NEXT:
+        query = query.order_by(created_column.desc(), id_column.desc())
+    else:
+        query = query.order_by(created_column.asc(), id_column.asc())
+
+    created_key, id_key = created_column.key, id_column.key
+    rows = query.limit(per_page + 1).all()
+    if extra_rows is not None:
+        sort_key = lambda row: (getattr(row, created_key), getattr(row, id_key))
+        bound = (created_at, row_id) if cursor else None
+        threshold = sort_key(rows[-1]) if len(rows) > per_page else None
+        extra = extra_rows(bound, direction == NEXT, per_page + 1, threshold)
+        if cursor:
+            extra = [row for row in extra if _after_cursor(sort_key(row), bound, direction)]
+        pick = heapq.nlargest if direction == NEXT else heapq.nsmallest
+        rows = pick(per_page + 1, list(rows) + list(extra), key=sort_key)
+
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if direction == PREV:
+        rows.reverse()
+
+    has_next = has_more if direction == NEXT else True
+    has_prev = bool(cursor) if direction == NEXT else has_more
+    if not rows:
+        return KeysetPage([], per_page)
+
+    first, last = rows[0], rows[-1]
+    return KeysetPage(
+        rows, per_page,
+        next_cursor=encode_cursor(getattr(last, created_key), getattr(last, id_key), NEXT) if has_next else None,
+        prev_cursor=encode_cursor(getattr(first, created_key), getattr(first, id_key), PREV) if has_prev else None
+    )
+
+class CountCache:
+    """Capped row counts cached per filter combination"""
+
+    def __init__(self, app: Flask = None, config_prefix='SECURITY_LOG_COUNT'):
+        self.app = app
+        self.config_prefix = config_prefix
+        self.ttl = 60  # seconds
+        self.cap = 10000  # counting stops here; the total is shown as "cap+"
+        self.max_entries = 256
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        if app:
+            self.init_app(app)
+
+    def init_app(self, app: Flask):
+        """Initialize the count cache with Flask app"""
+        self.app = app
+        self.ttl = app.config.get(f'{self.config_prefix}_TTL', self.ttl)
+        self.cap = app.config.get(f'{self.config_prefix}_CAP', self.cap)
+        self.clear()
+
+    def count(self, key, query, id_column):
+        """Return (count, capped) for a filtered query, cached under key"""
+        def compute():
+            # Count at most cap + 1 rows so the cost is bounded on huge tables
+            limited = query.order_by(None).with_entities(id_column).limit(self.cap + 1).subquery()
+            return query.session.execute(select(func.count()).select_from(limited)).scalar()
+        return self._cached(key, compute)
+
+    def count_rows(self, key, rows):
+        """Return (count, capped) for an iterable of rows, cached under key; rows
+        is only consumed on a cache miss, so pass a generator"""
+        return self._cached(key, lambda: sum(1 for _ in itertools.islice(rows, self.cap + 1)))
+
+    def _cached(self, key, compute):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                return entry[1]
+
+        total = compute()
+        result = (min(total, self.cap), total > self.cap)
+
+        with self._lock:
+            self._entries[key] = (now + self.ttl, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return result
+
+    def clear(self):
+        """Drop every cached count"""
+        with self._lock:
+            self._entries.clear()
+
+# Global security log count cache
+security_log_counts = CountCache()
+
+def paginate_ranked(keys, ids, cursor=None, per_page=50):
+    """Page of ids ranked in memory, in descending (key, id) order; raises ValueError for a bad cursor
+
+    keys and ids are NumPy arrays of the same length, e.g. the scores and row
+    ids of every search match. Only the page's neighbourhood is sorted.
+    """
+    total = len(ids)
+    direction = NEXT
+    if cursor:
+        cursor_key, cursor_id, direction = decode_rank_cursor(cursor)
+        if direction == NEXT:
+            after = (keys < cursor_key) | ((keys == cursor_key) & (ids < cursor_id))
+        else:
+            after = (keys > cursor_key) | ((keys == cursor_key) & (ids > cursor_id))
+        keys, ids = keys[after], ids[after]
+
+    wanted = per_page + 1
+    if len(keys) > 8 * wanted:
+        # Narrow to the keys that can make the page before sorting; ties at the edge stay in
+        if direction == NEXT:
+            selected = keys >= np.partition(keys, len(keys) - wanted)[len(keys) - wanted]
+        else:
+            selected = keys <= np.partition(keys, wanted - 1)[wanted - 1]
+        keys, ids = keys[selected], ids[selected]
+    order = np.lexsort((ids, keys))
+    order = order[::-1][:wanted] if direction == NEXT else order[:wanted]
+    has_more = len(order) > per_page
+    order = order[:per_page]
+    if direction == PREV:
+        order = order[::-1]
+
+    has_next = has_more if direction == NEXT else True
+    has_prev = bool(cursor) if direction == NEXT else has_more
+    if not len(order):
+        return KeysetPage([], per_page, total=total)
+    first, last = order[0], order[-1]
+    return KeysetPage(
+        ids[order].tolist(), per_page, total=total,
+        next_cursor=encode_rank_cursor(float(keys[last]), int(ids[last]), NEXT) if has_next else None,
+        prev_cursor=encode_rank_cursor(float(keys[first]), int(ids[first]), PREV) if has_prev else None
+    )
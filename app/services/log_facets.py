@@ -0,0 +1,176 @@
+"""
+Security Log Facets Service
+
+Serves the security log filter dropdowns without touching security_logs.
+The options come from the closed enums on the model (SecurityEventType and
+the severity column), and the per-value counts come from the
+'event_type:<type>' and 'severity:<level>' security event buckets that the
+dashboard rollups already maintain.
+
+Counts are cached incrementally. Closed days, which the rollups no longer
+rewrite, are cached per day until evicted, so widening a date range only
+reads the days not seen yet; a range is clamped to the oldest day bucket,
+so an early date_from costs nothing. The all-time totals, the open days and
+the oldest bucket are re-read from the rollups at most once per
+SECURITY_LOG_FACET_TTL.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, timedelta
+
+from flask import Flask
+from sqlalchemy import func, or_, select
+
+from app import db
+from app.auth.auth_models import DashboardCounter, SecurityEventType, SecurityLog
+from app.services.dashboard_rollups import GAUGE_DATE, SECURITY_EVENTS, dashboard_rollups
+
+FACETS = ('event_type', 'severity')
+
+def _as_date(value):
+    # DATE columns come back as strings on SQLite
+    return date.fromisoformat(value) if isinstance(value, str) else value
+
+def _split(counters):
+    """{'event_type': {...}, 'severity': {...}} from {dimension: count}"""
+    counts = {facet: {} for facet in FACETS}
+    for dimension, value in counters.items():
+        facet, _, option = dimension.partition(':')
+        if facet in counts:
+            counts[facet][option] = counts[facet].get(option, 0) + value
+    return counts
+
+class LogFacets:
+    """Filter options and cached per-value counts for the security log views"""
+
+    def __init__(self, app: Flask = None):
+        self.app = app
+        self.ttl = 60  # seconds the all-time and open-day counts are reused
+        self.max_days = 1000  # closed days kept in the per-day cache
+        self._days = OrderedDict()  # closed day -> {dimension: count}
+        self._live = None  # (expires, DashboardStats)
+        self._oldest = None  # (expires, oldest day bucket or None)
+        self._lock = threading.Lock()
+
+        if app:
+            self.init_app(app)
+
+    def init_app(self, app: Flask):
+        """Initialize the log facets with Flask app"""
+        self.app = app
+        self.ttl = app.config.get('SECURITY_LOG_FACET_TTL', self.ttl)
+        app.extensions['log_facets'] = self
+        self.clear()
+
+    @staticmethod
+    def options():
+        """Filter choices from the column definitions, in declaration order"""
+        return {
+            'event_type': [event.value for event in SecurityEventType],
+            'severity': list(SecurityLog.severity.type.enums)
+        }
+
+    def counts(self, date_from=None, date_to=None):
+        """Per-value event counts for an optional inclusive date range"""
+        stats = self._live_stats()
+        if date_from is None and date_to is None:
+            return _split({
+                dimension: value for (metric, day, dimension), value in stats.counters.items()
+                if metric == SECURITY_EVENTS and day == GAUGE_DATE
+            })
+
+        # Days from the rollups' open window onwards are live, earlier ones are final
+        first_open = stats.today - timedelta(days=dashboard_rollups.open_days - 1)
+        date_to = min(date_to or stats.today, stats.today)
+        totals = {}
+        if date_from is None:
+            # Everything up to date_to is the all-time total minus the later days
+            for (metric, day, dimension), value in stats.counters.items():
+                if metric == SECURITY_EVENTS and day == GAUGE_DATE:
+                    totals[dimension] = totals.get(dimension, 0) + value
+            sign, date_from, date_to = -1, date_to + timedelta(days=1), stats.today
+        else:
+            sign = 1
+
+        for day, counters in self._closed_days(date_from, min(date_to, first_open - timedelta(days=1))):
+            for dimension, value in counters.items():
+                totals[dimension] = totals.get(dimension, 0) + sign * value
+        for (metric, day, dimension), value in stats.counters.items():
+            if metric == SECURITY_EVENTS and day != GAUGE_DATE and max(date_from, first_open) <= day <= date_to:
+                totals[dimension] = totals.get(dimension, 0) + sign * value
+        return _split(totals)
+
+    def clear(self):
+        """Drop every cached count"""
+        with self._lock:
+            self._days.clear()
+            self._live = None
+            self._oldest = None
+
+    def _live_stats(self):
+        now = time.monotonic()
+        with self._lock:
+            if self._live is not None and self._live[0] > now:
+                return self._live[1]
+        stats = dashboard_rollups.read()  # refreshes the rollups first if they are stale
+        with self._lock:
+            self._live = (now + self.ttl, stats)
+        return stats
+
+    def _oldest_day(self):
+        """Earliest security event day bucket, None if there is none"""
+        now = time.monotonic()
+        with self._lock:
+            if self._oldest is not None and self._oldest[0] > now:
+                return self._oldest[1]
+        table = DashboardCounter.__table__
+        oldest = db.session.execute(
+            select(func.min(table.c.bucket_date))
+            .where(table.c.metric == SECURITY_EVENTS, table.c.bucket_date > GAUGE_DATE)
+        ).scalar()
+        oldest = _as_date(oldest) if oldest is not None else None
+        with self._lock:
+            self._oldest = (now + self.ttl, oldest)
+        return oldest
+
+    def _closed_days(self, first, last):
+        """(day, {dimension: count}) for each closed day in [first, last], reading
+        only the days missing from the cache with one query; days before the
+        oldest bucket have no counts and are skipped"""
+        oldest = self._oldest_day()
+        if oldest is None:
+            return []
+        first = max(first, oldest)
+        if first > last:
+            return []
+        days = [first + timedelta(days=i) for i in range((last - first).days + 1)]
+        with self._lock:
+            cached = {day: self._days[day] for day in days if day in self._days}
+        missing = [day for day in days if day not in cached]
+
+        if missing:
+            table = DashboardCounter.__table__
+            fetched = {day: {} for day in missing}
+            for bucket_date, dimension, value in db.session.execute(
+                select(table.c.bucket_date, table.c.dimension, table.c.value).where(
+                    table.c.metric == SECURITY_EVENTS,
+                    table.c.bucket_date >= missing[0],
+                    table.c.bucket_date <= missing[-1],
+                    or_(*(table.c.dimension.like(f'{facet}:%') for facet in FACETS))
+                )
+            ):
+                day = _as_date(bucket_date)
+                if day in fetched:
+                    fetched[day][dimension] = value
+            cached.update(fetched)
+            with self._lock:
+                self._days.update(fetched)
+                while len(self._days) > self.max_days:
+                    self._days.popitem(last=False)
+
+        return [(day, cached[day]) for day in days]
+
+# Global security log facets instance
+log_facets = LogFacets()
@@ -0,0 +1,369 @@
+"""
+Security Log Retention Service
+
+security_logs is kept as a hot table holding the last
+SECURITY_LOG_RETENTION_DAYS days. Older rows move to a cold tier of
+compressed archive files, one per day bucket:
+
+1. Each aged day is exported to gzip NDJSON under SECURITY_LOG_ARCHIVE_DIR
+   and recorded in the security_log_archives manifest with its row count,
+   id range and checksum. Rows that reach an already exported day later are
+   written to a further part of the same day.
+2. Only then are the exported rows deleted from the hot table, in small
+   id-keyed chunks with a commit and a pause between chunks, so the purge
+   never holds long locks or floods replication.
+
+Runs happen on a background thread, every SECURITY_LOG_RETENTION_INTERVAL
+seconds and whenever request_run asks for one (the maintenance action), so
+no request waits for an archive and purge.
+
+Archived rows stay browsable. The manifest records the time span of each
+part, and archived_page reads only the parts that can hold a page's rows,
+nearest first. It stops reading a part at the page's cursor and stops
+altogether once no remaining part can beat the rows it has, so a page costs
+about one part whatever the size of the archive. A part whose file is
+missing, not yet synced to this host, or corrupt is logged and skipped. The
+per-day dashboard
+rollups of archived days are left as they are, so the dashboards keep their
+history.
+"""
+
+import bisect
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+from collections import namedtuple
+from datetime import date, datetime, timedelta
+
+from flask import Flask
+from sqlalchemy import and_, delete, func, or_, select
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.auth.auth_models import SecurityEventType, SecurityLog, SecurityLogArchive
+
+ARCHIVE_COLUMNS = [
+    'id', 'user_id', 'event_type', 'ip_address', 'user_agent',
+    'details_json', 'severity', 'resolved', 'created_at'
+]
+
+ArchivedPart = namedtuple('ArchivedPart', 'bucket_date part path row_count min_created_at max_created_at')
+
+def _day_range(day):
+    start = datetime.combine(day, datetime.min.time())
+    return start, start + timedelta(days=1)
+
+def _to_record(row):
+    record = dict(row._mapping)
+    record['event_type'] = getattr(record['event_type'], 'value', record['event_type'])
+    record['created_at'] = record['created_at'].isoformat() if record['created_at'] else None
+    return record
+
+def _to_log(record):
+    """Transient SecurityLog for an archived record, never added to the session"""
+    try:
+        event_type = SecurityEventType(record['event_type'])
+    except ValueError:
+        event_type = record['event_type']
+    return SecurityLog(
+        id=record['id'],
+        user_id=record['user_id'],
+        event_type=event_type,
+        ip_address=record['ip_address'],
+        user_agent=record['user_agent'],
+        details_json=record['details_json'],
+        severity=record['severity'],
+        resolved=record['resolved'],
+        created_at=datetime.fromisoformat(record['created_at']) if record['created_at'] else None
+    )
+
+class LogRetention:
+    """Archives aged security log days and purges them from the hot table"""
+
+    def __init__(self, app: Flask = None):
+        self.app = app
+        self.retention_days = 90  # days kept in the hot security_logs table
+        self.archive_dir = None
+        self.batch_size = 1000  # rows per archive read and per purge chunk
+        self.pause = 0.05  # seconds slept between purge chunks
+        self.interval = 0  # seconds between background runs, 0 disables the background thread
+        self.manifest_ttl = 60  # seconds the purged part list is reused by the log browser
+        self._manifest = None  # (expires_at, parts)
+        self._run_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._wake_event = threading.Event()  # set by request_run
+        self._requested_days = None  # retention_days of the pending requested run
+        self._thread = None
+
+        if app:
+            self.init_app(app)
+
+    def init_app(self, app: Flask):
+        """Initialize log retention with Flask app"""
+        self.app = app
+        self.retention_days = app.config.get('SECURITY_LOG_RETENTION_DAYS', self.retention_days)
+        self.archive_dir = app.config.get('SECURITY_LOG_ARCHIVE_DIR') or \
+            os.path.join(app.instance_path, 'security_log_archives')
+        self.batch_size = app.config.get('SECURITY_LOG_PURGE_BATCH_SIZE', self.batch_size)
+        self.pause = app.config.get('SECURITY_LOG_PURGE_PAUSE', self.pause)
+        self.interval = app.config.get('SECURITY_LOG_RETENTION_INTERVAL', self.interval)
+        self.manifest_ttl = app.config.get('SECURITY_LOG_MANIFEST_TTL', self.manifest_ttl)
+        self._manifest = None
+        app.extensions['log_retention'] = self
+
+        # Start background retention thread
+        if self.interval > 0:
+            self._start_thread()
+
+    def hot_cutoff(self, retention_days=None):
+        """First day still kept in the hot table"""
+        days = self.retention_days if retention_days is None else retention_days
+        return datetime.utcnow().date() - timedelta(days=days)
+
+    def run(self, retention_days=None):
+        """Archive and purge every day older than the retention window"""
+        cutoff = self.hot_cutoff(retention_days)
+        result = {'days': 0, 'archived': 0, 'purged': 0}
+        with self._run_lock:
+            # Finish purges an earlier run did not complete
+            for part in SecurityLogArchive.query.filter(SecurityLogArchive.purged_at.is_(None)).all():
+                result['purged'] += self.purge_part(part)
+
+            for day in self.aged_days(cutoff):
+                part = self.archive_day(day)
+                result['days'] += 1
+                if part is not None:
+                    result['archived'] += part.row_count
+                    result['purged'] += self.purge_part(part)
+        return result
+
+    def request_run(self, retention_days=None):
+        """Queue a run on the background thread, starting the thread if needed"""
+        self._requested_days = retention_days
+        self._wake_event.set()
+        self._start_thread()
+
+    def aged_days(self, cutoff):
+        """Days before cutoff that still have rows in the hot table"""
+        day = func.date(SecurityLog.created_at)
+        rows = db.session.execute(
+            select(day).where(SecurityLog.created_at < datetime.combine(cutoff, datetime.min.time()))
+            .group_by(day).order_by(day)
+        ).scalars().all()
+        # func.date() returns a string on SQLite and a date on MySQL
+        return [date.fromisoformat(value) if isinstance(value, str) else value for value in rows]
+
+    def archive_day(self, day):
+        """Export the day's not yet archived rows to a new part; None if there were none"""
+        start, end = _day_range(day)
+        previous_max = db.session.execute(
+            select(func.max(SecurityLogArchive.max_id)).where(SecurityLogArchive.bucket_date == day)
+        ).scalar() or 0
+        part_number = (db.session.execute(
+            select(func.max(SecurityLogArchive.part)).where(SecurityLogArchive.bucket_date == day)
+        ).scalar() or 0) + 1
+
+        relative = os.path.join(
+            f'{day:%Y}', f'{day:%m}',
+            f'security_logs_{day.isoformat()}.part{part_number}.{uuid.uuid4().hex[:8]}.ndjson.gz'
+        )
+        path = os.path.join(self.archive_dir, relative)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        table = SecurityLog.__table__
+        columns = [table.c[name] for name in ARCHIVE_COLUMNS]
+        row_count, min_id, max_id, first, last = 0, None, None, None, None
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as raw, gzip.GzipFile(fileobj=raw, mode='wb') as archive:
+                while True:
+                    # Keyset over (created_at, id) so each batch is an index range
+                    query = select(*columns).where(
+                        table.c.created_at >= start, table.c.created_at < end, table.c.id > previous_max
+                    )
+                    if last is not None:
+                        query = query.where(or_(
+                            table.c.created_at > last[0],
+                            and_(table.c.created_at == last[0], table.c.id > last[1])
+                        ))
+                    rows = db.session.execute(
+                        query.order_by(table.c.created_at, table.c.id).limit(self.batch_size)
+                    ).all()
+                    if not rows:
+                        break
+                    archive.write(''.join(
+                        json.dumps(_to_record(row), separators=(',', ':'), default=str) + '\n' for row in rows
+                    ).encode('utf-8'))
+                    row_count += len(rows)
+                    ids = [row.id for row in rows]
+                    min_id = min(ids) if min_id is None else min(min_id, *ids)
+                    max_id = max(ids) if max_id is None else max(max_id, *ids)
+                    first = first or (rows[0].created_at, rows[0].id)
+                    last = (rows[-1].created_at, rows[-1].id)
+            db.session.commit()  # End the read transaction before the manifest write
+
+            if not row_count:
+                os.remove(temp_path)
+                return None
+            with open(temp_path, 'rb') as f:
+                sha256 = hashlib.sha256(f.read()).hexdigest()
+            os.replace(temp_path, path)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+        part = SecurityLogArchive(
+            bucket_date=day, part=part_number, path=relative, row_count=row_count,
+            min_id=min_id, max_id=max_id, min_created_at=first[0], max_created_at=last[0], sha256=sha256
+        )
+        db.session.add(part)
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # Another worker exported this part concurrently; its file is the one on record
+            db.session.rollback()
+            os.remove(path)
+            return None
+        return part
+
+    def purge_part(self, part):
+        """Delete an archived part's rows from the hot table in throttled chunks"""
+        start, end = _day_range(part.bucket_date)
+        table = SecurityLog.__table__
+        purged = 0
+        while True:
+            with db.engine.begin() as connection:
+                ids = connection.execute(
+                    select(table.c.id).where(
+                        table.c.created_at >= start, table.c.created_at < end,
+                        table.c.id >= part.min_id, table.c.id <= part.max_id
+                    ).limit(self.batch_size)
+                ).scalars().all()
+                if ids:
+                    purged += connection.execute(delete(table).where(table.c.id.in_(ids))).rowcount
+            if len(ids) < self.batch_size:
+                break
+            if self.pause:
+                time.sleep(self.pause)
+
+        part.purged_at = datetime.utcnow()
+        db.session.commit()
+        self._manifest = None
+        return purged
+
+    def iter_archived(self, date_from=None, date_to=None, event_type=None, severity=None):
+        """Yield archived logs as transient SecurityLog objects, reading only the
+        purged parts whose day lies in [date_from, date_to]"""
+        for part in self._parts(date_from, date_to):
+            for record in self._read_part(part, event_type, severity):
+                yield _to_log(record)
+
+    def archived_page(self, limit, bound=None, newest_first=True, threshold=None,
+                      date_from=None, date_to=None, event_type=None, severity=None):
+        """The first `limit` archived logs past bound, a (created_at, id) key, in
+        newest-first order (oldest-first if not newest_first)
+
+        threshold is the key of the worst row the caller already holds enough
+        of; parts that cannot beat it are not read.
+        """
+        spans = []
+        for part in self._parts(date_from, date_to):
+            start, end = _day_range(part.bucket_date)
+            low, high = part.min_created_at or start, part.max_created_at or end
+            if bound and (low > bound[0] if newest_first else high < bound[0]):
+                continue
+            spans.append((low, high, part))
+        # Nearest part first: newest-first pages start at the latest span end
+        spans.sort(key=lambda span: span[1] if newest_first else span[0], reverse=newest_first)
+
+        best = []  # (key, log), ascending; holds the `limit` best keys
+        for low, high, part in spans:
+            limits = [threshold] if threshold else []
+            if len(best) >= limit:
+                limits.append(best[0][0] if newest_first else best[-1][0])
+            if limits:
+                worst = max(limits) if newest_first else min(limits)
+                if (high < worst[0]) if newest_first else (low > worst[0]):
+                    break  # this part and every later one lie beyond the page
+
+            taken = 0
+            # Parts are written in ascending (created_at, id) order
+            for record in self._read_part(part, event_type, severity):
+                key = (datetime.fromisoformat(record['created_at']), record['id'])
+                if bound:
+                    if newest_first and key >= bound:
+                        break
+                    if not newest_first and key <= bound:
+                        continue
+                bisect.insort(best, (key, _to_log(record)))
+                if len(best) > limit:
+                    best.pop(0 if newest_first else -1)
+                taken += 1
+                if not newest_first and taken >= limit:
+                    break
+
+        logs = [log for _, log in best]
+        return logs[::-1] if newest_first else logs
+
+    def archived_count(self, date_from=None, date_to=None):
+        """Archived rows with a day in [date_from, date_to], from the manifest"""
+        return sum(part.row_count for part in self._parts(date_from, date_to))
+
+    def _parts(self, date_from, date_to):
+        """Purged parts whose day lies in [date_from, date_to], newest day first"""
+        now = time.monotonic()
+        manifest = self._manifest
+        if manifest is None or manifest[0] <= now:
+            rows = db.session.execute(
+                select(SecurityLogArchive.bucket_date, SecurityLogArchive.part, SecurityLogArchive.path,
+                       SecurityLogArchive.row_count, SecurityLogArchive.min_created_at,
+                       SecurityLogArchive.max_created_at)
+                .where(SecurityLogArchive.purged_at.isnot(None))
+                .order_by(SecurityLogArchive.bucket_date.desc(), SecurityLogArchive.part)
+            ).all()
+            manifest = self._manifest = (now + self.manifest_ttl, [ArchivedPart(*row) for row in rows])
+        return [part for part in manifest[1]
+                if (not date_from or part.bucket_date >= date_from) and (not date_to or part.bucket_date <= date_to)]
+
+    def _read_part(self, part, event_type=None, severity=None):
+        """Records of one part; an unreadable part is logged and yields what it could"""
+        try:
+            with gzip.open(os.path.join(self.archive_dir, part.path), 'rt', encoding='utf-8') as archive:
+                for line in archive:
+                    record = json.loads(line)
+                    if event_type and record['event_type'] != event_type:
+                        continue
+                    if severity and record['severity'] != severity:
+                        continue
+                    yield record
+        except (OSError, EOFError, ValueError) as e:
+            # Missing, not yet synced or corrupt (bad gzip, truncated, bad JSON)
+            print(f"⚠️ Log Retention: skipping unreadable archive part {part.path}: {e}")
+
+    def _start_thread(self):
+        if not self._thread:
+            self._thread = threading.Thread(target=self._background_retention, daemon=True)
+            self._thread.start()
+
+    def _background_retention(self):
+        """Background thread that archives aged days on a timer and on request"""
+        while not self._stop_event.is_set():
+            self._wake_event.wait(self.interval or None)
+            self._wake_event.clear()
+            retention_days, self._requested_days = self._requested_days, None
+            try:
+                with self.app.app_context():
+                    result = self.run(retention_days=retention_days)
+                print(f"🗄️ Log Retention: archived {result['archived']} rows from {result['days']} days, "
+                      f"purged {result['purged']}")
+            except Exception as e:
+                print(f"🚨 Log Retention Error: {e}")
+
+# Global log retention instance
+log_retention = LogRetention()
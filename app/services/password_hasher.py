@@ -0,0 +1,195 @@
+"""
+Password Hasher Service
+
+Runs Werkzeug password hashing in a dedicated process pool instead of on the
+request thread, so a burst of logins cannot starve every other request of CPU
+and the GIL. The request thread only waits on the result; at most
+PASSWORD_HASH_QUEUE_SIZE hashes may be queued or running per worker, and
+callers that cannot get a slot within PASSWORD_HASH_QUEUE_TIMEOUT seconds get
+PasswordHasherBusy instead of piling up.
+
+New hashes use PASSWORD_HASH_ITERATIONS PBKDF2 iterations, one value shared
+by every worker and never below PASSWORD_HASH_MIN_ITERATIONS. It is measured
+once per deployment with scripts/setup/calibrate_password_hash.py, which
+reports the count that makes a hash take about PASSWORD_HASH_TARGET_MS.
+PBKDF2 hashes stored below the PASSWORD_HASH_MIN_ITERATIONS floor are reported
+by needs_rehash and upgraded on the next login; other methods (scrypt) are
+left alone.
+"""
+
+import atexit
+import hashlib
+import math
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from flask import Flask
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, check_password_hash, generate_password_hash
+
+# Pool processes are never forked from the web worker: it runs background threads
+# (activity flusher, log writer, compactors) whose locks a fork could copy while held
+START_METHOD = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+
+class PasswordHasherBusy(RuntimeError):
+    """Raised when the hashing queue stays full for longer than the queue timeout"""
+
+class PasswordHasher:
+    """Process-pool password hashing at a configured PBKDF2 cost"""
+
+    def __init__(self, app: Flask = None):
+        self.app = app
+        self.workers = 0  # inline hashing until initialized
+        self.queue_size = 32
+        self.queue_timeout = 2.0  # seconds a caller may wait for a queue slot
+        self.target_ms = 250
+        self.min_iterations = DEFAULT_PBKDF2_ITERATIONS
+        self.max_iterations = 5000000
+        self.iterations = self.min_iterations
+        self.calibrated_ms = None
+        self._executor = None
+        self._executor_pid = None
+        self._executor_lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.queue_size)
+        self._stats_lock = threading.Lock()
+        self._atexit_registered = False
+        self._metrics = {}
+        self._reset_metrics()
+
+        if app:
+            self.init_app(app)
+
+    def init_app(self, app: Flask):
+        """Initialize the password hasher with Flask app"""
+        self.app = app
+        self.workers = app.config.get('PASSWORD_HASH_WORKERS', 2)
+        self.queue_timeout = app.config.get('PASSWORD_HASH_QUEUE_TIMEOUT', self.queue_timeout)
+        self.target_ms = app.config.get('PASSWORD_HASH_TARGET_MS', self.target_ms)
+        self.min_iterations = app.config.get('PASSWORD_HASH_MIN_ITERATIONS', DEFAULT_PBKDF2_ITERATIONS)
+        self.max_iterations = max(self.min_iterations, app.config.get('PASSWORD_HASH_MAX_ITERATIONS', self.max_iterations))
+        self.queue_size = app.config.get('PASSWORD_HASH_QUEUE_SIZE', self.queue_size)
+        self._slots = threading.BoundedSemaphore(self.queue_size)
+        self._reset_metrics()
+
+        iterations = app.config.get('PASSWORD_HASH_ITERATIONS') or self.min_iterations
+        self.iterations = min(max(iterations, self.min_iterations), self.max_iterations)
+        self.calibrated_ms = None
+        app.extensions['password_hasher'] = self
+
+        if self.workers > 0 and not self._atexit_registered:
+            atexit.register(self.shutdown)
+            self._atexit_registered = True
+
+    @property
+    def method(self):
+        """Werkzeug method string for new hashes"""
+        return f'pbkdf2:sha256:{self.iterations}'
+
+    def calibrate(self, probe_iterations=50000, rounds=3):
+        """Pick the iteration count that makes one hash take about target_ms on this machine"""
+        best = min(self._time_pbkdf2(probe_iterations) for _ in range(rounds))
+        per_iteration_ms = best * 1000 / probe_iterations
+
+        iterations = int(self.target_ms / per_iteration_ms) if per_iteration_ms > 0 else self.min_iterations
+        iterations = math.ceil(iterations / 10000) * 10000
+        self.iterations = min(max(iterations, self.min_iterations), self.max_iterations)
+        self.calibrated_ms = self.iterations * per_iteration_ms
+        return self.iterations
+
+    def hash(self, password):
+        """Hash a password at the current cost"""
+        result = self._run(generate_password_hash, password, self.method)
+        self._count('hashed')
+        return result
+
+    def verify(self, pwhash, password):
+        """Check a password against a stored hash"""
+        if not pwhash:
+            return False
+        result = self._run(check_password_hash, pwhash, password)
+        self._count('verified')
+        return result
+
+    def needs_rehash(self, pwhash):
+        """True if a stored hash is PBKDF2 with fewer iterations than the configured floor"""
+        if not pwhash or '$' not in pwhash:
+            return False
+
+        method = pwhash.split('$', 1)[0].split(':')
+        if method[0] != 'pbkdf2':
+            return False
+        iterations = int(method[2]) if len(method) > 2 else DEFAULT_PBKDF2_ITERATIONS
+        return iterations < self.min_iterations
+
+    def get_metrics(self):
+        """Get hashing counters, queue usage and the calibrated cost"""
+        with self._stats_lock:
+            metrics = dict(self._metrics)
+        metrics.update({
+            'workers': self.workers,
+            'queue_size': self.queue_size,
+            'iterations': self.iterations,
+            'calibrated_ms': self.calibrated_ms
+        })
+        return metrics
+
+    def shutdown(self):
+        """Stop the worker processes"""
+        with self._executor_lock:
+            if self._executor is not None and self._executor_pid == os.getpid():
+                self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+            self._executor_pid = None
+
+    def _run(self, func, *args):
+        if self.workers <= 0:
+            return func(*args)
+
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            self._count('rejected')
+            raise PasswordHasherBusy('Password hashing queue is full')
+
+        try:
+            self._count('in_flight')
+            try:
+                return self._get_executor().submit(func, *args).result()
+            except BrokenProcessPool:
+                # A worker died; hash inline this once and start a fresh pool next time
+                self._count('pool_restarts')
+                self.shutdown()
+                return func(*args)
+        finally:
+            self._count('in_flight', -1)
+            self._slots.release()
+
+    def _get_executor(self):
+        """Create the pool lazily, and again in a process forked after it was created"""
+        pid = os.getpid()
+        if self._executor is None or self._executor_pid != pid:
+            with self._executor_lock:
+                if self._executor is None or self._executor_pid != pid:
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers, mp_context=multiprocessing.get_context(START_METHOD)
+                    )
+                    self._executor_pid = pid
+        return self._executor
+
+    @staticmethod
+    def _time_pbkdf2(iterations):
+        started = time.perf_counter()
+        hashlib.pbkdf2_hmac('sha256', b'calibration-password', b'calibration-salt', iterations)
+        return time.perf_counter() - started
+
+    def _reset_metrics(self):
+        with self._stats_lock:
+            self._metrics = {'hashed': 0, 'verified': 0, 'rejected': 0, 'in_flight': 0, 'pool_restarts': 0}
+
+    def _count(self, key, amount=1):
+        with self._stats_lock:
+            self._metrics[key] += amount
+
+# Global password hasher instance
+password_hasher = PasswordHasher()
@@ -0,0 +1,141 @@
+"""
+Principal Service
+
+Resolves a user's active roles and effective permission set and answers
+has_role/has_permission checks from memory. Only the user's own role
+assignments and direct grants are queried; what each role grants comes from
+the process-wide RBAC snapshot. Within a request the resolved principal is
+cached on the request object, so the dozens of checks made by decorators, menus
+and templates cost one round-trip instead of one each.
+"""
+
+import hashlib
+
+from flask import current_app, has_request_context, request
+from sqlalchemy import event, literal, null, select, union_all
+from sqlalchemy.orm import Session
+
+from app import db
+from app.auth.auth_models import (
+    Permission, PermissionSet, Role, RolePermission, UserPermission, UserRole
+)
+from app.services.rbac_snapshot import get_rbac_snapshot
+
+# Models whose changes alter somebody's effective roles or permissions
+RBAC_MODELS = (UserRole, RolePermission, UserPermission, Role, Permission)
+
+class Principal:
+    """Resolved roles and effective permissions for a single user"""
+
+    __slots__ = ('user_id', 'roles', 'permissions', 'role_ids', 'rbac_version')
+
+    def __init__(self, user_id, roles=(), permissions=(), role_ids=(), rbac_version=0):
+        self.user_id = user_id
+        self.roles = frozenset(roles)
+        self.permissions = frozenset(permissions)
+        self.role_ids = frozenset(role_ids)
+        self.rbac_version = rbac_version
+
+    @property
+    def fingerprint(self):
+        """Stable fingerprint of the effective permission set"""
+        return permission_set_fingerprint(self.permissions)
+
+    def has_role(self, role_name):
+        """Check if the principal holds an active role"""
+        return role_name in self.roles
+
+    def has_permission(self, permission_name):
+        """Check if the principal holds a permission (via role or direct grant)"""
+        return permission_name in self.permissions
+
+    @classmethod
+    def load(cls, user_id):
+        """Load a user's role ids and direct grants, resolving the rest from the RBAC snapshot"""
+        if user_id is None:
+            return cls(None)
+
+        active_roles = select(
+            literal('role').label('kind'),
+            UserRole.role_id.label('role_id'),
+            null().label('name')
+        ).where(
+            UserRole.user_id == user_id,
+            UserRole.is_active == True
+        )
+
+        direct_permissions = select(
+            literal('permission').label('kind'),
+            null().label('role_id'),
+            Permission.name.label('name')
+        ).join(UserPermission, Permission.id == UserPermission.permission_id).where(
+            UserPermission.user_id == user_id,
+            UserPermission.granted == True
+        )
+
+        rows = db.session.execute(union_all(active_roles, direct_permissions)).all()
+
+        role_ids = [role_id for kind, role_id, name in rows if kind == 'role']
+        snapshot = get_rbac_snapshot(role_ids)
+        permissions = snapshot.permissions_for(role_ids)
+        permissions.update(name for kind, role_id, name in rows if kind == 'permission')
+        return cls(user_id, snapshot.roles_for(role_ids), permissions, role_ids, snapshot.version)
+
+def permission_set_fingerprint(permissions):
+    """Short hash identifying a set of permission names"""
+    digest = hashlib.sha256('\n'.join(sorted(permissions)).encode('utf-8')).hexdigest()
+    return digest[:16]
+
+def _known_permission_sets():
+    # Permission sets are immutable once fingerprinted, so this never needs invalidating
+    return current_app.extensions.setdefault('permission_sets', {})
+
+def register_permission_set(permissions):
+    """Make a permission set resolvable by fingerprint and return the fingerprint"""
+    fingerprint = permission_set_fingerprint(permissions)
+    known = _known_permission_sets()
+    if fingerprint not in known:
+        PermissionSet.register(fingerprint, permissions)
+        known[fingerprint] = frozenset(permissions)
+    return fingerprint
+
+def resolve_permission_set(fingerprint):
+    """Resolve a fingerprint to its permission names, or None if unknown"""
+    known = _known_permission_sets()
+    permissions = known.get(fingerprint)
+    if permissions is None:
+        permission_set = db.session.get(PermissionSet, fingerprint)
+        if permission_set is None:
+            return None
+        permissions = known[fingerprint] = frozenset(permission_set.permissions_json)
+    return permissions
+
+def get_principal(user):
+    """Get the principal for a user, cached for the lifetime of the request"""
+    user_id = getattr(user, 'id', None)
+
+    if not has_request_context():
+        return Principal.load(user_id)
+
+    cache = getattr(request, '_principals', None)
+    if cache is None:
+        cache = request._principals = {}
+
+    principal = cache.get(user_id)
+    if principal is None:
+        principal = Principal.load(user_id)
+        cache[user_id] = principal
+    return principal
+
+def invalidate_principals():
+    """Drop every principal cached for the current request"""
+    if has_request_context():
+        request.__dict__.pop('_principals', None)
+
+@event.listens_for(Session, 'after_flush')
+def _invalidate_on_rbac_change(session, flush_context):
+    """Invalidate cached principals when role/permission assignments change"""
+    for instance in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(instance, RBAC_MODELS):
+            invalidate_principals()
+            return
@@ -0,0 +1,95 @@
+"""
+RBAC Snapshot Service
+
+Keeps a process-wide, versioned copy of the role -> permission graph in memory
+as a VersionedSnapshot following the 'rbac' counter in cache_versions. Any
+flush that writes a role, permission or grant bumps the counter, so all
+workers converge within RBAC_SNAPSHOT_MAX_STALENESS seconds; bulk statements
+that bypass the session call bump_rbac_version() themselves. A lookup of a
+role id the snapshot does not know reloads it at once.
+"""
+
+import time
+
+from app import db
+from app.auth.auth_models import Permission, Role, RolePermission
+from app.services.versioned_snapshot import VersionedSnapshot, VersionedSnapshotCache
+
+RBAC_VERSION = 'rbac'
+
+# Models that make up the shared role -> permission graph
+SNAPSHOT_MODELS = (Role, RolePermission, Permission)
+
+class RBACSnapshot:
+    """Immutable view of every role and the permissions it grants"""
+
+    __slots__ = ('version', 'role_names', 'role_permissions')
+
+    def __init__(self, version, role_names=None, role_permissions=None):
+        self.version = version
+        self.role_names = role_names or {}
+        self.role_permissions = role_permissions or {}
+
+    def roles_for(self, role_ids):
+        """Map role ids to role names"""
+        return {self.role_names[role_id] for role_id in role_ids if role_id in self.role_names}
+
+    def permissions_for(self, role_ids):
+        """Union of the permissions granted by the given roles"""
+        permissions = set()
+        for role_id in role_ids:
+            permissions.update(self.role_permissions.get(role_id, ()))
+        return permissions
+
+    @classmethod
+    def load(cls, version):
+        """Load the full role -> permission graph"""
+        role_names = dict(db.session.query(Role.id, Role.name).all())
+
+        grants = {}
+        rows = db.session.query(RolePermission.role_id, Permission.name).join(
+            Permission, Permission.id == RolePermission.permission_id
+        ).all()
+        for role_id, permission_name in rows:
+            grants.setdefault(role_id, set()).add(permission_name)
+
+        role_permissions = {role_id: frozenset(names) for role_id, names in grants.items()}
+        return cls(version, role_names, role_permissions)
+
+class RBACSnapshotCache(VersionedSnapshotCache):
+    """RBAC snapshot cache that also reloads for role ids it does not know"""
+
+    def __init__(self, max_staleness=5.0, clock=time.monotonic):
+        super().__init__(RBAC_VERSION, RBACSnapshot.load, max_staleness, clock)
+        self._missing = set()  # role ids a forced reload did not find, until the next reload
+
+    def get(self, role_ids=()):
+        """Get the current snapshot, probing the version counter if the window expired
+
+        role_ids the snapshot does not know (a role created in a transaction
+        that has not reached this worker's probe yet) reload it once.
+        """
+        snapshot = super().get()
+        unknown = {role_id for role_id in role_ids if role_id not in snapshot.role_names} - self._missing
+        if unknown:
+            snapshot = self.reload()
+            self._missing.update(role_id for role_id in unknown if role_id not in snapshot.role_names)
+        return snapshot
+
+    def _loaded(self):
+        self._missing = set()
+
+rbac_snapshot = VersionedSnapshot(RBAC_VERSION, RBACSnapshotCache, SNAPSHOT_MODELS,
+                                  'RBAC_SNAPSHOT_MAX_STALENESS', extension='rbac_snapshot')
+
+def get_snapshot_cache(app=None):
+    """Get the snapshot cache of an application, creating it on first use"""
+    return rbac_snapshot.cache(app)
+
+def get_rbac_snapshot(role_ids=()):
+    """Get the current RBAC snapshot for the active application, knowing role_ids if they exist"""
+    return get_snapshot_cache().get(role_ids)
+
+def bump_rbac_version():
+    """Bump the RBAC version once in this transaction; needed only for changes the session does not flush"""
+    rbac_snapshot.bump()
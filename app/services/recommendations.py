@@ -0,0 +1,464 @@
+"""
+Recommendation Service
+
+Precomputes the best matches between jobs and jobseeker profiles: for every
+open job its best profiles, and for every profile its best open jobs, top_k
+of each, stored in the recommendations table so pages read a ready list.
+
+Jobs and profiles are encoded into sparse skill vectors (names resolved
+against the Skill taxonomy, other names kept as features of their own) next
+to experience, location and salary columns. Only pairs sharing a skill are
+scored:
+
+    SKILL_WEIGHT * share of the job's skills the profile has
+    + EXPERIENCE_WEIGHT * experience fit + LOCATION_WEIGHT * location match
+    + SALARY_WEIGHT * salary fit
+
+Rows of one side are scored in blocks: a block gathers the other side's
+skill postings into sparse (row, column) pairs, scores them in one
+vectorized pass and keeps the top_k per row. Blocks run in a process pool
+started with forkserver (or spawn), never forked from a threaded web worker.
+
+A pair's score depends on nothing but the two entities, so a run revisits
+only what changed since the last run started (by updated_at, plus jobs that
+closed or expired and profiles that were deleted):
+
+- changed entities get their lists recomputed, and so do entities whose
+  list holds a changed one, since its score may have dropped;
+- every other list is merged with the changed entities' pairs that reach
+  its current top_k-th score.
+
+A change of the skill taxonomy or of top_k makes the next run a full one.
+"""
+
+import itertools
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import numpy as np
+from sqlalchemy import delete, insert, or_, select
+
+from app import db
+from app.auth.auth_models import CacheVersion
+from app.models import Job, JobSeekerProfile, Recommendation, RecommendationRun
+from app.services.candidate_index import parse_skills, skill_names
+from app.services.index_sync import SYNC_OVERLAP
+from app.services.password_hasher import START_METHOD
+from app.services.reference_data import REFERENCE_VERSION, get_reference_data
+from app.services.typeahead import normalize
+
+JOB = 'job'  # kind of the lists of profiles recommended for a job
+PROFILE = 'profile'  # kind of the lists of jobs recommended for a profile
+
+SKILL_WEIGHT = 0.7
+EXPERIENCE_WEIGHT = 0.1
+LOCATION_WEIGHT = 0.1
+SALARY_WEIGHT = 0.1
+
+NO_LOCATION = -1
+ANYWHERE = -2  # location code of remote jobs
+QUERY_BATCH_SIZE = 1000  # ids per IN (...) lookup and subjects per write transaction
+PAIR_BUDGET = 2000000  # candidate pairs gathered per scoring block, which bounds its memory
+SCORE_BINS = 1024  # score histogram resolution used to skip pairs that cannot make a top_k
+
+class FeatureMatrix:
+    """Sparse skill vectors (CSR) and attribute columns of the jobs or profiles of a run"""
+
+    def __init__(self, ids, skill_lists, experience, salary, locations, location_columns):
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.lengths = np.fromiter(map(len, skill_lists), dtype=np.int64, count=len(skill_lists))
+        self.offsets = np.concatenate(([0], np.cumsum(self.lengths)))
+        self.skills = np.fromiter(itertools.chain.from_iterable(skill_lists), dtype=np.int64,
+                                  count=int(self.offsets[-1]))
+        self.experience = np.asarray(experience, dtype=np.float64)
+        self.salary = np.asarray(salary, dtype=np.float64)  # nan if not given
+        self.locations = np.asarray(locations, dtype=np.int32).reshape(len(self.ids), location_columns)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def postings(self, features):
+        """(offsets, rows): the rows having skill feature f are rows[offsets[f]:offsets[f + 1]]"""
+        rows = np.repeat(np.arange(len(self.ids)), self.lengths)
+        counts = np.bincount(self.skills, minlength=features)
+        return np.concatenate(([0], np.cumsum(counts))), rows[np.argsort(self.skills, kind='stable')]
+
+class FeatureEncoder:
+    """Shared skill and location codes for the jobs and profiles of a run"""
+
+    def __init__(self, skill_ids=None):
+        self.skill_ids = skill_ids or {}  # normalized taxonomy name -> skill id
+        self.features = {}  # skill id, or normalized name outside the taxonomy -> feature
+        self._names = {}  # skill name as written -> feature
+        self._locations = {}
+
+    def skill_features(self, value):
+        """Sorted skill features of a skills column"""
+        features = set()
+        for name in parse_skills(value):
+            feature = self._names.get(name)
+            if feature is None:
+                key = normalize(name)
+                key = self.skill_ids.get(key, key)
+                feature = self._names[name] = self.features.setdefault(key, len(self.features))
+            features.add(feature)
+        return sorted(features)
+
+    def location(self, value):
+        key = (value or '').strip().casefold()
+        return self._locations.setdefault(key, len(self._locations)) if key else NO_LOCATION
+
+    def encode_jobs(self, rows):
+        """FeatureMatrix of job rows (id, skills_required, experience_required, location, job_type, salaries)"""
+        ids, skills, experience, salary, locations = [], [], [], [], []
+        for row in rows:
+            ids.append(row['id'])
+            skills.append(self.skill_features(row['skills_required']))
+            experience.append(row['experience_required'] or 0)
+            offered = row['salary_max'] if row['salary_max'] is not None else row['salary_min']
+            salary.append(float(offered) if offered is not None else np.nan)
+            remote = row['job_type'] == 'remote' or 'remote' in (row['location'] or '').casefold()
+            locations.append(ANYWHERE if remote else self.location(row['location']))
+        return FeatureMatrix(ids, skills, experience, salary, locations, 1)
+
+    def encode_profiles(self, rows):
+        """FeatureMatrix of profile rows (id, skills, experience_years, expected_salary, locations)"""
+        ids, skills, experience, salary, locations = [], [], [], [], []
+        for row in rows:
+            ids.append(row['id'])
+            skills.append(self.skill_features(row['skills']))
+            experience.append(row['experience_years'] or 0)
+            salary.append(float(row['expected_salary']) if row['expected_salary'] is not None else np.nan)
+            locations.append((self.location(row['current_location']), self.location(row['preferred_location'])))
+        return FeatureMatrix(ids, skills, experience, salary, locations, 2)
+
+def pair_scores(jobs, profiles, job_rows, profile_rows, shared):
+    """Scores of (job, profile) row pairs sharing `shared` skills"""
+    coverage = shared / jobs.lengths[job_rows]
+    required = jobs.experience[job_rows]
+    experience = np.where(required > 0, np.minimum(profiles.experience[profile_rows] / np.maximum(required, 1), 1), 1)
+    where = jobs.locations[job_rows, 0]
+    located = (where < 0) | (where == profiles.locations[profile_rows, 0]) | \
+        (where == profiles.locations[profile_rows, 1])
+    offered, expected = jobs.salary[job_rows], profiles.salary[profile_rows]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        salary = np.where(np.isnan(offered) | np.isnan(expected) | (expected <= offered), 1,
+                          np.clip(offered / expected, 0, 1))
+    return SKILL_WEIGHT * coverage + EXPERIENCE_WEIGHT * experience + LOCATION_WEIGHT * located + \
+        SALARY_WEIGHT * salary
+
+def _gather(offsets, values, rows):
+    """(owner, value) of every entry of the CSR slices values[offsets[r]:offsets[r + 1]] of rows"""
+    lengths = offsets[rows + 1] - offsets[rows]
+    owners = np.repeat(np.arange(len(rows)), lengths)
+    starts = np.repeat(offsets[rows] - (np.cumsum(lengths) - lengths), lengths)
+    return owners, values[starts + np.arange(len(owners))]
+
+_context = None  # what the scoring functions of this process score against, set by _init_scorer
+
+def _init_scorer(jobs, profiles, top_k, floors):
+    global _context
+    features = int(max(jobs.skills.max(initial=-1), profiles.skills.max(initial=-1))) + 1
+    _context = {
+        JOB: jobs, PROFILE: profiles, 'top_k': top_k, 'floors': floors,
+        'postings': {JOB: jobs.postings(features), PROFILE: profiles.postings(features)},
+    }
+
+def _score_rows(kind, rows, collect):
+    """Top-k lists of some rows of one side, and (if collect) their pairs reaching the other side's floors
+
+    Lists come as (subject ids, target ids, scores, ranks); reaching pairs as
+    (other side ids, ids of these rows, scores).
+    """
+    other_kind = PROFILE if kind == JOB else JOB
+    subjects, others = _context[kind], _context[other_kind]
+    entry_rows, features = _gather(subjects.offsets, subjects.skills, rows)
+    pair_entries, columns = _gather(*_context['postings'][other_kind], features)
+    keys = entry_rows[pair_entries] * len(others) + columns
+    if len(rows) * len(others) <= max(4 * len(keys), PAIR_BUDGET):
+        # Count shared skills on a dense rows x columns grid, linear in the pairs
+        counts = np.bincount(keys, minlength=len(rows) * len(others))
+        keys = np.flatnonzero(counts)
+        shared = counts[keys]
+    else:
+        keys, shared = np.unique(keys, return_counts=True)
+    local_rows, columns = keys // len(others), keys % len(others)
+    pair_rows = rows[local_rows]
+    if kind == JOB:
+        scores = pair_scores(subjects, others, pair_rows, columns, shared)
+    else:
+        scores = pair_scores(others, subjects, columns, pair_rows, shared)
+
+    reaching = None
+    if collect:
+        hit = scores >= _context['floors'][other_kind][columns]
+        reaching = (others.ids[columns[hit]], subjects.ids[pair_rows[hit]], scores[hit])
+
+    # Only sort the pairs in the score bins that can reach each row's top_k
+    top_k = _context['top_k']
+    bins = np.minimum(scores * SCORE_BINS, SCORE_BINS - 1).astype(np.int64)
+    histogram = np.bincount(local_rows * SCORE_BINS + bins, minlength=len(rows) * SCORE_BINS)
+    from_top = np.cumsum(histogram.reshape(len(rows), SCORE_BINS)[:, ::-1], axis=1)
+    lowest = np.where(from_top[:, -1] > top_k, SCORE_BINS - 1 - np.argmax(from_top >= top_k, axis=1), 0)
+    candidate = bins >= lowest[local_rows]
+    pair_rows, columns, scores = pair_rows[candidate], columns[candidate], scores[candidate]
+
+    # Rank the pairs of each row by score, then by target id
+    order = np.lexsort((others.ids[columns], -scores, pair_rows))
+    pair_rows, columns, scores = pair_rows[order], columns[order], scores[order]
+    starts = np.flatnonzero(np.r_[True, pair_rows[1:] != pair_rows[:-1]])
+    ranks = np.arange(len(pair_rows)) - np.repeat(starts, np.diff(np.r_[starts, len(pair_rows)]))
+    keep = ranks < top_k
+    lists = (subjects.ids[pair_rows[keep]], others.ids[columns[keep]], scores[keep], ranks[keep] + 1)
+    return lists, reaching
+
+class Scorer:
+    """Scores rows of jobs or profiles against the other side in blocks, inline or in a process pool
+
+    floors maps each kind to the per-row score a pair needs to enter that
+    row's list; they are only read for blocks scored with collect.
+    """
+
+    def __init__(self, jobs, profiles, top_k, floors=None, workers=0, block_size=256):
+        self.args = (jobs, profiles, top_k, floors)
+        self.workers = workers
+        self.block_size = block_size
+        self._executor = None
+        # Candidate pairs per row: how many rows of the other side share each of its skills
+        features = int(max(jobs.skills.max(initial=-1), profiles.skills.max(initial=-1))) + 1
+        self.costs = {}
+        for kind, subjects, others in ((JOB, jobs, profiles), (PROFILE, profiles, jobs)):
+            frequency = np.bincount(others.skills, minlength=features)
+            owners = np.repeat(np.arange(len(subjects)), subjects.lengths)
+            self.costs[kind] = np.bincount(owners, weights=frequency[subjects.skills], minlength=len(subjects))
+
+    def __enter__(self):
+        if self.workers > 0:
+            # Not forked, see password_hasher.START_METHOD; the encoded arrays are pickled to each process once
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, initializer=_init_scorer, initargs=self.args,
+                mp_context=multiprocessing.get_context(START_METHOD)
+            )
+        else:
+            _init_scorer(*self.args)
+        return self
+
+    def __exit__(self, *exc_info):
+        global _context
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
+        _context = None
+
+    def score(self, kind, rows, collect=False):
+        """Yield (rows, lists, reaching) per block of rows, in order"""
+        rows = np.asarray(rows, dtype=np.int64)
+        blocks = self._blocks(kind, rows)
+        if self._executor is None:
+            for block in blocks:
+                yield (block, *_score_rows(kind, block, collect))
+            return
+        # Keep a few blocks in flight so results do not pile up while they are written
+        pending = deque()
+        for block in itertools.chain(blocks, [None]):
+            if block is not None:
+                pending.append((block, self._executor.submit(_score_rows, kind, block, collect)))
+            while pending and (block is None or len(pending) > 2 * self.workers):
+                done, future = pending.popleft()
+                yield (done, *future.result())
+
+    def _blocks(self, kind, rows):
+        """Consecutive slices of rows of at most block_size rows and (unless a single row) PAIR_BUDGET pairs"""
+        total = np.cumsum(self.costs[kind][rows])
+        start = 0
+        while start < len(rows):
+            budget = (total[start - 1] if start else 0) + PAIR_BUDGET
+            stop = min(max(int(np.searchsorted(total, budget, side='right')), start + 1), start + self.block_size)
+            yield rows[start:stop]
+            start = stop
+
+def merge_lists(stored, candidates, top_k):
+    """Best top_k of two {target id: score} maps, as [(target id, score)]"""
+    merged = dict(stored)
+    merged.update(candidates)
+    return sorted(merged.items(), key=lambda item: (-item[1], item[0]))[:top_k]
+
+def open_jobs(now):
+    """Condition on the jobs that can be recommended at now: active and not expired"""
+    return Job.is_active.is_(True) & or_(Job.expires_at.is_(None), Job.expires_at > now)
+
+def recommended(kind, subject_id, limit=None):
+    """[(target id, score)] of the stored list of a job (kind JOB) or profile (kind PROFILE), best first"""
+    table = Recommendation.__table__
+    query = select(table.c.target_id, table.c.score).where(
+        table.c.kind == kind, table.c.subject_id == subject_id
+    ).order_by(table.c.rank)
+    if limit:
+        query = query.limit(limit)
+    return [tuple(row) for row in db.session.execute(query)]
+
+class RecommendationPipeline:
+    """Writes and incrementally refreshes the recommendations table"""
+
+    def __init__(self, top_k=20, workers=0, block_size=256):
+        self.top_k = top_k
+        self.workers = workers
+        self.block_size = block_size
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(
+            top_k=config.get('RECOMMENDATION_TOP_K', 20),
+            workers=config.get('RECOMMENDATION_WORKERS', os.cpu_count() or 1),
+            block_size=config.get('RECOMMENDATION_BLOCK_SIZE', 256),
+        )
+
+    def run(self, full=False, now=None):
+        """Bring the recommendation lists up to date; returns the RecommendationRun"""
+        now = now or datetime.utcnow()
+        version = CacheVersion.get_version(REFERENCE_VERSION)
+        last = RecommendationRun.query.filter(RecommendationRun.finished_at.isnot(None)) \
+            .order_by(RecommendationRun.id.desc()).first()
+        full = full or last is None or last.reference_version != version or last.top_k != self.top_k
+        run = RecommendationRun(started_at=now, full=full, reference_version=version, top_k=self.top_k,
+                                jobs_scored=0, profiles_scored=0, lists_written=0)
+
+        open_ids = set(db.session.scalars(select(Job.id).where(open_jobs(now))))
+        profile_ids = set(db.session.scalars(select(JobSeekerProfile.id)))
+        gone = {JOB: self._subjects(JOB) - open_ids, PROFILE: self._subjects(PROFILE) - profile_ids}
+        if full:
+            changed = {JOB: open_ids, PROFILE: profile_ids}
+        else:
+            since = last.started_at - SYNC_OVERLAP
+            changed = {
+                JOB: set(db.session.scalars(select(Job.id).where(Job.updated_at >= since))) | gone[JOB],
+                PROFILE: set(db.session.scalars(
+                    select(JobSeekerProfile.id).where(JobSeekerProfile.updated_at >= since)
+                )) | gone[PROFILE],
+            }
+
+        self._clear(JOB, gone[JOB])
+        self._clear(PROFILE, gone[PROFILE])
+        if changed[JOB] or changed[PROFILE]:
+            self._score(run, now, full, changed)
+        run.finished_at = datetime.utcnow()
+        db.session.add(run)
+        db.session.commit()
+        return run
+
+    def _score(self, run, now, full, changed):
+        encoder = FeatureEncoder(skill_names(get_reference_data()))
+        jobs = encoder.encode_jobs(db.session.execute(select(
+            Job.id, Job.skills_required, Job.experience_required, Job.location, Job.job_type,
+            Job.salary_min, Job.salary_max
+        ).where(open_jobs(now)).order_by(Job.id)).mappings())
+        profiles = encoder.encode_profiles(db.session.execute(select(
+            JobSeekerProfile.id, JobSeekerProfile.skills, JobSeekerProfile.experience_years,
+            JobSeekerProfile.expected_salary, JobSeekerProfile.current_location, JobSeekerProfile.preferred_location
+        ).order_by(JobSeekerProfile.id)).mappings())
+        row_of = {JOB: dict(zip(jobs.ids.tolist(), itertools.count())),
+                  PROFILE: dict(zip(profiles.ids.tolist(), itertools.count()))}
+
+        # Lists to recompute: the changed entities', and those holding a changed entity
+        recompute = {}
+        for kind, other_kind in ((JOB, PROFILE), (PROFILE, JOB)):
+            subjects = changed[kind] if full else changed[kind] | self._holding(kind, changed[other_kind])
+            recompute[kind] = {subject for subject in subjects if subject in row_of[kind]}
+
+        floors = None
+        if not full:
+            floors = {kind: self._floors(kind, row_of[kind]) for kind in (JOB, PROFILE)}
+        candidates = {JOB: {}, PROFILE: {}}  # subject id -> {target id: score} reaching its list
+        with Scorer(jobs, profiles, self.top_k, floors, self.workers, self.block_size) as scorer:
+            for kind, other_kind in ((JOB, PROFILE), (PROFILE, JOB)):
+                matrix = jobs if kind == JOB else profiles
+                rows = sorted(row_of[kind][subject] for subject in recompute[kind])
+                collect = not full and bool(changed[kind])
+                for block, lists, reaching in scorer.score(kind, rows, collect):
+                    self._write(kind, matrix.ids[block].tolist(), lists)
+                    if reaching is not None:
+                        # Only the changed entities' pairs can be news to the other side's lists
+                        for target, subject, score in zip(*(column.tolist() for column in reaching)):
+                            if subject in changed[kind] and target not in recompute[other_kind]:
+                                candidates[other_kind].setdefault(target, {})[subject] = score
+                run.lists_written += len(rows)
+        run.jobs_scored, run.profiles_scored = len(recompute[JOB]), len(recompute[PROFILE])
+
+        for kind in (JOB, PROFILE):
+            subjects = list(candidates[kind])
+            for start in range(0, len(subjects), QUERY_BATCH_SIZE):
+                chunk = subjects[start:start + QUERY_BATCH_SIZE]
+                stored = self._stored(kind, chunk)
+                merged = {subject: merge_lists(stored.get(subject, {}), candidates[kind][subject], self.top_k)
+                          for subject in chunk}
+                self._replace(kind, chunk, merged)
+                run.lists_written += len(chunk)
+
+    @staticmethod
+    def _subjects(kind):
+        """Subjects with a stored list"""
+        table = Recommendation.__table__
+        return set(db.session.scalars(select(table.c.subject_id).distinct().where(table.c.kind == kind)))
+
+    @staticmethod
+    def _holding(kind, targets):
+        """Subjects whose stored list holds one of the targets"""
+        table = Recommendation.__table__
+        targets, subjects = list(targets), set()
+        for start in range(0, len(targets), QUERY_BATCH_SIZE):
+            subjects.update(db.session.scalars(select(table.c.subject_id).distinct().where(
+                table.c.kind == kind, table.c.target_id.in_(targets[start:start + QUERY_BATCH_SIZE])
+            )))
+        return subjects
+
+    def _floors(self, kind, row_of):
+        """Score a pair needs to enter each row's list: its top_k-th score, 0 for a shorter list"""
+        table = Recommendation.__table__
+        floors = np.zeros(len(row_of))
+        for subject, score in db.session.execute(select(table.c.subject_id, table.c.score).where(
+            table.c.kind == kind, table.c.rank == self.top_k
+        )):
+            if subject in row_of:
+                floors[row_of[subject]] = score
+        return floors
+
+    @staticmethod
+    def _stored(kind, subjects):
+        """{subject id: {target id: score}} of stored lists"""
+        table = Recommendation.__table__
+        stored = {}
+        for subject, target, score in db.session.execute(select(
+            table.c.subject_id, table.c.target_id, table.c.score
+        ).where(table.c.kind == kind, table.c.subject_id.in_(subjects))):
+            stored.setdefault(subject, {})[target] = score
+        return stored
+
+    def _write(self, kind, subjects, lists):
+        """Replace the lists of the subjects of a scored block"""
+        by_subject = {}
+        for subject, target, score in zip(*(column.tolist() for column in lists[:3])):
+            by_subject.setdefault(subject, []).append((target, score))
+        self._replace(kind, subjects, by_subject)
+
+    def _clear(self, kind, subjects):
+        subjects = list(subjects)
+        for start in range(0, len(subjects), QUERY_BATCH_SIZE):
+            self._replace(kind, subjects[start:start + QUERY_BATCH_SIZE], {})
+
+    @staticmethod
+    def _replace(kind, subjects, lists):
+        """Swap the stored lists of subjects for {subject id: [(target id, score)] best first} in one transaction"""
+        table = Recommendation.__table__
+        computed_at = datetime.utcnow()
+        db.session.execute(delete(table).where(table.c.kind == kind, table.c.subject_id.in_(subjects)))
+        rows = [
+            {'kind': kind, 'subject_id': subject, 'rank': rank, 'target_id': target, 'score': score,
+             'computed_at': computed_at}
+            for subject, ranked in lists.items() for rank, (target, score) in enumerate(ranked, start=1)
+        ]
+        if rows:
+            db.session.execute(insert(table), rows)
+        db.session.commit()
@@ -0,0 +1,173 @@
+"""
+Reference Data Service
+
+Keeps a process-wide, versioned copy of the taxonomy tables (industries,
+skills, experience levels, job roles, company types, job types, countries,
+states and cities) in memory. They are small and change rarely, but nearly
+every superadmin and form page reads them.
+
+Each table is loaded with a single query into read-only records that behave
+like the model rows in templates (state.country.name, skill.industry, ...).
+The snapshot serves lookups by id and name, sorted option lists, and the
+country -> states -> cities indexes without touching the database.
+
+Like the RBAC snapshot this is a VersionedSnapshot: any flush that writes a
+taxonomy row bumps the 'reference_data' counter in cache_versions in the same
+transaction, every worker probes that counter at most once per
+REFERENCE_DATA_MAX_STALENESS seconds, and the worker that made the change
+drops its snapshot on commit. The JSON form of a snapshot carries an ETag so
+browsers can cache it as well.
+"""
+
+import hashlib
+import json
+import time
+
+from sqlalchemy import select
+
+from app import db
+from app.models import City, CompanyType, Country, Experience, IndustryType, JobRole, JobType, Skill, State
+from app.services.versioned_snapshot import VersionedSnapshot, VersionedSnapshotCache
+
+REFERENCE_VERSION = 'reference_data'
+
+# Snapshot table name -> model, in load order (parents before children)
+REFERENCE_MODELS = {
+    'industry_types': IndustryType,
+    'skills': Skill,
+    'experience_levels': Experience,
+    'job_roles': JobRole,
+    'company_types': CompanyType,
+    'job_types': JobType,
+    'countries': Country,
+    'states': State,
+    'cities': City,
+}
+
+# Records linked to their parent: (table, foreign key, attribute, parent table)
+PARENT_LINKS = (
+    ('skills', 'industry_id', 'industry', 'industry_types'),
+    ('job_roles', 'industry_id', 'industry', 'industry_types'),
+    ('states', 'country_id', 'country', 'countries'),
+    ('cities', 'state_id', 'state', 'states'),
+)
+
+# Columns left out of the JSON payload
+SKIPPED_COLUMNS = {'created_at', 'updated_at'}
+
+class ReferenceRecord:
+    """Read-only row of a reference table with attribute access like the model"""
+
+    __slots__ = ('_fields', '_links')
+
+    def __init__(self, fields):
+        self._fields = fields
+        self._links = {}
+
+    def __getattr__(self, name):
+        try:
+            return self._fields[name]
+        except KeyError:
+            pass
+        try:
+            return self._links[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def to_dict(self):
+        return {key: value for key, value in self._fields.items() if key not in SKIPPED_COLUMNS}
+
+    def __repr__(self):
+        return f"<ReferenceRecord {self._fields.get('id')} {self._fields.get('name')!r}>"
+
+def _sort_key(record):
+    return (record.sort_order or 0, (record._fields.get('display_name') or record.name or '').lower())
+
+class ReferenceData:
+    """Immutable view of every taxonomy table"""
+
+    def __init__(self, version, tables):
+        self.version = version
+        self.tables = tables  # table -> {id: ReferenceRecord}
+        self._sorted = {name: sorted(rows.values(), key=_sort_key) for name, rows in tables.items()}
+        self._by_name = {name: {record.name: record for record in rows.values()} for name, rows in tables.items()}
+
+        self._children = {'countries': {}, 'states': {}}
+        for state in self._sorted['states']:
+            self._children['countries'].setdefault(state.country_id, []).append(state)
+        for city in self._sorted['cities']:
+            self._children['states'].setdefault(city.state_id, []).append(city)
+
+        payload = {name: [record.to_dict() for record in rows] for name, rows in self._sorted.items()}
+        self.json = json.dumps({'version': version, 'tables': payload}, separators=(',', ':'))
+        self.etag = hashlib.sha1(self.json.encode('utf-8')).hexdigest()
+
+    def get(self, table, record_id):
+        """Record by id, or None"""
+        return self.tables[table].get(record_id)
+
+    def by_name(self, table, name):
+        """Record by its unique name, or None (states and cities are only unique per parent)"""
+        return self._by_name[table].get(name)
+
+    def all(self, table, active_only=True):
+        """Records in display order (sort_order, then display name)"""
+        rows = self._sorted[table]
+        return [record for record in rows if record.is_active] if active_only else list(rows)
+
+    def states_for(self, country_id, active_only=True):
+        """States of a country in display order"""
+        return [state for state in self._children['countries'].get(country_id, ())
+                if state.is_active or not active_only]
+
+    def cities_for(self, state_id, active_only=True):
+        """Cities of a state in display order"""
+        return [city for city in self._children['states'].get(state_id, ())
+                if city.is_active or not active_only]
+
+    def states_by_country(self, active_only=True):
+        """States ordered by country name then state name, as used by the location forms"""
+        states = [state for state in self.tables['states'].values()
+                  if (state.is_active or not active_only) and state.country is not None]
+        return sorted(states, key=lambda state: (state.country.name, state.name))
+
+    def categories(self, table):
+        """Distinct non-empty categories of skills or job roles"""
+        return sorted({record.category for record in self.tables[table].values() if record.category})
+
+    @classmethod
+    def load(cls, version):
+        """Load every reference table, one query per table"""
+        tables = {}
+        for name, model in REFERENCE_MODELS.items():
+            tables[name] = {
+                row.id: ReferenceRecord(dict(row._mapping))
+                for row in db.session.execute(select(model.__table__))
+            }
+
+        for table, foreign_key, attribute, parent in PARENT_LINKS:
+            parents = tables[parent]
+            for record in tables[table].values():
+                record._links[attribute] = parents.get(record._fields[foreign_key])
+        return cls(version, tables)
+
+class ReferenceDataCache(VersionedSnapshotCache):
+    """Reference data snapshot cache"""
+
+    def __init__(self, max_staleness=5.0, clock=time.monotonic):
+        super().__init__(REFERENCE_VERSION, ReferenceData.load, max_staleness, clock)
+
+reference_snapshot = VersionedSnapshot(REFERENCE_VERSION, ReferenceDataCache, REFERENCE_MODELS.values(),
+                                       'REFERENCE_DATA_MAX_STALENESS')
+
+def get_reference_cache(app=None):
+    """Get the reference data cache of an application, creating it on first use"""
+    return reference_snapshot.cache(app)
+
+def get_reference_data():
+    """Get the current reference data snapshot for the active application"""
+    return get_reference_cache().get()
+
+def bump_reference_version():
+    """Bump the reference data version once in this transaction; flushed taxonomy writes already do"""
+    reference_snapshot.bump()
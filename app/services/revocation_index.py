@@ -0,0 +1,190 @@
+"""
+JWT Revocation Index Service
+
+Keeps every unexpired revoked JTI in memory so verify_token no longer queries
+jwt_blacklist on each bearer request. A bloom filter sits in front of an exact
+dict of jti -> expires_at: for the common, non-revoked token the filter
+answers "no" without touching the dict or the database.
+
+The index is loaded on first use and then follows the table with a
+high-water-mark poll on blacklisted_at, at most once per
+JWT_REVOCATION_POLL_INTERVAL seconds. Entries past expires_at are pruned
+automatically, and a periodic compaction job deletes expired jwt_blacklist
+rows in batches.
+"""
+
+import hashlib
+import math
+import threading
+import time
+from datetime import datetime, timedelta
+
+from flask import Flask
+
+from app import db
+from app.auth.auth_models import JWTBlacklist
+
+class BloomFilter:
+    """Fixed-size bloom filter using double hashing over SHA-256"""
+
+    def __init__(self, capacity=100000, error_rate=0.001):
+        self.capacity = max(capacity, 1)
+        self.size = max(8, int(-self.capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / self.capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key):
+        digest = hashlib.sha256(key.encode('utf-8')).digest()
+        first = int.from_bytes(digest[:8], 'big')
+        second = int.from_bytes(digest[8:16], 'big') | 1
+        return ((first + i * second) % self.size for i in range(self.hashes))
+
+    def add(self, key):
+        for position in self._positions(key):
+            self._bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key):
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+class RevocationIndex:
+    """In-memory view of jwt_blacklist, refreshed incrementally"""
+
+    def __init__(self, app: Flask = None):
+        self.app = app
+        self.poll_interval = 5  # seconds between high-water-mark polls
+        self.poll_overlap = timedelta(seconds=30)  # re-read window for rows committed out of order
+        self.compact_interval = 3600  # seconds between compaction runs, 0 disables the job
+        self.compact_batch_size = 1000
+        self.bloom_capacity = 100000
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._reset()
+
+        if app:
+            self.init_app(app)
+
+    def init_app(self, app: Flask):
+        """Initialize the revocation index with Flask app"""
+        self.app = app
+        self.poll_interval = app.config.get('JWT_REVOCATION_POLL_INTERVAL', self.poll_interval)
+        self.compact_interval = app.config.get('JWT_BLACKLIST_COMPACT_INTERVAL', self.compact_interval)
+        self.compact_batch_size = app.config.get('JWT_BLACKLIST_COMPACT_BATCH_SIZE', self.compact_batch_size)
+        self._reset()
+        app.extensions['revocation_index'] = self
+
+        # Start background compaction thread
+        if self.compact_interval > 0 and not self._thread:
+            self._thread = threading.Thread(target=self._background_compactor, daemon=True)
+            self._thread.start()
+
+    def is_revoked(self, jti):
+        """Check whether a JTI has been revoked and is not yet expired"""
+        self.refresh()
+
+        if jti not in self._bloom:
+            return False
+
+        expires_at = self._revoked.get(jti)
+        if expires_at is None:
+            return False
+        if expires_at <= datetime.utcnow():
+            # The compactor thread prunes the same dict under the lock
+            with self._lock:
+                self._revoked.pop(jti, None)
+            return False
+        return True
+
+    def add(self, jti, expires_at):
+        """Record a revocation made by this worker without waiting for the next poll"""
+        with self._lock:
+            self._remember(jti, expires_at)
+
+    def refresh(self, force=False):
+        """Load or poll jwt_blacklist if the poll interval has elapsed"""
+        now = time.monotonic()
+        if not force and now < self._next_poll:
+            return
+
+        with self._lock:
+            if not force and now < self._next_poll:
+                return
+
+            query = db.session.query(
+                JWTBlacklist.token_jti, JWTBlacklist.expires_at, JWTBlacklist.blacklisted_at
+            ).filter(JWTBlacklist.expires_at > datetime.utcnow())
+            if self._high_water is not None:
+                query = query.filter(JWTBlacklist.blacklisted_at >= self._high_water - self.poll_overlap)
+
+            for jti, expires_at, blacklisted_at in query.all():
+                self._remember(jti, expires_at)
+                if blacklisted_at and (self._high_water is None or blacklisted_at > self._high_water):
+                    self._high_water = blacklisted_at
+
+            if self._high_water is None:
+                self._high_water = datetime.utcnow()
+            self._next_poll = now + self.poll_interval
+            self._prune()
+
+    def compact(self):
+        """Delete expired jwt_blacklist rows in batches, returning the number removed"""
+        removed = 0
+        while True:
+            expired_ids = [row_id for row_id, in db.session.query(JWTBlacklist.id).filter(
+                JWTBlacklist.expires_at <= datetime.utcnow()
+            ).limit(self.compact_batch_size).all()]
+            if not expired_ids:
+                return removed
+
+            JWTBlacklist.query.filter(JWTBlacklist.id.in_(expired_ids)).delete(synchronize_session=False)
+            db.session.commit()
+            removed += len(expired_ids)
+
+            if len(expired_ids) < self.compact_batch_size:
+                return removed
+
+    def __len__(self):
+        return len(self._revoked)
+
+    def _reset(self):
+        with self._lock:
+            self._revoked = {}
+            self._bloom = BloomFilter(self.bloom_capacity)
+            self._dead_keys = 0
+            self._high_water = None
+            self._next_poll = 0.0
+
+    def _remember(self, jti, expires_at):
+        if isinstance(expires_at, (int, float)):
+            expires_at = datetime.utcfromtimestamp(expires_at)
+        self._revoked[jti] = expires_at
+        self._bloom.add(jti)
+
+    def _prune(self):
+        """Drop expired entries; rebuild the filter once dead keys outweigh live ones"""
+        now = datetime.utcnow()
+        expired = [jti for jti, expires_at in self._revoked.items() if expires_at <= now]
+        for jti in expired:
+            del self._revoked[jti]
+        self._dead_keys += len(expired)
+
+        # A bloom filter cannot forget keys, so it is rebuilt from the live set
+        if self._dead_keys >= max(len(self._revoked), 1024) or len(self._revoked) > self._bloom.capacity:
+            self._bloom = BloomFilter(max(self.bloom_capacity, len(self._revoked) * 2))
+            for jti in self._revoked:
+                self._bloom.add(jti)
+            self._dead_keys = 0
+
+    def _background_compactor(self):
+        """Background thread that compacts jwt_blacklist on a timer"""
+        while not self._stop_event.wait(self.compact_interval):
+            try:
+                with self.app.app_context():
+                    removed = self.compact()
+                    if removed:
+                        self.app.logger.info(f"Compacted {removed} expired jwt_blacklist rows")
+            except Exception as e:
+                print(f"🚨 Revocation Index Error: {e}")
+
+# Global revocation index instance
+revocation_index = RevocationIndex()
@@ -0,0 +1,233 @@
+"""
+Security Log Writer Service
+
+Moves SecurityLog inserts off the request thread. Events are placed on a
+bounded in-process queue and a background flusher bulk-inserts them with a
+single executemany per batch. Each severity has its own backpressure policy:
+
+- low/medium events are sampled once the queue passes a high-water mark and
+  dropped when it is full
+- high events are never sampled; a full queue blocks the caller briefly and
+  then falls back to a synchronous write
+- critical events always bypass the queue and are committed synchronously
+"""
+
+import atexit
+import queue
+import threading
+import time
+from datetime import datetime
+
+from flask import Flask
+from sqlalchemy import insert
+
+from app import db
+from app.auth.auth_models import SecurityLog
+
+# Per-severity policy: sample 1 in `sample_every` events once the queue is more
+# than `sample_above` full, and what to do when the queue is full
+DEFAULT_POLICIES = {
+    'low': {'sample_above': 0.5, 'sample_every': 10, 'on_full': 'drop'},
+    'medium': {'sample_above': 0.8, 'sample_every': 2, 'on_full': 'drop'},
+    'high': {'sample_above': None, 'sample_every': 1, 'on_full': 'block'},
+    'critical': {'sample_above': None, 'sample_every': 1, 'on_full': 'sync'}
+}
+
+SYNC_SEVERITIES = ('critical',)
+
+class SecurityLogWriter:
+    """Bounded, batched writer for security audit events"""
+
+    def __init__(self, app: Flask = None):
+        self.app = app
+        self.enabled = False  # synchronous writes until initialized with SECURITY_LOG_ASYNC
+        self.queue_size = 10000
+        self.batch_size = 500
+        self.flush_interval = 1.0  # seconds, 0 disables the background flusher
+        self.block_timeout = 0.05  # seconds a high severity event may wait for space
+        self.policies = dict(DEFAULT_POLICIES)
+        self._queue = queue.Queue(maxsize=self.queue_size)
+        self._flush_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._sample_counters = {}
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._atexit_registered = False
+        self._metrics = {
+            'enqueued': 0,
+            'written': 0,
+            'sync_writes': 0,
+            'sampled_out': 0,
+            'dropped': {},
+            'flushes': 0,
+            'failed_flushes': 0,
+            'last_flush_ms': 0.0,
+            'max_flush_ms': 0.0
+        }
+
+        if app:
+            self.init_app(app)
+
+    def init_app(self, app: Flask):
+        """Initialize the security log writer with Flask app"""
+        self.app = app
+        self.enabled = app.config.get('SECURITY_LOG_ASYNC', True)
+        self.batch_size = app.config.get('SECURITY_LOG_BATCH_SIZE', self.batch_size)
+        self.flush_interval = app.config.get('SECURITY_LOG_FLUSH_INTERVAL', self.flush_interval)
+        self.block_timeout = app.config.get('SECURITY_LOG_BLOCK_TIMEOUT', self.block_timeout)
+        self.policies.update(app.config.get('SECURITY_LOG_POLICIES', {}))
+
+        queue_size = app.config.get('SECURITY_LOG_QUEUE_SIZE', self.queue_size)
+        if queue_size != self.queue_size:
+            self.queue_size = queue_size
+            self._queue = queue.Queue(maxsize=queue_size)
+        app.extensions['security_log_writer'] = self
+
+        if not self.enabled:
+            return
+
+        if not self._atexit_registered:
+            atexit.register(self.shutdown)
+            self._atexit_registered = True
+
+        # Start background flush thread
+        if self.flush_interval > 0 and not self._thread:
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._background_flusher, daemon=True)
+            self._thread.start()
+
+    def log(self, event_type, user_id=None, ip_address=None, user_agent=None, details=None, severity='medium'):
+        """Record a security event, returning True if it was written or queued"""
+        row = {
+            'user_id': user_id,
+            'event_type': event_type,
+            'ip_address': ip_address,
+            'user_agent': user_agent,
+            'details_json': details,
+            'severity': severity,
+            'resolved': False,
+            'created_at': datetime.utcnow()
+        }
+
+        if not self.enabled or severity in SYNC_SEVERITIES:
+            self._write_sync(row)
+            return True
+
+        policy = self.policies.get(severity, self.policies['medium'])
+        if self._sampled_out(severity, policy):
+            self._count('sampled_out')
+            return False
+
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            if policy['on_full'] == 'drop':
+                self._count_drop(severity)
+                return False
+            if policy['on_full'] == 'block':
+                try:
+                    self._queue.put(row, timeout=self.block_timeout)
+                except queue.Full:
+                    self._write_sync(row)
+                    return True
+            else:
+                self._write_sync(row)
+                return True
+
+        self._count('enqueued')
+        if self._queue.qsize() >= self.batch_size and self.flush_interval <= 0:
+            self.flush()
+        return True
+
+    def flush(self):
+        """Bulk-insert everything currently queued, returning the rows written"""
+        written = 0
+        with self._flush_lock:
+            while True:
+                batch = self._drain(self.batch_size)
+                if not batch:
+                    return written
+
+                started = time.perf_counter()
+                try:
+                    with db.engine.begin() as connection:
+                        connection.execute(insert(SecurityLog.__table__), batch)
+                except Exception as e:
+                    self._count('failed_flushes')
+                    self._count_drop('flush_error', len(batch))
+                    print(f"🚨 Security Log Writer Error: {e}")
+                    return written
+
+                elapsed_ms = (time.perf_counter() - started) * 1000
+                with self._stats_lock:
+                    self._metrics['flushes'] += 1
+                    self._metrics['written'] += len(batch)
+                    self._metrics['last_flush_ms'] = elapsed_ms
+                    self._metrics['max_flush_ms'] = max(self._metrics['max_flush_ms'], elapsed_ms)
+                written += len(batch)
+
+    def get_metrics(self):
+        """Get queue depth, drop counts and flush latency"""
+        with self._stats_lock:
+            metrics = dict(self._metrics)
+            metrics['dropped'] = dict(self._metrics['dropped'])
+        metrics['queue_depth'] = self._queue.qsize()
+        return metrics
+
+    def shutdown(self):
+        """Stop the background flusher and write out anything still queued"""
+        self._stop_event.set()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=self.flush_interval or None)
+        self._thread = None
+
+        if self.app is not None:
+            with self.app.app_context():
+                self.flush()
+
+    def _background_flusher(self):
+        """Background thread that flushes queued events on a timer"""
+        while not self._stop_event.wait(self.flush_interval):
+            try:
+                with self.app.app_context():
+                    self.flush()
+            except Exception as e:
+                print(f"🚨 Security Log Writer Error: {e}")
+
+    def _drain(self, limit):
+        batch = []
+        while len(batch) < limit:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _sampled_out(self, severity, policy):
+        """Keep 1 in `sample_every` events once the queue passes the high-water mark"""
+        threshold = policy.get('sample_above')
+        if threshold is None or self._queue.qsize() < threshold * self.queue_size:
+            return False
+
+        with self._stats_lock:
+            counter = self._sample_counters.get(severity, 0)
+            self._sample_counters[severity] = counter + 1
+        return counter % policy['sample_every'] != 0
+
+    def _write_sync(self, row):
+        """Write a single event on the caller's thread and session"""
+        db.session.add(SecurityLog(**row))
+        db.session.commit()
+        self._count('sync_writes')
+
+    def _count(self, key, amount=1):
+        with self._stats_lock:
+            self._metrics[key] += amount
+
+    def _count_drop(self, reason, amount=1):
+        with self._stats_lock:
+            dropped = self._metrics['dropped']
+            dropped[reason] = dropped.get(reason, 0) + amount
+
+# Global security log writer instance
+security_log_writer = SecurityLogWriter()
@@ -0,0 +1,195 @@
+"""
+Skill Links Service
+
+JobSeekerProfile.skills, Job.skills_required and
+ConsultancyProfile.specializations are free text (JSON lists of names). The
+names in them that resolve against the Skill taxonomy (see
+candidate_index.skill_names) are also stored as rows of association tables
+keyed on Skill.id -- jobseeker_skills, job_skills and consultancy_skills --
+so reads join on an index instead of parsing the text of every row:
+
+- a before_flush hook re-resolves the links of a row whenever its text
+  changes, in the same transaction,
+- backfill() links existing rows, walking the table in id order one batch
+  per transaction and rewriting only the rows whose links differ,
+- a change to the Skill taxonomy (the superadmin skill pages) queues a
+  backfill of every table on a background thread (see SkillRelinker), since
+  it can change what the stored names resolve to, and
+- linked_to() selects the rows having any or all of some skills from the
+  (skill_id, owner) index; the models' linked_skills relationships load the
+  Skill rows of many owners in one query with selectinload.
+
+The text columns stay the source of truth for display and for names outside
+the taxonomy. Links are resolved with the taxonomy of the moment; changes
+made outside those pages need a backfill run
+(scripts/database/backfill_skill_links.py).
+"""
+
+import threading
+from collections import Counter, namedtuple
+
+from flask import current_app, has_app_context
+from sqlalchemy import delete, event, func, insert, select
+from sqlalchemy.orm import Session, attributes
+
+from app import db
+from app.models import ConsultancyProfile, ConsultancySkill, Job, JobSeekerProfile, JobSeekerSkill, JobSkill
+from app.services.candidate_index import parse_skills, resolve_skills, skill_names
+from app.services.reference_data import get_reference_data
+
+BACKFILL_BATCH_SIZE = 1000
+
+SkillLink = namedtuple('SkillLink', 'column link owner_key')
+
+# Owner model -> its skills text column, association model and owner key column
+LINKS = {
+    JobSeekerProfile: SkillLink('skills', JobSeekerSkill, 'profile_id'),
+    Job: SkillLink('skills_required', JobSkill, 'job_id'),
+    ConsultancyProfile: SkillLink('specializations', ConsultancySkill, 'consultancy_id'),
+}
+
+_taxonomy = (None, {})  # (reference data snapshot, its skill names)
+
+def taxonomy():
+    """{normalized skill name or display name: skill id} of the current reference data snapshot"""
+    global _taxonomy
+    snapshot = get_reference_data()
+    if _taxonomy[0] is not snapshot:
+        _taxonomy = (snapshot, skill_names(snapshot))
+    return _taxonomy[1]
+
+def resolve(names):
+    """(skill ids, names outside the taxonomy) of skill names"""
+    return resolve_skills(taxonomy(), names)
+
+def linked_to(model, skill_ids, match_all=False):
+    """Select of the ids of model rows linked to any of skill_ids (or all of them, with match_all)"""
+    spec = LINKS[model]
+    table = spec.link.__table__
+    owner = table.c[spec.owner_key]
+    query = select(owner).where(table.c.skill_id.in_(skill_ids))
+    if match_all:
+        return query.group_by(owner).having(func.count() == len(set(skill_ids)))
+    return query.distinct()
+
+def backfill(model, batch_size=BACKFILL_BATCH_SIZE, start_after=0, progress=None):
+    """Relink every row of model from its skills text, batch_size rows per transaction
+
+    Rows are read in id order from start_after on, so a stopped backfill can
+    resume from the last id it reported to progress(last_id, stats). Returns
+    {'rows', 'links', 'relinked', 'unmatched'}: relinked counts the rows whose
+    links were rewritten, unmatched the names outside the taxonomy.
+    """
+    spec = LINKS[model]
+    table, links = model.__table__, spec.link.__table__
+    owner = links.c[spec.owner_key]
+    skill_ids = taxonomy()
+    stats = {'rows': 0, 'links': 0, 'relinked': 0, 'unmatched': Counter()}
+    last_id = start_after
+    while True:
+        # Lock the batch so an edit cannot commit between reading its text and replacing its links
+        rows = db.session.execute(
+            select(table.c.id, table.c[spec.column]).where(table.c.id > last_id)
+            .order_by(table.c.id).limit(batch_size).with_for_update()
+        ).all()
+        if not rows:
+            return stats
+        linked = {}
+        for row_id, skill_id in db.session.execute(
+            select(owner, links.c.skill_id).where(owner.in_([row_id for row_id, _ in rows]))
+        ):
+            linked.setdefault(row_id, set()).add(skill_id)
+        changed, values = [], []
+        for row_id, text in rows:
+            ids, unknown = resolve_skills(skill_ids, parse_skills(text))
+            stats['links'] += len(ids)
+            stats['unmatched'].update(name.casefold() for name in unknown)
+            if set(ids) != linked.get(row_id, set()):
+                changed.append(row_id)
+                values.extend({spec.owner_key: row_id, 'skill_id': skill_id} for skill_id in ids)
+        if changed:
+            db.session.execute(delete(links).where(owner.in_(changed)))
+        if values:
+            db.session.execute(insert(links), values)
+        db.session.commit()
+        stats['rows'] += len(rows)
+        stats['relinked'] += len(changed)
+        last_id = rows[-1][0]
+        if progress:
+            progress(last_id, stats)
+
+class SkillRelinker:
+    """Reruns the backfill of every linked table after the skill taxonomy changed
+
+    Requests made while a run is under way are folded into one more run, so a
+    burst of edits costs at most two passes. Without background (tests,
+    scripts) the run happens on the calling thread.
+    """
+
+    def __init__(self, app, background=True, batch_size=BACKFILL_BATCH_SIZE):
+        self.app = app
+        self.background = background
+        self.batch_size = batch_size
+        self._wake_event = threading.Event()  # set by request
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def request(self):
+        """Queue a relink of every table; call it after committing the taxonomy change"""
+        if not self.background:
+            self.run()
+            return
+        self._wake_event.set()
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._background_relink, daemon=True)
+                self._thread.start()
+
+    def run(self):
+        """Relink every table now; returns {table name: backfill stats}"""
+        return {model.__tablename__: backfill(model, batch_size=self.batch_size) for model in LINKS}
+
+    def _background_relink(self):
+        while True:
+            self._wake_event.wait()
+            self._wake_event.clear()
+            try:
+                with self.app.app_context():
+                    try:
+                        results = self.run()
+                    finally:
+                        db.session.remove()
+                relinked = sum(stats['relinked'] for stats in results.values())
+                print(f"🔗 Skill Links: relinked {relinked} rows after a taxonomy change")
+            except Exception as e:
+                print(f"🚨 Skill Links relink error: {e}")
+
+def get_skill_relinker(app=None):
+    """Get the skill relinker of an application, creating it on first use"""
+    app = app or current_app._get_current_object()
+    relinker = app.extensions.get('skill_relinker')
+    if relinker is None:
+        relinker = app.extensions['skill_relinker'] = SkillRelinker(
+            app, background=app.config.get('SKILL_RELINK_BACKGROUND', True)
+        )
+    return relinker
+
+@event.listens_for(Session, 'before_flush')
+def _relink_changed_skills(session, flush_context, instances):
+    """Keep the skill links of new and edited rows in step with their skills text"""
+    changed = [
+        instance for instance in (*session.new, *session.dirty)
+        if type(instance) in LINKS and (instance in session.new or attributes.get_history(
+            instance, LINKS[type(instance)].column).has_changes())
+    ]
+    if not changed or not has_app_context():
+        return
+    skill_ids = taxonomy()
+    for instance in changed:
+        spec = LINKS[type(instance)]
+        wanted = resolve_skills(skill_ids, parse_skills(getattr(instance, spec.column)))[0]
+        links = instance.skill_links
+        for link in [link for link in links if link.skill_id not in wanted]:
+            links.remove(link)
+        linked = {link.skill_id for link in links}
+        links.extend(spec.link(skill_id=skill_id) for skill_id in wanted if skill_id not in linked)
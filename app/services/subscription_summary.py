@@ -0,0 +1,110 @@
+"""
+Subscription Summary Service
+
+Sidebar totals shared by the subscription admin pages: plan counts by status
+and type, subscriber counts, active monthly revenue, features and active job
+portals. They are computed with two aggregate queries and cached per worker
+for SUBSCRIPTION_SUMMARY_TTL seconds. Any flush that touches a plan,
+subscription, feature or portal drops the cache in this worker; other workers
+catch up within the TTL.
+"""
+
+import threading
+import time
+
+from flask import Flask
+from sqlalchemy import case, event, func, select
+from sqlalchemy.orm import Session
+
+from app import db
+from app.auth.auth_models import (
+    JobPortal, SubscriptionFeature, SubscriptionPlan, SubscriptionStatus, UserSubscription
+)
+
+SUMMARY_MODELS = (SubscriptionPlan, UserSubscription, SubscriptionFeature, JobPortal)
+
+class SubscriptionSummary:
+    """Per-worker cache of the subscription sidebar aggregates"""
+
+    def __init__(self, app: Flask = None):
+        self.app = app
+        self.ttl = 60  # seconds
+        self._summary = None
+        self._expires_at = 0.0
+        self._lock = threading.Lock()
+
+        if app:
+            self.init_app(app)
+
+    def init_app(self, app: Flask):
+        """Initialize the subscription summary with Flask app"""
+        self.app = app
+        self.ttl = app.config.get('SUBSCRIPTION_SUMMARY_TTL', self.ttl)
+        self.invalidate()
+        app.extensions['subscription_summary'] = self
+
+    def get(self):
+        """Return the cached summary, recomputing it once the TTL has passed"""
+        with self._lock:
+            if self._summary is not None and time.monotonic() < self._expires_at:
+                return dict(self._summary)
+
+        summary = self.compute()
+        with self._lock:
+            self._summary = summary
+            self._expires_at = time.monotonic() + self.ttl
+        return dict(summary)
+
+    def invalidate(self):
+        """Drop the cached summary"""
+        with self._lock:
+            self._summary = None
+            self._expires_at = 0.0
+
+    @staticmethod
+    def compute():
+        """Compute the sidebar aggregates from the base tables"""
+        active = SubscriptionStatus.ACTIVE.value
+        plans = db.session.execute(select(
+            func.count(SubscriptionPlan.id),
+            func.coalesce(func.sum(case((SubscriptionPlan.is_active == True, 1), else_=0)), 0),
+            func.coalesce(func.sum(case((SubscriptionPlan.plan_type == 'jobseeker', 1), else_=0)), 0),
+            func.coalesce(func.sum(case((SubscriptionPlan.plan_type == 'consultancy', 1), else_=0)), 0),
+            select(func.count(SubscriptionFeature.id)).scalar_subquery(),
+            select(func.count(JobPortal.id)).where(JobPortal.is_active == True).scalar_subquery()
+        )).one()
+
+        subscribers = db.session.execute(
+            select(
+                func.count(UserSubscription.id),
+                func.coalesce(func.sum(case((UserSubscription.status == active, 1), else_=0)), 0),
+                func.coalesce(func.sum(case(
+                    (UserSubscription.status == active, SubscriptionPlan.price_monthly), else_=0
+                )), 0)
+            ).select_from(UserSubscription).outerjoin(
+                SubscriptionPlan, SubscriptionPlan.id == UserSubscription.plan_id
+            )
+        ).one()
+
+        return {
+            'total_plans': plans[0],
+            'active_plans': int(plans[1]),
+            'jobseeker_count': int(plans[2]),
+            'consultancy_count': int(plans[3]),
+            'total_features': plans[4],
+            'portal_count': plans[5],
+            'total_subscribers': subscribers[0],
+            'active_subscribers': int(subscribers[1]),
+            'monthly_revenue': float(subscribers[2])
+        }
+
+# Global subscription summary instance
+subscription_summary = SubscriptionSummary()
+
+@event.listens_for(Session, 'after_flush')
+def _invalidate_subscription_summary(session, flush_context):
+    """Drop the summary when a flush changes anything it counts"""
+    for instance in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(instance, SUMMARY_MODELS):
+            subscription_summary.invalidate()
+            return
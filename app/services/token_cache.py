@@ -0,0 +1,248 @@
+"""
+Verified Token Cache Service
+
+Caches the outcome of JWTAuthService.verify_token for API clients that send the
+same access token on every request. Entries are keyed by the SHA-256 digest of
+the raw token and hold the verified claims plus a snapshot of the user's
+non-sensitive columns, so a hit skips both jwt.decode and the user lookup.
+The snapshot is merged back into the session without a query.
+
+An entry never outlives the token's exp or JWT_DECODE_CACHE_TTL. Blacklisting
+a JTI drops its entry here, and other workers see it through the revocation
+index. Changing, deactivating or deleting a user bumps the 'auth_users'
+counter in cache_versions in the same transaction. The committing worker
+drops that user's entries on commit. Every worker probes the counter at most
+once per JWT_DECODE_CACHE_MAX_STALENESS seconds and drops its entries when
+the counter has moved. Entries are tagged with the version seen before the
+user row was read, so a request racing a change cannot re-cache the old row.
+Login bookkeeping (last_login, login_attempts) does not bump the counter.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from flask import Flask
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, make_transient_to_detached
+from sqlalchemy.orm.attributes import get_history, set_committed_value
+
+from app import db
+from app.auth.auth_models import AuthUser, CacheVersion
+
+# Columns never copied into the snapshot; they load on access if ever needed
+SENSITIVE_COLUMNS = frozenset({
+    'password_hash', 'email_verification_token', 'password_reset_token', 'two_factor_secret'
+})
+
+USERS_VERSION = 'auth_users'
+
+# Columns every login writes; changes to only these keep other workers' entries
+BOOKKEEPING_COLUMNS = frozenset({'last_login', 'login_attempts', 'updated_at'})
+
+_CHANGED_USERS = 'token_cache_changed_users'  # session.info key
+
+class VerifiedTokenCache:
+    """Bounded LRU/TTL cache from token digest to claims and user snapshot"""
+
+    def __init__(self, app: Flask = None):
+        self.app = app
+        self.enabled = True
+        self.max_entries = 10000
+        self.ttl = 300  # seconds
+        self.max_staleness = 1.0  # seconds between probes of the users version
+        self._version = None
+        self._next_probe = 0.0
+        self._entries = OrderedDict()
+        self._by_jti = {}
+        self._by_user = {}
+        self._lock = threading.Lock()
+        self._metrics = {}
+        self.clear()
+
+        if app:
+            self.init_app(app)
+
+    def init_app(self, app: Flask):
+        """Initialize the token cache with Flask app"""
+        self.app = app
+        self.enabled = app.config.get('JWT_DECODE_CACHE_ENABLED', True)
+        self.max_entries = app.config.get('JWT_DECODE_CACHE_SIZE', self.max_entries)
+        self.ttl = app.config.get('JWT_DECODE_CACHE_TTL', self.ttl)
+        self.max_staleness = app.config.get('JWT_DECODE_CACHE_MAX_STALENESS', self.max_staleness)
+        self.clear()
+        app.extensions['verified_token_cache'] = self
+
+    @staticmethod
+    def digest(token):
+        return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+    def version(self):
+        """Users version entries must carry, probing cache_versions at most once per max_staleness"""
+        if not self.enabled:
+            return None
+
+        now = time.monotonic()
+        if now < self._next_probe:
+            return self._version
+
+        version = CacheVersion.get_version(USERS_VERSION)
+        with self._lock:
+            if self._version is None or version > self._version:
+                # Every entry was cached under an older version and can no longer hit
+                self._metrics['invalidations'] += len(self._entries)
+                self._clear_entries()
+                self._version = version
+            self._next_probe = now + self.max_staleness
+            return self._version
+
+    def get(self, token):
+        """Return (payload, user) for a cached token, or None on a miss"""
+        if not self.enabled:
+            return None
+
+        version = self.version()
+        key = self.digest(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.time() or entry[3] != version:
+                if entry is not None:
+                    self._remove(key)
+                self._metrics['misses'] += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self._metrics['hits'] += 1
+            payload, user_state = entry[1], entry[2]
+
+        return payload, self._attach(user_state)
+
+    def put(self, token, payload, user, version):
+        """Cache a verified token for at most ttl seconds and never past its exp
+
+        version is the result of version() taken before the user was loaded.
+        """
+        if not self.enabled or version is None:
+            return
+
+        expires_at = min(payload.get('exp', 0), time.time() + self.ttl)
+        if expires_at <= time.time():
+            return
+
+        key = self.digest(token)
+        user_state = {
+            attr.key: getattr(user, attr.key)
+            for attr in AuthUser.__mapper__.column_attrs
+            if attr.key not in SENSITIVE_COLUMNS
+        }
+
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (expires_at, payload, user_state, version)
+            if payload.get('jti'):
+                self._by_jti[payload['jti']] = key
+            self._by_user.setdefault(user.id, set()).add(key)
+
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self._metrics['evictions'] += 1
+
+    def invalidate_jti(self, jti):
+        """Drop the entry for a revoked token"""
+        with self._lock:
+            key = self._by_jti.get(jti)
+            if key is not None:
+                self._remove(key)
+                self._metrics['invalidations'] += 1
+
+    def invalidate_user(self, user_id):
+        """Drop every entry for a changed or deactivated user"""
+        with self._lock:
+            for key in list(self._by_user.get(user_id, ())):
+                self._remove(key)
+                self._metrics['invalidations'] += 1
+
+    def mark_stale(self):
+        """Probe the users version on the next lookup"""
+        self._next_probe = 0.0
+
+    def clear(self):
+        """Drop every entry and reset the counters"""
+        with self._lock:
+            self._clear_entries()
+            self._version = None
+            self._next_probe = 0.0
+            self._metrics = {'hits': 0, 'misses': 0, 'evictions': 0, 'invalidations': 0}
+
+    def get_metrics(self):
+        """Get hit/miss counters and current size"""
+        with self._lock:
+            metrics = dict(self._metrics)
+            metrics['size'] = len(self._entries)
+        lookups = metrics['hits'] + metrics['misses']
+        metrics['hit_rate'] = metrics['hits'] / lookups if lookups else 0.0
+        return metrics
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _clear_entries(self):
+        self._entries.clear()
+        self._by_jti.clear()
+        self._by_user.clear()
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+
+        payload, user_state = entry[1], entry[2]
+        if self._by_jti.get(payload.get('jti')) == key:
+            del self._by_jti[payload['jti']]
+        keys = self._by_user.get(user_state['id'])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_user[user_state['id']]
+
+    @staticmethod
+    def _attach(user_state):
+        """Rebuild the user from its snapshot and merge it into the session without SQL"""
+        user = AuthUser.__mapper__.class_manager.new_instance()
+        for key, value in user_state.items():
+            set_committed_value(user, key, value)
+        make_transient_to_detached(user)
+        return db.session.merge(user, load=False)
+
+# Global verified token cache instance
+verified_token_cache = VerifiedTokenCache()
+
+def _changed(user):
+    return any(get_history(user, attr.key).has_changes()
+               for attr in AuthUser.__mapper__.column_attrs if attr.key not in BOOKKEEPING_COLUMNS)
+
+@event.listens_for(Session, 'after_flush')
+def _track_changed_users(session, flush_context):
+    """Bump the users version, in this transaction, for users that were changed or deleted"""
+    changed = {instance.id for instance in session.dirty
+               if isinstance(instance, AuthUser) and instance.id is not None and _changed(instance)}
+    changed.update(instance.id for instance in session.deleted
+                   if isinstance(instance, AuthUser) and instance.id is not None)
+    if changed:
+        session.info.setdefault(_CHANGED_USERS, set()).update(changed)
+        CacheVersion.bump_on(session.connection(), USERS_VERSION)
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_changed_users(session):
+    """Drop the committed users' entries here; other workers follow the version"""
+    changed = session.info.pop(_CHANGED_USERS, None)
+    if changed:
+        for user_id in changed:
+            verified_token_cache.invalidate_user(user_id)
+        verified_token_cache.mark_stale()
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_changed_users(session):
+    session.info.pop(_CHANGED_USERS, None)
@@ -0,0 +1,236 @@
+"""
+Typeahead Service
+
+In-memory autocomplete over Skill.display_name and City.name, built from the
+reference data snapshot. Each name is normalized (accents stripped,
+case-folded) and indexed under every word it contains, so "sao" finds
+"São Paulo" and "york" finds "New York". The index is a sorted array of
+(key, inner_word, id) tuples searched with bisect, and results are ranked by:
+
+- matches on the first word before matches on a later word
+- skills: sort_order, then name
+- cities: metro areas, then population, then name
+
+Answers for prefixes of up to three characters, and for any longer prefix
+matching more than HEAVY_SLICE keys, are precomputed, so a search either
+reads a stored answer or ranks a slice of at most HEAVY_SLICE keys.
+
+When the reference data version moves, only the records whose indexed
+fields changed are re-keyed. The array is copied, patched and swapped, so
+searches never see a half-updated index.
+"""
+
+import bisect
+import heapq
+import re
+import threading
+import unicodedata
+
+from flask import current_app
+
+from app.services.reference_data import get_reference_data
+
+SHORT_PREFIX = 3  # prefixes up to this length have precomputed answers
+HEAVY_SLICE = 200  # longer prefixes matching more keys than this are precomputed too
+MAX_LIMIT = 20  # largest result count a search may ask for
+REBUILD_THRESHOLD = 500  # changed records above which the array is re-sorted instead of patched
+
+# Characters that separate or wrap words; '+', '#' and '.' stay so C++, C# and .NET survive
+WORD_SEPARATORS = re.compile(r'[\s/,;:()\[\]{}<>"\'!?|]+')
+
+def normalize(text):
+    """Accent- and case-insensitive form of a name or query, words joined by single spaces"""
+    decomposed = unicodedata.normalize('NFKD', text or '')
+    stripped = ''.join(char for char in decomposed if not unicodedata.combining(char))
+    return ' '.join(word for word in WORD_SEPARATORS.split(stripped.casefold()) if word)
+
+def _skill_signature(skill):
+    return skill._fields
+
+def _skill_entry(skill):
+    text = skill.display_name
+    rank = (skill.sort_order or 0, normalize(text))
+    result = {'id': skill.id, 'name': skill.name, 'label': text, 'category': skill.category}
+    return text, rank, result
+
+def _city_signature(city):
+    # Read the record internals directly: this runs for every city on each update
+    state = city._links['state']
+    if state is None:
+        return city._fields, None, None
+    country = state._links['country']
+    return city._fields, state._fields['name'], country._fields['name'] if country else None
+
+def _city_entry(city):
+    state = city.state
+    country = state.country if state else None
+    rank = (not city.is_metro, -(city.population or 0), normalize(city.name))
+    result = {
+        'id': city.id,
+        'label': ', '.join([city.name] + [part.name for part in (state, country) if part is not None]),
+        'name': city.name,
+        'state': state.name if state else None,
+        'country': country.name if country else None,
+    }
+    return city.name, rank, result
+
+class PrefixIndex:
+    """Sorted-array prefix index over the active records of one table"""
+
+    def __init__(self, table, signature, entry):
+        self.table = table
+        self._signature = signature  # record -> tuple of every field the entry is built from
+        self._entry = entry  # record -> (indexed text, rank, JSON-ready result)
+        # (sorted (key, inner_word, id) tuples, {id: (signature, text, rank, result)},
+        #  {precomputed prefix: ranked ids}), replaced as a whole so a search always sees one version
+        self._state = ([], {}, {})
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._state[1])
+
+    def update(self, records):
+        """Bring the index in line with `records`, re-keying only what changed"""
+        with self._lock:
+            keys, old_records, short = self._state
+            records_by_id, removed, added = {}, [], []
+            for record in records:
+                if not record._fields['is_active']:
+                    continue
+                signature = self._signature(record)
+                old = old_records.get(record.id)
+                if old is not None and old[0] == signature:
+                    records_by_id[record.id] = old
+                    continue
+                text, rank, result = self._entry(record)
+                records_by_id[record.id] = (signature, text, rank, result)
+                if old is not None and old[1] == text and old[2] == rank:
+                    continue  # only the result label changed
+                if old is not None:
+                    removed.append((record.id, old[1]))
+                added.append((record.id, text))
+            removed.extend((record_id, old[1]) for record_id, old in old_records.items()
+                           if record_id not in records_by_id)
+            if not removed and not added:
+                self._state = (keys, records_by_id, short)
+                return
+
+            if len(removed) + len(added) > REBUILD_THRESHOLD:
+                # Initial load or bulk import: sorting once beats many insertions
+                removed_ids = {record_id for record_id, _ in removed}
+                keys = [key for key in keys if key[2] not in removed_ids]
+                keys.extend(key for record_id, text in added for key in self._keys_for(record_id, text))
+                keys.sort()
+                prefixes = set()
+                self._collect_prefixes(keys, 0, len(keys), 0, prefixes)
+                short = {}
+            else:
+                keys, changed, short = list(keys), set(), dict(short)
+                for record_id, text in removed:
+                    for key in self._keys_for(record_id, text):
+                        index = bisect.bisect_left(keys, key)
+                        if index < len(keys) and keys[index] == key:
+                            del keys[index]
+                        changed.add(key[0])
+                for record_id, text in added:
+                    for key in self._keys_for(record_id, text):
+                        bisect.insort(keys, key)
+                        changed.add(key[0])
+                prefixes = {key[:length] for key in changed for length in range(1, len(key) + 1)}
+
+            for prefix in prefixes:
+                lo, hi = self._slice(keys, prefix)
+                if hi > lo and (len(prefix) <= SHORT_PREFIX or hi - lo > HEAVY_SLICE):
+                    short[prefix] = self._rank(keys, records_by_id, prefix, MAX_LIMIT)
+                else:
+                    short.pop(prefix, None)
+            self._state = (keys, records_by_id, short)
+
+    def search(self, query, limit=10):
+        """Ranked results whose name has a word starting with `query`"""
+        prefix = normalize(query)
+        if not prefix:
+            return []
+        limit = max(1, min(limit, MAX_LIMIT))
+        keys, records, short = self._state
+        ids = short.get(prefix)
+        if ids is None:
+            ids = [] if len(prefix) <= SHORT_PREFIX else self._rank(keys, records, prefix, limit)
+        return [records[record_id][3] for record_id in ids[:limit]]
+
+    @staticmethod
+    def _keys_for(record_id, text):
+        words = normalize(text).split(' ')
+        # The whole name under its first word, and each later word on its own
+        return [(' '.join(words[position:]), position > 0, record_id) for position in range(len(words))]
+
+    @staticmethod
+    def _slice(keys, prefix, lo=0, hi=None):
+        """Bounds of the keys starting with prefix"""
+        hi = len(keys) if hi is None else hi
+        start = bisect.bisect_left(keys, (prefix,), lo, hi)
+        return start, bisect.bisect_left(keys, (prefix + '\uffff',), start, hi)
+
+    @classmethod
+    def _collect_prefixes(cls, keys, lo, hi, depth, prefixes):
+        """Add the short and heavy prefixes extending keys[lo:hi], which share depth characters"""
+        index = lo
+        while index < hi:
+            key = keys[index][0]
+            if len(key) <= depth:
+                index += 1
+                continue
+            prefix = key[:depth + 1]
+            start, end = cls._slice(keys, prefix, index, hi)
+            if depth + 1 <= SHORT_PREFIX or end - start > HEAVY_SLICE:
+                prefixes.add(prefix)
+                cls._collect_prefixes(keys, start, end, depth + 1, prefixes)
+            index = end
+
+    @classmethod
+    def _rank(cls, keys, records, prefix, limit):
+        start, end = cls._slice(keys, prefix)
+        best = {}
+        for index in range(start, end):
+            key, inner_word, record_id = keys[index]
+            score = (inner_word, records[record_id][2])
+            if record_id not in best or score < best[record_id]:
+                best[record_id] = score
+        return [record_id for record_id, _ in heapq.nsmallest(limit, best.items(), key=lambda item: item[1])]
+
+class Typeahead:
+    """Skill and city indexes kept in step with the reference data snapshot"""
+
+    def __init__(self):
+        self.indexes = {
+            'skills': PrefixIndex('skills', _skill_signature, _skill_entry),
+            'cities': PrefixIndex('cities', _city_signature, _city_entry),
+        }
+        self._snapshot = None
+        self._lock = threading.Lock()
+
+    def search(self, kind, query, limit=10):
+        """Autocomplete `query` against 'skills' or 'cities'; raises KeyError for other kinds"""
+        index = self.indexes[kind]
+        self.refresh()
+        return index.search(query, limit)
+
+    def refresh(self):
+        """Re-index the records that changed since the last snapshot"""
+        snapshot = get_reference_data()
+        if snapshot is self._snapshot:
+            return
+        with self._lock:
+            if snapshot is self._snapshot:
+                return
+            for kind, index in self.indexes.items():
+                index.update(snapshot.all(kind, active_only=False))
+            self._snapshot = snapshot
+
+def get_typeahead(app=None):
+    """Get the typeahead indexes of an application, creating them on first use"""
+    app = app or current_app._get_current_object()
+    typeahead = app.extensions.get('typeahead')
+    if typeahead is None:
+        typeahead = app.extensions['typeahead'] = Typeahead()
+    return typeahead
@@ -0,0 +1,140 @@
+"""
+Versioned Snapshot Service
+
+Process-wide, read-only copies of small tables that nearly every request
+reads and that change rarely (the RBAC graph, the reference data). Each kind
+of snapshot is described by a VersionedSnapshot: the counter it follows in
+cache_versions, the cache class that loads it and the models it is built
+from.
+
+Every worker holds its own snapshot and probes the counter at most once per
+staleness window; the snapshot is only reloaded when the counter has moved.
+Any flush that writes one of the models bumps the counter once in the same
+transaction, so all workers converge within the window; bulk statements that
+bypass the session call bump() themselves. The worker that made the change
+drops its snapshot on commit and sees the new data immediately.
+"""
+
+import threading
+import time
+
+from flask import current_app, has_app_context
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app import db
+from app.auth.auth_models import CacheVersion
+
+# Every VersionedSnapshot, for the session listeners below
+_snapshots = []
+
+class VersionedSnapshotCache:
+    """Holds the current snapshot and decides when to probe for a newer one"""
+
+    def __init__(self, version_name, loader, max_staleness=5.0, clock=time.monotonic):
+        self.version_name = version_name
+        self.loader = loader  # version -> snapshot
+        self.max_staleness = max_staleness
+        self.clock = clock
+        self._snapshot = None
+        self._next_probe = 0.0
+        self._lock = threading.Lock()
+
+    def get(self):
+        """Get the current snapshot, probing the version counter if the window expired"""
+        snapshot = self._snapshot
+        if snapshot is not None and self.clock() < self._next_probe:
+            return snapshot
+        return self._probe()
+
+    def reload(self):
+        """Load a fresh snapshot whatever the counter says"""
+        return self._probe(force=True)
+
+    def mark_stale(self):
+        """Drop the snapshot so the next get() reloads it"""
+        with self._lock:
+            self._snapshot = None
+            self._next_probe = 0.0
+
+    def _probe(self, force=False):
+        with self._lock:
+            now = self.clock()
+            if not force and self._snapshot is not None and now < self._next_probe:
+                return self._snapshot
+
+            version = CacheVersion.get_version(self.version_name)
+            if force or self._snapshot is None or self._snapshot.version != version:
+                self._snapshot = self.loader(version)
+                self._loaded()
+
+            self._next_probe = now + self.max_staleness
+            return self._snapshot
+
+    def _loaded(self):
+        """Called under the lock after a new snapshot was loaded"""
+
+class VersionedSnapshot:
+    """One kind of snapshot: its counter, its models and its per-application cache"""
+
+    def __init__(self, version_name, cache_class, models, staleness_setting, extension=None):
+        self.version_name = version_name
+        self.cache_class = cache_class  # built with max_staleness=
+        self.models = tuple(models)
+        self.staleness_setting = staleness_setting
+        self.extension = extension or version_name
+        self._changed = f'{version_name}_changed'
+        self._bumped = f'{version_name}_bumped'
+        _snapshots.append(self)
+
+    def cache(self, app=None):
+        """Get the cache of an application, creating it on first use"""
+        app = app or current_app._get_current_object()
+        cache = app.extensions.get(self.extension)
+        if cache is None:
+            cache = app.extensions[self.extension] = self.cache_class(
+                max_staleness=app.config.get(self.staleness_setting, 5.0)
+            )
+        return cache
+
+    def bump(self):
+        """Bump the version once in this transaction; needed only for changes the session does not flush"""
+        if not db.session.info.get(self._bumped):
+            CacheVersion.bump(self.version_name)
+            db.session.info[self._bumped] = True
+        db.session.info[self._changed] = True
+
+    def _track(self, session):
+        for instance in (*session.new, *session.dirty, *session.deleted):
+            if isinstance(instance, self.models):
+                session.info[self._changed] = True
+                if not session.info.get(self._bumped):
+                    CacheVersion.bump_on(session.connection(), self.version_name)
+                    session.info[self._bumped] = True
+                return
+
+    def _committed(self, session):
+        session.info.pop(self._bumped, None)
+        if session.info.pop(self._changed, False) and has_app_context():
+            self.cache().mark_stale()
+
+    def _rolled_back(self, session):
+        session.info.pop(self._changed, None)
+        session.info.pop(self._bumped, None)
+
+@event.listens_for(Session, 'after_flush')
+def _track_snapshot_changes(session, flush_context):
+    """Bump, in this transaction, the version of every snapshot the flush touched"""
+    for snapshot in _snapshots:
+        snapshot._track(session)
+
+@event.listens_for(Session, 'after_commit')
+def _expire_snapshots_on_commit(session):
+    """Make the committing worker pick up its own changes immediately"""
+    for snapshot in _snapshots:
+        snapshot._committed(session)
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_snapshot_changes(session):
+    for snapshot in _snapshots:
+        snapshot._rolled_back(session)
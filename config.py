@@ -30,11 +30,75 @@ class Config:
     JWT_ALGORITHM = 'HS256'
     JWT_ISSUER = 'JobMilgaya-Platform'
     JWT_AUDIENCE = 'JobMilgaya-Users'
+    JWT_COMPACT_CLAIMS = True  # Role ids + permission fingerprint instead of full name lists
+    JWT_REVOCATION_POLL_INTERVAL = 5  # Seconds before other workers see a revoked token
+    JWT_BLACKLIST_COMPACT_INTERVAL = 3600  # Seconds between deletes of expired jwt_blacklist rows
+    JWT_BLACKLIST_COMPACT_BATCH_SIZE = 1000
+    JWT_DECODE_CACHE_ENABLED = True
+    JWT_DECODE_CACHE_SIZE = 10000  # Verified tokens kept per worker
+    JWT_DECODE_CACHE_TTL = 300  # Seconds, never past the token's own exp
+    JWT_DECODE_CACHE_MAX_STALENESS = 1  # Seconds before a worker sees another worker's user changes
     
     # Security Configuration
     SECURITY_PASSWORD_SALT = os.environ.get('SECURITY_PASSWORD_SALT') or 'security-salt-2024'
     SECURITY_CSRF_PROTECT_ALL = True
     SECURITY_CSRF_TIME_LIMIT = 3600  # 1 hour
+    CSRF_TOKEN_MODE = os.environ.get('CSRF_TOKEN_MODE', 'signed')  # 'signed' (stateless HMAC) or 'database'
+    CSRF_SINGLE_USE = False  # Reject replayed signed tokens via an in-process replay cache
+    RBAC_SNAPSHOT_MAX_STALENESS = 5  # Seconds a worker may serve a role/permission snapshot before re-checking its version
+    REFERENCE_DATA_MAX_STALENESS = 5  # Seconds a worker may serve taxonomy tables before re-checking their version
+    JOB_SEARCH_DEFAULT_RADIUS_KM = 50  # Radius of a city search when the jobseeker does not pick one
+    JOB_SEARCH_SYNC_INTERVAL = 5  # Seconds before a worker's job index picks up other workers' edits
+    CANDIDATE_SEARCH_SYNC_INTERVAL = 5  # Seconds before a worker's candidate index picks up other workers' edits
+    JOB_SEARCH_BACKGROUND_BUILD = True  # Build a worker's job index off the request thread
+    CANDIDATE_SEARCH_BACKGROUND_BUILD = True
+    JOB_SEARCH_WARM_UP_TIMEOUT = 2  # Seconds a search waits for the first build before querying the jobs table
+    CANDIDATE_SEARCH_WARM_UP_TIMEOUT = 2  # Seconds a candidate search waits for the first build before coming back empty
+    SKILL_RELINK_BACKGROUND = True  # Relink skills text to a changed taxonomy off the request thread
+    RECOMMENDATION_TOP_K = 20  # Matches kept per job and per jobseeker profile
+    RECOMMENDATION_WORKERS = 2  # Scoring processes of a recommendation run, 0 scores inline
+    RECOMMENDATION_BLOCK_SIZE = 256  # Jobs or profiles scored per task
+    
+    # Last-activity write-behind
+    ACTIVITY_FLUSH_INTERVAL = 10  # Seconds between batched flushes, 0 disables the background flusher
+    ACTIVITY_FLUSH_THRESHOLD = 500  # Pending users that trigger an immediate flush
+    
+    # Security log writer (critical events are always written synchronously)
+    SECURITY_LOG_ASYNC = True
+    SECURITY_LOG_QUEUE_SIZE = 10000
+    SECURITY_LOG_BATCH_SIZE = 500
+    SECURITY_LOG_FLUSH_INTERVAL = 1.0  # Seconds between background bulk inserts
+    SECURITY_LOG_COUNT_TTL = 60  # Seconds a log browser total is reused per filter combination
+    SECURITY_LOG_COUNT_CAP = 10000  # Totals above this are shown as "10000+"
+    SECURITY_LOG_FACET_TTL = 60  # Seconds filter dropdown counts for open days are reused
+    
+    # Security log retention (aged days are archived to gzip NDJSON, then purged)
+    SECURITY_LOG_RETENTION_DAYS = 90  # Days kept in the live security_logs table
+    SECURITY_LOG_ARCHIVE_DIR = os.environ.get('SECURITY_LOG_ARCHIVE_DIR')  # Defaults to <instance>/security_log_archives
+    SECURITY_LOG_PURGE_BATCH_SIZE = 1000  # Rows exported per read and deleted per chunk
+    SECURITY_LOG_PURGE_PAUSE = 0.05  # Seconds between purge chunks
+    SECURITY_LOG_RETENTION_INTERVAL = 0  # Seconds between background runs, 0 leaves it to the maintenance action
+    SECURITY_LOG_MANIFEST_TTL = 60  # Seconds the log browser reuses the list of archived parts
+    
+    # Dashboard rollups
+    DASHBOARD_ROLLUP_INTERVAL = 60  # Seconds between aggregator runs, 0 disables the background aggregator
+    DASHBOARD_ROLLUP_MAX_STALENESS = 120  # Seconds before a dashboard read wakes the aggregator early
+    
+    # Subscription admin sidebar totals
+    SUBSCRIPTION_SUMMARY_TTL = 60  # Seconds other workers may show totals from before a change
+    
+    # Streaming exports
+    EXPORT_BATCH_SIZE = 500  # Users read per keyset batch
+    
+    # Password hashing (runs in a process pool, cost set by PASSWORD_HASH_ITERATIONS)
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 2))  # 0 hashes inline on the request thread
+    PASSWORD_HASH_QUEUE_SIZE = 32  # Hashes queued or running per worker before logins are turned away
+    PASSWORD_HASH_QUEUE_TIMEOUT = 2.0  # Seconds a login may wait for a queue slot
+    PASSWORD_HASH_TARGET_MS = 250  # Target time for one hash when calibrating
+    PASSWORD_HASH_MIN_ITERATIONS = 600000  # PBKDF2 floor; stored hashes below it are upgraded on login
+    # Cost for new hashes, the same in every worker; measure it with
+    # scripts/setup/calibrate_password_hash.py (0 uses the floor)
+    PASSWORD_HASH_ITERATIONS = int(os.environ.get('PASSWORD_HASH_ITERATIONS', 0))
     
     # Session Configuration
     SESSION_TYPE = 'filesystem'
@@ -47,6 +111,14 @@ class Config:
     RATELIMIT_STORAGE_URL = 'memory://'  # Use Redis in production
     RATELIMIT_DEFAULT = '100 per hour'
     RATELIMIT_HEADERS_ENABLED = True
+    RATELIMIT_ENABLED = True
+    RATELIMIT_ALGORITHM = 'sliding_window'  # 'sliding_window' or 'token_bucket'
+    RATELIMIT_BACKEND = 'memory'  # 'memory' (per worker) or 'database' (shared by all workers)
+    RATELIMIT_ANONYMOUS_LIMIT = 100  # Requests per IP address...
+    RATELIMIT_ANONYMOUS_WINDOW = 300  # ...per 5 minutes
+    RATELIMIT_PLAN_WINDOW = 60  # SubscriptionPlan.api_rate_limit is requests per minute
+    RATELIMIT_DEFAULT_USER_LIMIT = 100  # Users without an active subscription
+    RATELIMIT_PLAN_CACHE_SIZE = 10000  # Cached plan limits per worker, least recently used dropped first
     
     # Email Configuration (for future password reset functionality)
     MAIL_SERVER = os.environ.get('MAIL_SERVER') or 'localhost'
@@ -247,8 +319,20 @@ class TestingConfig(Config):
     """Testing configuration"""
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    SQLALCHEMY_ENGINE_OPTIONS = {}  # In-memory SQLite uses StaticPool, which rejects pool sizing options
     WTF_CSRF_ENABLED = False
     SECURITY_CSRF_PROTECT_ALL = False
+    ACTIVITY_FLUSH_INTERVAL = 0  # Tests flush explicitly
+    SECURITY_LOG_ASYNC = False  # Tests assert on logs right after the request
+    RATELIMIT_ENABLED = False  # Every test request comes from the same client address
+    JWT_REVOCATION_POLL_INTERVAL = 0  # Tests insert blacklist rows directly
+    JWT_BLACKLIST_COMPACT_INTERVAL = 0
+    PASSWORD_HASH_WORKERS = 0  # Hash inline at the minimum cost
+    PASSWORD_HASH_ITERATIONS = 0
+    DASHBOARD_ROLLUP_INTERVAL = 0
+    JOB_SEARCH_BACKGROUND_BUILD = False  # Tests search right after creating rows
+    CANDIDATE_SEARCH_BACKGROUND_BUILD = False
+    SKILL_RELINK_BACKGROUND = False
     
     # Shorter token expiry for faster testing
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(minutes=5)
@@ -269,6 +353,13 @@ class ProductionConfig(Config):
     
     # Use Redis for rate limiting in production
     RATELIMIT_STORAGE_URL = os.environ.get('REDIS_URL') or 'redis://localhost:6379'
+    # Share limits across gunicorn workers; costs one locked write transaction per
+    # request, so use 'memory' when a shared proxy already enforces the per-IP limit
+    RATELIMIT_BACKEND = 'database'
+    RATELIMIT_ALGORITHM = 'token_bucket'  # Two numbers per row, whatever the limit
+    
+    # Archive aged security logs once a day
+    SECURITY_LOG_RETENTION_INTERVAL = 86400
     
     # Strict security headers for production
     SECURITY_HEADERS = {
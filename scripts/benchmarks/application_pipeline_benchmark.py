@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Benchmark the application pipeline for recruiters with thousands of applicants per job.
+
+Fills a throwaway SQLite database with consultancies, jobs and applications,
+builds the status counts, then times
+
+- reading a consultancy's status stats from the counts vs GROUP BY over
+  job_applications,
+- moving a recruiter's selection of applicants with one bulk transition vs
+  one ORM update per application (both committed once), and
+- rejecting every remaining 'applied' application of a job.
+
+Usage:
+    python scripts/benchmarks/application_pipeline_benchmark.py [jobs] [applicants_per_job] [selection]
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+import warnings
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from sqlalchemy import func, insert, select
+
+from app import db
+from app.models import ConsultancyProfile, Job, JobApplication
+from app.services.application_pipeline import (CONSULTANCY_SCOPE, STATUSES, check_consistency, status_counts,
+                                               transition)
+from benchmark_app import file_app
+
+CONSULTANCIES = 20
+
+def timed(action, repeat=1):
+    """Average milliseconds of action()"""
+    started = time.perf_counter()
+    for _ in range(repeat):
+        action()
+    return (time.perf_counter() - started) / repeat * 1000
+
+def populate(jobs, applicants, rng):
+    db.session.execute(insert(ConsultancyProfile.__table__), [
+        {'id': i, 'user_id': i, 'company_name': f'Consultancy {i}'} for i in range(1, CONSULTANCIES + 1)
+    ])
+    db.session.execute(insert(Job.__table__), [
+        {'id': i, 'consultancy_id': i % CONSULTANCIES + 1, 'title': f'Job {i}', 'description': '-'}
+        for i in range(1, jobs + 1)
+    ])
+    weights = (70, 15, 8, 2, 5)  # most applicants have not been looked at yet
+    rows = [{'job_id': job_id, 'jobseeker_id': rng.randrange(1, 10 ** 6),
+             'status': rng.choices(STATUSES, weights)[0]}
+            for job_id in range(1, jobs + 1) for _ in range(applicants)]
+    for start in range(0, len(rows), 50000):
+        db.session.execute(insert(JobApplication.__table__), rows[start:start + 50000])
+    db.session.commit()
+    check_consistency(repair=True)  # rows inserted in bulk bypass the session hooks
+
+def main():
+    jobs = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    applicants = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    selection = int(sys.argv[3]) if len(sys.argv) > 3 else 500
+    rng = random.Random(42)
+    warnings.filterwarnings('ignore')
+
+    handle, path = tempfile.mkstemp(suffix='.db')
+    os.close(handle)
+    app = file_app(path)
+    try:
+        with app.app_context():
+            db.create_all()
+            assert db.engine.url.database == path
+            started = time.perf_counter()
+            populate(jobs, applicants, rng)
+            print(f'{jobs * applicants} applications over {jobs} jobs of {CONSULTANCIES} consultancies '
+                  f'loaded in {time.perf_counter() - started:.1f} s')
+
+            table = JobApplication.__table__
+            group_by = lambda: db.session.execute(
+                select(table.c.status, func.count()).join(Job, Job.id == table.c.job_id)
+                .where(Job.consultancy_id == 1).group_by(table.c.status)).all()
+            counted = lambda: status_counts(CONSULTANCY_SCOPE, [1])
+            print('Consultancy stats:')
+            print(f'  GROUP BY job_applications  {timed(group_by, 20):9.2f} ms')
+            print(f'  status counts              {timed(counted, 20):9.2f} ms')
+
+            def pick(job_id):
+                ids = db.session.scalars(select(table.c.id).where(table.c.job_id == job_id,
+                                                                  table.c.status == 'applied')).all()
+                return rng.sample(ids, min(selection, len(ids)))
+
+            def one_by_one(ids):
+                for application in JobApplication.query.filter(JobApplication.id.in_(ids)):
+                    application.status = 'reviewed'
+                db.session.commit()
+
+            def bulk(ids):
+                transition('reviewed', application_ids=ids)
+                db.session.commit()
+
+            print(f'Moving {selection} selected applicants to reviewed:')
+            for label, action, job_id in (('ORM, one UPDATE each', one_by_one, 1), ('bulk transition', bulk, 2)):
+                ids = pick(job_id)
+                db.session.expunge_all()
+                print(f'  {label:<26} {timed(lambda: action(ids)):9.2f} ms')
+
+            remaining = db.session.scalar(select(func.count()).where(table.c.job_id == 3,
+                                                                     table.c.status == 'applied'))
+            milliseconds = timed(lambda: (transition('rejected', job_id=3, from_statuses=['applied']),
+                                          db.session.commit()))
+            print(f'Rejecting the {remaining} remaining applicants of a job: {milliseconds:9.2f} ms')
+
+            mismatches = check_consistency()
+            print(f'Counts consistent with job_applications: {"yes" if not mismatches else len(mismatches)}')
+            db.session.remove()
+    finally:
+        os.unlink(path)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,19 @@
+"""
+Shared setup for the benchmarks in this directory.
+
+The benchmark scripts are run directly, so this directory is on sys.path and
+they import it as `from benchmark_app import file_app`.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from app import create_app
+from config import TestingConfig, config
+
+def file_app(path):
+    """Testing app on the SQLite file at path; the engine is created in create_app, so the URI goes in first"""
+    config['benchmark'] = type('BenchmarkConfig', (TestingConfig,), {'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}'})
+    return create_app('benchmark')
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Benchmark city radius queries on the grid index against a full scan.
+
+Loads the countries, states and cities of sql-scripts/location_data_usa_canada.sql
+into a throwaway SQLite database. That script carries no coordinates, so each
+city is placed at a seeded random point inside the USA/Canada bounding box,
+and synthetic towns are added around them up to the requested total. Reports
+the index build time and p50/p99 latency of 50 km and 200 km queries on the
+grid, next to a vectorized haversine over every city and a SQL bounding-box
+query on latitude/longitude.
+
+Usage:
+    python scripts/benchmarks/geo_index_benchmark.py [cities]
+"""
+
+import math
+import os
+import random
+import re
+import statistics
+import sys
+import tempfile
+import time
+import warnings
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import numpy as np
+from sqlalchemy import insert
+
+from app import db
+from app.models import City, Country, State
+from app.services.geo_index import EARTH_RADIUS_KM, get_geo_index, haversine_km
+from app.services.reference_data import get_reference_data
+from benchmark_app import file_app
+
+DATASET = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                       'sql-scripts', 'location_data_usa_canada.sql')
+STATE_ROW = re.compile(r"\('([^']+)', '(\w+)', @(usa|canada)_id, 1\)")
+CITY_ROW = re.compile(r"\('((?:[^']|'')+)', \(SELECT id FROM states WHERE code = '(\w+)' AND country_id = @(usa|canada)_id\), 1\)")
+
+def load_dataset():
+    """(states, cities) parsed from the location script: [(name, code, country)], [(name, state code, country)]"""
+    with open(DATASET, encoding='utf-8') as f:
+        script = f.read()
+    states = [match.groups() for match in STATE_ROW.finditer(script)]
+    cities = [(name.replace("''", "'"), code, country) for name, code, country in CITY_ROW.findall(script)]
+    return states, cities
+
+def populate(rng, total):
+    states, cities = load_dataset()
+    db.session.execute(insert(Country.__table__), [
+        {'name': 'United States', 'code_alpha2': 'US', 'code_alpha3': 'USA'},
+        {'name': 'Canada', 'code_alpha2': 'CA', 'code_alpha3': 'CAN'},
+    ])
+    country_ids = {'usa': 1, 'canada': 2}
+    db.session.execute(insert(State.__table__), [
+        {'name': name, 'code': code, 'country_id': country_ids[country]} for name, code, country in states
+    ])
+    state_ids = {(code, country): index + 1 for index, (_, code, country) in enumerate(states)}
+
+    rows, seen = [], set()
+    for name, code, country in cities:
+        if (name, code) not in seen:
+            seen.add((name, code))
+            rows.append({'name': name, 'state_id': state_ids[(code, country)], 'latitude': rng.uniform(25, 60),
+                         'longitude': rng.uniform(-135, -60), 'is_active': True, 'sort_order': 0})
+    dataset_size = len(rows)
+    while len(rows) < total:
+        anchor = rng.choice(rows[:dataset_size])
+        rows.append({'name': f'Town {len(rows)}', 'state_id': anchor['state_id'],
+                     'latitude': anchor['latitude'] + rng.gauss(0, 2), 'longitude': anchor['longitude'] + rng.gauss(0, 3),
+                     'is_active': True, 'sort_order': 0})
+    db.session.execute(insert(City.__table__), rows)
+    db.session.commit()
+    return dataset_size, rows
+
+def percentiles(latencies):
+    latencies = sorted(latencies)
+    return statistics.median(latencies), latencies[max(int(len(latencies) * 0.99) - 1, 0)]
+
+def timed(function, points):
+    latencies = []
+    for lat, lon in points:
+        started = time.perf_counter()
+        function(lat, lon)
+        latencies.append((time.perf_counter() - started) * 1000)
+    return percentiles(latencies)
+
+def main():
+    warnings.filterwarnings('ignore')
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    rng = random.Random(42)
+
+    handle, path = tempfile.mkstemp(suffix='.db')
+    os.close(handle)
+    app = file_app(path)
+    try:
+        with app.app_context():
+            db.create_all()
+            assert db.engine.url.database == path
+            dataset_size, rows = populate(rng, total)
+            lats = np.array([row['latitude'] for row in rows])
+            lons = np.array([row['longitude'] for row in rows])
+
+            started = time.perf_counter()
+            get_reference_data()
+            loaded = time.perf_counter()
+            geo_index = get_geo_index()
+            geo_index.refresh()
+            print(f'{len(rows)} cities ({dataset_size} from the location script): reference data loaded in '
+                  f'{loaded - started:.2f} s, indexed in {time.perf_counter() - loaded:.2f} s')
+
+            points = [(row['latitude'], row['longitude']) for row in rng.sample(rows, 300)]
+            for radius in (50, 200):
+                def scan(lat, lon):
+                    distances = haversine_km(lat, lon, lats, lons)
+                    inside = np.nonzero(distances <= radius)[0]
+                    return inside[np.argsort(distances[inside])]
+
+                def bounding_box(lat, lon):
+                    delta_lat = math.degrees(radius / EARTH_RADIUS_KM)
+                    delta_lon = delta_lat / max(math.cos(math.radians(lat)), 0.01)
+                    return db.session.query(City.id, City.latitude, City.longitude).filter(
+                        City.latitude.between(lat - delta_lat, lat + delta_lat),
+                        City.longitude.between(lon - delta_lon, lon + delta_lon)
+                    ).all()
+
+                found = statistics.mean(len(geo_index.within(lat, lon, radius)) for lat, lon in points)
+                print(f'{radius} km (avg {found:.0f} cities):')
+                print('  grid index    p50={:8.3f} ms   p99={:8.3f} ms'.format(
+                    *timed(lambda lat, lon: geo_index.within(lat, lon, radius), points)))
+                print('  full scan     p50={:8.3f} ms   p99={:8.3f} ms'.format(*timed(scan, points)))
+                print('  sql bbox      p50={:8.3f} ms   p99={:8.3f} ms'.format(*timed(bounding_box, points[:50])))
+            db.session.remove()
+    finally:
+        os.remove(path)
+
+if __name__ == '__main__':
+    main()
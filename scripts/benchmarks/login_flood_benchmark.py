@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Benchmark non-login latency while a login flood is in progress.
+
+A pool of threads hammers a password-check endpoint, as a credential stuffing
+wave would, while another thread measures /health. The run is repeated with
+hashing inline on the request threads and with the PasswordHasher process
+pool, and reports p50/p99 of /health for each.
+
+Usage:
+    python scripts/benchmarks/login_flood_benchmark.py [requests] [flood_threads]
+"""
+
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import warnings
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from flask import jsonify, request
+
+from app import db
+from app.services.password_hasher import password_hasher, PasswordHasherBusy
+from benchmark_app import file_app
+
+def add_login_route(app, stored_hash):
+    """Password check without database writes, so only hashing cost is measured"""
+    def bench_login():
+        try:
+            ok = password_hasher.verify(stored_hash, request.get_json()['password'])
+        except PasswordHasherBusy:
+            return jsonify({'error': 'busy'}), 429
+        return jsonify({'ok': ok}), 200 if ok else 401
+
+    app.add_url_rule('/bench/login', 'bench_login', bench_login, methods=['POST'])
+
+def flood(app, stop_event, counter):
+    client = app.test_client()
+    while not stop_event.is_set():
+        client.post('/bench/login', json={'password': 'wrong-password'})
+        counter.append(1)
+
+def measure(client, requests):
+    """Return /health latencies in milliseconds"""
+    latencies = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        client.get('/health')
+        latencies.append((time.perf_counter() - started) * 1000)
+        time.sleep(0.005)
+    return latencies
+
+def summarize(label, latencies):
+    latencies = sorted(latencies)
+    p99 = latencies[max(int(len(latencies) * 0.99) - 1, 0)]
+    print(f'  {label:<16} p50={statistics.median(latencies):8.3f} ms   p99={p99:8.3f} ms')
+
+def run(workers, requests, flood_threads):
+    handle, path = tempfile.mkstemp(suffix='.db')
+    os.close(handle)
+
+    app = file_app(path)
+    app.config.update(PASSWORD_HASH_WORKERS=workers)
+    password_hasher.init_app(app)
+    password_hasher.calibrate()
+
+    try:
+        with app.app_context():
+            db.create_all()
+            assert db.engine.url.database == path
+            add_login_route(app, password_hasher.hash('correct-password'))
+            client = app.test_client()
+            measure(client, 20)  # Warm up
+
+            print(f"{'Process pool' if workers else 'Inline'} hashing "
+                  f"({password_hasher.iterations} iterations, ~{password_hasher.calibrated_ms:.0f} ms each):")
+            summarize('idle', measure(client, requests))
+
+            stop_event, attempts = threading.Event(), []
+            threads = [threading.Thread(target=flood, args=(app, stop_event, attempts)) for _ in range(flood_threads)]
+            for thread in threads:
+                thread.start()
+            started = time.perf_counter()
+            try:
+                summarize('during flood', measure(client, requests))
+            finally:
+                stop_event.set()
+                for thread in threads:
+                    thread.join()
+
+            elapsed = time.perf_counter() - started
+            metrics = password_hasher.get_metrics()
+            print(f'  login attempts/s: {len(attempts) / elapsed:.1f}   rejected: {metrics["rejected"]}')
+            db.session.remove()
+    finally:
+        password_hasher.shutdown()
+        os.remove(path)
+
+def main():
+    warnings.filterwarnings('ignore')
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    flood_threads = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    run(0, requests, flood_threads)
+    run(max((os.cpu_count() or 2) - 1, 1), requests, flood_threads)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Benchmark recommendation scoring throughput.
+
+Generates synthetic jobs and jobseeker profiles (Zipf-distributed skills out
+of a 2,000-skill vocabulary, a few hundred locations, experience and
+salaries), encodes them and times scoring every job against every profile
+and every profile against every job, inline and in a process pool, in rows
+and in candidate pairs (rows of the two sides sharing a skill) per second.
+Then times what an incremental run scores after 100 job and 1,000 profile
+edits: the edited rows plus the pairs reaching the other side's top-K
+floors. Database reads and writes are left out; they depend on the server.
+
+Usage:
+    python scripts/benchmarks/recommendation_benchmark.py [jobs] [profiles] [workers]
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import numpy as np
+
+from app.services.recommendations import JOB, PROFILE, FeatureEncoder, Scorer
+
+SKILLS = [f'skill {i}' for i in range(2000)]
+CITIES = [f'City {i}, ST' for i in range(400)]
+TOP_K = 20
+
+def skill_sampler(seed):
+    # Zipf-like skill popularity: a few skills are on most postings
+    ranks = np.arange(1, len(SKILLS) + 1)
+    weights = (1 / ranks) / (1 / ranks).sum()
+    rng = np.random.default_rng(seed)
+    return lambda count: '["' + '","'.join(SKILLS[i] for i in set(rng.choice(len(SKILLS), count, p=weights))) + '"]'
+
+def jobs(rng, count):
+    sample = skill_sampler(1)
+    for job_id in range(1, count + 1):
+        salary = rng.choice([None, rng.randrange(30000, 200000, 5000)])
+        yield {'id': job_id, 'skills_required': sample(rng.randint(3, 8)), 'experience_required': rng.randint(0, 10),
+               'location': rng.choice(CITIES), 'job_type': rng.choice(['full-time', 'contract', 'remote']),
+               'salary_min': None, 'salary_max': salary}
+
+def profiles(rng, count):
+    sample = skill_sampler(2)
+    for profile_id in range(1, count + 1):
+        yield {'id': profile_id, 'skills': sample(rng.randint(3, 12)), 'experience_years': rng.randint(0, 25),
+               'expected_salary': rng.choice([None, rng.randrange(30000, 200000, 5000)]),
+               'current_location': rng.choice(CITIES), 'preferred_location': rng.choice([None] + CITIES)}
+
+def score_all(scorer, kind, rows, collect=False):
+    """(seconds, list rows kept, reaching pairs) of scoring rows of one side"""
+    started = time.perf_counter()
+    kept = reached = 0
+    for _, lists, reaching in scorer.score(kind, rows, collect):
+        kept += len(lists[0])
+        reached += len(reaching[0]) if reaching is not None else 0
+    return time.perf_counter() - started, kept, reached
+
+def main():
+    job_count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    profile_count = int(sys.argv[2]) if len(sys.argv) > 2 else 50000
+    workers = int(sys.argv[3]) if len(sys.argv) > 3 else (os.cpu_count() or 1)
+    rng = random.Random(42)
+
+    encoder = FeatureEncoder()
+    started = time.perf_counter()
+    job_matrix = encoder.encode_jobs(jobs(rng, job_count))
+    profile_matrix = encoder.encode_profiles(profiles(rng, profile_count))
+    print(f'Encoded {job_count} jobs and {profile_count} profiles ({len(encoder.features)} skills) '
+          f'in {time.perf_counter() - started:.1f} s')
+
+    for pool in sorted({0, workers}):
+        with Scorer(job_matrix, profile_matrix, TOP_K, workers=pool) as scorer:
+            label = f'{pool} workers' if pool else 'inline'
+            for kind, count in ((JOB, job_count), (PROFILE, profile_count)):
+                seconds, kept, _ = score_all(scorer, kind, np.arange(count))
+                pairs = scorer.costs[kind].sum()
+                print(f'  {label:<10} {kind:<8} {count / seconds:9.0f} rows/s  {pairs / seconds / 1e6:6.1f} M pairs/s  '
+                      f'{seconds:6.1f} s   {kept} list rows')
+
+    # An incremental run: floors from a full run's lists, then only the edited rows
+    floors = {}
+    with Scorer(job_matrix, profile_matrix, TOP_K) as scorer:
+        for kind, count in ((JOB, job_count), (PROFILE, profile_count)):
+            floor = np.zeros(count)
+            for block, lists, _ in scorer.score(kind, np.arange(count)):
+                last = lists[3] == TOP_K
+                floor[np.searchsorted((job_matrix if kind == JOB else profile_matrix).ids, lists[0][last])] = \
+                    lists[2][last]
+            floors[kind] = floor
+    with Scorer(job_matrix, profile_matrix, TOP_K, floors=floors, workers=workers) as scorer:
+        started = time.perf_counter()
+        _, _, job_reach = score_all(scorer, JOB, np.array(sorted(rng.sample(range(job_count), 100))), collect=True)
+        _, _, profile_reach = score_all(scorer, PROFILE, np.array(sorted(rng.sample(range(profile_count), 1000))),
+                                        collect=True)
+        print(f'Incremental, 100 job and 1000 profile edits: {time.perf_counter() - started:.2f} s, '
+              f'{job_reach + profile_reach} pairs to merge into other lists')
+
+if __name__ == '__main__':
+    main()
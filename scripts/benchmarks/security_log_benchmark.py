@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Benchmark request latency with and without heavy security logging.
+
+Every request from a "scanner" user agent makes the middleware log a
+SUSPICIOUS_ACTIVITY event. The benchmark compares request latency for clean
+traffic and for a simulated bot scan, first with synchronous logging and then
+with the batched SecurityLogWriter.
+
+Usage:
+    python scripts/benchmarks/security_log_benchmark.py [requests]
+"""
+
+import os
+import statistics
+import sys
+import tempfile
+import time
+import warnings
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from app import db
+from app.auth.auth_models import SecurityLog
+from app.services.security_log_writer import security_log_writer
+from benchmark_app import file_app
+
+CLEAN_AGENT = 'Mozilla/5.0 (X11; Linux x86_64)'
+SCAN_AGENT = 'vuln-scanner-bot/1.0'
+
+def measure(client, user_agent, requests):
+    """Return per-request latencies in milliseconds"""
+    latencies = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        client.get('/health', headers={'User-Agent': user_agent})
+        latencies.append((time.perf_counter() - started) * 1000)
+    return latencies
+
+def summarize(label, latencies):
+    latencies = sorted(latencies)
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(f'  {label:<14} p50={statistics.median(latencies):7.3f} ms   p95={p95:7.3f} ms')
+
+def run(async_logging, requests):
+    handle, path = tempfile.mkstemp(suffix='.db')
+    os.close(handle)
+
+    app = file_app(path)
+    app.config.update(
+        SECURITY_LOG_ASYNC=async_logging,
+        SECURITY_LOG_FLUSH_INTERVAL=0.2
+    )
+    security_log_writer.init_app(app)
+
+    try:
+        with app.app_context():
+            db.create_all()
+            assert db.engine.url.database == path
+            client = app.test_client()
+            measure(client, CLEAN_AGENT, 20)  # Warm up
+
+            print(f"{'Batched' if async_logging else 'Synchronous'} logging:")
+            summarize('clean traffic', measure(client, CLEAN_AGENT, requests))
+            summarize('bot scan', measure(client, SCAN_AGENT, requests))
+
+            security_log_writer.shutdown()
+            print(f'  rows written: {SecurityLog.query.count()}')
+            db.session.remove()
+    finally:
+        security_log_writer.enabled = False
+        os.remove(path)
+
+def main():
+    warnings.filterwarnings('ignore')
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    run(False, requests)
+    run(True, requests)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Benchmark typeahead lookups against the ilike('%term%') search they replace.
+
+Generates synthetic cities and skills, builds the in-memory prefix indexes
+and reports p50/p99 search latency for short and long prefixes, next to the
+same searches run as ILIKE queries on SQLite. Also times one incremental
+update after a single edit.
+
+Usage:
+    python scripts/benchmarks/typeahead_benchmark.py [cities] [skills]
+"""
+
+import os
+import random
+import statistics
+import string
+import sys
+import tempfile
+import time
+import warnings
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from sqlalchemy import insert
+
+from app import db
+from app.models import City, Country, Skill, State
+from app.services.reference_data import bump_reference_version, get_reference_data
+from app.services.typeahead import get_typeahead
+from benchmark_app import file_app
+
+SYLLABLES = ['san', 'new', 'port', 'ville', 'ton', 'burg', 'lake', 'field', 'mont', 'sao', 'ber', 'lin',
+             'ham', 'ford', 'ridge', 'wood', 'spring', 'dale', 'ka', 'ra', 'mé', 'zé', 'lo']
+
+def random_name(rng, words):
+    return ' '.join(''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 3))).title()
+                    for _ in range(rng.randint(1, words)))
+
+def populate(rng, cities, skills):
+    db.session.execute(insert(Country.__table__), [{'name': 'Benchland', 'code_alpha2': 'BL', 'code_alpha3': 'BLD'}])
+    db.session.execute(insert(State.__table__), [{'name': f'State {i}', 'country_id': 1} for i in range(50)])
+    seen = set()
+    rows = []
+    while len(rows) < cities:
+        name, state_id = random_name(rng, 2), rng.randint(1, 50)
+        if (name, state_id) not in seen:
+            seen.add((name, state_id))
+            rows.append({'name': name, 'state_id': state_id, 'population': rng.randint(100, 9000000),
+                         'is_metro': rng.random() < 0.05, 'is_active': True, 'sort_order': 0})
+    db.session.execute(insert(City.__table__), rows)
+    names = set()
+    while len(names) < skills:
+        names.add(random_name(rng, 3) + rng.choice(['', '', ' ' + rng.choice(string.ascii_uppercase)]))
+    db.session.execute(insert(Skill.__table__), [
+        {'name': name.lower().replace(' ', '_'), 'display_name': name, 'sort_order': rng.randint(0, 9), 'is_active': True}
+        for name in names
+    ])
+    db.session.commit()
+
+def percentiles(latencies):
+    latencies = sorted(latencies)
+    return statistics.median(latencies), latencies[max(int(len(latencies) * 0.99) - 1, 0)]
+
+def main():
+    warnings.filterwarnings('ignore')
+    cities = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    skills = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+    rng = random.Random(42)
+
+    handle, path = tempfile.mkstemp(suffix='.db')
+    os.close(handle)
+    app = file_app(path)
+    try:
+        with app.app_context():
+            db.create_all()
+            assert db.engine.url.database == path
+            populate(rng, cities, skills)
+
+            started = time.perf_counter()
+            typeahead = get_typeahead()
+            typeahead.refresh()
+            print(f'Indexed {cities} cities and {skills} skills in {time.perf_counter() - started:.2f} s')
+
+            queries = [syllable[:length] for syllable in SYLLABLES for length in (1, 2, 3)] + \
+                      ['new port', 'sanlake', 'mont', 'zé', 'ze']
+            for kind, model, column in (('cities', City, City.name), ('skills', Skill, Skill.display_name)):
+                memory, ilike = [], []
+                for query in queries * 5:
+                    started = time.perf_counter()
+                    typeahead.search(kind, query, 10)
+                    memory.append((time.perf_counter() - started) * 1000)
+                for query in queries:
+                    started = time.perf_counter()
+                    model.query.filter(column.ilike(f'%{query}%')).limit(10).all()
+                    ilike.append((time.perf_counter() - started) * 1000)
+                print(f'{kind}:')
+                print('  typeahead   p50={:8.3f} ms   p99={:8.3f} ms'.format(*percentiles(memory)))
+                print('  ilike       p50={:8.3f} ms   p99={:8.3f} ms'.format(*percentiles(ilike)))
+
+            city = City.query.get(1)
+            city.name = 'Zzyzx Benchmark'
+            bump_reference_version()
+            db.session.commit()
+            get_reference_data()
+            started = time.perf_counter()
+            typeahead.refresh()
+            print(f'Re-index after one edit: '
+                  f'{(time.perf_counter() - started) * 1000:.1f} ms')
+            db.session.remove()
+    finally:
+        os.remove(path)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Backfill Skill Links - Fill the skill association tables from the skills text of existing rows
+
+Walks jobseeker_profiles, jobs and consultancy_profiles in id order, one batch
+per transaction, and replaces each row's links that differ from the skills
+its text resolves to. Safe to rerun: run it once after creating the tables
+(sql-scripts/add_skill_links.sql) and again after changing skills other than
+through the superadmin skill pages (which relink in the background), so
+rows written before the change pick them up. A stopped run resumes with
+--table and --start-after from the last id it printed.
+
+Usage:
+    python scripts/database/backfill_skill_links.py [--table NAME] [--batch-size N] [--start-after ID] [--config NAME]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from app import create_app
+from app.services.skill_links import BACKFILL_BATCH_SIZE, LINKS, backfill
+
+def main():
+    tables = {model.__tablename__: model for model in LINKS}
+    parser = argparse.ArgumentParser(description='Fill the skill association tables from existing rows')
+    parser.add_argument('--table', choices=sorted(tables), help='only this table (default all)')
+    parser.add_argument('--batch-size', type=int, default=BACKFILL_BATCH_SIZE, help='rows per transaction')
+    parser.add_argument('--start-after', type=int, default=0, help='resume after this id (with --table)')
+    parser.add_argument('--config', help='configuration name (default FLASK_ENV)')
+    args = parser.parse_args()
+    if args.start_after and not args.table:
+        parser.error('--start-after needs --table')
+
+    app = create_app(args.config)
+    with app.app_context():
+        for name, model in tables.items():
+            if args.table and name != args.table:
+                continue
+            started = time.perf_counter()
+            stats = backfill(model, batch_size=args.batch_size, start_after=args.start_after,
+                             progress=lambda last_id, stats: print(f'  {name}: {stats["rows"]} rows, '
+                                                                   f'last id {last_id}', flush=True))
+            print(f'{name}: linked {stats["rows"]} rows to {stats["links"]} skills, '
+                  f'{stats["relinked"]} rows changed, in {time.perf_counter() - started:.1f} s')
+            if stats['unmatched']:
+                common = ', '.join(f'{skill} ({count})' for skill, count in stats['unmatched'].most_common(10))
+                print(f'  not in the skill taxonomy: {common}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Check Application Counts - Compare the application status counts with job_applications
+
+The counts are kept by the application on every status change; this finds
+any drift (e.g. from rows edited outside the application) and with --repair
+rebuilds them from job_applications.
+
+Usage:
+    python scripts/database/check_application_counts.py [--repair] [--config NAME]
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from app import create_app
+from app.services.application_pipeline import check_consistency
+
+def main():
+    parser = argparse.ArgumentParser(description='Check the application status counts')
+    parser.add_argument('--repair', action='store_true', help='rebuild the counts if any differ')
+    parser.add_argument('--config', help='configuration name (default FLASK_ENV)')
+    args = parser.parse_args()
+
+    app = create_app(args.config)
+    with app.app_context():
+        mismatches = check_consistency(repair=args.repair)
+        for mismatch in mismatches[:50]:
+            print(f'  {mismatch["scope"]} {mismatch["scope_id"]} {mismatch["status"]}: '
+                  f'expected {mismatch["expected"]}, stored {mismatch["actual"]}')
+        if not mismatches:
+            print('Application status counts match job_applications')
+        else:
+            print(f'{len(mismatches)} counts differ' + (', rebuilt' if args.repair else ''))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""
+Rebuild Jobseeker Dashboards - Rewrite every jobseeker's dashboard row
+
+Rows are kept by the application on profile and application writes and are
+built on first read; this fills them ahead of time (e.g. after creating the
+table) or rewrites them after rows were edited outside the application.
+Recently viewed jobs are kept.
+
+Usage:
+    python scripts/database/rebuild_jobseeker_dashboards.py [--batch-size N] [--config NAME]
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from app import create_app
+from app.services.jobseeker_dashboard import REFRESH_BATCH_SIZE, rebuild
+
+def main():
+    parser = argparse.ArgumentParser(description='Rebuild the jobseeker dashboard rows')
+    parser.add_argument('--batch-size', type=int, default=REFRESH_BATCH_SIZE, help='users per transaction')
+    parser.add_argument('--config', help='configuration name (default FLASK_ENV)')
+    args = parser.parse_args()
+
+    app = create_app(args.config)
+    with app.app_context():
+        refreshed = rebuild(batch_size=args.batch_size,
+                            progress=lambda last_id, count: print(f'  {count} users (up to id {last_id})'))
+        print(f'Rebuilt {refreshed} jobseeker dashboards')
+
+if __name__ == '__main__':
+    main()
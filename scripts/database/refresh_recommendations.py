@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Refresh Recommendations - Bring the precomputed job/candidate recommendation lists up to date
+
+By default only the lists affected by jobs and profiles edited since the last
+run are recomputed, so this is meant to run from cron every few minutes;
+--full rescores everything. Scoring runs in RECOMMENDATION_WORKERS processes.
+
+Usage:
+    python scripts/database/refresh_recommendations.py [--full] [--workers N] [--config NAME]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from app import create_app
+from app.services.recommendations import RecommendationPipeline
+
+def main():
+    parser = argparse.ArgumentParser(description='Refresh the precomputed recommendation lists')
+    parser.add_argument('--full', action='store_true', help='rescore every job and profile')
+    parser.add_argument('--workers', type=int, help='scoring processes (default RECOMMENDATION_WORKERS, 0 inline)')
+    parser.add_argument('--config', help='configuration name (default FLASK_ENV)')
+    args = parser.parse_args()
+
+    app = create_app(args.config)
+    with app.app_context():
+        pipeline = RecommendationPipeline.from_config(app.config)
+        if args.workers is not None:
+            pipeline.workers = args.workers
+        started = time.perf_counter()
+        run = pipeline.run(full=args.full)
+        print(f'{"Full" if run.full else "Incremental"} run {run.id}: scored {run.jobs_scored} jobs and '
+              f'{run.profiles_scored} profiles, wrote {run.lists_written} lists '
+              f'in {time.perf_counter() - started:.1f} s')
+
+if __name__ == '__main__':
+    main()
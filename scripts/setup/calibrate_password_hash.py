@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Calibrate Password Hash - Measure the PBKDF2 cost for this hardware
+
+Times PBKDF2-SHA256 on the machine it runs on and prints the iteration count
+that makes one hash take about PASSWORD_HASH_TARGET_MS, within the configured
+floor and ceiling. Run it once on the production hardware and set the result
+as PASSWORD_HASH_ITERATIONS for every worker.
+
+Usage:
+    python scripts/setup/calibrate_password_hash.py [--config NAME]
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from app import create_app
+from app.services.password_hasher import PasswordHasher
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure PASSWORD_HASH_ITERATIONS for this machine')
+    parser.add_argument('--config', help='configuration name (default FLASK_ENV)')
+    args = parser.parse_args()
+
+    app = create_app(args.config)
+    hasher = PasswordHasher()
+    hasher.target_ms = app.config.get('PASSWORD_HASH_TARGET_MS', hasher.target_ms)
+    hasher.min_iterations = app.config.get('PASSWORD_HASH_MIN_ITERATIONS', hasher.min_iterations)
+    hasher.max_iterations = max(hasher.min_iterations,
+                                app.config.get('PASSWORD_HASH_MAX_ITERATIONS', hasher.max_iterations))
+
+    iterations = hasher.calibrate()
+    print(f'One hash takes ~{hasher.calibrated_ms:.0f} ms at {iterations} iterations')
+    print(f'PASSWORD_HASH_ITERATIONS={iterations}')
+
+if __name__ == '__main__':
+    main()
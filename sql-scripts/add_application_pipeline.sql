@@ -0,0 +1,37 @@
+-- =====================================================
+-- ADD APPLICATION PIPELINE
+-- =====================================================
+
+USE jobhunter_fresh;
+
+-- A job's applications newest first, in all statuses or in one: the recruiter
+-- listings page on (applied_at, id), and bulk status changes seek (job_id, status).
+CREATE INDEX idx_job_applications_job_status ON job_applications (job_id, status, applied_at, id);
+CREATE INDEX idx_job_applications_job_applied ON job_applications (job_id, applied_at, id);
+
+-- Applications per status of each job (scope 'job') and of all the jobs of
+-- each consultancy (scope 'consultancy'), kept by the application in the
+-- same transaction as every status change.
+CREATE TABLE IF NOT EXISTS application_status_counts (
+    scope VARCHAR(20) NOT NULL,
+    scope_id INT NOT NULL,
+    status VARCHAR(50) NOT NULL,
+    count INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (scope, scope_id, status)
+);
+
+-- Initial counts; scripts/database/check_application_counts.py --repair rebuilds them
+DELETE FROM application_status_counts;
+INSERT INTO application_status_counts (scope, scope_id, status, count)
+SELECT 'job', a.job_id, a.status, COUNT(*)
+FROM job_applications a
+GROUP BY a.job_id, a.status;
+INSERT INTO application_status_counts (scope, scope_id, status, count)
+SELECT 'consultancy', j.consultancy_id, a.status, COUNT(*)
+FROM job_applications a
+JOIN jobs j ON j.id = a.job_id
+GROUP BY j.consultancy_id, a.status;
+
+SELECT 'APPLICATION STATUSES:' as info;
+SELECT status, COUNT(*) as applications FROM job_applications GROUP BY status;
+SELECT scope, status, SUM(count) as counted FROM application_status_counts GROUP BY scope, status;
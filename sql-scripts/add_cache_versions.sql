@@ -0,0 +1,18 @@
+-- =====================================================
+-- ADD CACHE VERSION COUNTERS
+-- =====================================================
+
+USE jobhunter_fresh;
+
+-- Monotonic counters probed by each worker to invalidate in-memory caches
+CREATE TABLE IF NOT EXISTS cache_versions (
+    name VARCHAR(50) NOT NULL PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0,
+    updated_at DATETIME NULL
+);
+
+-- Seed the RBAC snapshot counter
+INSERT IGNORE INTO cache_versions (name, version, updated_at) VALUES ('rbac', 1, NOW());
+
+SELECT 'CACHE VERSIONS:' as info;
+SELECT * FROM cache_versions;
@@ -0,0 +1,20 @@
+-- =====================================================
+-- ADD DASHBOARD COUNTERS
+-- =====================================================
+
+USE jobhunter_fresh;
+
+-- Pre-aggregated dashboard statistics, maintained by the rollup aggregator.
+-- Day buckets carry the day in bucket_date; current totals use 1970-01-01.
+CREATE TABLE IF NOT EXISTS dashboard_counters (
+    metric VARCHAR(50) NOT NULL,
+    bucket_date DATE NOT NULL,
+    dimension VARCHAR(100) NOT NULL DEFAULT 'total',
+    value BIGINT NOT NULL DEFAULT 0,
+    updated_at DATETIME NULL,
+    PRIMARY KEY (metric, bucket_date, dimension),
+    INDEX idx_dashboard_counters_bucket_date (bucket_date)
+);
+
+SELECT 'DASHBOARD COUNTERS:' as info;
+SELECT COUNT(*) as counter_rows FROM dashboard_counters;
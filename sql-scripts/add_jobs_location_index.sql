@@ -0,0 +1,14 @@
+-- =====================================================
+-- ADD JOBS LOCATION INDEX
+-- =====================================================
+
+USE jobhunter_fresh;
+
+-- City-radius job search resolves the radius to the labels of the cities
+-- inside it ("Austin", "Austin, TX", ...) and matches them with
+-- location IN (...). The default case-insensitive collation lets the index
+-- serve "austin, tx" as well.
+CREATE INDEX idx_jobs_location ON jobs (location);
+
+SELECT 'JOBS INDEXES:' as info;
+SHOW INDEX FROM jobs;
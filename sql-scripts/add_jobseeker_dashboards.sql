@@ -0,0 +1,35 @@
+-- =====================================================
+-- ADD JOBSEEKER DASHBOARDS
+-- =====================================================
+
+USE jobhunter_fresh;
+
+-- A jobseeker's applications, newest first: dashboard refreshes and listings.
+CREATE INDEX idx_job_applications_jobseeker ON job_applications (jobseeker_id, applied_at);
+
+-- One row per jobseeker holding everything the dashboard shows, rewritten by
+-- the application in the same transaction as profile and application writes.
+-- JSON columns: profile_summary (job title, location, experience, skill names),
+-- application_counts (status -> applications), recent_applications and
+-- recently_viewed (newest first).
+CREATE TABLE IF NOT EXISTS jobseeker_dashboards (
+    user_id INT PRIMARY KEY,
+    profile_id INT NULL,
+    first_name VARCHAR(50) NULL,
+    last_name VARCHAR(50) NULL,
+    profile_completeness INT DEFAULT 0,
+    profile_summary TEXT NULL,
+    application_counts TEXT NULL,
+    recent_applications TEXT NULL,
+    recently_viewed TEXT NULL,
+    jobs_viewed INT DEFAULT 0,
+    updated_at DATETIME NULL,
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+);
+
+-- Rows are built on first read; scripts/database/rebuild_jobseeker_dashboards.py
+-- fills them for every jobseeker ahead of time.
+
+SELECT 'JOBSEEKER DASHBOARDS:' as info;
+SELECT COUNT(*) as jobseekers FROM users WHERE user_type = 'JOBSEEKER';
+SELECT COUNT(*) as dashboards FROM jobseeker_dashboards;
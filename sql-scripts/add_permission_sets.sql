@@ -0,0 +1,15 @@
+-- =====================================================
+-- ADD PERMISSION SET FINGERPRINTS
+-- =====================================================
+
+USE jobhunter_fresh;
+
+-- Distinct effective permission sets; JWTs carry only the fingerprint
+CREATE TABLE IF NOT EXISTS permission_sets (
+    fingerprint VARCHAR(16) NOT NULL PRIMARY KEY,
+    permissions_json JSON NOT NULL,
+    created_at DATETIME NULL
+);
+
+SELECT 'PERMISSION SETS:' as info;
+SELECT fingerprint, JSON_LENGTH(permissions_json) AS permission_count, created_at FROM permission_sets;
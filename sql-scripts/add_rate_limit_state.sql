@@ -0,0 +1,17 @@
+-- =====================================================
+-- ADD SHARED RATE LIMITER STATE
+-- =====================================================
+
+USE jobhunter_fresh;
+
+-- One row per throttled identifier (user:<id> or ip:<address>), used when
+-- RATELIMIT_BACKEND = 'database' so every worker enforces the same limits
+CREATE TABLE IF NOT EXISTS rate_limit_state (
+    `key` VARCHAR(255) NOT NULL PRIMARY KEY,
+    state_json JSON NULL,
+    expires_at DATETIME NOT NULL,
+    INDEX ix_rate_limit_state_expires_at (expires_at)
+);
+
+SELECT 'RATE LIMIT STATE:' as info;
+DESCRIBE rate_limit_state;
@@ -0,0 +1,38 @@
+-- =====================================================
+-- ADD RECOMMENDATIONS
+-- =====================================================
+
+USE jobhunter_fresh;
+
+-- Precomputed top matches, written by scripts/database/refresh_recommendations.py.
+-- kind 'job' rows list the best profiles for a job, kind 'profile' rows the
+-- best jobs for a jobseeker profile, ranked from 1.
+CREATE TABLE IF NOT EXISTS recommendations (
+    kind VARCHAR(10) NOT NULL,
+    subject_id INT NOT NULL,
+    `rank` INT NOT NULL,
+    target_id INT NOT NULL,
+    score DOUBLE NOT NULL,
+    computed_at DATETIME NULL,
+    PRIMARY KEY (kind, subject_id, `rank`),
+    INDEX idx_recommendations_target (kind, target_id)
+);
+
+-- One row per pipeline run; incremental runs start from the last finished one.
+CREATE TABLE IF NOT EXISTS recommendation_runs (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    started_at DATETIME NOT NULL,
+    finished_at DATETIME NULL,
+    full BOOLEAN DEFAULT FALSE,
+    reference_version BIGINT DEFAULT 0,
+    top_k INT NOT NULL,
+    jobs_scored INT DEFAULT 0,
+    profiles_scored INT DEFAULT 0,
+    lists_written INT DEFAULT 0
+);
+
+SELECT 'RECOMMENDATIONS:' as info;
+SELECT kind, COUNT(DISTINCT subject_id) as lists, COUNT(*) as recommendation_rows
+FROM recommendations
+GROUP BY kind;
+SELECT * FROM recommendation_runs ORDER BY id DESC LIMIT 10;
@@ -0,0 +1,22 @@
+-- =====================================================
+-- ADD SEARCH SYNC INDEXES
+-- =====================================================
+
+USE jobhunter_fresh;
+
+-- Every worker's job and candidate search index polls its table every few
+-- seconds for rows changed since the last poll:
+--     WHERE updated_at >= :watermark - INTERVAL 60 SECOND
+-- Without an index on updated_at each poll scans the whole table.
+CREATE INDEX idx_jobs_updated_at ON jobs (updated_at);
+CREATE INDEX idx_jobseeker_profiles_updated_at ON jobseeker_profiles (updated_at);
+
+-- Until a worker's job index is built, job search pages the matching jobs
+-- newest first: ORDER BY created_at DESC, id DESC LIMIT per_page + 1
+CREATE INDEX idx_jobs_created ON jobs (created_at, id);
+
+SELECT 'JOBS INDEXES:' as info;
+SHOW INDEX FROM jobs;
+
+SELECT 'JOBSEEKER PROFILE INDEXES:' as info;
+SHOW INDEX FROM jobseeker_profiles;
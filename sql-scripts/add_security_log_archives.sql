@@ -0,0 +1,35 @@
+-- =====================================================
+-- ADD SECURITY LOG ARCHIVES
+-- =====================================================
+
+USE jobhunter_fresh;
+
+-- Manifest of security log days exported to gzip NDJSON files by the
+-- retention job. Rows of a day are deleted from security_logs only after
+-- its part is recorded here; purged_at marks parts whose rows are gone.
+-- min_created_at/max_created_at bound each part's rows so log browser
+-- pages read only the parts that can hold them.
+CREATE TABLE IF NOT EXISTS security_log_archives (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    bucket_date DATE NOT NULL,
+    part INT NOT NULL DEFAULT 1,
+    path VARCHAR(500) NOT NULL,
+    row_count INT NOT NULL DEFAULT 0,
+    min_id INT NULL,
+    max_id INT NULL,
+    min_created_at DATETIME NULL,
+    max_created_at DATETIME NULL,
+    sha256 VARCHAR(64) NULL,
+    archived_at DATETIME NULL,
+    purged_at DATETIME NULL,
+    UNIQUE KEY uq_security_log_archives_bucket_part (bucket_date, part),
+    INDEX ix_security_log_archives_bucket_date (bucket_date)
+);
+
+SELECT 'SECURITY LOG ARCHIVES:' as info;
+SELECT bucket_date, COUNT(*) as parts, SUM(row_count) as archived_rows,
+       SUM(purged_at IS NULL) as pending_purge
+FROM security_log_archives
+GROUP BY bucket_date
+ORDER BY bucket_date DESC
+LIMIT 30;
@@ -0,0 +1,15 @@
+-- =====================================================
+-- ADD SECURITY LOG KEYSET INDEXES
+-- =====================================================
+
+USE jobhunter_fresh;
+
+-- The log browsers page newest-first by seeking on (created_at, id); one
+-- index per filter the views offer keeps every page a short range scan
+CREATE INDEX idx_security_logs_created_id ON security_logs (created_at, id);
+CREATE INDEX idx_security_logs_type_created_id ON security_logs (event_type, created_at, id);
+CREATE INDEX idx_security_logs_severity_created_id ON security_logs (severity, created_at, id);
+CREATE INDEX idx_security_logs_user_created_id ON security_logs (user_id, created_at, id);
+
+SELECT 'SECURITY LOG INDEXES:' as info;
+SHOW INDEX FROM security_logs;
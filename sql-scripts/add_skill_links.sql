@@ -0,0 +1,44 @@
+-- =====================================================
+-- ADD SKILL LINKS
+-- =====================================================
+
+USE jobhunter_fresh;
+
+-- The skills of profiles and jobs and the specializations of consultancies,
+-- resolved to skills.id. The JSON text columns stay; these tables are kept in
+-- step with them by the application and filled for existing rows by
+-- scripts/database/backfill_skill_links.py. The (skill_id, owner) indexes
+-- answer "rows with skill X" without reading the owner tables.
+CREATE TABLE IF NOT EXISTS jobseeker_skills (
+    profile_id INT NOT NULL,
+    skill_id INT NOT NULL,
+    PRIMARY KEY (profile_id, skill_id),
+    INDEX idx_jobseeker_skills_skill (skill_id, profile_id),
+    FOREIGN KEY (profile_id) REFERENCES jobseeker_profiles(id) ON DELETE CASCADE,
+    FOREIGN KEY (skill_id) REFERENCES skills(id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS job_skills (
+    job_id INT NOT NULL,
+    skill_id INT NOT NULL,
+    PRIMARY KEY (job_id, skill_id),
+    INDEX idx_job_skills_skill (skill_id, job_id),
+    FOREIGN KEY (job_id) REFERENCES jobs(id) ON DELETE CASCADE,
+    FOREIGN KEY (skill_id) REFERENCES skills(id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS consultancy_skills (
+    consultancy_id INT NOT NULL,
+    skill_id INT NOT NULL,
+    PRIMARY KEY (consultancy_id, skill_id),
+    INDEX idx_consultancy_skills_skill (skill_id, consultancy_id),
+    FOREIGN KEY (consultancy_id) REFERENCES consultancy_profiles(id) ON DELETE CASCADE,
+    FOREIGN KEY (skill_id) REFERENCES skills(id) ON DELETE CASCADE
+);
+
+SELECT 'SKILL LINKS:' as info;
+SELECT 'jobseeker_skills' as table_name, COUNT(*) as links, COUNT(DISTINCT skill_id) as skills FROM jobseeker_skills
+UNION ALL
+SELECT 'job_skills', COUNT(*), COUNT(DISTINCT skill_id) FROM job_skills
+UNION ALL
+SELECT 'consultancy_skills', COUNT(*), COUNT(DISTINCT skill_id) FROM consultancy_skills;
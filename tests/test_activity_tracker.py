@@ -0,0 +1,136 @@
+"""
+Activity Tracker Tests
+Tests write-behind batching of user last-activity timestamps
+"""
+
+import os
+import sys
+import unittest
+from datetime import datetime, timedelta
+
+# Add the parent directory to the path so we can import the app
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event
+
+from app import create_app, db
+from app.auth.auth_models import AuthUser
+from app.services.activity_tracker import ActivityTracker
+
+class TestActivityTracker(unittest.TestCase):
+    """Test the write-behind activity tracker"""
+
+    def setUp(self):
+        """Set up test environment"""
+        self.app = create_app('testing')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        self.users = []
+        for i in range(3):
+            user = AuthUser(username=f'user{i}', email=f'user{i}@test.com')
+            user.set_password('password123')
+            self.users.append(user)
+        db.session.add_all(self.users)
+        db.session.commit()
+        self.user_ids = [user.id for user in self.users]
+
+        self.tracker = ActivityTracker()
+        self.tracker.app = self.app
+        self.tracker.flush_interval = 0
+
+    def tearDown(self):
+        """Clean up test environment"""
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def _updated_at(self, user_id):
+        db.session.expire_all()
+        return AuthUser.query.get(user_id).updated_at
+
+    def test_record_does_not_write(self):
+        """Test recording activity stays in memory until flushed"""
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        self.addCleanup(event.remove, db.engine, 'before_cursor_execute', listener)
+
+        for user_id in self.user_ids:
+            self.tracker.record(user_id)
+        self.assertEqual(statements, [])
+        self.assertEqual(self.tracker.get_metrics()['queue_depth'], 3)
+        print("✅ Activity recorded in memory")
+
+    def test_repeated_hits_coalesced(self):
+        """Test repeated hits keep only the latest timestamp per user"""
+        base = datetime(2024, 1, 1, 12, 0, 0)
+        self.tracker.record(self.user_ids[0], base + timedelta(minutes=5))
+        self.tracker.record(self.user_ids[0], base)
+        self.tracker.record(self.user_ids[0], base + timedelta(minutes=2))
+
+        metrics = self.tracker.get_metrics()
+        self.assertEqual(metrics['queue_depth'], 1)
+        self.assertEqual(metrics['coalesced'], 2)
+
+        self.tracker.flush()
+        self.assertEqual(self._updated_at(self.user_ids[0]), base + timedelta(minutes=5))
+        print("✅ Repeated hits coalesced")
+
+    def test_flush_single_batched_update(self):
+        """Test a flush writes every pending user with one UPDATE ... CASE"""
+        stamps = {user_id: datetime(2024, 1, 1, 9, i) for i, user_id in enumerate(self.user_ids)}
+        for user_id, stamp in stamps.items():
+            self.tracker.record(user_id, stamp)
+
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        self.assertEqual(self.tracker.flush(), 3)
+        event.remove(db.engine, 'before_cursor_execute', listener)
+
+        self.assertEqual(len(statements), 1)
+        self.assertIn('CASE', statements[0])
+        for user_id, stamp in stamps.items():
+            self.assertEqual(self._updated_at(user_id), stamp)
+
+        metrics = self.tracker.get_metrics()
+        self.assertEqual(metrics['queue_depth'], 0)
+        self.assertEqual(metrics['flushes'], 1)
+        self.assertEqual(metrics['rows_flushed'], 3)
+        print("✅ Pending activity flushed in one statement")
+
+    def test_size_threshold_triggers_flush(self):
+        """Test reaching the threshold flushes inline"""
+        self.tracker.flush_threshold = 2
+        self.tracker.record(self.user_ids[0])
+        self.assertEqual(self.tracker.get_metrics()['flushes'], 0)
+        self.tracker.record(self.user_ids[1])
+
+        metrics = self.tracker.get_metrics()
+        self.assertEqual(metrics['flushes'], 1)
+        self.assertEqual(metrics['queue_depth'], 0)
+        print("✅ Size threshold triggers a flush")
+
+    def test_shutdown_flushes_pending(self):
+        """Test shutdown writes out everything still pending"""
+        stamp = datetime(2024, 6, 1, 8, 30)
+        self.tracker.record(self.user_ids[2], stamp)
+        self.tracker.shutdown()
+        self.assertEqual(self._updated_at(self.user_ids[2]), stamp)
+        print("✅ Shutdown performs a final flush")
+
+    def test_update_last_activity_deferred(self):
+        """Test the user model defers activity writes to the tracker"""
+        from app.services.activity_tracker import activity_tracker
+        user = self.users[0]
+        before = activity_tracker.get_metrics()['recorded']
+        user.update_last_activity()
+        self.assertEqual(activity_tracker.get_metrics()['recorded'], before + 1)
+        self.assertNotIn(user, db.session.dirty)
+        activity_tracker.flush()
+        print("✅ update_last_activity is write-behind")
+
+if __name__ == '__main__':
+    unittest.main()
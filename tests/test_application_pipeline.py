@@ -0,0 +1,190 @@
+"""
+Application Pipeline Tests
+Tests status transitions, bulk moves and the per-job and per-consultancy status counts
+"""
+
+import os
+import sys
+import unittest
+from unittest.mock import patch
+
+from sqlalchemy import event, update
+from sqlalchemy.exc import OperationalError
+
+# Add the parent directory to the path so we can import the app
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app, db
+from app.models import ApplicationStatusCount, ConsultancyProfile, Job, JobApplication
+from app.routes.roles.consultancy_routes import consultancy_routes_bp
+from app.services.activity_tracker import activity_tracker
+from app.services.application_pipeline import (CONSULTANCY_SCOPE, JOB_SCOPE, check_consistency, status_counts,
+                                               transition)
+
+class TestApplicationPipeline(unittest.TestCase):
+    """Test transitions keep the status counts in step with job_applications"""
+
+    def setUp(self):
+        """Set up test environment"""
+        self.app = create_app('testing')
+        self.app.register_blueprint(consultancy_routes_bp, name='consultancy_pipeline', url_prefix='/pipeline')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        db.session.add_all([ConsultancyProfile(user_id=1, company_name='Acme'),
+                            ConsultancyProfile(user_id=2, company_name='Other')])
+        db.session.add_all([Job(consultancy_id=1, title='Backend', description='-'),
+                            Job(consultancy_id=1, title='Frontend', description='-'),
+                            Job(consultancy_id=2, title='Elsewhere', description='-')])
+        db.session.commit()
+
+    def tearDown(self):
+        """Clean up test environment"""
+        activity_tracker.flush()
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def apply(self, job_id, count, start=1):
+        applications = [JobApplication(job_id=job_id, jobseeker_id=start + i) for i in range(count)]
+        db.session.add_all(applications)
+        db.session.commit()
+        return applications
+
+    def counts(self, scope, scope_id):
+        counts = status_counts(scope, [scope_id])[scope_id]
+        return {status: count for status, count in counts.items() if count}
+
+    def test_single_transitions(self):
+        """Test new, moved and deleted applications update the counts in the same transaction"""
+        first, second = self.apply(1, 2)
+        self.apply(2, 1, start=10)
+        self.assertEqual(self.counts(JOB_SCOPE, 1), {'applied': 2, 'total': 2})
+        self.assertEqual(self.counts(CONSULTANCY_SCOPE, 1), {'applied': 3, 'total': 3})
+
+        first.status = 'reviewed'
+        db.session.commit()
+        first.status = 'hired'
+        db.session.commit()
+        self.assertEqual(self.counts(JOB_SCOPE, 1), {'applied': 1, 'hired': 1, 'total': 2})
+
+        first.status = 'applied'
+        with self.assertRaises(ValueError):
+            db.session.commit()
+        db.session.rollback()
+        second.status = 'shortlisted'
+        with self.assertRaises(ValueError):
+            db.session.flush()
+        db.session.rollback()
+
+        db.session.delete(second)
+        db.session.commit()
+        self.assertEqual(self.counts(CONSULTANCY_SCOPE, 1), {'applied': 1, 'hired': 1, 'total': 2})
+        self.assertEqual(check_consistency(), [])
+        print("✅ Single transitions keep the counts exact")
+
+    def test_bulk_transition(self):
+        """Test hundreds of applications move in one UPDATE and the counts follow"""
+        backend = self.apply(1, 300)
+        self.apply(2, 50, start=1000)
+        self.apply(3, 20, start=2000)
+
+        statements = []
+        listener = lambda conn, cursor, statement, *args: statements.append(statement)
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            moved = transition('reviewed', application_ids=[application.id for application in backend[:200]])
+            db.session.commit()
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+        self.assertEqual(moved, 200)
+        self.assertEqual(sum(statement.startswith('UPDATE job_applications') for statement in statements), 1)
+        self.assertEqual(backend[0].status, 'reviewed')  # loaded objects reload
+
+        # Reject every reviewed application of the job; the hired one is left alone
+        backend[0].status = 'hired'
+        db.session.commit()
+        self.assertEqual(transition('rejected', job_id=1, from_statuses=['reviewed', 'hired']), 199)
+        self.assertEqual(transition('interviewed', application_ids=[backend[1].id, backend[250].id]), 1)
+        # Another consultancy's applications are out of reach
+        self.assertEqual(transition('reviewed', job_id=3, consultancy_id=1), 0)
+        self.assertEqual(transition('reviewed', consultancy_id=1, from_statuses=['applied']), 149)
+        db.session.commit()
+
+        self.assertEqual(self.counts(JOB_SCOPE, 1),
+                         {'reviewed': 99, 'interviewed': 1, 'hired': 1, 'rejected': 199, 'total': 300})
+        self.assertEqual(self.counts(CONSULTANCY_SCOPE, 1)['reviewed'], 149)
+        self.assertEqual(self.counts(CONSULTANCY_SCOPE, 2), {'applied': 20, 'total': 20})
+        with self.assertRaises(ValueError):
+            transition('archived', job_id=1)
+        self.assertEqual(check_consistency(), [])
+
+        db.session.execute(update(ApplicationStatusCount).values(count=0))
+        db.session.commit()
+        self.assertTrue(check_consistency(repair=True))
+        self.assertEqual(check_consistency(), [])
+        print("✅ Bulk transitions move many applications with one statement")
+
+    def test_applications_routes(self):
+        """Test the applications page reads the counters and the bulk form moves applications"""
+        applications = self.apply(1, 5)
+        self.apply(3, 2, start=100)
+        context = {}
+        with patch('app.routes.roles.consultancy_routes.render_template',
+                   side_effect=lambda template, **kwargs: context.update(kwargs) or ''):
+            client = self.app.test_client()
+            with client.session_transaction() as session:
+                session.update(user_id=1, role='consultancy')
+            client.post('/pipeline/applications/status', data={
+                'status': 'rejected', 'application_ids': [str(application.id) for application in applications[:3]]
+            })
+            client.get('/pipeline/applications')
+            self.assertEqual(context['stats'], {'total': 5, 'new': 2, 'reviewed': 0, 'interviewed': 0,
+                                                'hired': 0, 'rejected': 3})
+            self.assertEqual(len(context['applications'].items), 5)
+
+            client.get('/pipeline/applications?job_id=1&status=applied')
+            self.assertEqual({application.status for application in context['applications'].items}, {'applied'})
+            self.assertEqual(context['job_counts'][2]['total'], 0)
+
+            # Moving a whole job needs the status to move from
+            client.post('/pipeline/applications/status', data={'status': 'reviewed', 'job_id': '1'})
+            client.post('/pipeline/applications/status', data={'status': 'reviewed', 'job_id': '1',
+                                                               'from_status': 'applied'})
+            client.get('/pipeline/applications?job_id=1')
+            self.assertEqual((context['stats']['reviewed'], context['stats']['rejected']), (2, 3))
+            client.get('/pipeline/applications?job_id=3')  # not this consultancy's job
+            self.assertIsNone(context['filters']['job_id'])
+        print("✅ The applications page is served from the status counts")
+
+    def test_applications_page_renders(self):
+        """Test the applications template lists the applications with a form posting to the status route"""
+        self.apply(1, 2)
+        client = self.app.test_client()
+        with client.session_transaction() as session:
+            session.update(user_id=1, role='consultancy')
+        page = client.get('/pipeline/applications?job_id=1&status=applied').get_data(as_text=True)
+        self.assertIn('action="/pipeline/applications/status"', page)
+        self.assertEqual(page.count('name="application_ids"'), 2)
+        self.assertIn('Move All Applied', page)
+        print("✅ The applications page renders the status form")
+
+    def test_failed_status_update_rolls_back(self):
+        """Test a database error while moving applications is flashed and leaves the session clean"""
+        applications = self.apply(1, 2)
+        client = self.app.test_client()
+        with client.session_transaction() as session:
+            session.update(user_id=1, role='consultancy')
+        deadlock = OperationalError('UPDATE job_applications', {}, Exception('Deadlock found'))
+        with patch('app.routes.roles.consultancy_routes.transition', side_effect=deadlock):
+            response = client.post('/pipeline/applications/status', data={
+                'status': 'reviewed', 'application_ids': [str(applications[0].id)]
+            })
+        self.assertEqual(response.status_code, 302)
+        with client.session_transaction() as session:
+            self.assertEqual(session['_flashes'][0][0], 'error')
+        self.assertEqual(self.counts(JOB_SCOPE, 1), {'applied': 2, 'total': 2})
+        print("✅ A failed status update rolls back and flashes")
+
+if __name__ == '__main__':
+    unittest.main()
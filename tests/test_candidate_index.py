@@ -0,0 +1,202 @@
+"""
+Candidate Index Tests
+Tests skill matching, ranking, filters and incremental updates of the consultancy candidate search
+"""
+
+import json
+import os
+import sys
+import threading
+import unittest
+from unittest.mock import patch
+
+# Add the parent directory to the path so we can import the app
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app, db
+from app.models import JobSeekerProfile, Skill
+from app.routes.roles.consultancy_routes import consultancy_routes_bp
+from app.services.activity_tracker import activity_tracker
+from app.services.candidate_index import (CandidateIndex, CandidateSearch, get_candidate_search,
+                                          parse_experience_range, parse_skills)
+from app.services.reference_data import bump_reference_version
+from app.services.typeahead import normalize
+
+SKILL_IDS = {normalize(name): skill_id for skill_id, name in
+             enumerate(['Python', 'SQL', 'React', 'Docker', 'Node.js'], start=1)}
+
+def profile(profile_id, skills, experience=0, **fields):
+    return {'id': profile_id, 'skills': json.dumps(skills), 'experience_years': experience, **fields}
+
+class TestCandidateIndex(unittest.TestCase):
+    """Test matching, ranking and paging on the index alone"""
+
+    def setUp(self):
+        self.index = CandidateIndex(SKILL_IDS)
+        self.index.upsert([
+            profile(1, ['Python', 'SQL', 'React'], 2, job_title='Full Stack Developer', current_location='Austin, TX'),
+            profile(2, ['python', 'Cobol'], 10, job_title='Backend Developer', preferred_location='Dallas, TX'),
+            profile(3, ['SQL', 'Docker'], 5, job_title='Data Engineer', current_location='Dallas, TX'),
+            profile(4, 'React, Node.js', 1, job_title='Frontend Developer'),
+            profile(5, ['Python', 'SQL', 'Docker'], 30, job_title='Platform Engineer'),
+        ])
+
+    def search(self, **filters):
+        return self.index.search(**filters).items
+
+    def test_parsing(self):
+        """Test skills and experience ranges are read from the stored and submitted forms"""
+        self.assertEqual(parse_skills('["Python", {"name": "SQL"}, ""]'), ['Python', 'SQL'])
+        self.assertEqual(parse_skills('react, node.js'), ['react', 'node.js'])
+        self.assertEqual(parse_experience_range('3-5'), (3, 5))
+        self.assertEqual(parse_experience_range('10+'), (10, None))
+        self.assertEqual(parse_experience_range('senior'), (None, None))
+        self.assertEqual(self.index.skills_of(2), [1])  # Cobol is outside the taxonomy
+        print("✅ Skills resolve to taxonomy ids and experience ranges parse")
+
+    def test_overlap_ranking(self):
+        """Test candidates rank by weighted skill coverage, then experience"""
+        self.assertEqual(self.search(skills=['Python', 'SQL']), [5, 1, 2, 3])
+        self.assertEqual(self.search(skills=['docker']), [5, 3])
+        self.assertEqual(self.search(skills=['Python', 'SQL'], match_all=True), [5, 1])
+        self.assertEqual(self.search(skills=['Cobol']), [])
+        self.assertEqual(self.index.resolve(['SQL', 'Cobol']), ([2], ['Cobol']))
+        self.assertEqual(self.search(), [5, 2, 3, 1, 4])  # browsing ranks by experience
+        print("✅ Set overlap scoring ranks the best matches first")
+
+    def test_filters(self):
+        """Test title words, experience range and location filters"""
+        self.assertEqual(self.search(skills=['Python'], query='developer'), [2, 1])
+        self.assertEqual(self.search(skills=['SQL'], experience_min=3, experience_max=10), [3])
+        self.assertEqual(self.search(experience_min=10), [5, 2])
+        self.assertEqual(self.search(locations={'dallas, tx': None}), [2, 3])
+        self.assertEqual(self.search(locations={'Paris'}), [])
+        print("✅ Filters intersect as masks")
+
+    def test_cursor_paging(self):
+        """Test cursors walk forwards and back over the ranked candidates"""
+        first = self.index.search(skills=['Python', 'SQL'], per_page=2)
+        self.assertEqual((first.items, first.total), ([5, 1], 4))
+        second = self.index.search(skills=['Python', 'SQL'], per_page=2, cursor=first.next_cursor)
+        self.assertEqual((second.items, second.has_next), ([2, 3], False))
+        back = self.index.search(skills=['Python', 'SQL'], per_page=2, cursor=second.prev_cursor)
+        self.assertEqual(back.items, [5, 1])
+        with self.assertRaises(ValueError):
+            self.index.search(cursor='not-a-cursor')
+        print("✅ Candidates are paged with (score, id) cursors")
+
+    def test_updates_survive_compaction(self):
+        """Test edits and removals through slot compaction"""
+        for years in range(20):
+            self.index.upsert([profile(4, ['Docker'], years)])
+        self.index.remove([3])
+        self.assertEqual(self.search(skills=['Docker']), [5, 4])
+        self.assertEqual(self.search(skills=['React']), [1])
+        self.assertEqual(self.index.skills_of(4), [4])
+        self.assertLess(self.index._size, 20)  # tombstoned slots were compacted away
+        self.assertEqual(len(self.index), 4)
+        print("✅ Incremental updates stay correct across compaction")
+
+class TestCandidateSearch(unittest.TestCase):
+    """Test the index follows jobseeker_profiles and the skill taxonomy"""
+
+    def setUp(self):
+        """Set up test environment"""
+        self.app = create_app('testing')
+        self.app.register_blueprint(consultancy_routes_bp, name='consultancy_search', url_prefix='/search')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        db.session.add_all([Skill(name='python', display_name='Python'),
+                            Skill(name='sql', display_name='SQL'),
+                            Skill(name='machine_learning', display_name='ML')])
+        db.session.add_all([
+            JobSeekerProfile(user_id=1, skills=json.dumps(['Python', 'SQL']), experience_years=4,
+                             job_title='Data Engineer', current_location='Austin, TX'),
+            JobSeekerProfile(user_id=2, skills=json.dumps(['Machine Learning', 'Rust']), experience_years=7),
+        ])
+        db.session.commit()
+
+    def tearDown(self):
+        """Clean up test environment"""
+        activity_tracker.flush()
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_profile_edits_and_taxonomy_changes(self):
+        """Test own profile edits apply at once and taxonomy changes re-resolve skills"""
+        search = get_candidate_search()
+        self.assertEqual(search.search(skills=['ml']).total, 1)  # by display name
+        self.assertEqual(search.search(skills=['rust']).total, 0)
+
+        first = JobSeekerProfile.query.filter_by(user_id=1).first()
+        first.skills = json.dumps(['Rust'])
+        db.session.commit()
+        self.assertEqual(search.search(skills=['python']).total, 0)
+
+        db.session.add(Skill(name='rust', display_name='Rust'))
+        bump_reference_version()
+        db.session.commit()
+        self.assertEqual(search.search(skills=['rust']).total, 2)
+
+        db.session.delete(first)
+        db.session.commit()
+        self.assertEqual(search.search(skills=['rust']).total, 1)
+        print("✅ The index follows profile edits and the skill taxonomy")
+
+    def test_rebuild_keeps_serving_the_current_index(self):
+        """Test searches during a rebuild use the current index until the new one is swapped in"""
+        search = CandidateSearch()
+        search.background = False
+        self.assertEqual(search.search(skills=['python']).total, 1)
+        search.background = True
+        release = threading.Event()
+        build = search._build
+
+        def slow_build():
+            release.wait(5)
+            build()
+
+        with patch.object(search, '_build', side_effect=slow_build):
+            search.rebuild()
+            builder = search._builder
+            JobSeekerProfile.query.filter_by(user_id=2).first().skills = json.dumps(['Python'])
+            db.session.commit()
+            search.mark_changed({2})  # this worker's own edit, applied to the current index
+            self.assertEqual(search.search(skills=['python']).total, 2)
+            self.assertEqual(search.resolve(['Python', 'Cobol'])[1], ['Cobol'])
+            release.set()
+            builder.join(5)
+        self.assertEqual(search.search(skills=['python']).total, 2)
+        print("✅ Rebuilds swap the new index in")
+
+    def test_candidates_route(self):
+        """Test the candidates page renders matches from the index"""
+        context = {}
+        with patch('app.routes.roles.consultancy_routes.render_template',
+                   side_effect=lambda template, **kwargs: context.update(kwargs) or ''):
+            client = self.app.test_client()
+            with client.session_transaction() as session:
+                session.update(user_id=1, role='consultancy')
+            client.get('/search/candidates?skills=Python, Cobol&experience=3-5&location=Austin, TX')
+        self.assertEqual([candidate.user_id for candidate in context['candidates'].items], [1])
+        self.assertEqual(context['total_count'], 1)
+        self.assertEqual(context['unknown_skills'], ['Cobol'])
+        self.assertEqual(context['page_args']['experience'], '3-5')
+        print("✅ The candidates page is served from the candidate index")
+
+    def test_candidates_page_renders(self):
+        """Test the candidates template renders results and the empty state"""
+        client = self.app.test_client()
+        with client.session_transaction() as session:
+            session.update(user_id=1, role='consultancy')
+        found = client.get('/search/candidates?skills=Python').get_data(as_text=True)
+        self.assertIn('Data Engineer', found)
+        self.assertIn('1 candidates found', found)
+        empty = client.get('/search/candidates?q=astronaut').get_data(as_text=True)
+        self.assertIn('No Candidates Found', empty)
+        print("✅ The candidates page renders")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+"""
+Compact JWT Tests
+Tests role-id and permission-fingerprint token claims
+"""
+
+import os
+import sys
+import unittest
+
+# Add the parent directory to the path so we can import the app
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import jwt
+
+from app import create_app, db
+from app.auth.auth_models import AuthUser, Permission, PermissionSet, Role, UserRole
+from app.services.activity_tracker import activity_tracker
+from app.services.auth_service import JWTAuthService
+from app.services.principal_service import permission_set_fingerprint, resolve_permission_set
+
+class TestCompactJWT(unittest.TestCase):
+    """Test compact JWT payloads"""
+
+    def setUp(self):
+        """Set up test environment"""
+        self.app = create_app('testing')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        self.permissions = [
+            Permission(name=f'resource{i}.read', display_name=f'Read {i}', resource=f'resource{i}', action='read')
+            for i in range(40)
+        ]
+        self.role = Role(name='admin', display_name='Admin')
+        self.role.permissions = self.permissions
+        self.user = AuthUser(username='jwtuser', email='jwtuser@test.com')
+        self.user.set_password('password123')
+        db.session.add_all(self.permissions + [self.role, self.user])
+        db.session.flush()
+        db.session.add(UserRole(user_id=self.user.id, role_id=self.role.id))
+        db.session.commit()
+
+    def tearDown(self):
+        """Clean up test environment"""
+        activity_tracker.flush()  # Write requests' last-activity before the tables go
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def _decode(self, token):
+        return jwt.decode(token, options={'verify_signature': False})
+
+    def test_payload_carries_role_ids_and_fingerprint(self):
+        """Test the token has role ids and a fingerprint instead of name lists"""
+        payload = self._decode(self.user.generate_jwt_token('access'))
+        self.assertNotIn('roles', payload)
+        self.assertNotIn('permissions', payload)
+        self.assertEqual(payload['role_ids'], [self.role.id])
+        self.assertEqual(payload['perm_fp'], permission_set_fingerprint(p.name for p in self.permissions))
+        print("✅ Token carries role ids and permission fingerprint")
+
+    def test_fingerprint_resolves_from_table(self):
+        """Test a fingerprint resolves through the permission_sets table"""
+        payload = self._decode(self.user.generate_jwt_token('access'))
+        self.assertEqual(PermissionSet.query.count(), 1)
+        self.assertEqual(resolve_permission_set(payload['perm_fp']), {p.name for p in self.permissions})
+        self.assertIsNone(resolve_permission_set('0000000000000000'))
+        print("✅ Fingerprint resolves to permission names")
+
+    def test_compact_token_is_smaller(self):
+        """Test the compact token is smaller than the legacy format"""
+        compact = self.user.generate_jwt_token('access')
+        self.app.config['JWT_COMPACT_CLAIMS'] = False
+        legacy = self.user.generate_jwt_token('access')
+        self.assertIn('permissions', self._decode(legacy))
+        self.assertLess(len(compact), len(legacy) / 2)
+        print("✅ Compact tokens are smaller")
+
+    def test_compact_token_verifies(self):
+        """Test verify_token accepts compact tokens"""
+        user, message = JWTAuthService.verify_token(self.user.generate_jwt_token('access'))
+        self.assertEqual(user.id, self.user.id)
+        print("✅ Compact tokens verify")
+
+    def test_permission_set_endpoint(self):
+        """Test clients can expand a fingerprint"""
+        token = self.user.generate_jwt_token('access')
+        fingerprint = self._decode(token)['perm_fp']
+        client = self.app.test_client()
+        response = client.get(f'/auth/permission-sets/{fingerprint}', headers={'Authorization': f'Bearer {token}'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.get_json()['permissions']), 40)
+        self.assertIn('immutable', response.headers['Cache-Control'])
+        print("✅ Permission set endpoint expands fingerprints")
+
+if __name__ == '__main__':
+    unittest.main()
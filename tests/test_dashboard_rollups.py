@@ -0,0 +1,183 @@
+"""
+Dashboard Rollup Tests
+Tests the dashboard_counters aggregator, reader and consistency checker
+"""
+
+import os
+import sys
+import time
+import unittest
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+# Add the parent directory to the path so we can import the app
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event
+from sqlalchemy.exc import OperationalError
+
+from app import create_app, db
+from app.auth.auth_models import (
+    AuthUser, DashboardCounter, SecurityLog, SecurityEventType, SubscriptionPlan, UserSubscription
+)
+from app.services.dashboard_rollups import GAUGE_DATE, dashboard_rollups
+
+class TestDashboardRollups(unittest.TestCase):
+    """Test rolled-up dashboard statistics"""
+
+    def setUp(self):
+        """Set up test environment"""
+        self.app = create_app('testing')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        users = [AuthUser(username=f'user{i}', email=f'user{i}@test.com', is_active=i != 0) for i in range(3)]
+        for user in users:
+            user.password_hash = 'unused'
+        plan = SubscriptionPlan(name='Pro', display_name='Pro', price_monthly=10, price_yearly=100)
+        db.session.add_all(users + [plan])
+        db.session.commit()
+
+        db.session.add_all([
+            UserSubscription(user_id=users[0].id, plan_id=plan.id, status='active'),
+            UserSubscription(user_id=users[1].id, plan_id=plan.id, status='cancelled')
+        ])
+        now = datetime.utcnow()
+        self._log(SecurityEventType.LOGIN_FAILED, 'medium', now)
+        self._log(SecurityEventType.LOGIN_FAILED, 'high', now)
+        self._log(SecurityEventType.LOGIN_SUCCESS, 'low', now - timedelta(days=3))
+        self._log(SecurityEventType.SUSPICIOUS_ACTIVITY, 'high', now - timedelta(days=30))
+        db.session.commit()
+
+    def tearDown(self):
+        """Clean up test environment"""
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def _log(self, event_type, severity, created_at):
+        db.session.add(SecurityLog(event_type=event_type, severity=severity, created_at=created_at))
+
+    def _count_queries(self):
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        self.addCleanup(event.remove, db.engine, 'before_cursor_execute', listener)
+        return statements
+
+    def test_first_read_backfills_every_day(self):
+        """Test the first read builds day buckets and totals from the base tables"""
+        stats = dashboard_rollups.read()
+
+        self.assertEqual(stats.gauge('users'), 3)
+        self.assertEqual(stats.gauge('users', 'active'), 2)
+        self.assertEqual(stats.gauge('subscriptions'), 2)
+        self.assertEqual(stats.gauge('subscriptions', 'active'), 1)
+        self.assertEqual(stats.breakdown('subscriptions', 'plan:'), [('Pro', 2)])
+        self.assertEqual(stats.daily('security_events'), 2)
+        self.assertEqual(stats.daily('security_events', since=stats.today - timedelta(days=7)), 3)
+        self.assertEqual(stats.daily('security_events', 'event_type:login_failed'), 2)
+        self.assertEqual(stats.gauge('security_events', 'severity:high'), 2)
+        self.assertEqual(stats.gauge('security_events'), 4)
+        print("✅ First read backfills day buckets and totals")
+
+    def test_fresh_read_is_one_query(self):
+        """Test a dashboard read within the staleness window is a single query"""
+        dashboard_rollups.read()
+
+        statements = self._count_queries()
+        stats = dashboard_rollups.read()
+        self.assertEqual(stats.gauge('users'), 3)
+        self.assertEqual(len(statements), 1)
+        self.assertIn('dashboard_counters', statements[0])
+        print("✅ Fresh dashboard read runs one query")
+
+    def test_stale_read_refreshes_open_days(self):
+        """Test new events show up once the rollups are stale"""
+        dashboard_rollups.read()
+        self._log(SecurityEventType.LOGIN_FAILED, 'high', datetime.utcnow())
+        db.session.commit()
+
+        self.assertEqual(dashboard_rollups.read().daily('security_events'), 2)
+
+        max_staleness = dashboard_rollups.max_staleness
+        dashboard_rollups.max_staleness = -1
+        try:
+            stats = dashboard_rollups.read()
+        finally:
+            dashboard_rollups.max_staleness = max_staleness
+
+        self.assertEqual(stats.daily('security_events'), 3)
+        self.assertEqual(stats.gauge('security_events', 'severity:high'), 3)
+        self.assertGreaterEqual(stats.refreshed_at, int(time.time()) - 5)
+        print("✅ Stale reads refresh the open day buckets")
+
+    def test_failed_refresh_serves_previous_counters(self):
+        """Test a refresh that loses a deadlock leaves the read on the counters it loaded"""
+        dashboard_rollups.read()
+        deadlock = OperationalError('DELETE FROM dashboard_counters', {}, Exception('Deadlock found'))
+        with patch.object(dashboard_rollups, 'max_staleness', -1), \
+                patch.object(dashboard_rollups, '_insert', side_effect=deadlock):
+            stats = dashboard_rollups.read()
+
+        self.assertEqual(stats.gauge('users'), 3)
+        self.assertEqual(dashboard_rollups.read().gauge('users'), 3)  # The failed refresh was rolled back
+        print("✅ A failed refresh serves the previous counters")
+
+    def test_stale_read_wakes_background_aggregator(self):
+        """Test reads leave refreshing to a running aggregator and serve the last counters"""
+        dashboard_rollups.read()
+        self._log(SecurityEventType.LOGIN_FAILED, 'high', datetime.utcnow())
+        db.session.commit()
+
+        statements = self._count_queries()
+        with patch.object(dashboard_rollups, '_thread', object()), \
+                patch.object(dashboard_rollups, 'interval', 60), \
+                patch.object(dashboard_rollups, 'max_staleness', -1), \
+                patch.object(dashboard_rollups, '_wake_event') as wake_event:
+            stats = dashboard_rollups.read()
+
+        self.assertEqual(stats.daily('security_events'), 2)
+        self.assertEqual(len(statements), 1)
+        wake_event.set.assert_called_once()
+        print("✅ Stale reads wake the aggregator instead of refreshing inline")
+
+    def test_refresh_keeps_closed_days(self):
+        """Test closed day buckets survive deletion of their base rows"""
+        dashboard_rollups.refresh(full=True)
+        SecurityLog.query.filter(SecurityLog.created_at < datetime.utcnow() - timedelta(days=10)).delete()
+        db.session.commit()
+
+        dashboard_rollups.refresh()
+        stats = dashboard_rollups.read()
+        self.assertEqual(stats.gauge('security_events'), 4)
+        self.assertEqual(stats.gauge('security_events', 'event_type:suspicious_activity'), 1)
+        print("✅ Closed day buckets outlive log cleanup")
+
+    def test_consistency_checker_detects_and_repairs(self):
+        """Test drifted counters are reported and rewritten"""
+        dashboard_rollups.refresh(full=True)
+        self.assertEqual(dashboard_rollups.check_consistency(), [])
+
+        today = datetime.utcnow().date()
+        DashboardCounter.query.filter_by(
+            metric='security_events', bucket_date=today, dimension='total'
+        ).update({'value': 99})
+        DashboardCounter.query.filter_by(
+            metric='users', bucket_date=GAUGE_DATE, dimension='total'
+        ).update({'value': 7})
+        db.session.commit()
+
+        mismatches = dashboard_rollups.check_consistency()
+        self.assertEqual(
+            {(m['metric'], m['dimension'], m['expected'], m['actual']) for m in mismatches},
+            {('security_events', 'total', 2, 99), ('users', 'total', 3, 7)}
+        )
+
+        dashboard_rollups.check_consistency(repair=True)
+        self.assertEqual(dashboard_rollups.check_consistency(), [])
+        print("✅ Consistency checker reports and repairs drift")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,154 @@
+"""
+Geo Index Tests
+Tests the NumPy city grid, radius queries and the city-radius job search
+"""
+
+import os
+import random
+import sys
+import unittest
+from unittest.mock import patch
+
+# Add the parent directory to the path so we can import the app
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from app import create_app, db
+from app.models import City, Country, Job, State
+from app.routes.roles.jobseeker_routes import jobseeker_routes_bp
+from app.services.activity_tracker import activity_tracker
+from app.services.geo_index import GeoGrid, get_geo_index, haversine_km
+from app.services.reference_data import bump_reference_version
+
+class TestGeoIndex(unittest.TestCase):
+    """Test radius queries over city coordinates"""
+
+    def setUp(self):
+        """Set up test environment"""
+        self.app = create_app('testing')
+        self.app.register_blueprint(jobseeker_routes_bp, name='jobseeker_search', url_prefix='/search')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        us = Country(name='United States', code_alpha2='US', code_alpha3='USA')
+        db.session.add(us)
+        db.session.flush()
+        texas = State(name='Texas', code='TX', country_id=us.id)
+        illinois = State(name='Illinois', code='IL', country_id=us.id)
+        missouri = State(name='Missouri', code='MO', country_id=us.id)
+        db.session.add_all([texas, illinois, missouri])
+        db.session.flush()
+        self.cities = {}
+        for name, state, lat, lon in (('Austin', texas, 30.2672, -97.7431),
+                                      ('Round Rock', texas, 30.5083, -97.6789),
+                                      ('San Antonio', texas, 29.4241, -98.4936),
+                                      ('Dallas', texas, 32.7767, -96.7970),
+                                      ('Springfield', illinois, 39.7817, -89.6501),
+                                      ('Springfield', missouri, 37.2090, -93.2923),
+                                      ('Marfa', texas, None, None)):
+            city = City(name=name, state_id=state.id, latitude=lat, longitude=lon)
+            db.session.add(city)
+            db.session.flush()
+            self.cities[(name, state.code)] = city.id
+        db.session.commit()
+
+    def tearDown(self):
+        """Clean up test environment"""
+        activity_tracker.flush()
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_haversine(self):
+        """Test vectorized distances against known great-circle distances"""
+        distances = haversine_km(30.2672, -97.7431, np.array([32.7767, 30.2672]), np.array([-96.7970, -97.7431]))
+        self.assertAlmostEqual(distances[0], 293, delta=2)
+        self.assertEqual(distances[1], 0)
+        print("✅ Haversine distances are vectorized and accurate")
+
+    def test_grid_matches_brute_force(self):
+        """Test the grid returns exactly the points a full scan would, including across the antimeridian and poles"""
+        rng = random.Random(7)
+        lats = [rng.uniform(-90, 90) for _ in range(5000)]
+        lons = [rng.uniform(-180, 180) for _ in range(5000)]
+        grid = GeoGrid(range(5000), lats, lons)
+        for lat, lon, radius in ((0, 179.9, 300), (0, -179.9, 300), (89.5, 10, 200), (-45, 30, 1000), (40, -100, 50)):
+            ids, distances = grid.within(lat, lon, radius)
+            expected = set(np.nonzero(haversine_km(lat, lon, np.array(lats), np.array(lons)) <= radius)[0].tolist())
+            self.assertEqual(set(ids.tolist()), expected)
+            self.assertTrue(np.all(np.diff(distances) >= 0))
+        print("✅ Grid candidates match a brute-force scan")
+
+    def test_near_city_and_labels(self):
+        """Test radius queries resolve to city ids and unambiguous location labels"""
+        geo_index = get_geo_index()
+        austin = self.cities[('Austin', 'TX')]
+        matches = geo_index.near_city(austin, 50)
+        self.assertEqual([city_id for city_id, _ in matches], [austin, self.cities[('Round Rock', 'TX')]])
+        self.assertEqual(geo_index.near_city(self.cities[('Marfa', 'TX')], 50), [(self.cities[('Marfa', 'TX')], 0.0)])
+
+        labels = geo_index.location_labels(matches)
+        self.assertIn('Round Rock, TX', labels)
+        self.assertIn('Austin, Texas, United States', labels)
+        self.assertEqual(labels['Austin'], (austin, 0.0))
+
+        springfield = self.cities[('Springfield', 'IL')]
+        labels = geo_index.location_labels(geo_index.near_city(springfield, 50))
+        self.assertIn('Springfield, IL', labels)
+        self.assertNotIn('Springfield', labels)  # also names the Missouri city, 400 km away
+
+        self.assertEqual(geo_index.resolve(' round rock ,tx'), self.cities[('Round Rock', 'TX')])
+        self.assertIsNone(geo_index.resolve('Atlantis'))
+        print("✅ Radius queries resolve to cities and location labels")
+
+    def test_nearby_endpoint(self):
+        """Test the nearby cities API lists cities with distances and 404s unknown ones"""
+        with patch('app.routes.reference_routes.AuthMiddleware.require_auth', return_value=None):
+            client = self.app.test_client()
+            response = client.get(f"/api/reference/cities/{self.cities[('Austin', 'TX')]}/nearby?radius=150")
+            self.assertEqual(response.status_code, 200)
+            results = response.get_json()['results']
+            self.assertEqual([city['name'] for city in results], ['Austin', 'Round Rock', 'San Antonio'])
+            self.assertAlmostEqual(results[2]['distance_km'], 118, delta=2)
+            self.assertEqual(client.get('/api/reference/cities/999/nearby').status_code, 404)
+        print("✅ Nearby cities are served with distances")
+
+    def test_index_follows_reference_data(self):
+        """Test coordinate edits are picked up when the reference data version moves"""
+        geo_index = get_geo_index()
+        austin = self.cities[('Austin', 'TX')]
+        self.assertEqual(len(geo_index.near_city(austin, 50)), 2)
+
+        city = City.query.get(self.cities[('San Antonio', 'TX')])
+        city.latitude, city.longitude = 30.3, -97.8
+        bump_reference_version()
+        db.session.commit()
+        self.assertEqual(len(geo_index.near_city(austin, 50)), 3)
+        print("✅ The grid is rebuilt on reference data changes")
+
+    def test_job_search_by_radius(self):
+        """Test the jobs page filters by city radius and ranks by distance"""
+        for title, location in (('Old Austin', 'Austin, TX'),
+                                ('Nearby', 'Round Rock, Texas'), ('Far', 'Dallas, TX'), ('Austin', 'Austin')):
+            db.session.add(Job(consultancy_id=1, title=title, description='-', location=location))
+        db.session.commit()
+
+        context = {}
+        with patch('app.routes.roles.jobseeker_routes.render_template',
+                   side_effect=lambda template, **kwargs: context.update(kwargs) or ''):
+            client = self.app.test_client()
+            with client.session_transaction() as session:
+                session.update(user_id=1, role='jobseeker')
+
+            client.get(f"/search/jobs?city_id={self.cities[('Austin', 'TX')]}&radius=50")
+            self.assertEqual([job.title for job in context['jobs'].items], ['Austin', 'Old Austin', 'Nearby'])
+            self.assertAlmostEqual(context['distances']['round rock, texas'], 28, delta=2)
+
+            client.get('/search/jobs?location=Dallas,%20TX&radius=10')
+            self.assertEqual([job.title for job in context['jobs'].items], ['Far'])
+        print("✅ Job search joins the radius query against job locations")
+
+if __name__ == '__main__':
+    unittest.main()
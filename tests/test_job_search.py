@@ -0,0 +1,248 @@
+"""
+Job Search Tests
+Tests the in-memory BM25 job index, its filters, cursors and incremental updates
+"""
+
+import json
+import os
+import sys
+import threading
+import unittest
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+# Add the parent directory to the path so we can import the app
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app, db
+from app.models import Job
+from app.routes.roles.jobseeker_routes import jobseeker_routes_bp
+from app.services.activity_tracker import activity_tracker
+from app.services.job_search import JobSearch, JobSearchIndex, get_job_search
+
+class FakeClock:
+    """Manually advanced monotonic clock"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+def job(job_id, title, description='-', **fields):
+    return {'id': job_id, 'title': title, 'description': description, 'is_active': True, **fields}
+
+class TestJobSearchIndex(unittest.TestCase):
+    """Test ranking, filtering and paging on the index alone"""
+
+    def setUp(self):
+        self.index = JobSearchIndex(merge_threshold=4)
+        self.index.upsert([
+            job(1, 'Python Developer', 'Build APIs', skills_required=json.dumps(['Django', 'SQL']),
+                location='Austin, TX', category='Technology', job_type='full-time', salary_min=90000, salary_max=120000),
+            job(2, 'Data Analyst', 'Reports in Python and SQL', location='Dallas, TX', category='Finance',
+                job_type='contract', salary_min=60000),
+            job(3, 'Senior Python Engineer', 'Python services, python tooling', location='Austin, TX',
+                category='Technology', job_type='full-time', salary_max=150000),
+            job(4, 'Python Developer', 'Expired posting', expires_at=datetime.utcnow() - timedelta(days=1)),
+            job(5, 'Python Developer', 'Closed posting', is_active=False),
+        ])
+
+    def search(self, **filters):
+        return self.index.search(**filters).items
+
+    def test_bm25_ranking(self):
+        """Test every term must match and title hits outrank body hits"""
+        self.assertEqual(self.search(query='python'), [3, 1, 2])
+        self.assertEqual(self.search(query='python sql'), [1, 2])
+        self.assertEqual(self.search(query='the django'), [1])
+        self.assertEqual(self.search(query='python cobol'), [])
+        print("✅ Queries match every term and rank with BM25")
+
+    def test_filters(self):
+        """Test category, type, location, salary and validity filters"""
+        self.assertEqual(self.search(category='technology'), [3, 1])
+        self.assertEqual(self.search(query='python', job_type='contract'), [2])
+        self.assertEqual(self.search(locations={'austin, tx': None}), [3, 1])
+        self.assertEqual(self.search(salary_min=100000), [3, 1])
+        self.assertEqual(self.search(salary_max=70000), [2])
+        self.assertEqual(self.search(locations={'Austin, TX': 20.0, 'Dallas, TX': 5.0}), [2, 3, 1])
+        print("✅ Filters intersect as masks and radius browsing ranks by distance")
+
+    def test_cursor_paging(self):
+        """Test cursors walk forwards and back over the ranked results"""
+        first = self.index.search(query='python', per_page=2)
+        self.assertEqual((first.items, first.total, first.has_prev), ([3, 1], 3, False))
+        second = self.index.search(query='python', per_page=2, cursor=first.next_cursor)
+        self.assertEqual((second.items, second.has_next), ([2], False))
+        back = self.index.search(query='python', per_page=2, cursor=second.prev_cursor)
+        self.assertEqual((back.items, back.has_prev), ([3, 1], False))
+        with self.assertRaises(ValueError):
+            self.index.search(cursor='not-a-cursor')
+        print("✅ Results are paged with (score, id) cursors")
+
+    def test_updates_survive_merges(self):
+        """Test edits and removals through merges and slot compaction"""
+        for version in range(20):
+            self.index.upsert([job(1, f'Rust Developer {version}')])
+        self.index.remove([2])
+        self.assertEqual(self.search(query='rust'), [1])
+        self.assertEqual(self.search(query='python'), [3])
+        self.assertLess(self.index._size, 20)  # tombstoned slots were compacted away
+        self.assertEqual(len(self.index), 4)
+        print("✅ Incremental updates stay correct across merges")
+
+    def test_skill_filter(self):
+        """Test any/all skill filters read the per-skill postings, also after compaction"""
+        index = JobSearchIndex(merge_threshold=4, skill_ids={'django': 1, 'sql': 2, 'python': 3})
+        index.upsert([job(1, 'Backend', skills_required=json.dumps(['Django', 'SQL'])),
+                      job(2, 'Analyst', skills_required='SQL, Excel'),
+                      job(3, 'Scripting', skills_required=json.dumps(['Python']))])
+        self.assertEqual(index.search(skills=[2]).items, [2, 1])
+        self.assertEqual(index.search(skills=[1, 2], match_all=True).items, [1])
+        self.assertEqual(index.search(skills=[4]).total, 0)
+        self.assertEqual(index.search(skills=[]).total, 0)
+
+        for version in range(10):
+            index.upsert([job(3, f'Scripting {version}', skills_required=json.dumps(['Python', 'SQL']))])
+        self.assertLess(index._size, 10)  # tombstoned slots were compacted away
+        self.assertEqual(index.search(skills=[2, 3], match_all=True).items, [3])
+        self.assertEqual(index.search(skills=[2]).items, [3, 2, 1])
+        print("✅ Skill filters are served from the index")
+
+    def test_taxonomy_change_is_not_a_rebuild(self):
+        """Test a new taxonomy maps skill ids onto the indexed names in place"""
+        index = JobSearchIndex(skill_ids={'django': 1})
+        index.upsert([job(1, 'Backend', skills_required=json.dumps(['Django', 'Postgres'])),
+                      job(2, 'DBA', skills_required=json.dumps(['PostgreSQL']))])
+        self.assertEqual(index.search(skills=[2]).total, 0)
+
+        index.set_skill_ids({'django': 1, 'postgres': 2, 'postgresql': 2})
+        self.assertEqual(index.search(skills=[2]).items, [2, 1])
+        self.assertEqual(index.search(skills=[1, 2], match_all=True).items, [1])
+        print("✅ Taxonomy changes remap the name postings without re-indexing")
+
+class TestJobSearchSync(unittest.TestCase):
+    """Test the index follows the jobs table"""
+
+    def setUp(self):
+        """Set up test environment"""
+        self.app = create_app('testing')
+        self.app.register_blueprint(jobseeker_routes_bp, name='jobseeker_search', url_prefix='/search')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        db.session.add_all([Job(consultancy_id=1, title='Python Developer', description='APIs', location='Austin, TX'),
+                            Job(consultancy_id=1, title='Java Developer', description='Services')])
+        db.session.commit()
+
+    def tearDown(self):
+        """Clean up test environment"""
+        activity_tracker.flush()
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_own_commits_apply_on_next_search(self):
+        """Test this worker's creates, edits and deletes show up at once"""
+        search = get_job_search()
+        self.assertEqual(search.search(query='developer').total, 2)
+
+        db.session.add(Job(consultancy_id=1, title='Go Developer', description='CLI tools'))
+        java = Job.query.filter_by(title='Java Developer').first()
+        java.title = 'Kotlin Engineer'
+        db.session.commit()
+        self.assertEqual(search.search(query='developer').total, 2)
+        self.assertEqual(search.search(query='kotlin').items, [java.id])
+
+        db.session.delete(java)
+        db.session.commit()
+        self.assertEqual(search.search(query='kotlin').total, 0)
+        print("✅ Own commits are indexed before the next search")
+
+    def test_other_workers_edits_are_polled(self):
+        """Test edits made elsewhere show up after the sync interval"""
+        clock = FakeClock()
+        worker = JobSearch(sync_interval=5.0, clock=clock, background=False)
+        self.assertEqual(worker.search(query='go').total, 0)
+
+        db.session.add(Job(consultancy_id=1, title='Go Developer', description='CLI tools'))
+        db.session.commit()  # this worker's hooks only notify the app's own index
+        self.assertEqual(worker.search(query='go').total, 0)
+        clock.advance(6)
+        self.assertEqual(worker.search(query='go').total, 1)
+        print("✅ Other workers' edits are picked up by polling updated_at")
+
+    def test_first_build_runs_in_background(self):
+        """Test the first search returns at once while the index is built off the request thread"""
+        worker = JobSearch()
+        release = threading.Event()
+        build = worker._build
+
+        def slow_build():
+            release.wait(5)
+            build()
+
+        with patch.object(worker, '_build', side_effect=slow_build):
+            page = worker.search(query='developer')
+            builder = worker._builder
+            self.assertTrue(worker.warming)
+            self.assertEqual((len(page.items), page.total, len(worker)), (2, None, 0))  # from the jobs table
+            self.assertEqual(worker.search(query='python').items, [1])
+            worker.mark_changed({1})  # commits do not wait for the build
+            release.set()
+            builder.join(5)
+        self.assertFalse(worker.warming)
+        self.assertEqual(worker.search(query='developer').total, 2)
+        print("✅ The first build runs in the background")
+
+    def test_first_search_waits_for_the_build(self):
+        """Test the first search waits up to warm_up_timeout for the index"""
+        worker = JobSearch(warm_up_timeout=5)
+        page = worker.search(query='developer')
+        self.assertFalse(worker.warming)
+        self.assertEqual(page.total, 2)
+        print("✅ The first search waits for a quick build")
+
+    def test_database_fallback_filters(self):
+        """Test the warm-up query applies the index's filters newest first"""
+        db.session.add(Job(consultancy_id=1, title='Go Developer', description='CLI', location='Dallas, TX',
+                           category='Technology', salary_min=50000, salary_max=70000))
+        db.session.add(Job(consultancy_id=1, title='Closed Developer', description='-', is_active=False))
+        db.session.commit()
+        worker = JobSearch()
+
+        titles = lambda page: [db.session.get(Job, job_id).title for job_id in page.items]
+        self.assertEqual(titles(worker._search_database(query='developer')),
+                         ['Go Developer', 'Java Developer', 'Python Developer'])
+        self.assertEqual(titles(worker._search_database(locations={'austin, tx': None})), ['Python Developer'])
+        self.assertEqual(titles(worker._search_database(category='technology', salary_min=60000)),
+                         ['Go Developer'])
+        self.assertEqual(worker._search_database(salary_min=80000).items, [])
+        self.assertEqual(worker._search_database(skills=[]).total, 0)
+
+        first = worker._search_database(per_page=2)
+        second = worker._search_database(per_page=2, cursor=first.next_cursor)
+        self.assertEqual((len(first.items), len(second.items), second.has_next), (2, 1, False))
+        print("✅ The database fallback filters and pages newest first")
+
+    def test_jobs_route(self):
+        """Test the jobs page renders full-text results from the index"""
+        context = {}
+        with patch('app.routes.roles.jobseeker_routes.render_template',
+                   side_effect=lambda template, **kwargs: context.update(kwargs) or ''):
+            client = self.app.test_client()
+            with client.session_transaction() as session:
+                session.update(user_id=1, role='jobseeker')
+            client.get('/search/jobs?search=python')
+        self.assertEqual([job.title for job in context['jobs'].items], ['Python Developer'])
+        self.assertEqual(context['total_count'], 1)
+        self.assertFalse(context['search_warming'])
+        self.assertEqual(context['page_args'], {'search': 'python'})
+        print("✅ The jobs page is served from the search index")
+
+if __name__ == '__main__':
+    unittest.main()
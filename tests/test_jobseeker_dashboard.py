@@ -0,0 +1,192 @@
+"""
+Jobseeker Dashboard Tests
+Tests the per-user dashboard rows follow profile and application writes and serve the dashboard pages
+"""
+
+import os
+import sys
+import unittest
+from unittest.mock import patch
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+# Add the parent directory to the path so we can import the app
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app, db
+from app.models import (ConsultancyProfile, Job, JobApplication, JobSeekerDashboard, JobSeekerProfile, Skill, User,
+                        UserType)
+from app.routes.roles.jobseeker_routes import jobseeker_routes_bp
+from app.services.activity_tracker import activity_tracker
+from app.services.application_pipeline import transition
+from app.services.jobseeker_dashboard import RECENT_LIMIT, get_dashboard, rebuild, record_job_view
+
+class TestJobseekerDashboard(unittest.TestCase):
+    """Test the dashboard read model is rewritten in the transactions that change it"""
+
+    def setUp(self):
+        """Set up test environment"""
+        self.app = create_app('testing')
+        self.app.register_blueprint(jobseeker_routes_bp, name='jobseeker_dashboard', url_prefix='/board')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        db.session.add_all([Skill(name='python', display_name='Python'), Skill(name='sql', display_name='SQL')])
+        db.session.add_all([User(username='seeker', email='seeker@example.com', password_hash='-', first_name='Ada'),
+                            User(username='other', email='other@example.com', password_hash='-'),
+                            User(username='acme', email='acme@example.com', password_hash='-',
+                                 user_type=UserType.CONSULTANCY)])
+        db.session.add(ConsultancyProfile(user_id=3, company_name='Acme'))
+        db.session.add_all([Job(consultancy_id=1, title=f'Job {i}', description='-', location='Austin, TX')
+                            for i in range(1, 9)])
+        db.session.commit()
+
+    def tearDown(self):
+        """Clean up test environment"""
+        activity_tracker.flush()
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def dashboard(self, user_id=1):
+        db.session.expire_all()
+        return get_dashboard(user_id)
+
+    def test_writes_rewrite_the_row(self):
+        """Test user, profile and application writes rewrite the row in the same commit"""
+        summary = self.dashboard()
+        self.assertEqual((summary.first_name, summary.profile, summary.total_applications), ('Ada', None, 0))
+        self.assertEqual(summary.profile_completeness, 5)
+
+        user = db.session.get(User, 1)
+        user.last_name = 'Lovelace'
+        db.session.add(JobSeekerProfile(user_id=1, skills='["Python", "SQL", "Cobol"]', job_title='Engineer',
+                                        current_location='Austin, TX', experience_years=0))
+        db.session.commit()
+        summary = self.dashboard()
+        self.assertEqual(summary.last_name, 'Lovelace')
+        self.assertEqual(summary.profile, {'job_title': 'Engineer', 'location': 'Austin, TX',
+                                           'experience_years': 0, 'skills': ['Python', 'SQL', 'Cobol']})
+        self.assertEqual(summary.profile_completeness, 5 + 5 + 20 + 10 + 5 + 10)
+
+        db.session.add_all([JobApplication(job_id=job_id, jobseeker_id=1) for job_id in range(1, 8)])
+        db.session.add(JobApplication(job_id=8, jobseeker_id=2))  # nobody's profile
+        db.session.commit()
+        first = JobApplication.query.filter_by(job_id=1).one()
+        first.status = 'reviewed'
+        db.session.commit()
+        summary = self.dashboard()
+        self.assertEqual((summary.total_applications, summary.pending_applications), (7, 7))
+        self.assertEqual(summary.counts['reviewed'], 1)
+        self.assertEqual(len(summary.recent_applications), RECENT_LIMIT)
+        self.assertEqual(summary.recent_applications[0]['company'], 'Acme')
+
+        db.session.delete(first)
+        db.session.commit()
+        self.assertEqual(self.dashboard().total_applications, 6)
+
+        # Consultancies have no dashboard
+        self.assertIsNone(get_dashboard(3))
+        self.assertIsNone(db.session.get(JobSeekerDashboard, 3))
+        print("✅ Profile and application writes rewrite the dashboard row")
+
+    def test_bulk_transitions_and_views(self):
+        """Test bulk transitions refresh every moved jobseeker and views stay capped and deduplicated"""
+        for user_id in (1, 2):
+            db.session.add(JobSeekerProfile(user_id=user_id))
+        db.session.commit()
+        db.session.add_all([JobApplication(job_id=job_id, jobseeker_id=profile_id)
+                            for profile_id in (1, 2) for job_id in (1, 2)])
+        db.session.commit()
+        self.assertEqual(rebuild(batch_size=1), 2)
+
+        transition('rejected', job_id=1)
+        db.session.commit()
+        for user_id in (1, 2):
+            summary = self.dashboard(user_id)
+            self.assertEqual((summary.counts['rejected'], summary.pending_applications), (1, 1))
+
+        for job_id in (1, 2, 3, 4, 5, 6, 2):
+            record_job_view(1, db.session.get(Job, job_id))
+            db.session.commit()
+        summary = self.dashboard()
+        self.assertEqual([entry['job_id'] for entry in summary.recently_viewed], [2, 6, 5, 4, 3])
+        self.assertEqual(summary.jobs_viewed, 7)
+
+        # An application write rewrites the row but keeps the views
+        db.session.add(JobApplication(job_id=3, jobseeker_id=1))
+        db.session.commit()
+        summary = self.dashboard()
+        self.assertEqual((summary.total_applications, summary.jobs_viewed), (3, 7))
+        print("✅ Bulk transitions and job views keep the dashboard current")
+
+    def test_dashboard_route_reads_one_row(self):
+        """Test the dashboard page is served from the user's row, built on first visit"""
+        db.session.add(JobSeekerProfile(user_id=1, skills='["Python"]'))
+        db.session.commit()
+        db.session.add(JobApplication(job_id=1, jobseeker_id=1))
+        db.session.commit()
+        JobSeekerDashboard.query.delete()
+        db.session.commit()
+
+        context = {}
+        with patch('app.routes.roles.jobseeker_routes.render_template',
+                   side_effect=lambda template, **kwargs: context.update(kwargs) or ''):
+            client = self.app.test_client()
+            with client.session_transaction() as session:
+                session.update(user_id=1, role='jobseeker')
+            client.get('/board/dashboard')  # builds the row
+            self.assertEqual(context['total_applications'], 1)
+
+            client.get('/board/jobs/2')
+            statements = []
+            listener = lambda conn, cursor, statement, *args: statements.append(statement)
+            event.listen(db.engine, 'before_cursor_execute', listener)
+            try:
+                client.get('/board/dashboard')
+            finally:
+                event.remove(db.engine, 'before_cursor_execute', listener)
+        self.assertEqual(sum('FROM job_applications' in statement for statement in statements), 0)
+        self.assertEqual(sum('FROM jobseeker_dashboards' in statement for statement in statements), 1)
+        self.assertEqual(context['recent_applications'][0]['title'], 'Job 1')
+        self.assertEqual([job['title'] for job in context['recent_jobs']], ['Job 2'])
+        self.assertEqual(context['stats']['jobs_viewed'], 1)
+        self.assertEqual(context['profile']['skills'], ['Python'])
+        print("✅ The dashboard is served from one keyed row")
+
+    def test_first_read_leaves_the_session_alone(self):
+        """Test building a missing row commits its own session, not the caller's"""
+        JobSeekerDashboard.query.delete()
+        db.session.commit()
+
+        committed = []
+        listener = lambda session: committed.append(session)
+        event.listen(Session, 'after_commit', listener)
+        try:
+            self.assertEqual(get_dashboard(1).first_name, 'Ada')
+        finally:
+            event.remove(Session, 'after_commit', listener)
+        self.assertTrue(committed)
+        self.assertNotIn(db.session(), committed)
+        self.assertIsNotNone(db.session.get(JobSeekerDashboard, 1))
+        print("✅ Building a dashboard row on read keeps out of the request's transaction")
+
+    def test_job_detail_page(self):
+        """Test the job page renders and counts the view, and a failed render counts nothing"""
+        client = self.app.test_client()
+        with client.session_transaction() as session:
+            session.update(user_id=1, role='jobseeker')
+        response = client.get('/board/jobs/2')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'Job 2', response.data)
+        self.assertIn(b'Acme', response.data)
+        self.assertEqual(self.dashboard().jobs_viewed, 1)
+
+        with patch('app.routes.roles.jobseeker_routes.render_template', side_effect=RuntimeError('broken')):
+            self.assertEqual(client.get('/board/jobs/3').status_code, 302)
+        self.assertEqual(self.dashboard().jobs_viewed, 1)
+        print("✅ The job page renders and counts the view")
+
+if __name__ == '__main__':
+    unittest.main()
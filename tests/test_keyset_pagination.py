@@ -0,0 +1,128 @@
+"""
+Keyset Pagination Tests
+Tests seek pagination and cached counts for security log browsing
+"""
+
+import os
+import sys
+import unittest
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+# Add the parent directory to the path so we can import the app
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event
+
+from app import create_app, db
+from app.auth.auth_models import SecurityLog, SecurityEventType
+from app.routes.superadmin_routes import superadmin_bp
+from app.services.activity_tracker import activity_tracker
+from app.services.keyset_pagination import CountCache, decode_cursor, paginate_keyset
+
+class TestKeysetPagination(unittest.TestCase):
+    """Test cursor navigation over security logs"""
+
+    def setUp(self):
+        """Set up test environment"""
+        self.app = create_app('testing')
+        self.app.register_blueprint(superadmin_bp, name='superadmin_acl', url_prefix='/acl')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        # 23 events, several sharing a timestamp so ties are broken by id
+        base = datetime(2024, 1, 1, 12, 0, 0)
+        for i in range(23):
+            db.session.add(SecurityLog(
+                event_type=SecurityEventType.LOGIN_FAILED if i % 2 else SecurityEventType.LOGIN_SUCCESS,
+                severity='high' if i % 3 == 0 else 'low',
+                created_at=base + timedelta(minutes=i // 3)
+            ))
+        db.session.commit()
+        self.newest_first = [log.id for log in SecurityLog.query.order_by(
+            SecurityLog.created_at.desc(), SecurityLog.id.desc()
+        )]
+
+    def tearDown(self):
+        """Clean up test environment"""
+        activity_tracker.flush()
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def _page(self, cursor=None, per_page=5):
+        return paginate_keyset(SecurityLog.query, SecurityLog.created_at, SecurityLog.id,
+                               cursor=cursor, per_page=per_page)
+
+    def test_walk_forward_and_back(self):
+        """Test older/newer cursors visit every row once and return to the same pages"""
+        pages, page = [], self._page()
+        self.assertFalse(page.has_prev)
+        while True:
+            pages.append([log.id for log in page.items])
+            if not page.has_next:
+                break
+            page = self._page(page.next_cursor)
+
+        self.assertEqual([log_id for ids in pages for log_id in ids], self.newest_first)
+        self.assertEqual([len(ids) for ids in pages], [5, 5, 5, 5, 3])
+
+        for expected in reversed(pages[:-1]):
+            page = self._page(page.prev_cursor)
+            self.assertEqual([log.id for log in page.items], expected)
+        self.assertFalse(page.has_prev)
+        print("✅ Cursors walk every row forwards and backwards")
+
+    def test_invalid_cursor(self):
+        """Test malformed cursors are rejected"""
+        for cursor in ('garbage', 'WzEsMl0', ''.join('x' for _ in range(40))):
+            with self.assertRaises(ValueError):
+                decode_cursor(cursor)
+        print("✅ Malformed cursors are rejected")
+
+    def test_count_cache_caps_and_reuses(self):
+        """Test totals stop at the cap and are cached per key"""
+        counts = CountCache()
+        counts.cap = 10
+        self.assertEqual(counts.count('all', SecurityLog.query, SecurityLog.id), (10, True))
+
+        high = SecurityLog.query.filter(SecurityLog.severity == 'high')
+        self.assertEqual(counts.count('high', high, SecurityLog.id), (8, False))
+
+        db.session.add(SecurityLog(event_type=SecurityEventType.LOGIN_FAILED, severity='high'))
+        db.session.commit()
+        self.assertEqual(counts.count('high', high, SecurityLog.id), (8, False))
+        counts.clear()
+        self.assertEqual(counts.count('high', high, SecurityLog.id), (9, False))
+        print("✅ Counts are capped and cached per filter")
+
+    def test_security_logs_view_seeks_without_offset(self):
+        """Test deep pages of the log browser use a seek instead of OFFSET"""
+        context, statements = {}, []
+        listener = lambda *args: statements.append((args[2], args[3]))
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        self.addCleanup(event.remove, db.engine, 'before_cursor_execute', listener)
+
+        with patch('app.routes.superadmin_routes.AuthMiddleware.superadmin_only', return_value=None), \
+             patch('app.routes.superadmin_routes.render_template',
+                   side_effect=lambda template, **kwargs: context.update(kwargs) or ''):
+            client = self.app.test_client()
+            client.get('/acl/security?per_page=5&severity=low')
+            first_page = context['logs']
+            statements.clear()
+            client.get(f'/acl/security?per_page=5&severity=low&cursor={first_page.next_cursor}')
+
+        logs = context['logs']
+        self.assertEqual(logs.total, 15)
+        self.assertTrue(logs.has_prev)
+        self.assertTrue(all(log.severity == 'low' for log in logs.items))
+        self.assertEqual(len(statements), 1)  # count served from the cache
+        sql, params = statements[0]
+        self.assertIn('security_logs.created_at < ?', sql)
+        self.assertEqual(params[-1], 0)  # no rows skipped by OFFSET
+        self.assertIn('login_failed', context['event_types'])
+        print("✅ Log browser seeks to deep pages and reuses the cached count")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,113 @@
+"""
+Log Facet Tests
+Tests security log filter options and counts are served from enums and rollups
+"""
+
+import os
+import sys
+import unittest
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+# Add the parent directory to the path so we can import the app
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event
+
+from app import create_app, db
+from app.auth.auth_models import SecurityLog, SecurityEventType
+from app.routes.superadmin_routes import superadmin_bp
+from app.services.activity_tracker import activity_tracker
+from app.services.dashboard_rollups import dashboard_rollups
+from app.services.log_facets import log_facets
+
+class TestLogFacets(unittest.TestCase):
+    """Test filter dropdown facets for the security log browser"""
+
+    def setUp(self):
+        """Set up test environment"""
+        self.app = create_app('testing')
+        self.app.register_blueprint(superadmin_bp, name='superadmin_acl', url_prefix='/acl')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        # Two events on each of the last 10 days, alternating type and severity
+        self.today = datetime.utcnow().date()
+        for days_ago in range(10):
+            start = datetime.combine(self.today - timedelta(days=days_ago), datetime.min.time())
+            db.session.add(SecurityLog(event_type=SecurityEventType.LOGIN_FAILED, severity='high',
+                                       created_at=start + timedelta(hours=1)))
+            db.session.add(SecurityLog(event_type=SecurityEventType.LOGIN_SUCCESS, severity='low',
+                                       created_at=start + timedelta(hours=2)))
+        db.session.commit()
+        dashboard_rollups.refresh(full=True)
+
+        self.statements, self.params = [], []
+        listener = lambda *args: self.statements.append(args[2]) or self.params.append(args[3])
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        self.addCleanup(event.remove, db.engine, 'before_cursor_execute', listener)
+
+    def tearDown(self):
+        """Clean up test environment"""
+        activity_tracker.flush()
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_options_come_from_enums(self):
+        """Test every enum value is offered without a query"""
+        options = log_facets.options()
+        self.assertEqual(options['event_type'], [event.value for event in SecurityEventType])
+        self.assertEqual(options['severity'], ['low', 'medium', 'high', 'critical'])
+        self.assertEqual(self.statements, [])
+        print("✅ Filter options come from the enum definitions")
+
+    def test_counts_match_the_log_table(self):
+        """Test all-time and ranged counts agree with the base table"""
+        counts = log_facets.counts()
+        self.assertEqual(counts['event_type'], {'login_failed': 10, 'login_success': 10})
+        self.assertEqual(counts['severity'], {'high': 10, 'low': 10})
+
+        since = self.today - timedelta(days=4)
+        self.assertEqual(log_facets.counts(since)['severity'], {'high': 5, 'low': 5})
+        self.assertEqual(log_facets.counts(None, since)['event_type'], {'login_failed': 6, 'login_success': 6})
+        self.assertEqual(log_facets.counts(since, since)['event_type'], {'login_failed': 1, 'login_success': 1})
+        self.assertTrue(all('security_logs' not in sql for sql in self.statements))
+        print("✅ Facet counts come from the rollups and match the logs")
+
+    def test_closed_days_are_read_once(self):
+        """Test widening a range only reads the closed days not cached yet"""
+        log_facets.counts(self.today - timedelta(days=5))
+        self.statements.clear()
+        self.assertEqual(log_facets.counts(self.today - timedelta(days=5))['severity'], {'high': 6, 'low': 6})
+        self.assertEqual(self.statements, [])
+
+        self.assertEqual(log_facets.counts(self.today - timedelta(days=8))['severity'], {'high': 9, 'low': 9})
+        self.assertEqual(len(self.statements), 1)
+        self.assertEqual(self.params[-1][1:3], (str(self.today - timedelta(days=8)),
+                                                str(self.today - timedelta(days=6))))
+        print("✅ Closed days are cached and only new days are read")
+
+    def test_early_date_from_is_clamped_to_the_oldest_bucket(self):
+        """Test a range starting long before the first event only walks the stored days"""
+        counts = log_facets.counts(self.today - timedelta(days=365 * 200))
+        self.assertEqual(counts['severity'], {'high': 10, 'low': 10})
+        self.assertLessEqual(len(log_facets._days), 10)
+        print("✅ Early date_from is clamped to the oldest rollup bucket")
+
+    def test_security_logs_page_shows_counts(self):
+        """Test the log browser fills its dropdowns without scanning security_logs"""
+        context = {}
+        with patch('app.routes.superadmin_routes.AuthMiddleware.superadmin_only', return_value=None), \
+             patch('app.routes.superadmin_routes.render_template',
+                   side_effect=lambda template, **kwargs: context.update(kwargs) or ''):
+            self.app.test_client().get('/acl/security?severity=high')
+
+        self.assertEqual(context['facet_counts']['severity']['high'], 10)
+        self.assertIn('critical', context['severities'])
+        self.assertFalse(any('DISTINCT' in sql for sql in self.statements))
+        print("✅ Log browser dropdowns carry rollup counts")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,225 @@
+"""
+Log Retention Tests
+Tests archiving, throttled purging and archive-aware browsing of security logs
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import unittest
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+# Add the parent directory to the path so we can import the app
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event
+
+from app import create_app, db
+from app.auth.auth_models import SecurityLog, SecurityLogArchive, SecurityEventType
+from app.routes.superadmin_routes import superadmin_bp
+from app.services.activity_tracker import activity_tracker
+from app.services.log_retention import log_retention
+
+class TestLogRetention(unittest.TestCase):
+    """Test the hot table / archive file retention tiers"""
+
+    def setUp(self):
+        """Set up test environment"""
+        self.archive_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.archive_dir, True)
+
+        self.app = create_app('testing')
+        self.app.config.update(SECURITY_LOG_ARCHIVE_DIR=self.archive_dir, SECURITY_LOG_PURGE_BATCH_SIZE=4,
+                               SECURITY_LOG_PURGE_PAUSE=0)
+        log_retention.init_app(self.app)
+        self.app.register_blueprint(superadmin_bp, name='superadmin_acl', url_prefix='/acl')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        # 10 events on each of two aged days and 3 recent ones
+        now = datetime.utcnow().replace(microsecond=0)
+        self.old_days = [(now - timedelta(days=days)).date() for days in (120, 100)]
+        for day in self.old_days:
+            start = datetime.combine(day, datetime.min.time())
+            for i in range(10):
+                self._log(start + timedelta(hours=i), severity='high' if i % 2 else 'low',
+                          event_type=SecurityEventType.LOGIN_FAILED, details={'attempt': i})
+        for i in range(3):
+            self._log(now - timedelta(hours=i))
+        db.session.commit()
+
+    def tearDown(self):
+        """Clean up test environment"""
+        activity_tracker.flush()
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def _log(self, created_at, severity='low', event_type=SecurityEventType.LOGIN_SUCCESS, details=None):
+        db.session.add(SecurityLog(event_type=event_type, severity=severity, created_at=created_at,
+                                   details_json=details, ip_address='10.0.0.1'))
+
+    def _read_archive(self, part):
+        path = os.path.join(self.archive_dir, part.path)
+        with open(path, 'rb') as f:
+            self.assertEqual(hashlib.sha256(f.read()).hexdigest(), part.sha256)
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            return [json.loads(line) for line in f]
+
+    def test_archive_then_purge(self):
+        """Test aged days are exported to checksummed files before they are deleted"""
+        result = log_retention.run()
+        self.assertEqual(result, {'days': 2, 'archived': 20, 'purged': 20})
+        self.assertEqual(SecurityLog.query.count(), 3)
+
+        parts = SecurityLogArchive.query.order_by(SecurityLogArchive.bucket_date).all()
+        self.assertEqual([part.bucket_date for part in parts], self.old_days)
+        self.assertTrue(all(part.purged_at for part in parts))
+        start = datetime.combine(self.old_days[0], datetime.min.time())
+        self.assertEqual((parts[0].min_created_at, parts[0].max_created_at), (start, start + timedelta(hours=9)))
+
+        records = self._read_archive(parts[0])
+        self.assertEqual(len(records), parts[0].row_count)
+        self.assertEqual(records[1]['event_type'], 'login_failed')
+        self.assertEqual(records[1]['details_json'], {'attempt': 1})
+        self.assertEqual([r['id'] for r in records], list(range(parts[0].min_id, parts[0].max_id + 1)))
+
+        self.assertEqual(log_retention.run(), {'days': 0, 'archived': 0, 'purged': 0})
+        print("✅ Aged days are archived with a checksum, then purged")
+
+    def test_purge_is_chunked(self):
+        """Test the purge deletes in small chunks with a pause between them"""
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        self.addCleanup(event.remove, db.engine, 'before_cursor_execute', listener)
+
+        with patch('app.services.log_retention.time.sleep') as sleep:
+            log_retention.pause = 0.01
+            log_retention.run()
+
+        deletes = [sql for sql in statements if sql.startswith('DELETE')]
+        self.assertEqual(len(deletes), 6)  # 10 rows per day in chunks of 4
+        self.assertTrue(all('security_logs.id IN' in sql for sql in deletes))
+        self.assertEqual(sleep.call_count, 4)
+        print("✅ Purge runs as throttled, bounded chunks")
+
+    def test_late_rows_go_to_a_new_part(self):
+        """Test rows reaching an archived day later are exported as a further part"""
+        log_retention.run()
+        self._log(datetime.combine(self.old_days[0], datetime.min.time()) + timedelta(hours=20))
+        db.session.commit()
+
+        self.assertEqual(log_retention.run(), {'days': 1, 'archived': 1, 'purged': 1})
+        parts = SecurityLogArchive.query.filter_by(bucket_date=self.old_days[0]).order_by(SecurityLogArchive.part).all()
+        self.assertEqual([part.part for part in parts], [1, 2])
+        self.assertEqual(len(self._read_archive(parts[1])), 1)
+        print("✅ Late rows are archived as an extra part")
+
+    def test_unfinished_purge_is_resumed(self):
+        """Test a purge interrupted after the export completes on the next run"""
+        with patch.object(log_retention, 'purge_part', return_value=0):
+            log_retention.run()
+        self.assertEqual(SecurityLog.query.count(), 23)
+
+        self.assertEqual(log_retention.run(), {'days': 0, 'archived': 0, 'purged': 20})
+        self.assertEqual(SecurityLog.query.count(), 3)
+        self.assertEqual(SecurityLogArchive.query.count(), 2)
+        print("✅ Interrupted purges are resumed without re-exporting")
+
+    def test_browse_reads_only_relevant_archives(self):
+        """Test the log browser merges archived days, reading only the parts a page can reach"""
+        log_retention.run()
+        context = {}
+        opened = []
+        real_open = gzip.open
+
+        def tracking_open(path, *args, **kwargs):
+            opened.append(path)
+            return real_open(path, *args, **kwargs)
+
+        with patch('app.routes.superadmin_routes.AuthMiddleware.superadmin_only', return_value=None), \
+             patch('app.routes.superadmin_routes.render_template',
+                   side_effect=lambda template, **kwargs: context.update(kwargs) or ''), \
+             patch('app.services.log_retention.gzip.open', side_effect=tracking_open):
+            client = self.app.test_client()
+
+            # The hot table fills the first page, so no part is read
+            client.get('/acl/security?per_page=2')
+            self.assertEqual(context['logs'].total, 23)
+            self.assertEqual(opened, [])
+
+            # Deeper pages read the newest archived day only, stopping at the cursor
+            client.get('/acl/security?per_page=5')
+            page = context['logs']
+            client.get(f'/acl/security?per_page=5&cursor={page.next_cursor}')
+            deeper = context['logs']
+            newest = datetime.combine(self.old_days[1], datetime.min.time())
+            self.assertEqual([log.created_at for log in page.items[3:] + deeper.items],
+                             [newest + timedelta(hours=hour) for hour in range(9, 2, -1)])
+            self.assertTrue(deeper.has_next)
+            self.assertTrue(all(self.old_days[1].isoformat() in path for path in opened))
+            opened.clear()
+
+            day = self.old_days[1].isoformat()
+            client.get(f'/acl/security?date_from={day}&date_to={day}&severity=high&per_page=3')
+            first = context['logs']
+            client.get(f'/acl/security?date_from={day}&date_to={day}&severity=high&per_page=3'
+                       f'&cursor={first.next_cursor}')
+            second = context['logs']
+
+        self.assertEqual(first.total, 5)
+        self.assertEqual(len(first.items), 3)
+        self.assertEqual(len(second.items), 2)
+        self.assertFalse(second.has_next)
+        items = first.items + second.items
+        self.assertTrue(all(log.severity == 'high' for log in items))
+        self.assertEqual(items[0].event_type, SecurityEventType.LOGIN_FAILED)
+        self.assertEqual([log.created_at for log in items], sorted((log.created_at for log in items), reverse=True))
+        self.assertTrue(opened)
+        self.assertTrue(all(self.old_days[1].isoformat() in path for path in opened))
+        print("✅ Date ranges read just the archived days they cover")
+
+    def test_unreadable_parts_are_skipped(self):
+        """Test a missing or corrupt archive part is skipped instead of failing the page"""
+        log_retention.run()
+        parts = SecurityLogArchive.query.order_by(SecurityLogArchive.bucket_date).all()
+        os.remove(os.path.join(self.archive_dir, parts[0].path))
+        with open(os.path.join(self.archive_dir, parts[1].path), 'wb') as f:
+            f.write(b'not gzip')
+
+        self.assertEqual(log_retention.archived_page(50), [])
+        self.assertEqual(list(log_retention.iter_archived()), [])
+
+        with gzip.open(os.path.join(self.archive_dir, parts[1].path), 'wt', encoding='utf-8') as f:
+            f.write('{"id": 1}\n{broken\n')
+        self.assertEqual(len(list(log_retention._read_part(parts[1]))), 1)
+        print("✅ Unreadable archive parts are logged and skipped")
+
+    def test_requested_run_happens_in_the_background(self):
+        """Test the maintenance action hands the run to the retention thread"""
+        done = threading.Event()
+        calls = []
+
+        def fake_run(retention_days=None):
+            calls.append((retention_days, threading.current_thread()))
+            done.set()
+            return {'days': 0, 'archived': 0, 'purged': 0}
+
+        with patch.object(log_retention, 'run', side_effect=fake_run):
+            log_retention.request_run(retention_days=30)
+            self.assertTrue(done.wait(5))
+
+        self.assertEqual(calls[0][0], 30)
+        self.assertIsNot(calls[0][1], threading.current_thread())
+        print("✅ Requested retention runs on the background thread")
+
+if __name__ == '__main__':
+    unittest.main()
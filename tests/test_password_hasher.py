@@ -0,0 +1,164 @@
+"""
+Password Hasher Tests
+Tests offloaded password hashing, cost calibration and rehash on login
+"""
+
+import os
+import sys
+import threading
+import unittest
+from unittest.mock import patch
+
+# Add the parent directory to the path so we can import the app
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+from app import create_app, db
+from app.auth.auth_models import AuthUser
+from app.services.auth_service import JWTAuthService
+from app.services.password_hasher import PasswordHasher, PasswordHasherBusy, password_hasher
+
+class TestPasswordHasher(unittest.TestCase):
+    """Test the hashing executor and its cost policy"""
+
+    def setUp(self):
+        """Set up a cheap standalone hasher"""
+        self.hasher = PasswordHasher()
+        self.hasher.min_iterations = 1000
+        self.hasher.iterations = 1000
+
+    def tearDown(self):
+        """Stop any worker processes"""
+        self.hasher.shutdown()
+
+    def test_calibration_targets_latency_within_bounds(self):
+        """Test the iteration count scales to the target and respects floor and ceiling"""
+        self.hasher.target_ms = 250
+        self.hasher.max_iterations = 5000000
+
+        # 50000 iterations in 10ms -> 1250000 for 250ms
+        with patch.object(PasswordHasher, '_time_pbkdf2', return_value=0.010):
+            self.assertEqual(self.hasher.calibrate(), 1250000)
+        self.assertAlmostEqual(self.hasher.calibrated_ms, 250, delta=1)
+
+        self.hasher.min_iterations = 2000000
+        with patch.object(PasswordHasher, '_time_pbkdf2', return_value=0.010):
+            self.assertEqual(self.hasher.calibrate(), 2000000)
+
+        self.hasher.min_iterations = 1000
+        with patch.object(PasswordHasher, '_time_pbkdf2', return_value=0.0001):
+            self.assertEqual(self.hasher.calibrate(), 5000000)
+        print("✅ Calibration follows the target latency within its bounds")
+
+    def test_needs_rehash(self):
+        """Test only PBKDF2 hashes below the configured floor are flagged"""
+        self.hasher.min_iterations = 600000
+        self.hasher.iterations = 900000
+        self.assertTrue(self.hasher.needs_rehash('pbkdf2:sha256:260000$salt$hash'))
+        self.assertTrue(self.hasher.needs_rehash('pbkdf2:sha1:260000$salt$hash'))
+        self.assertFalse(self.hasher.needs_rehash('pbkdf2:sha256:600000$salt$hash'))
+        self.assertFalse(self.hasher.needs_rehash('pbkdf2:sha256:900000$salt$hash'))
+        self.assertFalse(self.hasher.needs_rehash('scrypt:32768:8:1$salt$hash'))
+        self.assertFalse(self.hasher.needs_rehash(None))
+        print("✅ PBKDF2 hashes below the floor are flagged for rehash, scrypt is kept")
+
+    def test_iterations_come_from_config(self):
+        """Test every worker hashes at the configured cost, clamped to the floor"""
+        app = create_app('testing')
+        app.config.update(PASSWORD_HASH_MIN_ITERATIONS=1000, PASSWORD_HASH_ITERATIONS=5000)
+        with patch.object(PasswordHasher, '_time_pbkdf2') as timer:
+            self.hasher.init_app(app)
+        timer.assert_not_called()
+        self.assertEqual(self.hasher.iterations, 5000)
+
+        app.config['PASSWORD_HASH_ITERATIONS'] = 10
+        self.hasher.init_app(app)
+        self.assertEqual(self.hasher.iterations, 1000)
+        print("✅ Hash cost is read from config, not calibrated per worker")
+
+    def test_process_pool_hashes_and_verifies(self):
+        """Test hashes produced by the worker pool are ordinary Werkzeug hashes"""
+        self.hasher.workers = 1
+
+        pwhash = self.hasher.hash('s3cret-Password')
+        self.assertTrue(pwhash.startswith('pbkdf2:sha256:1000$'))
+        self.assertTrue(check_password_hash(pwhash, 's3cret-Password'))
+        self.assertTrue(self.hasher.verify(pwhash, 's3cret-Password'))
+        self.assertFalse(self.hasher.verify(pwhash, 'wrong'))
+        # Pool processes are not forked from this (multithreaded) process
+        self.assertNotEqual(self.hasher._get_executor()._mp_context.get_start_method(), 'fork')
+
+        metrics = self.hasher.get_metrics()
+        self.assertEqual(metrics['hashed'], 1)
+        self.assertEqual(metrics['verified'], 2)
+        self.assertEqual(metrics['in_flight'], 0)
+        print("✅ Worker pool hashes and verifies passwords")
+
+    def test_full_queue_rejects(self):
+        """Test callers are turned away once every queue slot is taken"""
+        self.hasher.workers = 1
+        self.hasher.queue_timeout = 0.01
+        self.hasher._slots = threading.BoundedSemaphore(1)
+        self.hasher._slots.acquire()
+        try:
+            with self.assertRaises(PasswordHasherBusy):
+                self.hasher.verify('pbkdf2:sha256:1000$salt$hash', 'password')
+        finally:
+            self.hasher._slots.release()
+
+        self.assertEqual(self.hasher.get_metrics()['rejected'], 1)
+        print("✅ A full hashing queue rejects new work")
+
+class TestRehashOnLogin(unittest.TestCase):
+    """Test authenticate_user upgrades weak hashes"""
+
+    def setUp(self):
+        """Set up test environment"""
+        self.app = create_app('testing')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        self.user = AuthUser(username='hashuser', email='hashuser@test.com')
+        self.user.password_hash = generate_password_hash('password123', method='pbkdf2:sha256:1000')
+        db.session.add(self.user)
+        db.session.commit()
+
+    def tearDown(self):
+        """Clean up test environment"""
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_login_rehashes_weak_hash(self):
+        """Test a successful login stores the hash at the current cost"""
+        user, message = JWTAuthService.authenticate_user('hashuser', 'password123')
+        self.assertIsNotNone(user, message)
+
+        stored = db.session.get(AuthUser, self.user.id).password_hash
+        self.assertTrue(stored.startswith(f'pbkdf2:sha256:{password_hasher.iterations}$'))
+        self.assertFalse(password_hasher.needs_rehash(stored))
+        self.assertTrue(check_password_hash(stored, 'password123'))
+        print("✅ Login upgrades hashes below the current cost")
+
+    def test_failed_login_keeps_hash(self):
+        """Test a wrong password never rewrites the stored hash"""
+        original = self.user.password_hash
+        user, _ = JWTAuthService.authenticate_user('hashuser', 'wrong-password')
+        self.assertIsNone(user)
+        self.assertEqual(db.session.get(AuthUser, self.user.id).password_hash, original)
+        print("✅ Failed logins leave the stored hash alone")
+
+    def test_busy_hasher_turns_login_away(self):
+        """Test a full hashing queue fails the login without counting an attempt"""
+        with patch.object(password_hasher, 'verify', side_effect=PasswordHasherBusy('full')):
+            user, message = JWTAuthService.authenticate_user('hashuser', 'password123')
+
+        self.assertIsNone(user)
+        self.assertIn('try again', message)
+        self.assertEqual(db.session.get(AuthUser, self.user.id).login_attempts or 0, 0)
+        print("✅ Busy hasher rejects logins without penalizing the account")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,130 @@
+"""
+Principal Cache Tests
+Tests per-request resolution of user roles and permissions
+"""
+
+import os
+import sys
+import unittest
+
+# Add the parent directory to the path so we can import the app
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event
+
+from app import create_app, db
+from app.auth.auth_models import AuthUser, Role, Permission, UserRole, UserPermission
+from app.services.rbac_snapshot import get_rbac_snapshot
+
+class TestPrincipalCache(unittest.TestCase):
+    """Test the per-request principal cache"""
+
+    def setUp(self):
+        """Set up test environment"""
+        self.app = create_app('testing')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        self.user_read = Permission(name='user.read', display_name='View Users', resource='user', action='read')
+        self.role_read = Permission(name='role.read', display_name='View Roles', resource='role', action='read')
+        self.job_read = Permission(name='job.read', display_name='View Jobs', resource='job', action='read')
+        self.admin_role = Role(name='admin', display_name='Admin')
+        self.admin_role.permissions = [self.user_read]
+        self.jobseeker_role = Role(name='jobseeker', display_name='Job Seeker')
+        self.jobseeker_role.permissions = [self.job_read]
+
+        self.user = AuthUser(username='admin1', email='admin1@test.com')
+        self.user.set_password('password123')
+        db.session.add_all([self.user_read, self.role_read, self.job_read,
+                            self.admin_role, self.jobseeker_role, self.user])
+        db.session.flush()
+        db.session.add(UserRole(user_id=self.user.id, role_id=self.admin_role.id))
+        db.session.add(UserPermission(user_id=self.user.id, permission_id=self.role_read.id))
+        db.session.commit()
+        self.user_id = self.user.id  # Refresh the expired instance outside the counted block
+        get_rbac_snapshot()  # Warm the process-wide snapshot outside the counted block
+
+    def tearDown(self):
+        """Clean up test environment"""
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def _count_queries(self):
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+        self.addCleanup(event.remove, db.engine, 'before_cursor_execute', before_cursor_execute)
+        return statements
+
+    def test_roles_and_permissions_resolved(self):
+        """Test role, role permission and direct permission checks"""
+        with self.app.test_request_context('/'):
+            self.assertTrue(self.user.has_role('admin'))
+            self.assertFalse(self.user.has_role('jobseeker'))
+            self.assertTrue(self.user.has_permission('user.read'))
+            self.assertTrue(self.user.has_permission('role.read'))
+            self.assertFalse(self.user.has_permission('job.read'))
+        print("✅ Principal resolves roles and permissions")
+
+    def test_single_query_per_request(self):
+        """Test repeated checks within a request issue one query"""
+        with self.app.test_request_context('/'):
+            statements = self._count_queries()
+            for _ in range(10):
+                self.user.has_role('admin')
+                self.user.has_role('superadmin')
+                self.user.has_permission('user.read')
+                self.user.has_permission('user.list')
+            self.assertEqual(len(statements), 1)
+        print("✅ Principal loaded with a single query")
+
+    def test_new_request_reloads(self):
+        """Test each request resolves its own principal"""
+        for _ in range(2):
+            with self.app.test_request_context('/'):
+                statements = self._count_queries()
+                self.user.has_role('admin')
+                self.assertEqual(len(statements), 1)
+        print("✅ Principal cache is request scoped")
+
+    def test_invalidated_on_role_assignment(self):
+        """Test the cache is dropped when role assignments change"""
+        with self.app.test_request_context('/'):
+            self.assertFalse(self.user.has_permission('job.read'))
+
+            db.session.add(UserRole(user_id=self.user.id, role_id=self.jobseeker_role.id))
+            db.session.commit()
+
+            self.assertTrue(self.user.has_role('jobseeker'))
+            self.assertTrue(self.user.has_permission('job.read'))
+        print("✅ Principal invalidated on UserRole change")
+
+    def test_invalidated_on_role_permission_change(self):
+        """Test the cache is dropped when a role's permissions change"""
+        with self.app.test_request_context('/'):
+            self.assertTrue(self.user.has_permission('user.read'))
+
+            self.admin_role.permissions = []
+            db.session.commit()
+
+            self.assertFalse(self.user.has_permission('user.read'))
+        print("✅ Principal invalidated on RolePermission change")
+
+    def test_inactive_role_ignored(self):
+        """Test deactivated role assignments grant nothing"""
+        UserRole.query.filter_by(user_id=self.user.id).update({'is_active': False})
+        db.session.commit()
+
+        with self.app.test_request_context('/'):
+            self.assertFalse(self.user.has_role('admin'))
+            self.assertFalse(self.user.has_permission('user.read'))
+            self.assertTrue(self.user.has_permission('role.read'))
+        print("✅ Inactive roles excluded from principal")
+
+if __name__ == '__main__':
+    unittest.main()
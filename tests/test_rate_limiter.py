@@ -0,0 +1,170 @@
+"""
+Rate Limiter Tests
+Tests throttling algorithms, backends and the middleware 429 response
+"""
+
+import os
+import sys
+import unittest
+
+# Add the parent directory to the path so we can import the app
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app, db
+from app.auth.auth_models import (
+    AuthUser, RateLimitState, SubscriptionPlan, UserSubscription, SubscriptionStatus
+)
+from app.services.rate_limiter import (
+    DatabaseBackend, MemoryBackend, RateLimiter, SlidingWindowLog, TokenBucket, rate_limiter
+)
+
+class FakeClock:
+    """Manually advanced clock"""
+
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+class TestRateLimitAlgorithms(unittest.TestCase):
+    """Test the algorithms against the in-memory backend"""
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.backend = MemoryBackend(stripes=4, clock=self.clock)
+
+    def test_sliding_window_limits_and_slides(self):
+        """Test the window admits `limit` requests and frees slots as it slides"""
+        for second in range(5):
+            self.clock.now = 1000.0 + second
+            self.assertTrue(self.backend.apply('ip:1', SlidingWindowLog, 5, 10).allowed)
+
+        self.clock.now = 1005.0
+        result = self.backend.apply('ip:1', SlidingWindowLog, 5, 10)
+        self.assertFalse(result.allowed)
+        self.assertEqual(result.remaining, 0)
+        self.assertAlmostEqual(result.retry_after, 5.0)
+
+        self.clock.now = 1010.0
+        self.assertTrue(self.backend.apply('ip:1', SlidingWindowLog, 5, 10).allowed)
+        print("✅ Sliding window log throttles and slides")
+
+    def test_token_bucket_bursts_and_refills(self):
+        """Test the bucket allows a burst then refills at limit/window"""
+        results = [self.backend.apply('user:1', TokenBucket, 3, 30) for _ in range(4)]
+        self.assertEqual([result.allowed for result in results], [True, True, True, False])
+        self.assertAlmostEqual(results[-1].retry_after, 10.0)
+
+        self.clock.now += 10
+        self.assertTrue(self.backend.apply('user:1', TokenBucket, 3, 30).allowed)
+        self.assertFalse(self.backend.apply('user:1', TokenBucket, 3, 30).allowed)
+        print("✅ Token bucket bursts and refills")
+
+    def test_keys_are_independent(self):
+        """Test one identifier's usage does not affect another"""
+        self.backend.apply('ip:1', SlidingWindowLog, 1, 60)
+        self.assertFalse(self.backend.apply('ip:1', SlidingWindowLog, 1, 60).allowed)
+        self.assertTrue(self.backend.apply('ip:2', SlidingWindowLog, 1, 60).allowed)
+        print("✅ Keys throttled independently")
+
+    def test_expired_keys_dropped_lazily(self):
+        """Test idle keys are swept as their stripe is used"""
+        backend = MemoryBackend(stripes=1, clock=self.clock)
+        for i in range(20):
+            backend.apply(f'ip:{i}', SlidingWindowLog, 10, 5)
+        self.assertEqual(len(backend), 20)
+
+        self.clock.now += 6
+        for _ in range(3):
+            backend.apply('ip:fresh', SlidingWindowLog, 10, 5)
+        self.assertEqual(len(backend), 1)
+        print("✅ Expired keys swept lazily")
+
+class TestRateLimiterIntegration(unittest.TestCase):
+    """Test the database backend, plan limits and middleware responses"""
+
+    def setUp(self):
+        """Set up test environment"""
+        self.app = create_app('testing')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+    def tearDown(self):
+        """Clean up test environment"""
+        rate_limiter.init_app(self.app)
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_database_backend_shared_state(self):
+        """Test two backend instances (two workers) share one counter"""
+        clock = FakeClock(1_700_000_000.0)
+        workers = [DatabaseBackend(clock=clock), DatabaseBackend(clock=clock)]
+        outcomes = [workers[i % 2].apply('ip:9', SlidingWindowLog, 3, 60).allowed for i in range(4)]
+
+        self.assertEqual(outcomes, [True, True, True, False])
+        self.assertEqual(RateLimitState.query.count(), 1)
+
+        clock.now += 61
+        self.assertEqual(workers[0].purge_expired(), 1)
+
+        # The shared backend keeps fixed-size state whatever algorithm is configured
+        self.app.config.update(RATELIMIT_BACKEND='database', RATELIMIT_ALGORITHM='sliding_window')
+        limiter = RateLimiter(self.app)
+        self.assertIs(limiter.algorithm, TokenBucket)
+        limiter.hit('ip:10', 1000, 60)
+        self.assertEqual(len(db.session.get(RateLimitState, 'ip:10').state_json), 2)
+        print("✅ Database backend shares state between workers")
+
+    def test_plan_limit_for_user(self):
+        """Test authenticated users get their plan's api_rate_limit"""
+        user = AuthUser(username='planuser', email='planuser@test.com')
+        user.set_password('password123')
+        plan = SubscriptionPlan(name='pro', display_name='Pro', api_rate_limit=250)
+        db.session.add_all([user, plan])
+        db.session.flush()
+        db.session.add(UserSubscription(user_id=user.id, plan_id=plan.id, status=SubscriptionStatus.ACTIVE.value))
+        db.session.commit()
+
+        limiter = RateLimiter()
+        self.assertEqual(limiter.limit_for_user(user.id), 250)
+        self.assertEqual(limiter.check_request(user).limit, 250)
+        self.assertEqual(limiter.limit_for_user(user.id + 1), limiter.default_user_limit)
+        print("✅ Plan api_rate_limit applied per user")
+
+    def test_plan_limit_cache_is_bounded(self):
+        """Test the plan limit cache drops the least recently used user past its size"""
+        limiter = RateLimiter()
+        limiter.plan_cache_size = 2
+        for user_id in (1, 2, 1, 3):
+            limiter.limit_for_user(user_id)
+
+        self.assertEqual(list(limiter._plan_limits), [1, 3])
+        print("✅ Plan limit cache bounded by plan_cache_size")
+
+    def test_middleware_returns_429_with_headers(self):
+        """Test throttled requests get 429, Retry-After and X-RateLimit-* headers"""
+        self.app.config.update(RATELIMIT_ENABLED=True, RATELIMIT_ANONYMOUS_LIMIT=2)
+        rate_limiter.init_app(self.app)
+
+        @self.app.route('/rate-limited')
+        def rate_limited():
+            return 'ok'
+
+        client = self.app.test_client()
+        first = client.get('/rate-limited')
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first.headers['X-RateLimit-Limit'], '2')
+        self.assertEqual(first.headers['X-RateLimit-Remaining'], '1')
+
+        client.get('/rate-limited')
+        throttled = client.get('/rate-limited')
+        self.assertEqual(throttled.status_code, 429)
+        self.assertEqual(throttled.headers['X-RateLimit-Remaining'], '0')
+        self.assertGreaterEqual(int(throttled.headers['Retry-After']), 1)
+        print("✅ Middleware returns 429 with rate limit headers")
+
+if __name__ == '__main__':
+    unittest.main()
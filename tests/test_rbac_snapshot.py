@@ -0,0 +1,142 @@
+"""
+RBAC Snapshot Tests
+Tests the process-wide role -> permission snapshot and its version-based invalidation
+"""
+
+import os
+import sys
+import unittest
+
+# Add the parent directory to the path so we can import the app
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app, db
+from app.auth.auth_models import CacheVersion, Permission, Role
+from app.services.rbac_snapshot import RBAC_VERSION, RBACSnapshotCache, bump_rbac_version
+
+class FakeClock:
+    """Manually advanced monotonic clock"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+class TestRBACSnapshot(unittest.TestCase):
+    """Test snapshot loading and cross-worker convergence"""
+
+    def setUp(self):
+        """Set up test environment"""
+        self.app = create_app('testing')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        self.user_read = Permission(name='user.read', display_name='View Users', resource='user', action='read')
+        self.user_delete = Permission(name='user.delete', display_name='Delete Users', resource='user', action='delete')
+        self.admin_role = Role(name='admin', display_name='Admin')
+        self.admin_role.permissions = [self.user_read]
+        db.session.add_all([self.user_read, self.user_delete, self.admin_role])
+        db.session.commit()
+        self.admin_role_id = self.admin_role.id
+        self.base_version = CacheVersion.get_version(RBAC_VERSION)  # the setup writes bumped it
+
+    def tearDown(self):
+        """Clean up test environment"""
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def _grant_delete(self):
+        """Simulate the superadmin edit_role route running in another worker"""
+        role = Role.query.get(self.admin_role_id)
+        role.permissions.append(self.user_delete)
+        bump_rbac_version()
+        db.session.commit()
+
+    def test_snapshot_resolves_role_permissions(self):
+        """Test the snapshot maps role ids to names and permissions"""
+        snapshot = RBACSnapshotCache(clock=FakeClock()).get()
+        self.assertEqual(snapshot.roles_for([self.admin_role_id]), {'admin'})
+        self.assertEqual(snapshot.permissions_for([self.admin_role_id]), {'user.read'})
+        self.assertEqual(snapshot.permissions_for([999]), set())
+        print("✅ Snapshot resolves role permissions")
+
+    def test_version_bump_is_monotonic(self):
+        """Test the first role writes start the counter and later bumps only increase it"""
+        self.assertEqual(self.base_version, 1)
+        bump_rbac_version()
+        bump_rbac_version()  # once per transaction
+        db.session.commit()
+        bump_rbac_version()
+        db.session.commit()
+        self.assertEqual(CacheVersion.get_version(RBAC_VERSION), 3)
+        print("✅ RBAC version bumps monotonically")
+
+    def test_flushed_role_changes_bump_the_version(self):
+        """Test roles written through the session move the version without an explicit bump"""
+        clock = FakeClock()
+        other_worker = RBACSnapshotCache(max_staleness=5, clock=clock)
+        other_worker.get()
+
+        role = Role(name='jobseeker', display_name='Jobseeker')
+        db.session.add(role)
+        db.session.commit()
+        self.assertEqual(CacheVersion.get_version(RBAC_VERSION), self.base_version + 1)
+
+        # Before its next probe the other worker reloads for the role id it does not know
+        self.assertEqual(other_worker.get([role.id]).roles_for([role.id]), {'jobseeker'})
+        self.assertEqual(other_worker.get([404]).roles_for([404]), set())
+        snapshot = other_worker.get([404])  # a missing id reloads only once
+        self.assertIs(other_worker.get([404]), snapshot)
+        print("✅ Session writes bump the RBAC version and unknown roles reload")
+
+    def test_probe_limited_to_staleness_window(self):
+        """Test the version is probed at most once per window"""
+        clock = FakeClock()
+        cache = RBACSnapshotCache(max_staleness=5, clock=clock)
+        first = cache.get()
+
+        self._grant_delete()
+        self.assertIs(cache.get(), first)
+
+        clock.advance(5)
+        self.assertIsNot(cache.get(), first)
+        self.assertIn('user.delete', cache.get().permissions_for([self.admin_role_id]))
+        print("✅ Snapshot probes once per staleness window")
+
+    def test_workers_converge_within_staleness_window(self):
+        """Test two workers see an edit made elsewhere within the staleness bound"""
+        max_staleness = 5
+        clocks = [FakeClock(), FakeClock()]
+        workers = [RBACSnapshotCache(max_staleness=max_staleness, clock=clock) for clock in clocks]
+
+        # Workers load their snapshots at different points in time
+        workers[0].get()
+        clocks[1].advance(3)
+        workers[1].get()
+
+        self._grant_delete()
+
+        for worker, clock in zip(workers, clocks):
+            clock.advance(max_staleness)
+            snapshot = worker.get()
+            self.assertEqual(snapshot.version, self.base_version + 1)
+            self.assertIn('user.delete', snapshot.permissions_for([self.admin_role_id]))
+        print("✅ Workers converge within the staleness window")
+
+    def test_unchanged_version_keeps_snapshot(self):
+        """Test an expired window without a version change does not reload"""
+        clock = FakeClock()
+        cache = RBACSnapshotCache(max_staleness=5, clock=clock)
+        first = cache.get()
+        clock.advance(10)
+        self.assertIs(cache.get(), first)
+        print("✅ Snapshot kept when version is unchanged")
+
+if __name__ == '__main__':
+    unittest.main()
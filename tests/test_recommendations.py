@@ -0,0 +1,203 @@
+"""
+Recommendation Pipeline Tests
+Tests match scoring, the precomputed top-K lists and incremental runs
+"""
+
+import json
+import os
+import random
+import sys
+import unittest
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+from sqlalchemy import select, update
+
+# Add the parent directory to the path so we can import the app
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app, db
+from app.models import Job, JobSeekerProfile, Recommendation, Skill, User
+from app.routes.roles.jobseeker_routes import jobseeker_routes_bp
+from app.services.activity_tracker import activity_tracker
+from app.services.recommendations import (JOB, PROFILE, FeatureEncoder, RecommendationPipeline, Scorer,
+                                          merge_lists, recommended)
+from app.services.reference_data import bump_reference_version
+
+SKILLS = ['Python', 'SQL', 'React', 'Docker', 'Java', 'Go', 'AWS', 'Excel']
+CITIES = ['Austin, TX', 'Dallas, TX', 'Denver, CO', None]
+
+def job_row(job_id, skills, experience=0, location=None, job_type='full-time', salary_max=None):
+    return {'id': job_id, 'skills_required': json.dumps(skills), 'experience_required': experience,
+            'location': location, 'job_type': job_type, 'salary_min': None, 'salary_max': salary_max}
+
+def profile_row(profile_id, skills, experience=0, location=None, expected_salary=None):
+    return {'id': profile_id, 'skills': json.dumps(skills), 'experience_years': experience,
+            'expected_salary': expected_salary, 'current_location': location, 'preferred_location': None}
+
+class TestScoring(unittest.TestCase):
+    """Test encoding and block scoring without a database"""
+
+    def setUp(self):
+        encoder = FeatureEncoder()
+        self.jobs = encoder.encode_jobs([
+            job_row(1, ['Python', 'SQL'], experience=4, location='Austin, TX', salary_max=100000),
+            job_row(2, ['React'], job_type='remote'),
+            job_row(3, ['Cobol']),
+        ])
+        self.profiles = encoder.encode_profiles([
+            profile_row(10, ['python', 'SQL'], experience=5, location='Austin, TX', expected_salary=90000),
+            profile_row(11, ['Python'], experience=2, location='Austin, TX'),
+            profile_row(12, ['Python', 'SQL'], experience=8, location='Denver, CO', expected_salary=200000),
+            profile_row(13, ['React', 'SQL']),
+        ])
+
+    def score(self, kind, rows, top_k=2):
+        with Scorer(self.jobs, self.profiles, top_k) as scorer:
+            (_, lists, _), = scorer.score(kind, rows)
+        return [(subject, target, round(score, 3), rank) for subject, target, score, rank in
+                zip(*(column.tolist() for column in lists))]
+
+    def test_pair_scores_and_top_k(self):
+        """Test skill coverage, experience, location and salary fit, cut to top_k per row"""
+        self.assertEqual(self.score(JOB, [0, 1, 2]), [
+            (1, 10, 1.0, 1),  # everything fits
+            (1, 12, 0.85, 2),  # elsewhere, expects twice the salary
+            (2, 13, 1.0, 1),  # remote jobs match any location
+        ])
+        self.assertEqual(self.score(PROFILE, [1, 3], top_k=5), [(11, 1, 0.6, 1), (13, 2, 1.0, 1), (13, 1, 0.45, 2)])
+        print("✅ Pairs sharing a skill are scored and ranked per row")
+
+    def test_merge_lists(self):
+        """Test merged lists keep the best top_k, ties broken by id"""
+        self.assertEqual(merge_lists({5: 0.9, 6: 0.5}, {7: 0.9, 8: 0.4}, 3), [(5, 0.9), (7, 0.9), (6, 0.5)])
+        print("✅ Stored lists merge with new pairs")
+
+class TestRecommendationPipeline(unittest.TestCase):
+    """Test full and incremental runs against the recommendations table"""
+
+    def setUp(self):
+        """Set up test environment"""
+        self.app = create_app('testing')
+        self.app.register_blueprint(jobseeker_routes_bp, name='jobseeker_recommendations', url_prefix='/recs')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        db.session.add_all([Skill(name=name.lower(), display_name=name) for name in SKILLS])
+        db.session.commit()
+        self.rng = random.Random(7)
+
+    def tearDown(self):
+        """Clean up test environment"""
+        activity_tracker.flush()
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def populate(self, jobs=40, profiles=60):
+        rng = self.rng
+        for _ in range(jobs):
+            db.session.add(Job(consultancy_id=1, title='Job', description='-', skills_required=json.dumps(
+                rng.sample(SKILLS, rng.randint(1, 4))), experience_required=rng.randint(0, 6),
+                location=rng.choice(CITIES), salary_max=rng.choice([None, 80000, 120000])))
+        for user_id in range(1, profiles + 1):
+            db.session.add(JobSeekerProfile(user_id=user_id, skills=json.dumps(rng.sample(SKILLS, rng.randint(1, 4))),
+                                            experience_years=rng.randint(0, 10), current_location=rng.choice(CITIES),
+                                            expected_salary=rng.choice([None, 70000, 150000])))
+        db.session.commit()
+        self.age()
+
+    def age(self):
+        """Move every row's updated_at past the overlap window, so only later edits count as changes"""
+        hour_ago = datetime.utcnow() - timedelta(hours=1)
+        db.session.execute(update(Job).values(updated_at=hour_ago))
+        db.session.execute(update(JobSeekerProfile).values(updated_at=hour_ago))
+        db.session.commit()
+
+    def stored(self):
+        table = Recommendation.__table__
+        return sorted(db.session.execute(select(
+            table.c.kind, table.c.subject_id, table.c.rank, table.c.target_id, table.c.score
+        )).all())
+
+    def edit(self):
+        rng = self.rng
+        jobs = Job.query.order_by(Job.id).all()
+        profiles = JobSeekerProfile.query.order_by(JobSeekerProfile.id).all()
+        for job in rng.sample(jobs, 4):
+            job.skills_required = json.dumps(rng.sample(SKILLS, rng.randint(1, 4)))
+        jobs[0].is_active = False
+        jobs[1].expires_at = datetime.utcnow() - timedelta(minutes=1)
+        for profile in rng.sample(profiles, 5):
+            profile.experience_years = rng.randint(0, 10)
+            profile.skills = json.dumps(rng.sample(SKILLS, rng.randint(1, 4)))
+        db.session.delete(profiles[-1])
+        db.session.add(Job(consultancy_id=1, title='New', description='-', skills_required='["Go", "AWS"]'))
+        db.session.add(JobSeekerProfile(user_id=999, skills='["Excel", "SQL"]', experience_years=3))
+        db.session.commit()
+
+    def test_incremental_run_matches_full_run(self):
+        """Test an incremental run after edits leaves the same lists as rescoring everything"""
+        self.populate()
+        pipeline = RecommendationPipeline(top_k=3, workers=0, block_size=16)
+        first = pipeline.run()
+        self.assertTrue(first.full)
+        self.assertEqual(first.jobs_scored, 40)
+
+        self.edit()
+        run = pipeline.run()
+        self.assertFalse(run.full)
+        self.assertLess(run.profiles_scored, 60)
+        incremental = self.stored()
+
+        pipeline.run(full=True)
+        self.assertEqual(incremental, self.stored())
+        self.age()
+        self.assertEqual(pipeline.run().lists_written, 0)  # nothing changed since
+        print("✅ Incremental runs recompute only affected lists and match a full run")
+
+    def test_process_pool_and_taxonomy_change(self):
+        """Test pooled scoring matches inline scoring and a taxonomy change forces a full run"""
+        self.populate(jobs=15, profiles=20)
+        RecommendationPipeline(top_k=4, workers=0, block_size=4).run()
+        inline = self.stored()
+        RecommendationPipeline(top_k=4, workers=1, block_size=4).run(full=True)
+        self.assertEqual(inline, self.stored())
+
+        db.session.add(Skill(name='rust', display_name='Rust'))
+        bump_reference_version()
+        db.session.commit()
+        self.assertTrue(RecommendationPipeline(top_k=4, workers=0).run().full)
+        print("✅ Process-pool scoring matches inline scoring")
+
+    def test_dashboard_reads_recommended_jobs(self):
+        """Test the jobseeker dashboard shows the stored list of the user's profile"""
+        db.session.add(User(username='seeker', email='seeker@example.com', password_hash='-'))
+        db.session.add_all([
+            Job(consultancy_id=1, title='Python Developer', description='-', skills_required='["Python", "SQL"]'),
+            Job(consultancy_id=1, title='Java Developer', description='-', skills_required='["Java"]'),
+            Job(consultancy_id=1, title='Data Analyst', description='-', skills_required='["SQL", "Excel"]'),
+        ])
+        db.session.add(JobSeekerProfile(user_id=1, skills='["Python", "SQL"]'))
+        db.session.commit()
+        RecommendationPipeline(top_k=5, workers=0).run()
+        self.assertEqual([job_id for job_id, _ in recommended(JOB, 1)], [1])
+
+        context = {}
+        with patch('app.routes.roles.jobseeker_routes.render_template',
+                   side_effect=lambda template, **kwargs: context.update(kwargs) or ''):
+            client = self.app.test_client()
+            with client.session_transaction() as session:
+                session.update(user_id=1, role='jobseeker')
+            client.get('/recs/dashboard')
+            self.assertEqual([job.title for job in context['recommended_jobs']], ['Python Developer', 'Data Analyst'])
+
+            # Expired since the last run: skipped before the pipeline catches up
+            db.session.get(Job, 3).expires_at = datetime.utcnow() - timedelta(minutes=1)
+            db.session.commit()
+            client.get('/recs/dashboard')
+        self.assertEqual([job.title for job in context['recommended_jobs']], ['Python Developer'])
+        print("✅ The dashboard reads precomputed recommendations")
+
+if __name__ == '__main__':
+    unittest.main()
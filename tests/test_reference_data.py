@@ -0,0 +1,173 @@
+"""
+Reference Data Tests
+Tests the in-process taxonomy snapshot, its invalidation and the ETag endpoint
+"""
+
+import json
+import os
+import sys
+import unittest
+from unittest.mock import patch
+
+# Add the parent directory to the path so we can import the app
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event
+
+from app import create_app, db
+from app.models import City, Country, IndustryType, Skill, State
+from app.routes.superadmin_routes import superadmin_bp
+from app.services.activity_tracker import activity_tracker
+from app.services.reference_data import ReferenceDataCache, bump_reference_version, get_reference_data
+
+class FakeClock:
+    """Manually advanced monotonic clock"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+class TestReferenceData(unittest.TestCase):
+    """Test taxonomy lookups served from memory"""
+
+    def setUp(self):
+        """Set up test environment"""
+        self.app = create_app('testing')
+        self.app.register_blueprint(superadmin_bp, name='superadmin_acl', url_prefix='/acl')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        tech = IndustryType(name='tech', display_name='Technology')
+        db.session.add(tech)
+        db.session.flush()
+        db.session.add_all([
+            Skill(name='python', display_name='Python', category='technical', industry_id=tech.id, sort_order=2),
+            Skill(name='sql', display_name='SQL', category='technical', sort_order=1),
+            Skill(name='writing', display_name='Writing', category='soft', is_active=False),
+        ])
+        us = Country(name='United States', code_alpha2='US', code_alpha3='USA')
+        ca = Country(name='Canada', code_alpha2='CA', code_alpha3='CAN')
+        db.session.add_all([us, ca])
+        db.session.flush()
+        texas = State(name='Texas', code='TX', country_id=us.id)
+        ontario = State(name='Ontario', code='ON', country_id=ca.id)
+        db.session.add_all([texas, ontario])
+        db.session.flush()
+        db.session.add_all([City(name='Austin', state_id=texas.id), City(name='Dallas', state_id=texas.id),
+                            City(name='Toronto', state_id=ontario.id)])
+        db.session.commit()
+        self.ids = {'us': us.id, 'texas': texas.id, 'tech': tech.id}
+
+        self.statements = []
+        listener = lambda *args: self.statements.append(args[2])
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        self.addCleanup(event.remove, db.engine, 'before_cursor_execute', listener)
+
+    def tearDown(self):
+        """Clean up test environment"""
+        activity_tracker.flush()
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_lookups_and_indexes(self):
+        """Test sorted lists, lookups and the country -> state -> city index"""
+        reference = get_reference_data()
+        self.assertEqual([skill.name for skill in reference.all('skills')], ['sql', 'python'])
+        self.assertEqual(len(reference.all('skills', active_only=False)), 3)
+        self.assertEqual(reference.by_name('skills', 'python').industry.display_name, 'Technology')
+        self.assertEqual(reference.categories('skills'), ['soft', 'technical'])
+
+        self.assertEqual([state.name for state in reference.states_for(self.ids['us'])], ['Texas'])
+        self.assertEqual([city.name for city in reference.cities_for(self.ids['texas'])], ['Austin', 'Dallas'])
+        self.assertEqual([(s.country.name, s.name) for s in reference.states_by_country()],
+                         [('Canada', 'Ontario'), ('United States', 'Texas')])
+        self.assertEqual(reference.get('cities', 3).state.country.code_alpha2, 'CA')
+
+        self.statements.clear()
+        get_reference_data()
+        self.assertEqual(self.statements, [])
+        print("✅ Taxonomy lookups and indexes are served from memory")
+
+    def test_other_workers_converge_on_bump(self):
+        """Test a bumped version reloads other workers after the staleness window"""
+        clock = FakeClock()
+        worker = ReferenceDataCache(max_staleness=5.0, clock=clock)
+        self.assertEqual(len(worker.get().all('skills')), 2)
+
+        skill = Skill.query.filter_by(name='writing').first()
+        skill.is_active = True
+        bump_reference_version()
+        db.session.commit()
+
+        self.assertEqual(len(worker.get().all('skills')), 2)
+        clock.advance(6)
+        self.assertEqual(len(worker.get().all('skills')), 3)
+        self.assertEqual(len(get_reference_data().all('skills')), 3)  # committing worker reloads at once
+        print("✅ Workers converge on the bumped reference data version")
+
+    def test_flushed_taxonomy_writes_bump_the_version(self):
+        """Test taxonomy rows written through the session move the version once per transaction"""
+        worker = ReferenceDataCache(max_staleness=0, clock=FakeClock())
+        version = worker.get().version
+
+        db.session.add(Skill(name='go', display_name='Go', category='technical'))
+        db.session.flush()
+        bump_reference_version()  # already bumped by the flush
+        db.session.commit()
+
+        snapshot = worker.get()
+        self.assertEqual(snapshot.version, version + 1)
+        self.assertIsNotNone(snapshot.by_name('skills', 'go'))
+        print("✅ Session writes bump the reference data version")
+
+    def test_routes_bump_and_use_the_snapshot(self):
+        """Test taxonomy edits bump the version and forms read the cached lists"""
+        context = {}
+        with patch('app.routes.superadmin_routes.AuthMiddleware.superadmin_only', return_value=None), \
+             patch('app.routes.superadmin_routes.render_template',
+                   side_effect=lambda template, **kwargs: context.update(kwargs) or ''):
+            client = self.app.test_client()
+            version = get_reference_data().version
+            client.post('/acl/skills/create', data={'name': 'go', 'display_name': 'Go', 'category': 'technical'})
+            self.assertEqual(get_reference_data().version, version + 1)
+
+            client.get('/acl/cities/create')
+            self.statements.clear()
+            client.get('/acl/cities/create')
+
+        self.assertEqual([state.name for state in context['states']], ['Ontario', 'Texas'])
+        self.assertFalse(any('states' in sql for sql in self.statements))
+        print("✅ Edits bump the version and forms skip the taxonomy queries")
+
+    def test_json_endpoint_etag(self):
+        """Test the JSON endpoint answers 304 to a matching If-None-Match"""
+        with patch('app.routes.superadmin_routes.AuthMiddleware.superadmin_only', return_value=None):
+            client = self.app.test_client()
+            response = client.get('/acl/api/reference-data')
+            self.assertEqual(response.status_code, 200)
+            payload = json.loads(response.get_data(as_text=True))
+            self.assertEqual([c['name'] for c in payload['tables']['countries']], ['Canada', 'United States'])
+            self.assertNotIn('created_at', payload['tables']['skills'][0])
+            etag = response.headers['ETag']
+
+            cached = client.get('/acl/api/reference-data', headers={'If-None-Match': etag})
+            self.assertEqual(cached.status_code, 304)
+
+            country = Country.query.get(self.ids['us'])
+            country.phone_code = '+1'
+            bump_reference_version()
+            db.session.commit()
+            changed = client.get('/acl/api/reference-data', headers={'If-None-Match': etag})
+            self.assertEqual(changed.status_code, 200)
+            self.assertNotEqual(changed.headers['ETag'], etag)
+        print("✅ Reference data JSON is revalidated by ETag")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,139 @@
+"""
+Revocation Index Tests
+Tests the in-memory JWT blacklist used by verify_token
+"""
+
+import os
+import sys
+import unittest
+from datetime import datetime, timedelta
+
+# Add the parent directory to the path so we can import the app
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event
+
+from app import create_app, db
+from app.auth.auth_models import AuthUser, JWTBlacklist
+from app.services.auth_service import JWTAuthService
+from app.services.revocation_index import BloomFilter, RevocationIndex, revocation_index
+
+class TestRevocationIndex(unittest.TestCase):
+    """Test revoked-token lookups without per-request SQL"""
+
+    def setUp(self):
+        """Set up test environment"""
+        self.app = create_app('testing')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        self.user = AuthUser(username='tokenuser', email='tokenuser@test.com')
+        self.user.set_password('password123')
+        db.session.add(self.user)
+        db.session.commit()
+
+    def tearDown(self):
+        """Clean up test environment"""
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def _blacklist(self, jti, expires_in=timedelta(hours=1), blacklisted_ago=timedelta(0)):
+        db.session.add(JWTBlacklist(
+            token_jti=jti,
+            user_id=self.user.id,
+            expires_at=datetime.utcnow() + expires_in,
+            blacklisted_at=datetime.utcnow() - blacklisted_ago
+        ))
+        db.session.commit()
+
+    def _count_queries(self):
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        self.addCleanup(event.remove, db.engine, 'before_cursor_execute', listener)
+        return statements
+
+    def test_bloom_filter_membership(self):
+        """Test added keys are always found and most others are not"""
+        bloom = BloomFilter(capacity=1000)
+        for i in range(1000):
+            bloom.add(f'jti-{i}')
+        self.assertTrue(all(f'jti-{i}' in bloom for i in range(1000)))
+        false_positives = sum(f'other-{i}' in bloom for i in range(10000))
+        self.assertLess(false_positives, 50)
+        print("✅ Bloom filter has no false negatives")
+
+    def test_loaded_on_first_use(self):
+        """Test existing unexpired rows are loaded; expired ones are not"""
+        self._blacklist('revoked-1')
+        self._blacklist('expired-1', expires_in=timedelta(hours=-1))
+
+        index = RevocationIndex()
+        self.assertTrue(index.is_revoked('revoked-1'))
+        self.assertFalse(index.is_revoked('expired-1'))
+        self.assertEqual(len(index), 1)
+        print("✅ Index loads unexpired revocations")
+
+    def test_no_sql_between_polls(self):
+        """Test lookups between polls cost zero SQL"""
+        index = RevocationIndex()
+        index.poll_interval = 60
+        index.refresh()
+
+        statements = self._count_queries()
+        for i in range(100):
+            self.assertFalse(index.is_revoked(f'live-token-{i}'))
+        self.assertEqual(statements, [])
+        print("✅ Non-revoked tokens checked without SQL")
+
+    def test_incremental_poll_picks_up_new_rows(self):
+        """Test the high-water-mark poll sees rows revoked by other workers"""
+        self._blacklist('old', blacklisted_ago=timedelta(hours=2))
+        index = RevocationIndex()
+        index.poll_interval = 0
+        index.refresh()
+
+        self._blacklist('new')
+        self.assertTrue(index.is_revoked('new'))
+        self.assertTrue(index.is_revoked('old'))
+        print("✅ Poll picks up new revocations")
+
+    def test_expired_entries_pruned(self):
+        """Test entries are dropped once past expires_at"""
+        index = RevocationIndex()
+        index.poll_interval = 60
+        index.refresh()
+        index.add('short-lived', datetime.utcnow() - timedelta(seconds=1))
+        self.assertFalse(index.is_revoked('short-lived'))
+        self.assertEqual(len(index), 0)
+        print("✅ Expired revocations pruned")
+
+    def test_compaction_deletes_expired_rows_in_batches(self):
+        """Test compaction removes only expired rows"""
+        for i in range(5):
+            self._blacklist(f'expired-{i}', expires_in=timedelta(hours=-1))
+        self._blacklist('live')
+
+        index = RevocationIndex()
+        index.compact_batch_size = 2
+        self.assertEqual(index.compact(), 5)
+        self.assertEqual([row.token_jti for row in JWTBlacklist.query.all()], ['live'])
+        print("✅ Compaction deletes expired rows in batches")
+
+    def test_verify_token_honours_blacklist(self):
+        """Test verify_token rejects a token right after it is blacklisted"""
+        token = self.user.generate_jwt_token('access')
+        self.assertIsNotNone(JWTAuthService.verify_token(token)[0])
+
+        with self.app.test_request_context('/'):
+            JWTAuthService.logout_user(token)
+        user, message = JWTAuthService.verify_token(token)
+        self.assertIsNone(user)
+        self.assertEqual(message, 'Token is blacklisted')
+        self.assertGreaterEqual(len(revocation_index), 1)
+        print("✅ verify_token uses the revocation index")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,133 @@
+"""
+Security Log Writer Tests
+Tests queued, batched security logging and its per-severity policies
+"""
+
+import os
+import sys
+import unittest
+
+# Add the parent directory to the path so we can import the app
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event
+
+from app import create_app, db
+from app.auth.auth_models import SecurityLog, SecurityEventType
+from app.services.security_log_writer import SecurityLogWriter
+
+class TestSecurityLogWriter(unittest.TestCase):
+    """Test the asynchronous security log writer"""
+
+    def setUp(self):
+        """Set up test environment"""
+        self.app = create_app('testing')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        self.writer = self._make_writer(queue_size=100)
+
+    def tearDown(self):
+        """Clean up test environment"""
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def _make_writer(self, queue_size):
+        writer = SecurityLogWriter()
+        writer.app = self.app
+        writer.enabled = True
+        writer.flush_interval = 0  # Flush explicitly
+        writer.batch_size = queue_size * 2
+        writer.queue_size = queue_size
+        writer._queue.maxsize = queue_size
+        return writer
+
+    def _log(self, severity, count=1, writer=None):
+        writer = writer or self.writer
+        return [
+            writer.log(SecurityEventType.SUSPICIOUS_ACTIVITY, ip_address='10.0.0.1',
+                       details={'n': i}, severity=severity)
+            for i in range(count)
+        ]
+
+    def test_events_queued_not_written(self):
+        """Test non-critical events do not touch the database on log()"""
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        self.addCleanup(event.remove, db.engine, 'before_cursor_execute', listener)
+
+        self._log('medium', 5)
+        self.assertEqual(statements, [])
+        self.assertEqual(self.writer.get_metrics()['queue_depth'], 5)
+        print("✅ Events queued off the request path")
+
+    def test_flush_uses_executemany(self):
+        """Test a flush inserts the whole batch with one executemany"""
+        self._log('low', 3)
+        self._log('high', 2)
+
+        executions = []
+        listener = lambda conn, cursor, statement, params, context, executemany: executions.append(executemany)
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        self.assertEqual(self.writer.flush(), 5)
+        event.remove(db.engine, 'before_cursor_execute', listener)
+
+        self.assertEqual(executions, [True])
+        self.assertEqual(SecurityLog.query.count(), 5)
+        self.assertEqual(SecurityLog.query.filter_by(severity='high').count(), 2)
+        log = SecurityLog.query.first()
+        self.assertEqual(log.event_type, SecurityEventType.SUSPICIOUS_ACTIVITY)
+        self.assertEqual(log.details_json, {'n': 0})
+        print("✅ Batch flushed with executemany")
+
+    def test_critical_written_synchronously(self):
+        """Test critical events bypass the queue"""
+        self._log('critical')
+        self.assertEqual(SecurityLog.query.filter_by(severity='critical').count(), 1)
+        metrics = self.writer.get_metrics()
+        self.assertEqual(metrics['queue_depth'], 0)
+        self.assertEqual(metrics['sync_writes'], 1)
+        print("✅ Critical events written synchronously")
+
+    def test_full_queue_drops_medium(self):
+        """Test medium events are dropped once the queue is full"""
+        writer = self._make_writer(queue_size=4)
+        writer.policies['medium'] = {'sample_above': None, 'sample_every': 1, 'on_full': 'drop'}
+        results = self._log('medium', 6, writer=writer)
+
+        self.assertEqual(results, [True] * 4 + [False] * 2)
+        self.assertEqual(writer.get_metrics()['dropped'], {'medium': 2})
+        print("✅ Full queue drops medium events")
+
+    def test_full_queue_high_falls_back_to_sync(self):
+        """Test high events are never lost when the queue is full"""
+        writer = self._make_writer(queue_size=2)
+        writer.block_timeout = 0
+        self._log('high', 3, writer=writer)
+
+        self.assertEqual(SecurityLog.query.count(), 1)
+        writer.flush()
+        self.assertEqual(SecurityLog.query.count(), 3)
+        print("✅ High events fall back to synchronous writes")
+
+    def test_low_sampled_above_high_water_mark(self):
+        """Test low events are sampled once the queue passes its high-water mark"""
+        writer = self._make_writer(queue_size=100)
+        self._log('medium', 50, writer=writer)
+        results = self._log('low', 20, writer=writer)
+
+        self.assertEqual(results.count(True), 2)
+        self.assertEqual(writer.get_metrics()['sampled_out'], 18)
+        print("✅ Low events sampled under pressure")
+
+    def test_disabled_writer_is_synchronous(self):
+        """Test the model API writes immediately when async logging is off"""
+        SecurityLog.log_security_event(SecurityEventType.LOGIN_FAILED, ip_address='10.0.0.2', severity='low')
+        self.assertEqual(SecurityLog.query.count(), 1)
+        print("✅ Synchronous logging when async is disabled")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+"""
+Signed CSRF Token Tests
+Tests stateless HMAC CSRF tokens and the selectable database mode
+"""
+
+import os
+import sys
+import time
+import unittest
+from unittest.mock import patch
+
+# Add the parent directory to the path so we can import the app
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event
+
+from app import create_app, db
+from app.auth.auth_models import CSRFToken
+from app.services.auth_service import SecurityService
+from app.services.csrf_service import (
+    ReplayCache, generate_signed_token, validate_signed_token
+)
+
+class TestSignedCSRFTokens(unittest.TestCase):
+    """Test signed CSRF token issue and validation"""
+
+    def setUp(self):
+        """Set up test environment"""
+        self.app = create_app('testing')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+    def tearDown(self):
+        """Clean up test environment"""
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_round_trip(self):
+        """Test a token validates for the session and user it was issued to"""
+        token = generate_signed_token(user_id=7, session_id='session-a')
+        self.assertTrue(validate_signed_token(token, user_id=7, session_id='session-a'))
+        self.assertTrue(validate_signed_token(token, session_id='session-a'))
+        print("✅ Signed token round trip")
+
+    def test_bound_to_session_and_user(self):
+        """Test a token is rejected for another session or user"""
+        token = generate_signed_token(user_id=7, session_id='session-a')
+        self.assertFalse(validate_signed_token(token, user_id=7, session_id='session-b'))
+        self.assertFalse(validate_signed_token(token, user_id=8, session_id='session-a'))
+        print("✅ Signed token bound to session and user")
+
+    def test_tampered_and_malformed_rejected(self):
+        """Test altered or garbage tokens fail validation"""
+        token = generate_signed_token(user_id=7, session_id='session-a')
+        issued_at, nonce, user_id, signature = token.split('.')
+        forged = '.'.join([issued_at, nonce, '1', signature])
+        self.assertFalse(validate_signed_token(forged, user_id=1, session_id='session-a'))
+        self.assertFalse(validate_signed_token('not-a-token', session_id='session-a'))
+        self.assertFalse(validate_signed_token(None))
+        print("✅ Tampered tokens rejected")
+
+    def test_expired_rejected(self):
+        """Test tokens older than SECURITY_CSRF_TIME_LIMIT are rejected"""
+        token = generate_signed_token(session_id='session-a')
+        limit = self.app.config['SECURITY_CSRF_TIME_LIMIT']
+        with patch('app.services.csrf_service.time.time', return_value=time.time() + limit + 1):
+            self.assertFalse(validate_signed_token(token, session_id='session-a'))
+        print("✅ Expired tokens rejected")
+
+    def test_single_use_replay_cache(self):
+        """Test the replay cache rejects a token the second time"""
+        self.app.config['CSRF_SINGLE_USE'] = True
+        self.addCleanup(self.app.config.update, CSRF_SINGLE_USE=False)
+
+        token = generate_signed_token(session_id='session-a')
+        self.assertTrue(validate_signed_token(token, session_id='session-a'))
+        self.assertFalse(validate_signed_token(token, session_id='session-a'))
+        print("✅ Replayed tokens rejected in single-use mode")
+
+    def test_replay_cache_bounded_and_expiring(self):
+        """Test the replay cache evicts expired nonces and caps its size"""
+        now = [1000.0]
+        cache = ReplayCache(max_entries=3, clock=lambda: now[0])
+        for i in range(5):
+            self.assertTrue(cache.check_and_add(f'nonce-{i}', 2000.0))
+        self.assertEqual(len(cache), 3)
+
+        now[0] = 2001.0
+        self.assertTrue(cache.check_and_add('fresh', 3000.0))
+        self.assertEqual(len(cache), 1)
+        print("✅ Replay cache bounded")
+
+    def test_signed_mode_needs_no_database(self):
+        """Test issuing and validating through SecurityService issues no SQL"""
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        self.addCleanup(event.remove, db.engine, 'before_cursor_execute', listener)
+
+        with self.app.test_request_context('/'):
+            token = SecurityService.generate_csrf_token(user_id=3)
+            self.assertTrue(SecurityService.validate_csrf_token(token, user_id=3))
+        self.assertEqual(statements, [])
+        print("✅ Signed mode issues no SQL")
+
+    def test_database_mode_selectable(self):
+        """Test CSRF_TOKEN_MODE='database' keeps the table-backed tokens"""
+        self.app.config['CSRF_TOKEN_MODE'] = 'database'
+        with self.app.test_request_context('/'):
+            token = SecurityService.generate_csrf_token(user_id=None)
+            self.assertEqual(CSRFToken.query.filter_by(token=token).count(), 1)
+            self.assertTrue(SecurityService.validate_csrf_token(token))
+        print("✅ Database mode still selectable")
+
+if __name__ == '__main__':
+    unittest.main()
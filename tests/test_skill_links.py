@@ -0,0 +1,160 @@
+"""
+Skill Links Tests
+Tests the skill association tables follow the skills text, the backfill and skill filtering in search
+"""
+
+import json
+import os
+import sys
+import unittest
+from unittest.mock import patch
+
+from sqlalchemy import delete, event, select
+
+# Add the parent directory to the path so we can import the app
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app, db
+from app.models import ConsultancyProfile, ConsultancySkill, Job, JobSeekerProfile, JobSeekerSkill, JobSkill, Skill
+from app.routes.roles.jobseeker_routes import jobseeker_routes_bp
+from app.routes.superadmin_routes import superadmin_bp
+from app.services.activity_tracker import activity_tracker
+from app.services.skill_links import backfill, linked_to
+from sqlalchemy.orm import selectinload
+
+class TestSkillLinks(unittest.TestCase):
+    """Test links are written with the skills text and read by join"""
+
+    def setUp(self):
+        """Set up test environment"""
+        self.app = create_app('testing')
+        self.app.register_blueprint(jobseeker_routes_bp, name='jobseeker_skills', url_prefix='/skills')
+        self.app.register_blueprint(superadmin_bp, name='superadmin_acl', url_prefix='/acl')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        db.session.add_all([Skill(name='python', display_name='Python'),
+                            Skill(name='sql', display_name='SQL'),
+                            Skill(name='machine_learning', display_name='ML'),
+                            Skill(name='react', display_name='React')])
+        db.session.commit()
+        self.skill = {skill.display_name: skill.id for skill in Skill.query}
+
+    def tearDown(self):
+        """Clean up test environment"""
+        activity_tracker.flush()
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def links(self, link, key):
+        return sorted(db.session.execute(select(getattr(link, key), link.skill_id)).all())
+
+    def test_links_follow_skills_text(self):
+        """Test new and edited rows are linked to the skills their text resolves to"""
+        profile = JobSeekerProfile(user_id=1, skills=json.dumps(['python', 'Machine Learning', 'Cobol']))
+        job = Job(consultancy_id=1, title='Data Engineer', description='-', skills_required='SQL, Python')
+        consultancy = ConsultancyProfile(user_id=2, company_name='Acme', specializations='["React"]')
+        db.session.add_all([profile, job, consultancy])
+        db.session.commit()
+        self.assertEqual(self.links(JobSeekerSkill, 'profile_id'),
+                         [(profile.id, self.skill['Python']), (profile.id, self.skill['ML'])])
+        self.assertEqual(self.links(JobSkill, 'job_id'),
+                         [(job.id, self.skill['Python']), (job.id, self.skill['SQL'])])
+        self.assertEqual(self.links(ConsultancySkill, 'consultancy_id'), [(consultancy.id, self.skill['React'])])
+
+        profile.skills = json.dumps(['SQL', 'Python'])
+        profile.experience_years = 3
+        job.title = 'Senior Data Engineer'  # untouched skills keep their links
+        db.session.commit()
+        self.assertEqual(self.links(JobSeekerSkill, 'profile_id'),
+                         [(profile.id, self.skill['Python']), (profile.id, self.skill['SQL'])])
+        self.assertEqual(len(self.links(JobSkill, 'job_id')), 2)
+
+        db.session.delete(profile)
+        db.session.commit()
+        self.assertEqual(self.links(JobSeekerSkill, 'profile_id'), [])
+        print("✅ Skill links follow the skills text")
+
+    def test_backfill_and_join_reads(self):
+        """Test the backfill relinks rows in batches and the skills load in one query"""
+        for user_id in range(1, 8):
+            db.session.add(JobSeekerProfile(user_id=user_id, skills=json.dumps(['Python', 'SQL'][:user_id % 3])))
+        db.session.commit()
+        db.session.execute(delete(JobSeekerSkill))  # rows written before the tables existed
+        db.session.commit()
+
+        batches = []
+        stats = backfill(JobSeekerProfile, batch_size=3, progress=lambda last_id, stats: batches.append(last_id))
+        self.assertEqual((stats['rows'], stats['links'], batches), (7, 7, [3, 6, 7]))
+        self.assertEqual(backfill(JobSeekerProfile, batch_size=3)['links'], 7)  # reruns replace, not add
+        self.assertEqual(len(self.links(JobSeekerSkill, 'profile_id')), 7)
+
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            db.session.expunge_all()
+            profiles = JobSeekerProfile.query.options(selectinload(JobSeekerProfile.linked_skills)).all()
+            names = {profile.user_id: [skill.display_name for skill in profile.linked_skills] for profile in profiles}
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+        self.assertEqual(len(statements), 2)
+        self.assertEqual(names[2], ['Python', 'SQL'])
+        self.assertEqual(names[3], [])
+        print("✅ The backfill streams batches and reads join the link table")
+
+    def test_taxonomy_changes_relink_rows(self):
+        """Test creating and renaming skills on the superadmin pages relinks the rows naming them"""
+        profile = JobSeekerProfile(user_id=1, skills=json.dumps(['Rust', 'Python']))
+        job = Job(consultancy_id=1, title='Systems', description='-', skills_required='["Rust"]')
+        db.session.add_all([profile, job])
+        db.session.commit()
+        self.assertEqual(len(self.links(JobSeekerSkill, 'profile_id')), 1)
+
+        client = self.app.test_client()
+        with patch('app.routes.superadmin_routes.AuthMiddleware.superadmin_only', return_value=None), \
+             patch('app.routes.superadmin_routes.url_for', return_value='/'):
+            client.post('/acl/skills/create', data={'name': 'rust', 'display_name': 'Rust'})
+            rust = Skill.query.filter_by(name='rust').one().id
+            self.assertEqual(self.links(JobSeekerSkill, 'profile_id'),
+                             sorted([(profile.id, self.skill['Python']), (profile.id, rust)]))
+            self.assertEqual(self.links(JobSkill, 'job_id'), [(job.id, rust)])
+
+            client.post(f'/acl/skills/{rust}/edit', data={'name': 'rust_lang', 'display_name': 'Rust Lang',
+                                                          'is_active': 'on'})
+        self.assertEqual(self.links(JobSkill, 'job_id'), [])
+        self.assertEqual(backfill(JobSeekerProfile)['relinked'], 0)  # nothing left to rewrite
+        print("✅ Taxonomy changes relink the rows naming the skills")
+
+    def test_skill_filters(self):
+        """Test filtering by any or all skills, in SQL from the link index and on the jobs page from the job index"""
+        db.session.add_all([
+            Job(consultancy_id=1, title='Backend', description='-', skills_required='["Python", "SQL"]'),
+            Job(consultancy_id=1, title='Frontend', description='-', skills_required='["React"]'),
+            Job(consultancy_id=1, title='Analyst', description='-', skills_required='["SQL"]'),
+        ])
+        db.session.commit()
+        python, sql = self.skill['Python'], self.skill['SQL']
+        self.assertEqual(sorted(db.session.scalars(linked_to(Job, [python, sql]))), [1, 3])
+        self.assertEqual(list(db.session.scalars(linked_to(Job, [python, sql], match_all=True))), [1])
+
+        context = {}
+        with patch('app.routes.roles.jobseeker_routes.render_template',
+                   side_effect=lambda template, **kwargs: context.update(kwargs) or ''):
+            client = self.app.test_client()
+            with client.session_transaction() as session:
+                session.update(user_id=1, role='jobseeker')
+            client.get('/skills/jobs?skills=sql, Cobol')
+            self.assertEqual([job.title for job in context['jobs'].items], ['Analyst', 'Backend'])
+            self.assertEqual(context['unknown_skills'], ['Cobol'])
+            self.assertEqual([skill.display_name for skill in context['jobs'].items[1].linked_skills],
+                             ['Python', 'SQL'])
+            client.get('/skills/jobs?skills=SQL,Python&skill_match=all')
+            self.assertEqual([job.title for job in context['jobs'].items], ['Backend'])
+            client.get('/skills/jobs?skills=Cobol')
+            self.assertEqual(context['total_count'], 0)
+        print("✅ Job search filters on any or all skills")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,138 @@
+"""
+Subscription Plan Listing Query Tests
+Tests the plan listing stays O(1) in queries and shares the cached sidebar totals
+"""
+
+import os
+import sys
+import unittest
+from unittest.mock import patch
+
+# Add the parent directory to the path so we can import the app
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event
+
+from app import create_app, db
+from app.auth.auth_models import AuthUser, JobPortal, SubscriptionPlan, UserSubscription
+from app.routes.superadmin_routes import superadmin_bp
+from app.services.activity_tracker import activity_tracker
+from app.services.subscription_summary import subscription_summary
+
+class TestSubscriptionPlanQueries(unittest.TestCase):
+    """Test query counts of the subscription admin pages"""
+
+    def setUp(self):
+        """Set up test environment"""
+        self.app = create_app('testing')
+        self.app.register_blueprint(superadmin_bp, name='superadmin_acl', url_prefix='/acl')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        self.users = [AuthUser(username=f'subuser{i}', email=f'subuser{i}@test.com') for i in range(3)]
+        for user in self.users:
+            user.password_hash = 'unused'
+        db.session.add_all(self.users)
+        db.session.add(JobPortal(name='portal', display_name='Portal', website_url='https://portal.test'))
+        db.session.commit()
+
+        self.client = self.app.test_client()
+        superadmin_patch = patch('app.routes.superadmin_routes.AuthMiddleware.superadmin_only', return_value=None)
+        superadmin_patch.start()
+        self.addCleanup(superadmin_patch.stop)
+
+    def tearDown(self):
+        """Clean up test environment"""
+        activity_tracker.flush()
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def _add_plans(self, count, plan_type='jobseeker'):
+        start = SubscriptionPlan.query.count()
+        for i in range(start, start + count):
+            plan = SubscriptionPlan(name=f'plan{i}', display_name=f'Plan {i}', plan_type=plan_type,
+                                    price_monthly=10, price_yearly=100, sort_order=i)
+            db.session.add(plan)
+            db.session.flush()
+            for user in self.users[:i % 3 + 1]:
+                db.session.add(UserSubscription(user_id=user.id, plan_id=plan.id,
+                                                status='active' if user is self.users[0] else 'cancelled'))
+        db.session.commit()
+
+    def _render(self, path):
+        """Request a page, returning its template context and the SQL it ran"""
+        context, statements = {}, []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            with patch('app.routes.superadmin_routes.render_template',
+                       side_effect=lambda template, **kwargs: context.update(kwargs) or ''):
+                response = self.client.get(path)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+        self.assertEqual(response.status_code, 200)
+        return context, statements
+
+    def test_plan_listing_usage(self):
+        """Test per-plan counts come from the grouped query"""
+        self._add_plans(3)
+        context, _ = self._render('/acl/subscription-plans')
+
+        plans = context['plans']
+        self.assertEqual([plan.name for plan in plans.items], ['plan0', 'plan1', 'plan2'])
+        self.assertEqual(plans.total, 3)
+        self.assertEqual(
+            {plan.name: context['plan_usage'][plan.id] for plan in plans.items},
+            {
+                'plan0': {'total_users': 1, 'active_users': 1},
+                'plan1': {'total_users': 2, 'active_users': 1},
+                'plan2': {'total_users': 3, 'active_users': 1}
+            }
+        )
+        self.assertEqual(context['total_subscribers'], 6)
+        self.assertEqual(context['active_subscribers'], 3)
+        self.assertEqual(context['monthly_revenue'], 30.0)
+        self.assertEqual(context['portal_count'], 1)
+        print("✅ Plan listing reports per-plan usage and sidebar totals")
+
+    def test_plan_listing_queries_do_not_grow_with_plans(self):
+        """Test the listing runs the same number of queries for 2 or 20 plans"""
+        self._add_plans(2)
+        subscription_summary.invalidate()
+        _, few = self._render('/acl/subscription-plans')
+
+        self._add_plans(18, plan_type='consultancy')
+        subscription_summary.invalidate()
+        context, many = self._render('/acl/subscription-plans')
+
+        self.assertEqual(len(context['plans'].items), 20)
+        self.assertEqual(len(many), len(few))
+        print(f"✅ Plan listing runs {len(many)} queries regardless of plan count")
+
+    def test_sidebar_totals_are_cached_and_invalidated(self):
+        """Test the sidebar totals are reused until a plan or subscription changes"""
+        self._add_plans(2)
+        self._render('/acl/subscription-plans')
+
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        self.addCleanup(event.remove, db.engine, 'before_cursor_execute', listener)
+
+        summary = subscription_summary.get()
+        self.assertEqual(summary['total_plans'], 2)
+        self.assertEqual(summary['monthly_revenue'], 20.0)
+        self.assertEqual(statements, [])
+
+        self._add_plans(1, plan_type='consultancy')
+        statements.clear()
+        summary = subscription_summary.get()
+        self.assertEqual(summary['total_plans'], 3)
+        self.assertEqual(summary['consultancy_count'], 1)
+        self.assertEqual(len(statements), 2)
+        print("✅ Sidebar totals are cached and dropped on plan changes")
+
+if __name__ == '__main__':
+    unittest.main()
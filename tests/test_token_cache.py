@@ -0,0 +1,156 @@
+"""
+Verified Token Cache Tests
+Tests caching of verified JWT claims and user snapshots
+"""
+
+import os
+import sys
+import time
+import unittest
+from datetime import timedelta
+from unittest.mock import patch
+
+# Add the parent directory to the path so we can import the app
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event
+
+from app import create_app, db
+from app.auth.auth_models import AuthUser
+from app.services.auth_service import JWTAuthService
+from app.services.revocation_index import revocation_index
+from app.services.token_cache import VerifiedTokenCache, verified_token_cache
+
+class TestVerifiedTokenCache(unittest.TestCase):
+    """Test the verified JWT decode cache"""
+
+    def setUp(self):
+        """Set up test environment"""
+        self.app = create_app('testing')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        self.user = AuthUser(username='apiuser', email='apiuser@test.com')
+        self.user.set_password('password123')
+        db.session.add(self.user)
+        db.session.commit()
+        self.user_id = self.user.id
+        self.token = self.user.generate_jwt_token('access')
+
+    def tearDown(self):
+        """Clean up test environment"""
+        verified_token_cache.clear()
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def _count_queries(self):
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        self.addCleanup(event.remove, db.engine, 'before_cursor_execute', listener)
+        return statements
+
+    def test_hit_skips_decode_and_user_query(self):
+        """Test a repeated token is served without jwt.decode or SQL"""
+        JWTAuthService.verify_token(self.token)
+        db.session.remove()  # A new request starts with an empty session
+
+        statements = self._count_queries()
+        with patch.object(revocation_index, 'poll_interval', 60), \
+                patch('app.services.auth_service.jwt.decode') as decode:
+            revocation_index.refresh(force=True)
+            statements.clear()
+            user, message = JWTAuthService.verify_token(self.token)
+            decode.assert_not_called()
+
+        self.assertEqual(message, 'Token is valid')
+        self.assertEqual(user.id, self.user_id)
+        self.assertEqual(user.username, 'apiuser')
+        self.assertIn(user, db.session)
+        self.assertEqual(statements, [])
+
+        metrics = verified_token_cache.get_metrics()
+        self.assertEqual((metrics['hits'], metrics['misses']), (1, 1))
+        print("✅ Cached token verified without decode or SQL")
+
+    def test_snapshot_excludes_secrets(self):
+        """Test secrets are not cached but still load on access"""
+        JWTAuthService.verify_token(self.token)
+        db.session.remove()
+        user, _ = JWTAuthService.verify_token(self.token)
+        self.assertTrue(user.check_password('password123'))
+        print("✅ Sensitive columns load lazily")
+
+    def test_blacklist_drops_entry(self):
+        """Test blacklisting a token evicts it at once"""
+        JWTAuthService.verify_token(self.token)
+        with self.app.test_request_context('/'):
+            JWTAuthService.logout_user(self.token)
+
+        user, message = JWTAuthService.verify_token(self.token)
+        self.assertIsNone(user)
+        self.assertEqual(message, 'Token is blacklisted')
+        print("✅ Blacklisted token evicted")
+
+    def test_deactivation_drops_entry(self):
+        """Test deactivating the user evicts their tokens"""
+        JWTAuthService.verify_token(self.token)
+        self.assertEqual(len(verified_token_cache), 1)
+
+        AuthUser.query.get(self.user_id).is_active = False
+        db.session.commit()
+
+        self.assertEqual(len(verified_token_cache), 0)
+        user, message = JWTAuthService.verify_token(self.token)
+        self.assertIsNone(user)
+        self.assertEqual(message, 'User not found or inactive')
+        print("✅ Deactivated user evicted")
+
+    def test_other_workers_follow_users_version(self):
+        """Test another worker drops its entries once the users version moves, and bookkeeping does not move it"""
+        other = VerifiedTokenCache()
+        other.max_staleness = 0  # Probe on every lookup
+        payload = {'exp': time.time() + 600, 'jti': 'other-jti', 'user_id': self.user_id}
+        user = AuthUser.query.get(self.user_id)
+        other.put(self.token, payload, user, other.version())
+
+        user.login_attempts = 3  # Login bookkeeping
+        db.session.commit()
+        self.assertIsNotNone(other.get(self.token))
+
+        # A request that read the user before the change cannot re-cache the old row
+        stale_version = other.version()
+        user.is_active = False
+        db.session.commit()
+        self.assertIsNone(other.get(self.token))
+        other.put(self.token, payload, user, stale_version)
+        self.assertIsNone(other.get(self.token))
+        print("✅ Other workers drop changed users within the staleness window")
+
+    def test_entry_bounded_by_token_expiry(self):
+        """Test an entry never outlives the token's exp"""
+        short_token = self.user.generate_jwt_token('access', timedelta(seconds=30))
+        JWTAuthService.verify_token(short_token)
+
+        real_time = __import__('time').time
+        with patch('app.services.token_cache.time.time', return_value=real_time() + 31):
+            self.assertIsNone(verified_token_cache.get(short_token))
+        print("✅ Entries expire with the token")
+
+    def test_lru_bound(self):
+        """Test the cache evicts least recently used tokens beyond its size"""
+        verified_token_cache.max_entries = 2
+        self.addCleanup(setattr, verified_token_cache, 'max_entries', 10000)
+        tokens = [self.user.generate_jwt_token('access') for _ in range(3)]
+        for token in tokens:
+            JWTAuthService.verify_token(token)
+
+        self.assertEqual(len(verified_token_cache), 2)
+        self.assertIsNone(verified_token_cache.get(tokens[0]))
+        self.assertEqual(verified_token_cache.get_metrics()['evictions'], 1)
+        print("✅ Cache bounded by LRU eviction")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,140 @@
+"""
+Typeahead Tests
+Tests prefix search, ranking and incremental updates of the skill and city indexes
+"""
+
+import os
+import sys
+import unittest
+from unittest.mock import patch
+
+# Add the parent directory to the path so we can import the app
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event
+
+from app import create_app, db
+from app.models import City, Country, Skill, State
+from app.services.activity_tracker import activity_tracker
+from app.services.reference_data import bump_reference_version, get_reference_data
+from app.services.typeahead import PrefixIndex, _city_entry, _city_signature, get_typeahead, normalize
+
+class TestTypeahead(unittest.TestCase):
+    """Test the in-memory autocomplete engine"""
+
+    def setUp(self):
+        """Set up test environment"""
+        self.app = create_app('testing')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        db.session.add_all([
+            Skill(name='java', display_name='Java', sort_order=1),
+            Skill(name='javascript', display_name='JavaScript', sort_order=0),
+            Skill(name='spring', display_name='Spring Boot (Java)', sort_order=5),
+            Skill(name='cobol', display_name='COBOL', is_active=False),
+        ])
+        brazil = Country(name='Brazil', code_alpha2='BR', code_alpha3='BRA')
+        us = Country(name='United States', code_alpha2='US', code_alpha3='USA')
+        db.session.add_all([brazil, us])
+        db.session.flush()
+        sp = State(name='São Paulo', country_id=brazil.id)
+        ny = State(name='New York', country_id=us.id)
+        db.session.add_all([sp, ny])
+        db.session.flush()
+        db.session.add_all([
+            City(name='São Paulo', state_id=sp.id, population=12000000, is_metro=True),
+            City(name='Santos', state_id=sp.id, population=430000),
+            City(name='New York', state_id=ny.id, population=8000000, is_metro=True),
+            City(name='Newburgh', state_id=ny.id, population=28000),
+            City(name='New Rochelle', state_id=ny.id, population=79000),
+        ])
+        db.session.commit()
+        self.typeahead = get_typeahead()
+
+    def tearDown(self):
+        """Clean up test environment"""
+        activity_tracker.flush()
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def _labels(self, kind, query, limit=10):
+        return [result['label'] for result in self.typeahead.search(kind, query, limit)]
+
+    def test_normalize(self):
+        """Test accents, case and spacing are folded"""
+        self.assertEqual(normalize('  São   PAULO '), 'sao paulo')
+        self.assertEqual(normalize('Straße'), 'strasse')
+        self.assertEqual(normalize('Spring Boot (Java)'), 'spring boot java')
+        self.assertEqual(normalize('C++ / C#'), 'c++ c#')
+        print("✅ Names and queries are accent- and case-folded")
+
+    def test_skill_prefix_ranking(self):
+        """Test skills rank first-word matches by sort_order, then later-word matches"""
+        self.assertEqual(self._labels('skills', 'ja'), ['JavaScript', 'Java', 'Spring Boot (Java)'])
+        self.assertEqual(self._labels('skills', 'JAVA', limit=1), ['JavaScript'])
+        self.assertEqual(self._labels('skills', 'boot'), ['Spring Boot (Java)'])
+        self.assertEqual(self._labels('skills', 'cob'), [])  # inactive
+        self.assertEqual(self._labels('skills', ''), [])
+        print("✅ Skills are ranked by word position and sort order")
+
+    def test_city_ranking_and_accents(self):
+        """Test cities rank metros and population first and ignore accents"""
+        self.assertEqual(self._labels('cities', 'new'),
+                         ['New York, New York, United States', 'New Rochelle, New York, United States',
+                          'Newburgh, New York, United States'])
+        self.assertEqual(self._labels('cities', 'sao'), ['São Paulo, São Paulo, Brazil'])
+        self.assertEqual(self._labels('cities', 'SAN'), ['Santos, São Paulo, Brazil'])
+        self.assertEqual(self._labels('cities', 'york'), ['New York, New York, United States'])
+        self.assertEqual(self._labels('cities', 'new yo'), ['New York, New York, United States'])
+        print("✅ Cities rank metros and population first, accent-insensitively")
+
+    def test_incremental_update_on_edit(self):
+        """Test an edit re-keys only the changed record"""
+        self._labels('skills', 'ja')
+        index = self.typeahead.indexes['skills']
+
+        skill = Skill.query.filter_by(name='cobol').first()
+        skill.is_active = True
+        skill.display_name = 'Java EE'
+        bump_reference_version()
+        db.session.commit()
+
+        with patch.object(PrefixIndex, '_keys_for', wraps=PrefixIndex._keys_for) as keys_for:
+            self.assertEqual(self._labels('skills', 'java e'), ['Java EE'])
+        self.assertEqual(keys_for.call_count, 1)  # only the edited skill is re-keyed
+        self.assertEqual(len(index), 4)
+
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        self.addCleanup(event.remove, db.engine, 'before_cursor_execute', listener)
+        self._labels('skills', 'ja')
+        self.assertEqual(statements, [])
+        print("✅ Taxonomy edits update the index incrementally")
+
+    def test_precomputed_answers_match_a_scan(self):
+        """Test stored answers for short and heavy prefixes equal a full ranking"""
+        with patch('app.services.typeahead.HEAVY_SLICE', 1), patch('app.services.typeahead.SHORT_PREFIX', 1):
+            index = PrefixIndex('cities', _city_signature, _city_entry)
+            index.update(get_reference_data().all('cities', active_only=False))
+        keys, records, stored = index._state
+        self.assertIn('new', stored)  # three cities share it
+        for prefix, ids in stored.items():
+            self.assertEqual(ids, PrefixIndex._rank(keys, records, prefix, 20))
+        print("✅ Precomputed prefix answers match a full ranking")
+
+    def test_endpoint(self):
+        """Test the JSON endpoint for signed-in users"""
+        with patch('app.routes.reference_routes.AuthMiddleware.require_auth', return_value=None):
+            client = self.app.test_client()
+            response = client.get('/api/reference/typeahead/cities?q=new&limit=2')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual([r['name'] for r in response.get_json()['results']], ['New York', 'New Rochelle'])
+            self.assertEqual(client.get('/api/reference/typeahead/planets?q=ma').status_code, 404)
+        print("✅ Typeahead endpoint returns ranked JSON results")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,153 @@
+"""
+User Export Tests
+Tests the streaming, keyset-paged user export
+"""
+
+import csv
+import io
+import json
+import os
+import sys
+import unittest
+from unittest.mock import patch
+
+# Add the parent directory to the path so we can import the app
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import g
+from sqlalchemy import event
+
+from app import create_app, db
+from app.auth.auth_models import AuthUser, Role, SubscriptionPlan, UserRole, UserSubscription
+from app.routes.superadmin_routes import superadmin_bp
+from app.services.activity_tracker import activity_tracker
+from app.services.export_service import UserExportStream, decode_cursor, encode_cursor
+
+class TestUserExport(unittest.TestCase):
+    """Test NDJSON/CSV user exports"""
+
+    def setUp(self):
+        """Set up test environment"""
+        self.app = create_app('testing')
+        self.app.config['EXPORT_BATCH_SIZE'] = 2
+        self.app.register_blueprint(superadmin_bp, name='superadmin_acl', url_prefix='/acl')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        self.admin_role = Role(name='admin', display_name='Admin')
+        self.plan = SubscriptionPlan(name='pro', display_name='Pro', price_monthly=10, price_yearly=100)
+        db.session.add_all([self.admin_role, self.plan])
+        db.session.commit()
+        self._add_users(5)
+        self.admin = AuthUser.query.order_by(AuthUser.id).first()
+
+        def as_superadmin():
+            g.current_user = self.admin
+            return None
+
+        superadmin_patch = patch('app.routes.superadmin_routes.AuthMiddleware.superadmin_only', side_effect=as_superadmin)
+        superadmin_patch.start()
+        self.addCleanup(superadmin_patch.stop)
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        """Clean up test environment"""
+        activity_tracker.flush()
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def _add_users(self, count):
+        start = AuthUser.query.count()
+        for i in range(start, start + count):
+            user = AuthUser(username=f'export{i}', email=f'export{i}@test.com', first_name='Export')
+            user.password_hash = 'unused'
+            db.session.add(user)
+            db.session.flush()
+            if i % 2 == 0:
+                db.session.add(UserRole(user_id=user.id, role_id=self.admin_role.id))
+                db.session.add(UserSubscription(user_id=user.id, plan_id=self.plan.id, status='active'))
+        db.session.commit()
+
+    def _export(self, query=''):
+        response = self.client.get(f'/acl/export/users{query}')
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_ndjson_export(self):
+        """Test every user is streamed with roles and active plan"""
+        response = self._export()
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        self.assertIn('attachment', response.headers['Content-Disposition'])
+
+        records = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        self.assertEqual([record['username'] for record in records], [f'export{i}' for i in range(5)])
+        self.assertEqual(records[0]['roles'], ['admin'])
+        self.assertEqual(records[0]['subscription_plan'], 'pro')
+        self.assertEqual(records[0]['subscription_status'], 'active')
+        self.assertEqual(records[1]['roles'], [])
+        self.assertIsNone(records[1]['subscription_plan'])
+        self.assertNotIn('password_hash', records[0])
+        print("✅ NDJSON export streams every user with roles and plan")
+
+    def test_resume_from_cursor(self):
+        """Test a cursor resumes right after the record it came from"""
+        records = [json.loads(line) for line in self._export().get_data(as_text=True).splitlines()]
+
+        resumed = self._export(f'?cursor={records[2]["cursor"]}').get_data(as_text=True).splitlines()
+        self.assertEqual([json.loads(line)['id'] for line in resumed], [r['id'] for r in records[3:]])
+        self.assertEqual(decode_cursor(encode_cursor(42)), 42)
+
+        response = self.client.get('/acl/export/users?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, 400)
+        print("✅ Exports resume from a cursor and reject bad ones")
+
+    def test_csv_export(self):
+        """Test CSV export has one header and flattened roles"""
+        response = self._export('?format=csv')
+        self.assertEqual(response.mimetype, 'text/csv')
+
+        rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(rows[0]['roles'], 'admin')
+        self.assertEqual(rows[0]['subscription_plan'], 'pro')
+
+        resumed = self._export(f'?format=csv&cursor={rows[3]["cursor"]}').get_data(as_text=True)
+        self.assertEqual(len(resumed.splitlines()), 1)
+        self.assertNotIn('username', resumed)
+        print("✅ CSV export flattens roles and omits the header on resume")
+
+    def test_queries_scale_with_batches_not_users(self):
+        """Test each batch costs a fixed number of queries"""
+        self.app.config['EXPORT_BATCH_SIZE'] = 100
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        self.addCleanup(event.remove, db.engine, 'before_cursor_execute', listener)
+
+        self._export()
+        few = len(statements)
+
+        self._add_users(20)
+        db.session.refresh(self.admin)
+        statements.clear()
+        body = self._export().get_data(as_text=True)
+        self.assertEqual(len(body.splitlines()), 25)
+        self.assertEqual(len(statements), few)
+        print(f"✅ Exporting 5 or 25 users takes {few} queries")
+
+    def test_export_leaves_the_session_alone(self):
+        """Test batches are read off the request session, which is never committed"""
+        pending = AuthUser(username='pending', email='pending@test.com', password_hash='unused')
+        db.session.add(pending)
+        with patch.object(db.session, 'commit') as commit:
+            records = list(UserExportStream(batch_size=2).records())
+
+        self.assertEqual(len(records), 5)
+        commit.assert_not_called()
+        self.assertIn(pending, db.session.new)
+        print("✅ Export batches never touch the request session")
+
+if __name__ == '__main__':
+    unittest.main()